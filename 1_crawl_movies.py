@@ -19,55 +19,119 @@
 - data/raw/{worker_id}/movie_crew.jsonl
 - data/raw/{worker_id}/movie_awards.jsonl
 
-支持多 worker 切分任务：
-- 通过 --worker-id 和 --num-workers 指定当前 worker 要处理的子集
-- 默认 num_workers = 3
+支持多 worker 分配任务（--dispatch）：
+- lease（默认）：每个 worker 都把全部种子登记进 frontier，然后一小批一小批地认领电影，
+  干完再领；worker 崩了，它认领的电影租约过期后由其他 worker 接手。
+  worker 数量可以随时增减，--worker-id 只用来区分输出目录和 frontier 里的 owner
+- static：旧方式，通过 --worker-id 和 --num-workers 按种子行号取模静态切分，默认 num_workers = 3
 - 默认只爬前 10 部（max_movies=10），用于本地测试
+
+两种抓取引擎（--engine）：
+- sync  : 逐部电影串行抓取（默认）
+- async : asyncio 同时抓取多部电影（--concurrency），
+          按 host 限制并发，等令牌时 await 而不是阻塞；
+          每部电影的记录攒齐后一次性写出，输出文件与 sync 完全一致
+
+请求速率统一由 rate_limiter.py 的令牌桶控制（同一台机器上的所有 worker 共享）。
+
+失败的页面不再原地 sleep 重试，而是进 retry_queue 的延迟重试队列，
+重试用尽的写入 data/state/dead_letters/movies_{worker_id}.jsonl，
+之后可以用 --retry-dead-letters 单独重放。
+
+断点续爬：每个页面的进度记在 frontier（data/state/frontier.sqlite3），
+输出文件以追加模式打开，重启后跳过已完成的页面，从上次停下的地方接着跑。
+想从头再来，删掉 frontier 库、实体缓存和 data/raw/{worker_id}/ 即可。
+
+实体缓存（entity_cache.py）：crawler_config.ENTITY_TTL_DAYS["movie"] 天内抓过 subject 的电影
+（包括 data/raw/*/ 里已有的）不再抓 subject（没抓完的 celebrities / awards 照常续抓）；过期的只重抓 subject，
+basic / details / summary 都没变的不重复写出。subject 的三类记录都带 fetched_at（抓取时间），
+同一部电影写出过多次时 ETL 取最新的一条。
+
+每次抓到的响应都存进 page_archive 的原始响应存档（data/archive），
+改了解析器以后用 --from-archive 从存档重新解析，不发任何请求。
+
+各接口（subject / celebrities / awards）的耗时、字节数、状态码、重试和等令牌时间记进 metrics.py，
+写到 data/state/metrics/movies_{worker_id}.prom；--metrics-port 另开本地 /metrics 端点。
 """
 
 from __future__ import annotations
 
 import argparse
+import asyncio
+import contextlib
+import itertools
 import json
 import os
-import random
-import time
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, TextIO
 import requests
 
 from utils import fetch_html
+from entity_cache import FETCHED_AT, EntityCache, fetched_at_stamp, get_entity_cache, open_entity_cache
+from frontier import Frontier
+from page_archive import enable_replay
+from metrics import endpoint_of, get_metrics, start_metrics
+from rate_limiter import get_limiter, host_of
+from retry_queue import (
+    RetryQueue,
+    Task,
+    append_dead_letter,
+    dead_letter_path,
+    describe,
+    finish_dead_letters,
+    retry_delay,
+    take_dead_letters,
+)
 
 # 按你的实际模块路径调整下面这些 import
-from movie_info.ld_json import parse_movie_basic_from_ld_json
-from movie_info.summary import parse_summary
-from movie_info.details import parse_details
+from movie_info.subject_page import SubjectPage
 from person.celebrities import parse_celebrities
 from award.movie_awards import parse_awards
 
 from crawler_config import (
+    DOUBAN_MOVIE_BASE_URL,
     MOVIE_SEED_PATH,
     RAW_ROOT_DIR,
-    REQUEST_MIN_INTERVAL,
-    REQUEST_MAX_INTERVAL,
-    LONG_BREAK_EVERY,
-    LONG_BREAK_MIN,
-    LONG_BREAK_MAX,
     MAX_RETRY,
-    RETRY_BACKOFF_MIN,
-    RETRY_BACKOFF_MAX,
+    LEASE_BATCH_SIZE,
+    ASYNC_MAX_MOVIES_IN_FLIGHT,
+    ASYNC_PER_HOST_MAX_CONCURRENCY,
+    METRICS_PORT,
 )
 
 # ====== URL 模板 ======
 
-SUBJECT_URL_TMPL = "https://movie.douban.com/subject/{movie_id}/"
-CELEBRITIES_URL_TMPL = "https://movie.douban.com/subject/{movie_id}/celebrities"
-AWARDS_URL_TMPL = "https://movie.douban.com/subject/{movie_id}/awards/"
+SUBJECT_URL_TMPL = DOUBAN_MOVIE_BASE_URL + "/subject/{movie_id}/"
+CELEBRITIES_URL_TMPL = DOUBAN_MOVIE_BASE_URL + "/subject/{movie_id}/celebrities"
+AWARDS_URL_TMPL = DOUBAN_MOVIE_BASE_URL + "/subject/{movie_id}/awards/"
 
+# 页面类型 -> URL 模板，也是重试任务的 kind / frontier 里的 page_type
+PAGE_URL_TMPLS = {
+    "subject": SUBJECT_URL_TMPL,
+    "celebrities": CELEBRITIES_URL_TMPL,
+    "awards": AWARDS_URL_TMPL,
+}
 
-# ====== 小工具 ======
+# subject 抓完之后才知道 movie_douban_id，这两类页面由 subject 派生
+CHILD_PAGE_KINDS = ("celebrities", "awards")
+# subject 页面写出的记录类型（实体缓存按这三类一起算内容哈希）
+SUBJECT_RECORD_KINDS = ("basic", "details", "summary")
+# 本爬虫负责的页面类型（lease 模式认领时用；同一部电影的短评页归 4_crawl_movie_comments）
+MOVIE_PAGE_TYPES = ("subject",) + CHILD_PAGE_KINDS
 
-_request_counter = 0  # 全局请求计数器
+# ====== 输出文件：记录类型 -> 文件名（位于 data/raw/{worker_id}/ 下） ======
 
+OUTPUT_FILES = {
+    "basic": "movies_basic.jsonl",      # ld+json 基本信息
+    "details": "movies_details.jsonl",  # 地区 / 语言
+    "summary": "movies_summary.jsonl",  # 剧情简介
+    "cast": "movie_cast.jsonl",         # 演员
+    "crew": "movie_crew.jsonl",         # 幕后
+    "awards": "movie_awards.jsonl",     # 奖项记录
+}
+
+
+# ====== 小工具 ======
 
 def ensure_dir_for_file(path: str) -> None:
     """确保某个文件的上级目录存在"""
@@ -76,61 +140,17 @@ def ensure_dir_for_file(path: str) -> None:
         os.makedirs(dirname, exist_ok=True)
 
 
-def polite_sleep() -> None:
-    """在每次请求后小睡一下，偶尔长休息"""
-    global _request_counter
-    _request_counter += 1
-
-    # 普通间隔
-    interval = random.uniform(REQUEST_MIN_INTERVAL, REQUEST_MAX_INTERVAL)
-    time.sleep(interval)
-
-    # 长休息
-    if _request_counter % LONG_BREAK_EVERY == 0:
-        long_sleep = random.uniform(LONG_BREAK_MIN, LONG_BREAK_MAX)
-        print(f"[throttle] 已发送 {_request_counter} 次请求，长休眠 {long_sleep:.2f} 秒")
-        time.sleep(long_sleep)
-
-
-def fetch_page_with_retry(url: str) -> Optional[str]:
-    """
-    带重试的抓取函数：
-    - 调用 utils.fetch_html
-    - 出现异常时等待一段时间重试
-    - 最多重试 MAX_RETRY 次
-    """
-    for attempt in range(1, MAX_RETRY + 1):
-        try:
-            html = fetch_html(url)
-            polite_sleep()
-            return html
-
-        except requests.HTTPError as e:
-            status = e.response.status_code if e.response is not None else None
-            if status == 404:
-                print(f"[fetch] 404 Not Found，直接跳过：{url}")
-                # 不重试，不 sleep，直接放弃这个 URL
-                return None
-
-            print(
-                f"[fetch] HTTP error status={status} "
-                f"(attempt={attempt}/{MAX_RETRY}): {url}"
-            )
-
-        # 其他网络错误（超时、连接错误等）还是按原逻辑重试
-        except Exception as e:
-            print(f"[fetch] 请求失败 (attempt={attempt}/{MAX_RETRY}): {url}")
-            print(f"        错误: {e!r}")
-
-        if attempt >= MAX_RETRY:
-            print("[fetch] 达到最大重试次数，放弃该 URL")
-            break
-
-        backoff = random.uniform(RETRY_BACKOFF_MIN, RETRY_BACKOFF_MAX)
-        print(f"[fetch] {backoff:.2f}s 后重试...")
-        time.sleep(backoff)
-
-    return None
+def movie_task(kind: str, movie_id: str, movie_douban_id: Optional[str] = None) -> Task:
+    """构造某部电影某个页面的抓取任务（也是重试队列 / dead-letter / frontier 里的记录格式）"""
+    return {
+        "entity_type": "movie",
+        "entity_id": movie_id,
+        "page_type": kind,
+        "kind": kind,
+        "url": PAGE_URL_TMPLS[kind].format(movie_id=movie_id),
+        "movie_id": movie_id,
+        "movie_douban_id": movie_douban_id or movie_id,
+    }
 
 
 def load_seed_movie_ids_for_worker(
@@ -186,32 +206,18 @@ def load_seed_movie_ids_for_worker(
     return ids
 
 
-# ====== 单部电影抓取逻辑 ======
+# ====== 页面解析：HTML -> 各类记录 ======
 
-def crawl_single_movie(
-        movie_id: str,
-        f_basic,
-        f_details,
-        f_summary,
-        f_cast,
-        f_crew,
-        f_awards,
-) -> None:
+def parse_subject_records(movie_id: str, subject_html: str) -> Dict[str, List[Dict[str, Any]]]:
     """
-    抓取单部电影的所有信息，并写入对应 jsonl 文件。
-    文件句柄在外面统一打开，便于流式写入。
+    解析 subject 主页面，得到 basic / details / summary 三类记录。
+    只做解析不写文件，sync / async 两个引擎共用。
+    文档树只建一次（SubjectPage），三类字段共用。
     """
-    print(f"\n==== 开始抓取电影 {movie_id} ====")
+    page = SubjectPage(subject_html)
 
-    # --- 1. 主页面 HTML ---
-    subject_url = SUBJECT_URL_TMPL.format(movie_id=movie_id)
-    subject_html = fetch_page_with_retry(subject_url)
-    if not subject_html:
-        print(f"[movie={movie_id}] 获取 subject 页面失败，跳过该电影")
-        return
-
-    # --- 2. 基本信息（ld+json） ---
-    basic = parse_movie_basic_from_ld_json(subject_html) or {}
+    # --- 基本信息（ld+json） ---
+    basic = page.basic() or {}
     # 统一字段名：movie_douban_id
     movie_douban_id = basic.get("douban_id") or movie_id
 
@@ -223,58 +229,426 @@ def crawl_single_movie(
         "genres": basic.get("genres") or [],
         "runtime_minutes": basic.get("runtime_minutes"),
     }
-    f_basic.write(json.dumps(basic_record, ensure_ascii=False) + "\n")
 
-    # --- 3. 地区 / 语言 ---
-    details = parse_details(subject_html) or {}
+    # --- 地区 / 语言 ---
+    details = page.details() or {}
     details_record = {
         "movie_douban_id": movie_douban_id,
         "regions": details.get("regions") or [],
         "languages": details.get("languages") or [],
     }
-    f_details.write(json.dumps(details_record, ensure_ascii=False) + "\n")
 
-    # --- 4. 剧情简介 ---
-    summary_text = parse_summary(subject_html)
+    # --- 剧情简介 ---
+    summary_records: List[Dict[str, Any]] = []
+    summary_text = page.summary()
     if summary_text:
-        summary_record = {
+        summary_records.append({
             "movie_douban_id": movie_douban_id,
             "summary": summary_text,
-        }
-        f_summary.write(json.dumps(summary_record, ensure_ascii=False) + "\n")
+        })
     else:
         print(f"[movie={movie_id}] 没有抓到剧情简介")
 
-    # --- 5. 演职员信息 ---
-    cele_url = CELEBRITIES_URL_TMPL.format(movie_id=movie_id)
-    cele_html = fetch_page_with_retry(cele_url)
+    return {
+        "basic": [basic_record],
+        "details": [details_record],
+        "summary": summary_records,
+    }
+
+
+def parse_celebrities_records(movie_douban_id: str, cele_html: str) -> Dict[str, List[Dict[str, Any]]]:
+    """解析 /celebrities 页面，得到 cast / crew 两类记录"""
+    cele_data = parse_celebrities(cele_html, movie_douban_id=movie_douban_id)
+
+    cast = cele_data.get("cast", [])
+    crew = cele_data.get("crew", [])
+    # 确保 movie_douban_id 填好
+    for rec in cast + crew:
+        rec.setdefault("movie_douban_id", movie_douban_id)
+
+    return {"cast": cast, "crew": crew}
+
+
+def parse_awards_records(movie_douban_id: str, awards_html: str) -> Dict[str, List[Dict[str, Any]]]:
+    """解析 /awards 页面，得到 awards 记录"""
+    awards_data = parse_awards(awards_html, movie_douban_id=movie_douban_id)
+
+    awards = awards_data.get("awards", [])
+    for rec in awards:
+        rec.setdefault("movie_douban_id", movie_douban_id)
+
+    return {"awards": awards}
+
+
+def write_records(records: Dict[str, List[Dict[str, Any]]], writers: Dict[str, TextIO]) -> None:
+    """按记录类型写入对应的 jsonl 文件"""
+    for kind, recs in records.items():
+        f = writers[kind]
+        for rec in recs:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        # 写完马上 flush，之后才能在 frontier 里标记 done
+        f.flush()
+
+
+def stamp_subject_records(subject_records: Dict[str, List[Dict[str, Any]]], url: str) -> None:
+    """给 subject 的三类记录打上抓取时间（重放存档时是当初抓到页面的时间）"""
+    stamp = fetched_at_stamp(url)
+    for kind in SUBJECT_RECORD_KINDS:
+        for rec in subject_records.get(kind, []):
+            rec[FETCHED_AT] = stamp
+
+
+def fresh_subject_records(
+        movie_id: str,
+        subject_records: Dict[str, List[Dict[str, Any]]],
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    实体缓存（entity_cache.py）过期后重新抓到的 subject：basic / details / summary 都和上次一样时返回空，
+    不再重复写出；有一类变了就三类原样返回（ETL 按 fetched_at 取最新的一条）。
+    """
+    cache = get_entity_cache()
+    if cache is not None and not cache.changed("movie", movie_id, subject_records):
+        print(f"[movie={movie_id}] subject 内容和上次一样，不重复写出")
+        return {}
+    return subject_records
+
+
+def remember_movie(movie_id: str, subject_records: Dict[str, List[Dict[str, Any]]]) -> None:
+    """subject 的记录写出之后，在实体缓存里记下这次的抓取时间和内容哈希"""
+    cache = get_entity_cache()
+    if cache is not None:
+        cache.record("movie", movie_id, subject_records)
+
+
+def skip_cached_movies(frontier: Frontier, cache: EntityCache, movie_ids: List[str]) -> List[str]:
+    """
+    按实体缓存筛一遍种子：有效期内抓过 subject 的电影，subject 在 frontier 里直接记为 done；
+    过期的把 frontier 里已完成的 subject 放回 pending（celebrities / awards 不重抓）。
+    返回还要交给 frontier 的那些：没抓过的、过期的，以及有效期内但 celebrities / awards 还没抓完的
+    （subject 写出后、子页面抓完前被杀掉的，static 模式只遍历这份列表，不留下的话子页面永远不会续抓）。
+    """
+    cache.scan_raw(
+        RAW_ROOT_DIR, "movie", {kind: OUTPUT_FILES[kind] for kind in SUBJECT_RECORD_KINDS}, "movie_douban_id"
+    )
+    fresh, stale = cache.split("movie", movie_ids)
+    skipped = frontier.mark_done_many(movie_task("subject", mid) for mid in fresh)
+    reopened = frontier.reopen_many(movie_task("subject", mid) for mid in movie_ids if mid in stale)
+    print(
+        f"[cache] 缓存 {len(cache)} 个实体；有效期内 {len(fresh)} 部电影跳过"
+        f"（frontier 新记为 done {skipped} 部），过期 {len(stale)} 部（重新放回 pending {reopened} 部）"
+    )
+    return [mid for mid in movie_ids if mid not in fresh or open_movie_tasks(frontier, mid)]
+
+
+def open_movie_tasks(frontier: Frontier, movie_id: str) -> Dict[str, Task]:
+    """
+    某部电影在 frontier 里还没完成的页面任务：kind -> task。
+    URL 按当前配置重新生成（base url 可能换过，比如切到本地 mock）。
+    """
+    tasks: Dict[str, Task] = {}
+    for t in frontier.open_tasks("movie", movie_id):
+        kind = t.get("kind")
+        if kind in PAGE_URL_TMPLS:
+            tasks[kind] = movie_task(kind, movie_id, t.get("movie_douban_id"))
+    return tasks
+
+
+# ====== 单部电影抓取逻辑（sync 引擎） ======
+
+def crawl_subject_page(task: Task, writers: Dict[str, TextIO], retry_queue: RetryQueue) -> None:
+    """subject 主页面：基本信息 / 地区语言 / 剧情简介，成功后接着抓 celebrities / awards"""
+    movie_id = task["movie_id"]
+    subject_html = retry_queue.try_fetch(task)
+    if not subject_html:
+        print(f"[movie={movie_id}] 获取 subject 页面失败，celebrities / awards 暂不抓取")
+        return
+
+    subject_records = parse_subject_records(movie_id, subject_html)
+    stamp_subject_records(subject_records, task["url"])
+    write_records(fresh_subject_records(movie_id, subject_records), writers)
+    remember_movie(movie_id, subject_records)
+    movie_douban_id = subject_records["basic"][0]["movie_douban_id"]
+
+    # 子页面先登记再把 subject 记为 done：崩在中间的话重启后还能找到它们
+    children = [
+        child for child in (movie_task(kind, movie_id, movie_douban_id) for kind in CHILD_PAGE_KINDS)
+        if retry_queue.should_fetch(child)
+    ]
+    retry_queue.complete(task)
+
+    for child in children:
+        PAGE_HANDLERS[child["kind"]](child, writers, retry_queue)
+
+
+def crawl_celebrities_page(task: Task, writers: Dict[str, TextIO], retry_queue: RetryQueue) -> None:
+    """/celebrities 页面：演职员信息"""
+    cele_html = retry_queue.try_fetch(task)
     if cele_html:
-        cele_data = parse_celebrities(cele_html, movie_douban_id=movie_douban_id)
-        for rec in cele_data.get("cast", []):
-            # 确保 movie_douban_id 填好
-            rec.setdefault("movie_douban_id", movie_douban_id)
-            f_cast.write(json.dumps(rec, ensure_ascii=False) + "\n")
-
-        for rec in cele_data.get("crew", []):
-            rec.setdefault("movie_douban_id", movie_douban_id)
-            f_crew.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        write_records(parse_celebrities_records(task["movie_douban_id"], cele_html), writers)
+        retry_queue.complete(task)
     else:
-        print(f"[movie={movie_id}] 获取演职员页面失败")
+        print(f"[movie={task['movie_id']}] 获取演职员页面失败")
 
-    # --- 6. 奖项信息 ---
-    awards_url = AWARDS_URL_TMPL.format(movie_id=movie_id)
-    awards_html = fetch_page_with_retry(awards_url)
+
+def crawl_awards_page(task: Task, writers: Dict[str, TextIO], retry_queue: RetryQueue) -> None:
+    """/awards 页面：奖项信息"""
+    awards_html = retry_queue.try_fetch(task)
     if awards_html:
-        awards_data = parse_awards(awards_html, movie_douban_id=movie_douban_id)
-        for rec in awards_data.get("awards", []):
-            rec.setdefault("movie_douban_id", movie_douban_id)
-            f_awards.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        write_records(parse_awards_records(task["movie_douban_id"], awards_html), writers)
+        retry_queue.complete(task)
     else:
-        print(f"[movie={movie_id}] 获取 awards 页面失败")
+        print(f"[movie={task['movie_id']}] 获取 awards 页面失败")
+
+
+# 任务 kind -> 处理函数
+PAGE_HANDLERS = {
+    "subject": crawl_subject_page,
+    "celebrities": crawl_celebrities_page,
+    "awards": crawl_awards_page,
+}
+
+
+def handle_movie_task(task: Task, writers: Dict[str, TextIO], retry_queue: RetryQueue) -> None:
+    """按 kind 分派页面任务（新任务、到期重试、dead-letter 重放都走这里）"""
+    handler = PAGE_HANDLERS.get(task.get("kind"))
+    if handler is None:
+        print(f"[retry] 未知任务类型，跳过: {task!r}")
+        return
+    handler(task, writers, retry_queue)
+
+
+def crawl_single_movie(
+        movie_id: str,
+        writers: Dict[str, TextIO],
+        retry_queue: RetryQueue,
+        frontier: Frontier,
+) -> None:
+    """
+    抓取单部电影还没完成的页面，并写入对应 jsonl 文件。
+    文件句柄在外面统一打开（writers: 记录类型 -> 文件句柄），便于流式写入。
+    失败的页面进 retry_queue，稍后重试，不阻塞后面的电影。
+    """
+    open_tasks = open_movie_tasks(frontier, movie_id)
+    if not open_tasks:
+        print(f"[movie={movie_id}] frontier 中已全部完成，跳过")
+        return
+
+    print(f"\n==== 开始抓取电影 {movie_id} ====")
+    if "subject" in open_tasks:
+        # subject 成功后会自己派生 celebrities / awards
+        crawl_subject_page(open_tasks["subject"], writers, retry_queue)
+    else:
+        for kind in CHILD_PAGE_KINDS:
+            if kind in open_tasks:
+                PAGE_HANDLERS[kind](open_tasks[kind], writers, retry_queue)
+    print(f"==== 电影 {movie_id} 抓取完成 ====")
+
+
+# ====== asyncio 引擎 ======
+
+class AsyncHostLimiter:
+    """
+    按 host 的限并发 + 令牌桶限速：
+
+    - 同一 host 同时在途的请求数不超过 max_concurrency；
+    - 发起时间向 rate_limiter 的共享令牌桶预约（和其他 worker 进程共用一份速率预算）。
+
+    等待全部是 await（预约令牌在线程里做），一部电影在等的时候其他电影照常推进。
+    """
+
+    def __init__(self, max_concurrency: int):
+        self._max_concurrency = max(1, max_concurrency)
+        self._sems: Dict[str, asyncio.Semaphore] = {}
+
+    @contextlib.asynccontextmanager
+    async def slot(self, url: str):
+        host = host_of(url)
+        sem = self._sems.get(host)
+        if sem is None:
+            sem = asyncio.Semaphore(self._max_concurrency)
+            self._sems[host] = sem
+
+        async with sem:
+            # reserve 要拿令牌桶状态文件的文件锁并读写文件，多个 worker 抢锁时会阻塞，
+            # 放到线程里做，别卡住事件循环上的其他电影
+            wait = await asyncio.to_thread(get_limiter().reserve, host)
+            if wait > 0:
+                get_metrics().record_throttle(endpoint_of(url), wait)
+                await asyncio.sleep(wait)
+            yield
+
+
+async def fetch_page_with_retry_async(
+        task: Task,
+        limiter: AsyncHostLimiter,
+        executor: ThreadPoolExecutor,
+        dead_letters: str,
+        frontier: Frontier,
+) -> Optional[str]:
+    """
+    带重试的异步抓取：
+    - 请求本身仍然走 utils.fetch_html（连接池），丢到线程池里执行
+    - 限速交给 limiter，重试退避（retry_queue.retry_delay）用 asyncio.sleep，不阻塞其他电影
+    - 重试用尽写入 dead-letter 文件，和 sync 引擎格式一致
+    - frontier：开始时 in_progress，404 记 done，重试用尽记 failed；
+      成功时由调用方写完记录后再记 done
+    """
+    loop = asyncio.get_running_loop()
+    url = task["url"]
+    error = ""
+    frontier.mark_in_progress(task)
+
+    for attempt in range(1, MAX_RETRY + 1):
+        try:
+            async with limiter.slot(url):
+                # 令牌已经在 slot 里预约过了，这里不再重复申请
+                return await loop.run_in_executor(executor, fetch_html, url, False)
+
+        except requests.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            if status == 404:
+                print(f"[fetch] 404 Not Found，直接跳过：{url}")
+                frontier.mark_done(task)
+                return None
+
+            error = f"HTTP {status}"
+            print(
+                f"[fetch] HTTP error status={status} "
+                f"(attempt={attempt}/{MAX_RETRY}): {url}"
+            )
+
+        except Exception as e:
+            error = repr(e)
+            print(f"[fetch] 请求失败 (attempt={attempt}/{MAX_RETRY}): {url}")
+            print(f"        错误: {e!r}")
+
+        if attempt >= MAX_RETRY:
+            append_dead_letter(dead_letters, dict(task, attempt=attempt), error)
+            frontier.mark_failed(task, error)
+            break
+
+        backoff = retry_delay(attempt)
+        get_metrics().record_retry(endpoint_of(url))
+        print(f"[fetch] {backoff:.2f}s 后重试: {describe(task)}")
+        await asyncio.sleep(backoff)
+
+    return None
+
+
+async def crawl_single_movie_async(
+        movie_id: str,
+        writers: Dict[str, TextIO],
+        limiter: AsyncHostLimiter,
+        executor: ThreadPoolExecutor,
+        dead_letters: str,
+        frontier: Frontier,
+) -> None:
+    """
+    crawl_single_movie 的异步版本。
 
+    subject 成功后 celebrities / awards 并发抓取；
+    所有记录攒齐后再一次性写出，保证同一部电影的记录在各文件里连续、不和别的电影交错，
+    写完之后再把成功的页面在 frontier 里记为 done。
+    """
+    open_tasks = open_movie_tasks(frontier, movie_id)
+    if not open_tasks:
+        print(f"[movie={movie_id}] frontier 中已全部完成，跳过")
+        return
+
+    loop = asyncio.get_running_loop()
+    print(f"\n==== 开始抓取电影 {movie_id} ====")
+
+    fetch = lambda t: fetch_page_with_retry_async(t, limiter, executor, dead_letters, frontier)
+    records: Dict[str, List[Dict[str, Any]]] = {}
+    done_tasks: List[Task] = []
+    subject_records: Optional[Dict[str, List[Dict[str, Any]]]] = None
+
+    if "subject" in open_tasks:
+        subject_task = open_tasks["subject"]
+        subject_html = await fetch(subject_task)
+        if not subject_html:
+            print(f"[movie={movie_id}] 获取 subject 页面失败，跳过该电影")
+            return
+
+        # 解析是 CPU 活，也丢到线程池里，别卡住事件循环
+        subject_records = await loop.run_in_executor(executor, parse_subject_records, movie_id, subject_html)
+        done_tasks.append(subject_task)
+        stamp_subject_records(subject_records, subject_task["url"])
+        movie_douban_id = subject_records["basic"][0]["movie_douban_id"]
+        records = dict(fresh_subject_records(movie_id, subject_records))
+
+        children = []
+        for kind in CHILD_PAGE_KINDS:
+            child = movie_task(kind, movie_id, movie_douban_id)
+            frontier.add(child, hold=True)
+            if not frontier.is_done(child):
+                children.append(child)
+    else:
+        children = [open_tasks[kind] for kind in CHILD_PAGE_KINDS if kind in open_tasks]
+
+    parsers = {"celebrities": parse_celebrities_records, "awards": parse_awards_records}
+    htmls = await asyncio.gather(*(fetch(child) for child in children))
+
+    for child, html in zip(children, htmls):
+        if html:
+            records.update(await loop.run_in_executor(
+                executor, parsers[child["kind"]], child["movie_douban_id"], html
+            ))
+            done_tasks.append(child)
+        else:
+            print(f"[movie={movie_id}] 获取 {child['kind']} 页面失败")
+
+    # 事件循环是单线程的，这里同步写完之前不会切到别的电影
+    write_records(records, writers)
+    if subject_records is not None:
+        remember_movie(movie_id, subject_records)
+    for t in done_tasks:
+        frontier.mark_done(t)
     print(f"==== 电影 {movie_id} 抓取完成 ====")
 
 
+async def crawl_movies_async(
+        movie_ids: Iterable[str],
+        writers: Dict[str, TextIO],
+        dead_letters: str,
+        frontier: Frontier,
+        max_in_flight: int = ASYNC_MAX_MOVIES_IN_FLIGHT,
+        per_host_concurrency: int = ASYNC_PER_HOST_MAX_CONCURRENCY,
+) -> int:
+    """
+    同时抓取至多 max_in_flight 部电影，返回处理了多少部。
+
+    movie_ids 可以是列表（static），也可以是边认领边产出的迭代器（lease）：
+    max_in_flight 个协程共用一个迭代器，谁空了谁取下一部。
+    """
+    max_in_flight = max(1, max_in_flight)
+    limiter = AsyncHostLimiter(max_concurrency=per_host_concurrency)
+    # 每部电影同时最多 2 个请求（celebrities + awards），线程给够即可
+    executor = ThreadPoolExecutor(max_workers=max_in_flight * 2)
+    ids = iter(movie_ids)
+    counter = itertools.count(1)
+    total = f"/{len(movie_ids)}" if isinstance(movie_ids, list) else ""
+    processed = 0
+
+    async def _worker() -> None:
+        nonlocal processed
+        # 取下一部电影是同步调用，协程之间不会同时推进这个迭代器
+        for mid in ids:
+            print(f"\n===== [{next(counter)}{total}] movie_id={mid} =====")
+            try:
+                await crawl_single_movie_async(mid, writers, limiter, executor, dead_letters, frontier)
+            except Exception as e:
+                # 单部电影出问题不影响其他电影
+                print(f"[movie={mid}] 抓取异常，跳过: {e!r}")
+            processed += 1
+
+    try:
+        await asyncio.gather(*(_worker() for _ in range(max_in_flight)))
+    finally:
+        executor.shutdown(wait=True)
+    return processed
+
+
 # ====== 参数解析 & 主流程 ======
 
 def parse_args() -> argparse.Namespace:
@@ -291,13 +665,48 @@ def parse_args() -> argparse.Namespace:
         "--num-workers",
         type=int,
         default=3,
-        help="总 worker 数量，用于切分种子电影（默认 3）",
+        help="总 worker 数量，仅 --dispatch static 时用于切分种子电影（默认 3）",
+    )
+    parser.add_argument(
+        "--dispatch",
+        choices=["lease", "static"],
+        default="lease",
+        help="任务分配：lease 从 frontier 动态认领（默认）；static 按行号取模静态切分",
     )
     parser.add_argument(
         "--max-movies",
         type=int,
         default=10,
-        help="当前 worker 最多处理多少部电影，默认 10（测试用）。设为 0 或负数表示不限。",
+        help="最多处理多少部电影，默认 10（测试用）；lease 模式下是全部种子的前 N 部。设为 0 或负数表示不限。",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["sync", "async"],
+        default="sync",
+        help="抓取引擎：sync 串行（默认）；async 多部电影并发 + 按 host 限并发",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=ASYNC_MAX_MOVIES_IN_FLIGHT,
+        help=f"async 引擎同时在途的电影数（默认 {ASYNC_MAX_MOVIES_IN_FLIGHT}）",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=METRICS_PORT,
+        help="在 127.0.0.1:(端口 + worker_id)/metrics 提供 Prometheus 指标，0 表示不开（默认 %(default)s）",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--retry-dead-letters",
+        action="store_true",
+        help="不读种子，只重放当前 worker 的 dead-letter 任务",
+    )
+    mode.add_argument(
+        "--from-archive",
+        action="store_true",
+        help="不联网，从原始响应存档（data/archive）重新解析当前 worker 的种子，输出覆盖写",
     )
     return parser.parse_args()
 
@@ -309,61 +718,129 @@ def main():
     num_workers = args.num_workers
     max_movies = args.max_movies if args.max_movies and args.max_movies > 0 else None
 
+    if args.from_archive and args.engine == "async":
+        print("[archive] 重放存档是纯 CPU 活，改用 sync 引擎")
+
     print(
         f"===> 启动 1_crawl_movies.py | worker_id={worker_id}, "
-        f"num_workers={num_workers}, max_movies={max_movies or '不限'}"
+        f"num_workers={num_workers}, max_movies={max_movies or '不限'}, "
+        f"engine={args.engine}, dispatch={args.dispatch}, retry_dead_letters={args.retry_dead_letters}, "
+        f"from_archive={args.from_archive}"
     )
-    print(f"种子文件: {MOVIE_SEED_PATH}")
 
-    # 根据 worker 切分种子
-    movie_ids = load_seed_movie_ids_for_worker(
-        worker_id=worker_id,
-        num_workers=num_workers,
-        max_movies=max_movies,
-    )
-    print(f"当前 worker 将抓取 {len(movie_ids)} 部电影。")
+    if args.from_archive:
+        # 重放存档：不联网；进度记在内存库里，不碰正式 frontier，每个页面都重新解析一遍。
+        # 存档里没有的页面不重试，直接进单独的 dead-letter 文件
+        enable_replay()
+        dead_letters = dead_letter_path("movies_archive", worker_id)
+        frontier = Frontier(path=":memory:", owner=f"movies:{worker_id}")
+        cache = None
+    else:
+        dead_letters = dead_letter_path("movies", worker_id)
+        frontier = Frontier(owner=f"movies:{worker_id}")
+        # 实体缓存：有效期内抓过的电影不再抓，写出记录时更新
+        cache = open_entity_cache()
+        start_metrics("movies", worker_id, port=args.metrics_port)
+        # 上次崩溃 / 被杀时遗留的 in_progress 放回 pending
+        frontier.reset_stale()
+
+    # 重放存档时各 worker 的内存 frontier 互不相通，只能静态切分
+    lease = args.dispatch == "lease" and not args.from_archive
+    if args.retry_dead_letters:
+        replay_tasks = take_dead_letters(dead_letters)
+        movie_ids: List[str] = []
+    else:
+        print(f"种子文件: {MOVIE_SEED_PATH}")
+        replay_tasks = []
+        # lease：全部种子都登记（各 worker 重复登记无害），之后按需认领；
+        # static：只登记属于当前 worker 的那一份
+        movie_ids = load_seed_movie_ids_for_worker(
+            worker_id=0 if lease else worker_id,
+            num_workers=1 if lease else num_workers,
+            max_movies=max_movies,
+        )
+        if cache is not None:
+            movie_ids = skip_cached_movies(frontier, cache, movie_ids)
+        new = frontier.add_many(movie_task("subject", mid) for mid in movie_ids)
+        if lease:
+            print(f"种子共 {len(movie_ids)} 部电影（frontier 新登记 {new} 部），从 frontier 认领。")
+        else:
+            print(f"当前 worker 负责 {len(movie_ids)} 部电影（frontier 新登记 {new} 部）。")
+        print(f"[frontier] movie 任务状态: {frontier.counts('movie')}")
+
+    def movie_source() -> Iterable[str]:
+        if lease:
+            return frontier.leased_entities("movie", MOVIE_PAGE_TYPES, LEASE_BATCH_SIZE)
+        return movie_ids
 
     # 统一输出目录：data/raw/{worker_id}/
     worker_dir = os.path.join(RAW_ROOT_DIR, str(worker_id))
-
-    basic_path = os.path.join(worker_dir, "movies_basic.jsonl")
-    details_path = os.path.join(worker_dir, "movies_details.jsonl")
-    summary_path = os.path.join(worker_dir, "movies_summary.jsonl")
-    cast_path = os.path.join(worker_dir, "movie_cast.jsonl")
-    crew_path = os.path.join(worker_dir, "movie_crew.jsonl")
-    awards_path = os.path.join(worker_dir, "movie_awards.jsonl")
+    out_paths = {kind: os.path.join(worker_dir, name) for kind, name in OUTPUT_FILES.items()}
 
     # 确保输出目录存在
-    for path in [basic_path, details_path, summary_path, cast_path, crew_path, awards_path]:
+    for path in out_paths.values():
         ensure_dir_for_file(path)
 
-    # 以覆盖模式写出（测试阶段）。以后跑正式全量，可以改成 "a" 追加。
-    with open(basic_path, "w", encoding="utf-8") as f_basic, \
-            open(details_path, "w", encoding="utf-8") as f_details, \
-            open(summary_path, "w", encoding="utf-8") as f_summary, \
-            open(cast_path, "w", encoding="utf-8") as f_cast, \
-            open(crew_path, "w", encoding="utf-8") as f_crew, \
-            open(awards_path, "w", encoding="utf-8") as f_awards:
-
-        for idx, mid in enumerate(movie_ids, start=1):
-            print(f"\n===== [{idx}/{len(movie_ids)}] movie_id={mid} =====")
-            crawl_single_movie(
-                movie_id=mid,
-                f_basic=f_basic,
-                f_details=f_details,
-                f_summary=f_summary,
-                f_cast=f_cast,
-                f_crew=f_crew,
-                f_awards=f_awards,
-            )
+    # 重放存档：输出覆盖写，存档里没有的页面不重试；平时：追加写入，frontier 保证不会重复抓
+    file_mode = "w" if args.from_archive else "a"
+    max_retry = 1 if args.from_archive else MAX_RETRY
+    with contextlib.ExitStack() as stack:
+        writers = {
+            kind: stack.enter_context(open(path, file_mode, encoding="utf-8"))
+            for kind, path in out_paths.items()
+        }
+
+        if args.retry_dead_letters:
+            # 重放量一般不大，统一走 sync 的页面级 handler
+            retry_queue = RetryQueue(dead_letters, max_retry=max_retry, frontier=frontier)
+            handle = lambda task: handle_movie_task(task, writers, retry_queue)
+            for idx, task in enumerate(replay_tasks, start=1):
+                print(f"\n===== [replay {idx}/{len(replay_tasks)}] {describe(task)} =====")
+                handle(task)
+                retry_queue.run_due(handle)
+            retry_queue.drain(handle)
+            finish_dead_letters(dead_letters)
+        elif args.engine == "async" and not args.from_archive:
+            while True:
+                n = asyncio.run(crawl_movies_async(
+                    movie_source(),
+                    writers,
+                    dead_letters,
+                    frontier,
+                    max_in_flight=args.concurrency,
+                ))
+                # lease：期间可能有别的 worker 崩了留下过期租约，再认领一轮，认领不到才结束
+                if not lease or n == 0:
+                    break
+        else:
+            retry_queue = RetryQueue(dead_letters, max_retry=max_retry, frontier=frontier)
+            handle = lambda task: handle_movie_task(task, writers, retry_queue)
+            total = "" if lease else f"/{len(movie_ids)}"
+            while True:
+                n = 0
+                for n, mid in enumerate(movie_source(), start=1):
+                    print(f"\n===== [{n}{total}] movie_id={mid} =====")
+                    crawl_single_movie(mid, writers, retry_queue, frontier)
+                    # 每部电影之后顺手跑一下已经到期的重试
+                    retry_queue.run_due(handle)
+                # 新任务跑完，等重试队列清空
+                retry_queue.drain(handle)
+                # lease：等重试期间可能有别的 worker 崩了，再认领一轮，认领不到才结束
+                if not lease or n == 0:
+                    break
+
+    print(f"\n[frontier] movie 任务状态: {frontier.counts('movie')}")
+    frontier.close()
 
     print("\n当前 worker 抓取完毕。输出文件：")
-    print(f"- 基本信息: {basic_path}")
-    print(f"- 地区语言: {details_path}")
-    print(f"- 剧情简介: {summary_path}")
-    print(f"- 演员 cast: {cast_path}")
-    print(f"- 幕后 crew: {crew_path}")
-    print(f"- 奖项记录: {awards_path}")
+    print(f"- 基本信息: {out_paths['basic']}")
+    print(f"- 地区语言: {out_paths['details']}")
+    print(f"- 剧情简介: {out_paths['summary']}")
+    print(f"- 演员 cast: {out_paths['cast']}")
+    print(f"- 幕后 crew: {out_paths['crew']}")
+    print(f"- 奖项记录: {out_paths['awards']}")
+    if os.path.exists(dead_letters) and os.path.getsize(dead_letters) > 0:
+        print(f"- 重试用尽（可用 --retry-dead-letters 重放）: {dead_letters}")
 
 
 if __name__ == "__main__":
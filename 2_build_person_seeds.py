@@ -45,18 +45,58 @@
   - 高频常客（frequent_person）：
         未被以上规则选中，且参与电影数 >= 2，
         按 total_score 排序选出前 max_frequent 名（默认 300）
+
+内存布局：
+  以前每个人物一个 dict，里面 6 个 set / dict 装电影 ID 字符串（空 set 就要 200 多字节），
+  人物一多内存就撑不住。现在人物 / 电影 ID 都先转成连续的整数下标，
+  每条 cast / crew 记录只往几个 array 里追加一条“边”（人物下标、电影下标、角色位、order），
+  扫完后按人物做计数排序，得到 CSR 形式的 人物 -> 电影 邻接表；
+  各项计数、评分按列批量计算，frequent_person 用大小为 max_frequent 的堆选出，
+  只给最终入选的人物构造输出的 dict。输出和以前逐字节一致。
+  对比见 bench/bench_person_seeds.py。
 """
 
 from __future__ import annotations
 
 import argparse
+import heapq
 import json
 import os
-from typing import Any, Dict, List, Optional, Set
+from array import array
+from itertools import accumulate
+from typing import Dict, List, Optional
 
 from crawler_config import RAW_ROOT_DIR, SEED_DIR
 
 
+# 每条边（一条 cast / crew 记录）的角色位
+ROLE_CAST = 1
+ROLE_CREW = 2
+ROLE_DIRECTOR = 4     # 只有 crew 记录会带，对应以前的 director_movies
+ROLE_WRITER = 8       # 同上，对应 writer_movies
+ROLE_HAS_ORDER = 16   # cast 记录带有能解析的 order
+
+# 人物级标志：cast / crew 任意一条记录的 department / role 像导演 / 编剧（ROLE_DIRECTOR / ROLE_WRITER 右移 2 位）
+PERSON_DIRECTOR = 1
+PERSON_WRITER = 2
+_PERSON_SHIFT = 2
+
+# 选种理由位，按输出顺序排列
+SEED_REASONS = [
+    (1, "core_actor"),
+    (2, "core_director"),
+    (4, "core_writer"),
+    (8, "awarded_person"),
+    (16, "frequent_person"),
+]
+REASON_FREQUENT = 16
+
+_INT64_MIN = -(2 ** 63)
+_INT64_MAX = 2 ** 63 - 1
+# best_cast_order 列里表示“没有 order”的值；真实的 order 会被截到 (_NO_ORDER, _INT64_MAX]
+_NO_ORDER = _INT64_MIN
+
+
 # ========== 小工具 ==========
 
 def ensure_dir_for_file(path: str) -> None:
@@ -82,32 +122,205 @@ def iter_jsonl(path: str):
             yield obj
 
 
+def _zeros(typecode: str, n: int) -> array:
+    return array(typecode, bytes(array(typecode).itemsize * n))
+
+
+def role_bits(department: str, role: str) -> int:
+    """department / role 像导演、编剧时返回 ROLE_DIRECTOR / ROLE_WRITER 位"""
+    dept_lower = department.lower()
+    role_lower = role.lower()
+    bits = 0
+    if "导演" in department or "director" in dept_lower or "director" in role_lower:
+        bits |= ROLE_DIRECTOR
+    if "编剧" in department or "writer" in dept_lower or "writer" in role_lower:
+        bits |= ROLE_WRITER
+    return bits
+
+
 # ========== 第一步：收集全局人物统计 ==========
 
-def collect_person_stats() -> Dict[str, Dict[str, Any]]:
+class PersonStats:
+    """
+    全部人物的统计，按列存放，下标 i 对应第 i 个出现的人物（也就是以前 dict 的插入顺序）。
+
+    收集阶段：
+      person_ids / names / person_flags / award_wins / award_noms : 每个人物一项
+      _edge_*  : 每条 cast / crew 记录一项（人物下标、电影下标、角色位、order）
+    finish() 之后边按人物分好组（CSR）：
+      人物 i 的边是 edge_movie[indptr[i]:indptr[i + 1]]（edge_bits / edge_order 同理），组内保持扫描顺序。
+    """
+
+    def __init__(self):
+        self.person_ids: List[str] = []
+        self.names: List[Optional[str]] = []
+        self.person_flags = array("B")
+        self.award_wins = array("q")
+        self.award_noms = array("q")
+
+        self._person_index: Dict[str, int] = {}
+        self._movie_index: Dict[str, int] = {}
+        self._edge_person = array("i")
+        self._edge_movie = array("i")
+        self._edge_bits = array("B")
+        self._edge_order = array("q")
+
+        self.indptr = array("q")
+        self.edge_movie = array("i")
+        self.edge_bits = array("B")
+        self.edge_order = array("q")
+
+    def __len__(self) -> int:
+        return len(self.person_ids)
+
+    def _person(self, pid: str, name: Optional[str]) -> int:
+        idx = self._person_index.get(pid)
+        if idx is None:
+            idx = self._person_index[pid] = len(self.person_ids)
+            self.person_ids.append(pid)
+            self.names.append(name)
+            self.person_flags.append(0)
+            self.award_wins.append(0)
+            self.award_noms.append(0)
+        elif name and not self.names[idx]:
+            self.names[idx] = name
+        return idx
+
+    def _movie(self, mid: str) -> int:
+        idx = self._movie_index.get(mid)
+        if idx is None:
+            idx = self._movie_index[mid] = len(self._movie_index)
+        return idx
+
+    def _add_edge(self, person: int, movie: int, bits: int, order: int) -> None:
+        self._edge_person.append(person)
+        self._edge_movie.append(movie)
+        self._edge_bits.append(bits)
+        self._edge_order.append(order)
+
+    def add_cast(
+            self, pid: str, mid: str, name: Optional[str], department: str, role: str, order: Optional[int],
+    ) -> None:
+        p = self._person(pid, name)
+        self.person_flags[p] |= role_bits(department, role) >> _PERSON_SHIFT
+        if order is None:
+            self._add_edge(p, self._movie(mid), ROLE_CAST, 0)
+        else:
+            # 超出 int64 的 order 没有实际意义，截到边界上
+            order = min(max(order, _NO_ORDER + 1), _INT64_MAX)
+            self._add_edge(p, self._movie(mid), ROLE_CAST | ROLE_HAS_ORDER, order)
+
+    def add_crew(self, pid: str, mid: str, name: Optional[str], department: str, role: str) -> None:
+        p = self._person(pid, name)
+        bits = role_bits(department, role)
+        self.person_flags[p] |= bits >> _PERSON_SHIFT
+        self._add_edge(p, self._movie(mid), ROLE_CREW | bits, 0)
+
+    def add_award(self, pid: str, is_winner: bool) -> None:
+        p = self._person(pid, None)
+        if is_winner:
+            self.award_wins[p] += 1
+        else:
+            self.award_noms[p] += 1
+
+    def finish(self) -> None:
+        """收集结束：按人物做计数排序得到 CSR，释放 ID -> 下标 的字典和原始边"""
+        n = len(self.person_ids)
+        edge_person = self._edge_person
+
+        counts = _zeros("q", n)
+        for p in edge_person:
+            counts[p] += 1
+        self.indptr = array("q", accumulate(counts, initial=0))
+        del counts
+
+        # 每条边在 CSR 里的位置；再逐列搬过去，搬完一列放掉一列
+        cursor = self.indptr[:-1]
+        slot = _zeros("q", len(edge_person))
+        for e, p in enumerate(edge_person):
+            slot[e] = cursor[p]
+            cursor[p] += 1
+        del cursor, edge_person
+        self._edge_person = array("i")
+
+        for name in ("edge_movie", "edge_bits", "edge_order"):
+            src = getattr(self, "_" + name)
+            dst = _zeros(src.typecode, len(src))
+            for e, v in enumerate(src):
+                dst[slot[e]] = v
+            setattr(self, name, dst)
+            setattr(self, "_" + name, array(src.typecode))
+            del src
+
+        self._person_index = {}
+        self._movie_index = {}
+
+    def movie_counts(self) -> Dict[str, array]:
+        """
+        逐个人物合并它的边（同一部电影可能出现多次），得到每个人物一项的列：
+          total / cast / crew / director / writer / other_crew : 不同电影数
+          actor_score : 每部参演电影按该电影里的最小 order 计分（<=3 记 3，<=8 记 2，其余记 1，没有 order 不计）
+          best_cast_order : 全部 order 的最小值，没有时为 _NO_ORDER
+        """
+        n = len(self.person_ids)
+        cols = {
+            name: _zeros("q", n)
+            for name in ("total", "cast", "crew", "director", "writer", "other_crew", "actor_score")
+        }
+        best_cast_order = array("q", [_NO_ORDER]) * n
+        indptr = self.indptr
+        edge_movie, edge_bits, edge_order = self.edge_movie, self.edge_bits, self.edge_order
+
+        for p in range(n):
+            lo, hi = indptr[p], indptr[p + 1]
+            if lo == hi:
+                continue
+            merged: Dict[int, int] = {}
+            min_order: Dict[int, int] = {}
+            for e in range(lo, hi):
+                m = edge_movie[e]
+                bits = edge_bits[e]
+                merged[m] = merged.get(m, 0) | bits
+                if bits & ROLE_HAS_ORDER:
+                    order = edge_order[e]
+                    prev = min_order.get(m)
+                    if prev is None or order < prev:
+                        min_order[m] = order
+
+            cast = crew = director = writer = other_crew = 0
+            for bits in merged.values():
+                if bits & ROLE_CAST:
+                    cast += 1
+                if bits & ROLE_CREW:
+                    crew += 1
+                    if bits & ROLE_DIRECTOR:
+                        director += 1
+                    if bits & ROLE_WRITER:
+                        writer += 1
+                    if not bits & (ROLE_DIRECTOR | ROLE_WRITER):
+                        other_crew += 1
+            cols["total"][p] = len(merged)
+            cols["cast"][p] = cast
+            cols["crew"][p] = crew
+            cols["director"][p] = director
+            cols["writer"][p] = writer
+            cols["other_crew"][p] = other_crew
+            if min_order:
+                cols["actor_score"][p] = sum(
+                    3 if order <= 3 else 2 if order <= 8 else 1 for order in min_order.values()
+                )
+                best_cast_order[p] = min(min_order.values())
+
+        cols["best_cast_order"] = best_cast_order
+        return cols
+
+
+def collect_person_stats() -> PersonStats:
     """
-    扫描 RAW_ROOT_DIR 下所有 worker 子目录，汇总每个人物的统计信息。
-    返回：
-      person_stats[person_id] = {
-        person_douban_id: str,
-        name: Optional[str],
-
-        cast_movies: Set[movie_id],
-        crew_movies: Set[movie_id],
-        cast_orders: Dict[movie_id, best_order],   # 每部电影中该演员的最小 order
-        best_cast_order: Optional[int],
-
-        departments: Set[str],
-        roles: Set[str],
-
-        director_movies: Set[movie_id],
-        writer_movies: Set[movie_id],
-
-        award_wins: int,
-        award_noms: int,
-      }
+    扫描 RAW_ROOT_DIR 下所有 worker 子目录，汇总每个人物的统计信息（见 PersonStats），
+    返回时已经调用过 finish()。
     """
-    person_stats: Dict[str, Dict[str, Any]] = {}
+    stats = PersonStats()
 
     if not os.path.exists(RAW_ROOT_DIR):
         raise FileNotFoundError(f"RAW_ROOT_DIR not found: {RAW_ROOT_DIR}")
@@ -142,42 +355,7 @@ def collect_person_stats() -> Dict[str, Dict[str, Any]]:
                 except Exception:
                     order = None
 
-            stats = person_stats.get(pid)
-            if stats is None:
-                stats = {
-                    "person_douban_id": pid,
-                    "name": name,
-                    "cast_movies": set(),        # type: Set[str]
-                    "crew_movies": set(),        # type: Set[str]
-                    "cast_orders": {},           # type: Dict[str, int]
-                    "best_cast_order": None,     # type: Optional[int]
-                    "departments": set(),        # type: Set[str]
-                    "roles": set(),              # type: Set[str]
-                    "director_movies": set(),    # type: Set[str]
-                    "writer_movies": set(),      # type: Set[str]
-                    "award_wins": 0,
-                    "award_noms": 0,
-                }
-                person_stats[pid] = stats
-
-            if name and not stats["name"]:
-                stats["name"] = name
-
-            stats["cast_movies"].add(mid)
-            if department:
-                stats["departments"].add(department)
-            if role:
-                stats["roles"].add(role)
-
-            if order is not None:
-                # 记录该电影下的最小 order
-                prev = stats["cast_orders"].get(mid)
-                if prev is None or order < prev:
-                    stats["cast_orders"][mid] = order
-                # 更新全局 best_cast_order
-                best = stats["best_cast_order"]
-                if best is None or order < best:
-                    stats["best_cast_order"] = order
+            stats.add_cast(pid, mid, name, department, role, order)
 
         # ----- crew：幕后信息 -----
         for rec in iter_jsonl(crew_path):
@@ -190,40 +368,7 @@ def collect_person_stats() -> Dict[str, Dict[str, Any]]:
             department = (rec.get("department") or "").strip()
             role = (rec.get("role") or "").strip()
 
-            stats = person_stats.get(pid)
-            if stats is None:
-                stats = {
-                    "person_douban_id": pid,
-                    "name": name,
-                    "cast_movies": set(),        # type: Set[str]
-                    "crew_movies": set(),        # type: Set[str]
-                    "cast_orders": {},           # type: Dict[str, int]
-                    "best_cast_order": None,     # type: Optional[int]
-                    "departments": set(),        # type: Set[str]
-                    "roles": set(),              # type: Set[str]
-                    "director_movies": set(),    # type: Set[str]
-                    "writer_movies": set(),      # type: Set[str]
-                    "award_wins": 0,
-                    "award_noms": 0,
-                }
-                person_stats[pid] = stats
-
-            if name and not stats["name"]:
-                stats["name"] = name
-
-            stats["crew_movies"].add(mid)
-            if department:
-                stats["departments"].add(department)
-            if role:
-                stats["roles"].add(role)
-
-            # 检测导演 / 编剧角色
-            dept_lower = department.lower()
-            role_lower = role.lower()
-            if "导演" in department or "director" in dept_lower or "director" in role_lower:
-                stats["director_movies"].add(mid)
-            if "编剧" in department or "writer" in dept_lower or "writer" in role_lower:
-                stats["writer_movies"].add(mid)
+            stats.add_crew(pid, mid, name, department, role)
 
         # ----- awards：获奖 / 提名信息 -----
         for rec in iter_jsonl(awards_path):
@@ -232,32 +377,10 @@ def collect_person_stats() -> Dict[str, Dict[str, Any]]:
             pid = str(rec.get("person_douban_id") or "").strip()
             if not pid:
                 continue
-            is_winner = bool(rec.get("is_winner"))
-
-            stats = person_stats.get(pid)
-            if stats is None:
-                stats = {
-                    "person_douban_id": pid,
-                    "name": None,
-                    "cast_movies": set(),        # type: Set[str]
-                    "crew_movies": set(),        # type: Set[str]
-                    "cast_orders": {},           # type: Dict[str, int]
-                    "best_cast_order": None,     # type: Optional[int]
-                    "departments": set(),        # type: Set[str]
-                    "roles": set(),              # type: Set[str]
-                    "director_movies": set(),    # type: Set[str]
-                    "writer_movies": set(),      # type: Set[str]
-                    "award_wins": 0,
-                    "award_noms": 0,
-                }
-                person_stats[pid] = stats
-
-            if is_winner:
-                stats["award_wins"] += 1
-            else:
-                stats["award_noms"] += 1
+            stats.add_award(pid, bool(rec.get("is_winner")))
 
-    return person_stats
+    stats.finish()
+    return stats
 
 
 # ========== 第二步：根据规则构建种子列表 ==========
@@ -278,126 +401,84 @@ def build_person_seeds(
         output_path = os.path.join(SEED_DIR, "persons_seed.jsonl")
     ensure_dir_for_file(output_path)
 
-    person_stats = collect_person_stats()
-
-    frequent_candidates: List[Dict[str, Any]] = []
-    all_records: List[Dict[str, Any]] = []
-
-    for pid, stats in person_stats.items():
-        cast_movies: Set[str] = stats["cast_movies"]
-        crew_movies: Set[str] = stats["crew_movies"]
-        cast_orders: Dict[str, int] = stats["cast_orders"]
-        departments: Set[str] = stats["departments"]
-        roles: Set[str] = stats["roles"]
-        director_movies: Set[str] = stats["director_movies"]
-        writer_movies: Set[str] = stats["writer_movies"]
-
-        cast_count = len(cast_movies)
-        crew_count = len(crew_movies)
-        total_movies = len(cast_movies | crew_movies)
-        best_cast_order = stats["best_cast_order"]
-        award_wins = stats["award_wins"]
-        award_noms = stats["award_noms"]
-
-        # 有一些出现在 awards 中但不在任何电影演职人员表中的人物
-        # 舍弃这些数据
-        if total_movies == 0:
+    stats = collect_person_stats()
+    n = len(stats)
+    cols = stats.movie_counts()
+    total_movies = cols["total"]
+    cast_count = cols["cast"]
+    director_count = cols["director"]
+    writer_count = cols["writer"]
+    best_cast_order = cols["best_cast_order"]
+    person_flags = stats.person_flags
+    award_wins, award_noms = stats.award_wins, stats.award_noms
+
+    # ---- 评分（按列批量计算）----
+    actor_score = cols["actor_score"]
+    crew_score = array("q", [
+        d * 3 + w * 2 + o for d, w, o in zip(director_count, writer_count, cols["other_crew"])
+    ])
+    award_score = array("q", [w * 3 + m for w, m in zip(award_wins, award_noms)])
+    total_score = array("q", [a + c + w for a, c, w in zip(actor_score, crew_score, award_score)])
+
+    # ---- 选种理由 ----
+    # 只出现在 awards 中、不在任何电影演职人员表中的人物（total_movies == 0）舍弃
+    reasons = _zeros("B", n)
+    for p in range(n):
+        if not total_movies[p]:
             continue
-
-        # ---- 角色标签 ----
-        is_actor = cast_count > 0
-
-        def _contains_any(text: str, keywords: List[str]) -> bool:
-            t = text.lower()
-            return any(kw in t for kw in keywords)
-
-        is_director = any(
-            ("导演" in d) or _contains_any(d, ["director"])
-            for d in departments
-        ) or any(_contains_any(r, ["director"]) for r in roles)
-
-        is_writer = any(
-            ("编剧" in d) or _contains_any(d, ["writer"])
-            for d in departments
-        ) or any(_contains_any(r, ["writer"]) for r in roles)
-
-        # ---- 评分 ----
-        # 演员分：按每部电影的 best order 加权
-        actor_score = 0
-        for order in cast_orders.values():
-            if order is None:
-                actor_score += 1
-            elif order <= 3:
-                actor_score += 3
-            elif order <= 8:
-                actor_score += 2
-            else:
-                actor_score += 1
-
-        director_count = len(director_movies)
-        writer_count = len(writer_movies)
-        other_crew_count = len(crew_movies - director_movies - writer_movies)
-        crew_score = director_count * 3 + writer_count * 2 + other_crew_count * 1
-
-        award_score = award_wins * 3 + award_noms * 1
-        total_score = actor_score + crew_score + award_score
-
-        # ---- 选种理由 ----
-        seed_reasons: List[str] = []
-
+        r = 0
         # 核心演员
-        if cast_count >= 3 or (cast_count >= 2 and best_cast_order is not None and best_cast_order <= 3):
-            seed_reasons.append("core_actor")
-
+        cast = cast_count[p]
+        if cast >= 3 or (cast >= 2 and best_cast_order[p] != _NO_ORDER and best_cast_order[p] <= 3):
+            r |= 1
         # 核心导演 / 编剧
-        if is_director and director_count >= 2:
-            seed_reasons.append("core_director")
-        if is_writer and writer_count >= 3:
-            seed_reasons.append("core_writer")
-
+        if person_flags[p] & PERSON_DIRECTOR and director_count[p] >= 2:
+            r |= 2
+        if person_flags[p] & PERSON_WRITER and writer_count[p] >= 3:
+            r |= 4
         # 奖项人物
-        if award_wins >= 1 or award_noms >= 3:
-            seed_reasons.append("awarded_person")
-
-        record = {
-            "person_douban_id": pid,
-            "name": stats["name"],
-            "total_movies": total_movies,
-            "total_cast_movies": cast_count,
-            "total_crew_movies": crew_count,
-            "best_cast_order": best_cast_order,
-            "is_actor": is_actor,
-            "is_director": is_director,
-            "is_writer": is_writer,
-            "award_wins": award_wins,
-            "award_noms": award_noms,
-            "actor_score": actor_score,
-            "crew_score": crew_score,
-            "award_score": award_score,
-            "total_score": total_score,
-            "seed_reasons": seed_reasons,
-        }
-
-        all_records.append(record)
-
-        # 还没被 core/award 规则选中，但在“高频候选池”里的，后面按分数截断
-        if not seed_reasons:
-            if total_movies >= min_total_movies_for_frequent and total_score > 0:
-                frequent_candidates.append(record)
+        if award_wins[p] >= 1 or award_noms[p] >= 3:
+            r |= 8
+        reasons[p] = r
 
     # ---- frequent_person 选拔 ----
-    frequent_candidates.sort(key=lambda r: r["total_score"], reverse=True)
-    selected_frequent = frequent_candidates[:max_frequent]
-    for r in selected_frequent:
-        r["seed_reasons"].append("frequent_person")
-
-    # ---- 汇总最终 seeds ----
-    seeds = [r for r in all_records if r["seed_reasons"]]
-
-    # 写出 jsonl
+    # 还没被 core/award 规则选中，但在“高频候选池”里的，按分数取前 max_frequent 名；
+    # 同分先出现的优先（和以前的稳定排序一致）
+    candidates = [
+        p for p in range(n)
+        if total_movies[p] and not reasons[p]
+        and total_movies[p] >= min_total_movies_for_frequent and total_score[p] > 0
+    ]
+    k = max_frequent if max_frequent >= 0 else max(len(candidates) + max_frequent, 0)
+    for p in heapq.nsmallest(k, candidates, key=lambda p: (-total_score[p], p)):
+        reasons[p] |= REASON_FREQUENT
+    del candidates
+
+    # ---- 写出 jsonl（按人物第一次出现的顺序）----
     with open(output_path, "w", encoding="utf-8") as f:
-        for r in seeds:
-            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+        for p in range(n):
+            if not reasons[p]:
+                continue
+            best = best_cast_order[p]
+            record = {
+                "person_douban_id": stats.person_ids[p],
+                "name": stats.names[p],
+                "total_movies": total_movies[p],
+                "total_cast_movies": cast_count[p],
+                "total_crew_movies": cols["crew"][p],
+                "best_cast_order": None if best == _NO_ORDER else best,
+                "is_actor": cast_count[p] > 0,
+                "is_director": bool(person_flags[p] & PERSON_DIRECTOR),
+                "is_writer": bool(person_flags[p] & PERSON_WRITER),
+                "award_wins": award_wins[p],
+                "award_noms": award_noms[p],
+                "actor_score": actor_score[p],
+                "crew_score": crew_score[p],
+                "award_score": award_score[p],
+                "total_score": total_score[p],
+                "seed_reasons": [name for bit, name in SEED_REASONS if reasons[p] & bit],
+            }
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
 
     return output_path
 
@@ -24,39 +24,68 @@
 }
 
 脚本特性：
-  - 支持多 worker 切分任务：
-        --worker-id
-        --num-workers   （默认 3）
+  - 支持多 worker 分配任务（--dispatch）：
+        lease           （默认）从 frontier 一批批认领人物，崩掉的 worker 的任务租约过期后被接手
+        static          按行号取模静态切分：--worker-id / --num-workers（默认 3）
         --max-persons   （测试阶段仅抓前若干个）
-  - 每次请求后随机 sleep，偶尔长休眠，避免被 ban。
-  - 失败时重试 MAX_RETRY 次。
+  - 请求速率由 rate_limiter.py 的令牌桶统一控制（所有 worker 共享），避免被 ban。
+  - 失败的人物进 retry_queue 延迟重试，最多尝试 MAX_RETRY 次，
+    用尽后写入 data/state/dead_letters/persons_{worker_id}.jsonl，可用 --retry-dead-letters 重放。
+  - 断点续爬：进度记在 frontier（data/state/frontier.sqlite3），输出追加写入，
+    重启后跳过已完成的人物。
+  - 实体缓存（entity_cache.py）：crawler_config.ENTITY_TTL_DAYS["person"] 天内抓过的人物
+    （包括 data/raw/*/person_details.jsonl 里已有的）不再抓，过期的重新抓；内容没变的不重复写出。
+    每条记录带 fetched_at（抓取时间），同一个人物写出过多次时 ETL 取最新的一条。
+  - 抓到的响应都存进原始响应存档（data/archive），--from-archive 不联网重新解析。
+  - 请求指标写到 data/state/metrics/persons_{worker_id}.prom（见 metrics.py），
+    --metrics-port 另开本地 /metrics 端点。
+  - 抓取顺序：按种子的 total_score + seed_reasons 加分（crawler_config.PERSON_REASON_BONUS）从高到低，
+    lease 模式下所有 worker 共用一个顺序（frontier 按 priority 认领），static 模式按名次轮流分给各 worker；
+    --request-budget（新人物的请求数；lease 下所有 worker 共用 frontier 里的计数，认领时记账，
+    同一轮 --budget-round 一起用完为止，static 下按 worker 数平分）/ --time-budget（秒）用完后不再开始新的人物，
+    只把在途的和重试队列收完，中途停下来抓到的也是最值得抓的那一批。
+  - 抓取引擎（--engine）：
+        sync   （默认）一个一个抓
+        pool   线程池并发：同时在途的请求数按 当前速率 × 平均延迟 + 1 自动调整（上限 --concurrency），
+               刚好喂饱共享的令牌桶；frontier、重试队列和写文件都在主线程，输出只有一个写者
 """
 
 from __future__ import annotations
 
 import argparse
 import json
+import math
 import os
-import random
+import threading
 import time
-from typing import Any, Dict, List, Optional
-
-import requests
+from datetime import date
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 from crawler_config import (
+    LEASE_BATCH_SIZE,
+    MAX_RETRY,
+    METRICS_PORT,
+    PERSON_MAX_IN_FLIGHT,
+    PERSON_REASON_BONUS,
     RAW_ROOT_DIR,
     SEED_DIR,
-    REQUEST_MIN_INTERVAL,
-    REQUEST_MAX_INTERVAL,
-    LONG_BREAK_EVERY,
-    LONG_BREAK_MIN,
-    LONG_BREAK_MAX,
-    MAX_RETRY,
-    RETRY_BACKOFF_MIN,
-    RETRY_BACKOFF_MAX,
 )
 
-from person.details_api import fetch_person_details
+from entity_cache import FETCHED_AT, EntityCache, fetched_at_stamp, get_entity_cache, open_entity_cache
+from frontier import Frontier
+from page_archive import enable_replay, replay_enabled
+from metrics import endpoint_of, get_metrics, start_metrics
+from person.details_api import BASE_API_URL, fetch_person_details
+from rate_limiter import get_limiter, host_of, throttle
+from retry_queue import (
+    RetryQueue,
+    Task,
+    dead_letter_path,
+    describe,
+    finish_dead_letters,
+    take_dead_letters,
+)
 
 
 # ====== 常量路径 ======
@@ -66,9 +95,6 @@ PERSON_SEED_PATH = os.path.join(SEED_DIR, "persons_seed.jsonl")
 
 # ====== 小工具 ======
 
-_request_counter = 0
-
-
 def ensure_dir_for_file(path: str) -> None:
     """确保某个文件的上级目录存在"""
     dirname = os.path.dirname(path)
@@ -76,77 +102,27 @@ def ensure_dir_for_file(path: str) -> None:
         os.makedirs(dirname, exist_ok=True)
 
 
-def polite_sleep() -> None:
-    """在每次请求后小睡一下，偶尔长休息"""
-    global _request_counter
-    _request_counter += 1
-
-    # 普通间隔
-    interval = random.uniform(REQUEST_MIN_INTERVAL, REQUEST_MAX_INTERVAL)
-    time.sleep(interval)
-
-    # 长休息
-    if _request_counter % LONG_BREAK_EVERY == 0:
-        long_sleep = random.uniform(LONG_BREAK_MIN, LONG_BREAK_MAX)
-        print(f"[throttle] 已发送 {_request_counter} 次请求，长休眠 {long_sleep:.2f} 秒")
-        time.sleep(long_sleep)
-
-
-def fetch_person_with_retry(person_id: str) -> Optional[Dict[str, Any]]:
-    """
-    带重试的人物抓取函数：
-    - 调用 person.details_api.fetch_person_details
-    - 捕获异常 / None，按退避策略重试
-    - 对 404 直接放弃，不再重试
-    """
-    for attempt in range(1, MAX_RETRY + 1):
-        try:
-            data = fetch_person_details(person_id)
-            polite_sleep()
-            if data is None:
-                print(f"[person={person_id}] API 返回 None")
-            return data
-
-        except requests.HTTPError as e:
-            status = e.response.status_code if e.response is not None else None
-            if status == 404:
-                # 对于明确的 404，直接跳过该人物，不再重试
-                print(f"[fetch_person] 404 Not Found，跳过人物 {person_id}")
-                return None
-
-            print(
-                f"[fetch_person] HTTP error status={status} "
-                f"(person={person_id}, attempt={attempt}/{MAX_RETRY}): {e!r}"
-            )
-
-        except Exception as e:
-            print(
-                f"[fetch_person] 请求失败 (person={person_id}, "
-                f"attempt={attempt}/{MAX_RETRY}): {e!r}"
-            )
-
-        if attempt >= MAX_RETRY:
-            print(f"[fetch_person] 放弃该人物 {person_id}")
-            break
-
-        backoff = random.uniform(RETRY_BACKOFF_MIN, RETRY_BACKOFF_MAX)
-        print(f"[fetch_person] {backoff:.2f}s 后重试...")
-        time.sleep(backoff)
-
-    return None
+def person_priority(seed: Dict[str, Any]) -> float:
+    """种子人物的抓取优先级：total_score + 各入选理由的加分"""
+    try:
+        score = float(seed.get("total_score") or 0)
+    except (TypeError, ValueError):
+        score = 0.0
+    return score + sum(PERSON_REASON_BONUS.get(reason, 0) for reason in seed.get("seed_reasons") or [])
 
 
 def load_seed_person_ids_for_worker(
         worker_id: int,
         num_workers: int,
         max_persons: Optional[int] = None,
-) -> List[str]:
+        by_priority: bool = True,
+) -> List[Tuple[str, float]]:
     """
-    从 persons_seed.jsonl 中读取属于当前 worker 的 person_douban_id 列表。
+    从 persons_seed.jsonl 中读取属于当前 worker 的 (person_douban_id, 优先级) 列表。
 
     规则：
-      - 按行号从 0 开始计数；
-      - 行号 % num_workers == worker_id 的行归当前 worker；
+      - by_priority=True 时按 person_priority 从高到低排序（同分保持文件顺序），否则按文件顺序；
+      - 排好序后名次 % num_workers == worker_id 的人归当前 worker（每个 worker 都从最重要的人开始）；
       - max_persons 限制当前 worker 最多处理多少人（None 表示不限）。
     """
     if not os.path.exists(PERSON_SEED_PATH):
@@ -158,9 +134,8 @@ def load_seed_person_ids_for_worker(
         print(f"[warn] worker_id={worker_id} 不在 [0, {num_workers})，自动改为 0")
         worker_id = 0
 
-    ids: List[str] = []
+    persons: List[Tuple[str, float]] = []
     seen: set[str] = set()
-    line_idx = -1
 
     with open(PERSON_SEED_PATH, "r", encoding="utf-8") as f:
         for line in f:
@@ -168,11 +143,6 @@ def load_seed_person_ids_for_worker(
             if not line:
                 continue
 
-            line_idx += 1
-            # 不属于当前 worker 的行直接跳过
-            if line_idx % num_workers != worker_id:
-                continue
-
             try:
                 obj = json.loads(line)
             except json.JSONDecodeError as e:
@@ -185,20 +155,72 @@ def load_seed_person_ids_for_worker(
             if pid in seen:
                 continue
             seen.add(pid)
+            persons.append((pid, person_priority(obj)))
 
-            ids.append(pid)
-            if max_persons is not None and len(ids) >= max_persons:
-                break
-
-    return ids
+    if by_priority:
+        # sorted 是稳定排序，同分的保持文件顺序
+        persons.sort(key=lambda p: -p[1])
+    # 不属于当前 worker 的名次直接跳过
+    persons = persons[worker_id::num_workers]
+    if max_persons is not None:
+        persons = persons[:max_persons]
+    return persons
 
 
 # ====== 单个人物抓取逻辑 ======
 
-def crawl_single_person(person_id: str, f_out) -> None:
-    """抓取单个人物的信息并写入 jsonl 文件"""
-    print(f"\n==== 开始抓取人物 {person_id} ====")
-    data = fetch_person_with_retry(person_id)
+def person_task(person_id: str, priority: float = 0.0) -> Task:
+    """构造人物抓取任务（也是重试队列 / dead-letter / frontier 里的记录格式）"""
+    task = {
+        "entity_type": "person",
+        "entity_id": person_id,
+        "page_type": "details_api",
+        "kind": "person",
+        # fetch_person_details 自己拼 URL，这里只用于日志和指标分类
+        "url": BASE_API_URL.format(person_id=person_id),
+        "person_id": person_id,
+    }
+    if priority:
+        # frontier 按它决定认领顺序（见 frontier.py）
+        task["priority"] = priority
+    return task
+
+
+def skip_cached_persons(
+        frontier: Frontier,
+        cache: EntityCache,
+        persons: List[Tuple[str, float]],
+) -> List[Tuple[str, float]]:
+    """
+    按实体缓存（entity_cache.py）筛一遍种子：有效期内抓过的不再登记、在 frontier 里直接记为 done，
+    过期的把 frontier 里已完成的任务放回 pending，返回还要交给 frontier 的那些。
+    """
+    cache.scan_raw(RAW_ROOT_DIR, "person", {"person": "person_details.jsonl"}, "person_douban_id")
+    fresh, stale = cache.split("person", (pid for pid, _ in persons))
+    skipped = frontier.mark_done_many(person_task(pid) for pid in fresh)
+    reopened = frontier.reopen_many(person_task(pid, priority) for pid, priority in persons if pid in stale)
+    print(
+        f"[cache] 缓存 {len(cache)} 个实体；有效期内 {len(fresh)} 个人物跳过"
+        f"（frontier 新记为 done {skipped} 个），过期 {len(stale)} 个（重新放回 pending {reopened} 个）"
+    )
+    return [(pid, priority) for pid, priority in persons if pid not in fresh]
+
+
+def handle_person_task(
+        task: Task,
+        f_out,
+        retry_queue: RetryQueue,
+        fetch: Optional[Callable[[], Any]] = None,
+) -> None:
+    """
+    执行一个人物任务：
+    - 调用 person.details_api.fetch_person_details（pool 引擎传进来的是线程池里那次抓取的 Future.result）
+    - 404 直接放弃；其他异常交给 retry_queue 稍后重试，不阻塞后面的人物
+    """
+    person_id = task["person_id"]
+    if fetch is None:
+        fetch = lambda: fetch_person_details(person_id)
+    data = retry_queue.try_fetch(task, fetch=fetch)
     if not data:
         print(f"[person={person_id}] 获取人物信息失败")
         return
@@ -206,9 +228,177 @@ def crawl_single_person(person_id: str, f_out) -> None:
     # 确保 person_douban_id 字段存在且是字符串
     pid = str(data.get("person_douban_id") or "").strip() or person_id
     data["person_douban_id"] = pid
+    # 抓取时间：同一个人物写出过多次时 ETL 取最新的一条
+    data[FETCHED_AT] = fetched_at_stamp(task["url"])
+
+    # 缓存过期重新抓到的：内容没变就不重复追加，只刷新抓取时间
+    cache = get_entity_cache()
+    records = {"person": [data]}
+    if cache is None or cache.changed("person", pid, records):
+        f_out.write(json.dumps(data, ensure_ascii=False) + "\n")
+        f_out.flush()
+    else:
+        print(f"[person={person_id}] 内容和上次一样，不重复写出")
+    if cache is not None:
+        cache.record("person", pid, records)
+    retry_queue.complete(task)
+
+
+def crawl_single_person(person_id: str, f_out, retry_queue: RetryQueue) -> bool:
+    """抓取单个人物的信息并写入 jsonl 文件（frontier 里已完成的跳过），返回是否发了请求"""
+    task = person_task(person_id)
+    if not retry_queue.should_fetch(task):
+        print(f"[person={person_id}] frontier 中已完成，跳过")
+        return False
 
-    f_out.write(json.dumps(data, ensure_ascii=False) + "\n")
+    print(f"\n==== 开始抓取人物 {person_id} ====")
+    handle_person_task(task, f_out, retry_queue)
     print(f"==== 人物 {person_id} 抓取完成 ====")
+    return True
+
+
+class CrawlBudget:
+    """
+    --request-budget / --time-budget：新人物的请求数（不含重试）或墙钟时间用完后，
+    不再开始新的人物；已经开始的（在途的、等重试的）照常收尾。
+    """
+
+    def __init__(self, requests: Optional[int] = None, seconds: Optional[float] = None):
+        self.requests = requests
+        self.deadline = time.monotonic() + seconds if seconds else None
+        self.spent = 0
+
+    def spend(self) -> None:
+        self.spent += 1
+
+    def exhausted(self) -> Optional[str]:
+        """用完了返回原因（日志用），没用完返回 None"""
+        if self.requests is not None and self.spent >= self.requests:
+            return f"请求预算 {self.requests} 已用完"
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return "时间预算已用完"
+        return None
+
+
+# ====== 并发抓取（--engine pool） ======
+
+class PersonFetchPool:
+    """
+    人物接口的线程池：线程里只做“等令牌 + 发请求 + 解析 JSON”，
+    frontier（sqlite 连接不能跨线程）、重试队列、写文件都留给主线程。
+
+    同时在途的请求数（window）按 Little 定律算：要让令牌桶的每个令牌都有请求接着，
+    需要 当前速率 × 平均请求延迟 个请求同时在路上，再多留 1 个接上下一个令牌；
+    再多只是在线程里排队等令牌，上限 max_in_flight（默认连接池大小，多出来的连接用完就被丢弃）。
+    """
+
+    def __init__(self, max_in_flight: int = PERSON_MAX_IN_FLIGHT):
+        self.max_in_flight = max(1, max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="person")
+        self._lock = threading.Lock()
+        # 请求延迟（不含等令牌）的 EWMA，秒
+        self._latency: Optional[float] = None
+        self._window = 1
+        self._window_at = 0.0
+
+    def _fetch(self, person_id: str) -> Optional[Dict[str, Any]]:
+        url = BASE_API_URL.format(person_id=person_id)
+        # 令牌在这里等（和 fetch_html 里一样），计时只算请求本身；重放存档时不限速
+        if not replay_enabled():
+            get_metrics().record_throttle(endpoint_of(url), throttle(url))
+        t0 = time.perf_counter()
+        try:
+            return fetch_person_details(person_id, throttle=False)
+        finally:
+            elapsed = time.perf_counter() - t0
+            with self._lock:
+                self._latency = elapsed if self._latency is None else 0.8 * self._latency + 0.2 * elapsed
+
+    def submit(self, task: Task) -> Future:
+        return self._executor.submit(self._fetch, task["person_id"])
+
+    def window(self) -> int:
+        """当前允许同时在途多少个请求（每秒最多重算一次，读限速器状态要加文件锁）"""
+        now = time.monotonic()
+        if now - self._window_at < 1.0:
+            return self._window
+        self._window_at = now
+
+        with self._lock:
+            latency = self._latency
+        if latency is None:
+            # 还没有延迟数据：先放满，第一批请求回来就有了
+            self._window = self.max_in_flight
+        else:
+            limiter = get_limiter()
+            if limiter.rate <= 0:
+                self._window = self.max_in_flight
+            else:
+                rate = limiter.current_rate(host_of(BASE_API_URL))
+                self._window = max(1, min(self.max_in_flight, math.ceil(rate * latency) + 1))
+        return self._window
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+def crawl_persons_pooled(
+        person_ids: Iterable[str],
+        f_out,
+        retry_queue: RetryQueue,
+        max_in_flight: int = PERSON_MAX_IN_FLIGHT,
+        budget: Optional[CrawlBudget] = None,
+) -> int:
+    """
+    --engine pool：并发抓取 person_ids（列表或 lease 迭代器），返回新提交了多少个人物。
+    到期的重试也丢进线程池；返回前等在途请求和重试队列都清空（相当于 sync 引擎的 drain）。
+    budget 用完后不再提交新的人物。
+    """
+    pool = PersonFetchPool(max_in_flight)
+    in_flight: Dict[Future, Task] = {}
+
+    def submit(task: Task) -> None:
+        in_flight[pool.submit(task)] = task
+
+    def reap(timeout: Optional[float]) -> None:
+        """等至少一个请求完成（或超时），在主线程里写出 / 记重试"""
+        done, _ = wait(list(in_flight), timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            handle_person_task(in_flight.pop(future), f_out, retry_queue, fetch=future.result)
+
+    submitted = 0
+    try:
+        for pid in person_ids:
+            if budget is not None and budget.exhausted():
+                break
+            task = person_task(pid)
+            if not retry_queue.should_fetch(task):
+                print(f"[person={pid}] frontier 中已完成，跳过")
+                continue
+            for due in retry_queue.pop_due():
+                submit(due)
+            while len(in_flight) >= pool.window():
+                reap(None)
+            submit(task)
+            submitted += 1
+            if budget is not None:
+                budget.spend()
+            if submitted % 100 == 0:
+                print(f"[pool] 已提交 {submitted} 个人物，在途 {len(in_flight)}（窗口 {pool.window()}），重试队列 {len(retry_queue)}")
+
+        while in_flight or len(retry_queue):
+            for due in retry_queue.pop_due():
+                submit(due)
+            if in_flight:
+                reap(retry_queue.next_due_in())
+            else:
+                wait_s = retry_queue.next_due_in() or 0.0
+                if wait_s > 0:
+                    print(f"[retry] 队列剩 {len(retry_queue)} 个任务，{wait_s:.1f}s 后到期")
+                    time.sleep(wait_s)
+    finally:
+        pool.shutdown()
+    return submitted
 
 
 # ====== 参数解析 & 主流程 ======
@@ -227,13 +417,71 @@ def parse_args() -> argparse.Namespace:
         "--num-workers",
         type=int,
         default=3,
-        help="总 worker 数量，用于切分种子人物（默认 3）",
+        help="总 worker 数量，仅 --dispatch static 时用于切分种子人物（默认 3）",
+    )
+    parser.add_argument(
+        "--dispatch",
+        choices=["lease", "static"],
+        default="lease",
+        help="任务分配：lease 从 frontier 动态认领（默认）；static 按行号取模静态切分",
     )
     parser.add_argument(
         "--max-persons",
         type=int,
         default=50,
-        help="当前 worker 最多处理多少个人物，默认 50（测试用）。设为 0 或负数表示不限。",
+        help="最多处理多少个人物，默认 50（测试用）；lease 模式下是全部种子按优先级的前 N 个。设为 0 或负数表示不限。",
+    )
+    parser.add_argument(
+        "--file-order",
+        action="store_true",
+        help="按种子文件顺序抓，不按 total_score / seed_reasons 排优先级",
+    )
+    parser.add_argument(
+        "--request-budget",
+        type=int,
+        default=0,
+        help="所有 worker 合计最多开始抓多少个新人物（不含重试）；lease 下所有 worker 共用一个计数（见 --budget-round），"
+             "static 下按 --num-workers 平分；0 表示不限",
+    )
+    parser.add_argument(
+        "--budget-round",
+        default=date.today().strftime("%Y%m%d"),
+        help="lease 下共享请求预算的轮次（默认当天日期）：同一轮启动的 worker 共用一个计数，换一轮重新计",
+    )
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        default=0,
+        help="开始这么多秒后不再开始新的人物（在途的和重试照常收尾）；0 表示不限",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["sync", "pool"],
+        default="sync",
+        help="抓取引擎：sync 一个一个抓（默认）；pool 线程池并发，在途请求数按速率和延迟自动调整",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=PERSON_MAX_IN_FLIGHT,
+        help=f"pool 引擎同时在途的请求数上限（默认 {PERSON_MAX_IN_FLIGHT}，即连接池大小）",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=METRICS_PORT,
+        help="在 127.0.0.1:(端口 + worker_id)/metrics 提供 Prometheus 指标，0 表示不开（默认 %(default)s）",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--retry-dead-letters",
+        action="store_true",
+        help="不读种子，只重放当前 worker 的 dead-letter 任务",
+    )
+    mode.add_argument(
+        "--from-archive",
+        action="store_true",
+        help="不联网，从原始响应存档（data/archive）重新解析当前 worker 的种子，输出覆盖写",
     )
     return parser.parse_args()
 
@@ -245,32 +493,140 @@ def main():
     num_workers = args.num_workers
     max_persons = args.max_persons if args.max_persons and args.max_persons > 0 else None
 
+    if args.from_archive and args.engine == "pool":
+        print("[archive] 重放存档是纯 CPU 活，改用 sync 引擎")
+    pooled = args.engine == "pool" and not args.from_archive
+
     print(
         f"===> 启动 3_crawl_persons.py | worker_id={worker_id}, "
-        f"num_workers={num_workers}, max_persons={max_persons or '不限'}"
+        f"num_workers={num_workers}, max_persons={max_persons or '不限'}, "
+        f"engine={args.engine}, dispatch={args.dispatch}, retry_dead_letters={args.retry_dead_letters}, "
+        f"request_budget={args.request_budget or '不限'}, time_budget={args.time_budget or '不限'}, "
+        f"from_archive={args.from_archive}"
     )
-    print(f"人物种子文件: {PERSON_SEED_PATH}")
 
-    person_ids = load_seed_person_ids_for_worker(
-        worker_id=worker_id,
-        num_workers=num_workers,
-        max_persons=max_persons,
-    )
-    print(f"当前 worker 将抓取 {len(person_ids)} 个人物。")
+    if args.from_archive:
+        # 重放存档：不联网；进度记在内存库里，不碰正式 frontier，每个页面都重新解析一遍。
+        # 存档里没有的页面不重试，直接进单独的 dead-letter 文件
+        enable_replay()
+        dead_letters = dead_letter_path("persons_archive", worker_id)
+        frontier = Frontier(path=":memory:", owner=f"persons:{worker_id}")
+        cache = None
+    else:
+        dead_letters = dead_letter_path("persons", worker_id)
+        frontier = Frontier(owner=f"persons:{worker_id}")
+        # 实体缓存：有效期内抓过的人物不再抓，写出记录时更新
+        cache = open_entity_cache()
+        start_metrics("persons", worker_id, port=args.metrics_port)
+        # 上次崩溃 / 被杀时遗留的 in_progress 放回 pending
+        frontier.reset_stale()
+
+    # 重放存档时各 worker 的内存 frontier 互不相通，只能静态切分
+    lease = args.dispatch == "lease" and not args.from_archive
+    if args.retry_dead_letters:
+        replay_tasks = take_dead_letters(dead_letters)
+        person_ids: List[str] = []
+    else:
+        print(f"人物种子文件: {PERSON_SEED_PATH}")
+        replay_tasks = []
+        # lease：全部种子都登记，之后按需认领；static：只登记属于当前 worker 的那一份
+        persons = load_seed_person_ids_for_worker(
+            worker_id=0 if lease else worker_id,
+            num_workers=1 if lease else num_workers,
+            max_persons=max_persons,
+            by_priority=not args.file_order,
+        )
+        if cache is not None:
+            persons = skip_cached_persons(frontier, cache, persons)
+        person_ids = [pid for pid, _ in persons]
+        # lease 下按 priority 认领，所有 worker 共用一个从高到低的顺序
+        new = frontier.add_many(person_task(pid, priority) for pid, priority in persons)
+        if lease:
+            print(f"种子共 {len(person_ids)} 个人物（frontier 新登记 {new} 个），从 frontier 认领。")
+        else:
+            print(f"当前 worker 负责 {len(person_ids)} 个人物（frontier 新登记 {new} 个）。")
+        print(f"[frontier] person 任务状态: {frontier.counts('person')}")
+
+    # 请求预算：lease 下所有 worker 共用 frontier 里的一个计数（认领时记账，见 frontier.py），
+    # 同一轮（--budget-round）启动的 worker 一起用完为止；static 下按 --num-workers 平分
+    shared_budget = None
+    request_budget = None
+    if args.request_budget > 0 and not args.retry_dead_letters:
+        if lease:
+            shared_budget = (f"persons:{args.budget_round}", args.request_budget)
+            spent = frontier.budget_spent(shared_budget[0])
+            print(f"[budget] 共享请求预算 {shared_budget[0]}：已用 {spent}/{args.request_budget}")
+        else:
+            request_budget = -(-args.request_budget // max(1, num_workers))
+
+    def person_source() -> Iterable[str]:
+        if lease and not args.retry_dead_letters:
+            return frontier.leased_entities("person", ("details_api",), LEASE_BATCH_SIZE, budget=shared_budget)
+        return person_ids
 
     # 输出路径：data/raw/{worker_id}/person_details.jsonl
     worker_dir = os.path.join(RAW_ROOT_DIR, str(worker_id))
     out_path = os.path.join(worker_dir, "person_details.jsonl")
     ensure_dir_for_file(out_path)
 
-    # 以覆盖模式写出。以后跑正式全量，可以考虑改成 "a" 追加。
-    with open(out_path, "w", encoding="utf-8") as f_out:
-        for idx, pid in enumerate(person_ids, start=1):
-            print(f"\n===== [{idx}/{len(person_ids)}] person_id={pid} =====")
-            crawl_single_person(pid, f_out)
+    # 重放存档：输出覆盖写，存档里没有的页面不重试；平时：追加写入，frontier 保证不会重复抓
+    file_mode = "w" if args.from_archive else "a"
+    max_retry = 1 if args.from_archive else MAX_RETRY
+    with open(out_path, file_mode, encoding="utf-8") as f_out:
+        retry_queue = RetryQueue(dead_letters, max_retry=max_retry, frontier=frontier)
+        handle = lambda task: handle_person_task(task, f_out, retry_queue)
+        # 时间预算每个 worker 各算各的
+        budget = CrawlBudget(request_budget, args.time_budget if args.time_budget > 0 else None)
+
+        for idx, task in enumerate(replay_tasks, start=1):
+            print(f"\n===== [replay {idx}/{len(replay_tasks)}] {describe(task)} =====")
+            handle(task)
+            retry_queue.run_due(handle)
+
+        total = "" if lease else f"/{len(person_ids)}"
+        while True:
+            n = 0
+            if pooled:
+                n = crawl_persons_pooled(person_source(), f_out, retry_queue, args.concurrency, budget)
+            else:
+                for n, pid in enumerate(person_source(), start=1):
+                    if budget.exhausted():
+                        break
+                    print(f"\n===== [{n}{total}] person_id={pid} =====")
+                    if crawl_single_person(pid, f_out, retry_queue):
+                        budget.spend()
+                    # 每个人物之后顺手跑一下已经到期的重试
+                    retry_queue.run_due(handle)
+
+                # 新任务跑完，等重试队列清空
+                retry_queue.drain(handle)
+
+            stop = budget.exhausted()
+            if stop:
+                # 认领了还没开始的人物马上还回去，别的 worker / 下次运行不用等租约过期
+                released = frontier.release_leases(budget=shared_budget[0] if shared_budget else None)
+                print(f"\n[budget] {stop}（开始了 {budget.spent} 个新人物），释放 {released} 个未开始的任务")
+                break
+            # lease：等重试期间可能有别的 worker 崩了，再认领一轮，认领不到才结束
+            if not lease or args.retry_dead_letters or n == 0:
+                break
+
+        if shared_budget is not None:
+            spent = frontier.budget_spent(shared_budget[0])
+            done = "已用完" if spent >= shared_budget[1] else "未用完"
+            print(f"\n[budget] 共享请求预算 {shared_budget[0]} {done}：{spent}/{shared_budget[1]}"
+                  f"（本 worker 开始了 {budget.spent} 个新人物）")
+
+        if args.retry_dead_letters:
+            finish_dead_letters(dead_letters)
+
+    print(f"\n[frontier] person 任务状态: {frontier.counts('person')}")
+    frontier.close()
 
     print("\n当前 worker 抓取完毕。输出文件：")
     print(f"- 人物详情: {out_path}")
+    if os.path.exists(dead_letters) and os.path.getsize(dead_letters) > 0:
+        print(f"- 重试用尽（可用 --retry-dead-letters 重放）: {dead_letters}")
 
 
 if __name__ == "__main__":
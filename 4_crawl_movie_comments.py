@@ -3,12 +3,32 @@
 
 根据 movies_seed.jsonl 中的种子电影列表，抓取每部电影的短评/想看信息。
 
-使用 comments/movie_comments.py 中的 parse_comments_page 解析 HTML，自己做翻页与限速控制。
+使用 comments/movie_comments.py 中的 parse_comments_page 解析 HTML，自己做翻页；
+限速由 rate_limiter.py 统一控制，失败的页面进 retry_queue 延迟重试，
+重试用尽的写入 data/state/dead_letters/comments_{worker_id}.jsonl，可用 --retry-dead-letters 重放。
+每一页的进度记在 frontier（data/state/frontier.sqlite3，page_type 形如 comments_P_0），
+输出追加写入，重启后跳过已完成的页面。
+抓到的响应都存进原始响应存档（data/archive），--from-archive 不联网重新解析。
+请求指标写到 data/state/metrics/comments_{worker_id}.prom（见 metrics.py），--metrics-port 另开本地 /metrics 端点。
+
+多 worker 分配任务（--dispatch）：默认 lease，所有页面先登记进 frontier，
+各 worker 按电影一批批认领；static 按种子行号 % --num-workers 静态切分。
 
 默认抓取：
   - 短评（status=P）：5 页 -> 最多 100 条
   - 想看（status=F）：2 页 -> 最多 40 条
 
+翻页深度按热度调整：种子里榜单名次（sources[].rank_in_type）靠前的电影多翻几页，
+榜单外的少翻几页（见 crawler_config.COMMENT_DEPTH_TIERS，--flat-depth 关闭）。
+--request-budget N 限制这次一共计划多少页：按“热度 / 第几页”的价值排序，只登记价值最高的 N 页。
+某一页不满 20 条说明已经翻到底，同一状态后面的页直接标记完成，不再请求；
+结束时汇报实际请求了多少页、提前停止省下多少页。
+
+增量刷新（--refresh [ROUND]，ROUND 默认当天日期）：每部电影每种状态按时间倒序（sort=time）翻页，
+跳过上次见过的短评，翻到比高水位（见 comment_marks.py）那一秒更早的就停，只追加新的记录。
+每部电影在 frontier 里是一个任务（page_type 形如 refresh_20260101），同一轮中断后重跑只补没刷完的电影；
+高水位开始前先从 data/raw 里已有的观影记录推出来，没有高水位的电影按上面的深度翻。
+
 输入：
   data/seeds/movies_seed.jsonl
 
@@ -24,36 +44,46 @@
 from __future__ import annotations
 
 import argparse
+import heapq
 import json
 import os
-import random
-import time
-from typing import Any, Dict, List, Optional
-import requests
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from bs4 import BeautifulSoup  # 主要是给类型提示用，不强依赖
 
-from utils import fetch_html
+from comment_marks import CommentMarks, Mark, is_older, is_seen, newest_mark
 from comments.movie_comments import parse_comments_page
+from frontier import Frontier
+from page_archive import enable_replay
+from metrics import start_metrics
+from retry_queue import (
+    RetryQueue,
+    Task,
+    dead_letter_path,
+    describe,
+    finish_dead_letters,
+    take_dead_letters,
+)
+from utils import fetch_html
 
 from crawler_config import (
+    COMMENT_DEPTH_TAIL,
+    COMMENT_DEPTH_TIERS,
+    COMMENT_F_PAGE_WEIGHT,
+    COMMENT_MAX_PAGES,
+    COMMENT_PAGE_SIZE,
+    COMMENT_REFRESH_MAX_PAGES,
+    DOUBAN_MOVIE_BASE_URL,
+    LEASE_BATCH_SIZE,
+    MAX_RETRY,
+    METRICS_PORT,
     MOVIE_SEED_PATH,
     RAW_ROOT_DIR,
-    REQUEST_MIN_INTERVAL,
-    REQUEST_MAX_INTERVAL,
-    LONG_BREAK_EVERY,
-    LONG_BREAK_MIN,
-    LONG_BREAK_MAX,
-    MAX_RETRY,
-    RETRY_BACKOFF_MIN,
-    RETRY_BACKOFF_MAX,
 )
 
 
-# ====== 小工具 & 限速 ======
-
-_request_counter = 0
-
+# ====== 小工具 ======
 
 def ensure_dir_for_file(path: str) -> None:
     """确保某个文件的上级目录存在"""
@@ -62,63 +92,6 @@ def ensure_dir_for_file(path: str) -> None:
         os.makedirs(dirname, exist_ok=True)
 
 
-def polite_sleep() -> None:
-    """在每次请求后小睡一下，偶尔长休息"""
-    global _request_counter
-    _request_counter += 1
-
-    # 普通间隔
-    interval = random.uniform(REQUEST_MIN_INTERVAL, REQUEST_MAX_INTERVAL)
-    time.sleep(interval)
-
-    # 长休息
-    if _request_counter % LONG_BREAK_EVERY == 0:
-        long_sleep = random.uniform(LONG_BREAK_MIN, LONG_BREAK_MAX)
-        print(f"[throttle] 已发送 {_request_counter} 次请求，长休眠 {long_sleep:.2f} 秒")
-        time.sleep(long_sleep)
-
-
-def fetch_page_with_retry(url: str) -> Optional[str]:
-    """
-    带重试的抓取函数：
-    - 调用 utils.fetch_html
-    - 出现异常时等待一段时间重试
-    - 最多重试 MAX_RETRY 次
-    """
-    for attempt in range(1, MAX_RETRY + 1):
-        try:
-            html = fetch_html(url)
-            polite_sleep()
-            return html
-
-        except requests.HTTPError as e:
-            status = e.response.status_code if e.response is not None else None
-            if status == 404:
-                print(f"[fetch] 404 Not Found，直接跳过：{url}")
-                # 不重试，不 sleep，直接放弃这个 URL
-                return None
-
-            print(
-                f"[fetch] HTTP error status={status} "
-                f"(attempt={attempt}/{MAX_RETRY}): {url}"
-            )
-
-        # 其他网络错误（超时、连接错误等）还是按原逻辑重试
-        except Exception as e:
-            print(f"[fetch] 请求失败 (attempt={attempt}/{MAX_RETRY}): {url}")
-            print(f"        错误: {e!r}")
-
-        if attempt >= MAX_RETRY:
-            print("[fetch] 达到最大重试次数，放弃该 URL")
-            break
-
-        backoff = random.uniform(RETRY_BACKOFF_MIN, RETRY_BACKOFF_MAX)
-        print(f"[fetch] {backoff:.2f}s 后重试...")
-        time.sleep(backoff)
-
-    return None
-
-
 # ====== 从种子中切分电影列表 ======
 
 def load_seed_movie_ids_for_worker(
@@ -178,6 +151,90 @@ def load_seed_movie_ids_for_worker(
     return ids
 
 
+def load_seed_best_ranks() -> Dict[str, Optional[int]]:
+    """movies_seed.jsonl 里每部电影在各个榜单中最好的名次（没有名次信息的为 None）"""
+    ranks: Dict[str, Optional[int]] = {}
+    with open(MOVIE_SEED_PATH, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+            mid = str(obj.get("movie_douban_id") or "").strip()
+            if not mid:
+                continue
+            best = ranks.get(mid)
+            for src in obj.get("sources") or []:
+                try:
+                    rank = int(src.get("rank_in_type"))
+                except (AttributeError, TypeError, ValueError):
+                    continue
+                if best is None or rank < best:
+                    best = rank
+            ranks[mid] = best
+    return ranks
+
+
+# ====== 翻页深度 ======
+
+def depth_multiplier(best_rank: Optional[int]) -> float:
+    """榜单名次 -> 翻页深度的倍数（见 COMMENT_DEPTH_TIERS）"""
+    if best_rank is None:
+        return 1.0
+    for max_rank, multiplier in COMMENT_DEPTH_TIERS:
+        if best_rank <= max_rank:
+            return multiplier
+    return COMMENT_DEPTH_TAIL
+
+
+def _scaled_depth(base: int, multiplier: float) -> int:
+    """base 页按倍数缩放，至少 1 页，放大时最多 COMMENT_MAX_PAGES 页（base 本身更大时以 base 为准）"""
+    if base <= 0:
+        return 0
+    return min(max(COMMENT_MAX_PAGES, base), max(1, round(base * multiplier)))
+
+
+def plan_comment_pages(
+        movie_ids: List[str],
+        best_ranks: Dict[str, Optional[int]],
+        pages_p: int,
+        pages_f: int,
+        request_budget: Optional[int] = None,
+) -> Dict[str, Tuple[int, int]]:
+    """
+    每部电影翻几页：movie_id -> (短评 P 页数, 想看 F 页数)。
+
+    先按热度把 pages_p / pages_f 放大或缩小；总页数超过 request_budget 时，
+    第 k 页（从 0 开始）的价值记为 倍数 / (k + 1)（F 页再乘 COMMENT_F_PAGE_WEIGHT），
+    只保留价值最高的 request_budget 页。价值随页码递减，所以留下的总是每部电影的前几页。
+    """
+    plan: Dict[str, Tuple[int, int]] = {}
+    multipliers: Dict[str, float] = {}
+    for mid in movie_ids:
+        m = multipliers[mid] = depth_multiplier(best_ranks.get(mid))
+        plan[mid] = (_scaled_depth(pages_p, m), _scaled_depth(pages_f, m))
+
+    if request_budget is None or sum(p + f for p, f in plan.values()) <= request_budget:
+        return plan
+
+    # (价值, 种子顺序, 电影, 状态)；价值相同时种子靠前的优先
+    pages = []
+    for order, mid in enumerate(movie_ids):
+        depth_p, depth_f = plan[mid]
+        m = multipliers[mid]
+        pages += [(m / (k + 1), -order, mid, "P") for k in range(depth_p)]
+        pages += [(m * COMMENT_F_PAGE_WEIGHT / (k + 1), -order, mid, "F") for k in range(depth_f)]
+
+    budgeted = {mid: [0, 0] for mid in movie_ids}
+    for _, _, mid, flag in heapq.nlargest(max(0, request_budget), pages):
+        budgeted[mid][0 if flag == "P" else 1] += 1
+    return {mid: (p, f) for mid, (p, f) in budgeted.items()}
+
+
 # ====== 评论抓取核心逻辑 ======
 
 def _build_comments_url(movie_id: str, page_idx: int, status_flag: str) -> str:
@@ -187,96 +244,248 @@ def _build_comments_url(movie_id: str, page_idx: int, status_flag: str) -> str:
     - status_flag="P": /comments?start=...&status=P&sort=new_score
     - status_flag="F": /comments?start=...&status=F
     """
-    start = page_idx * 20
+    start = page_idx * COMMENT_PAGE_SIZE
     if status_flag.upper() == "P":
         return (
-            f"https://movie.douban.com/subject/{movie_id}/comments"
-            f"?start={start}&limit=20&status=P&sort=new_score"
+            f"{DOUBAN_MOVIE_BASE_URL}/subject/{movie_id}/comments"
+            f"?start={start}&limit={COMMENT_PAGE_SIZE}&status=P&sort=new_score"
         )
     else:
         return (
-            f"https://movie.douban.com/subject/{movie_id}/comments"
-            f"?start={start}&limit=20&status=F"
+            f"{DOUBAN_MOVIE_BASE_URL}/subject/{movie_id}/comments"
+            f"?start={start}&limit={COMMENT_PAGE_SIZE}&status=F"
         )
 
 
-def fetch_movie_comments_with_retry(
-        movie_id: str,
-        num_pages: int,
-        status_flag: str,
-) -> Dict[str, List[Dict[str, Any]]]:
-    """
-    连续抓取某电影的若干页短评/想看页面，带重试与限速。
+def _build_refresh_url(movie_id: str, page_idx: int, status_flag: str) -> str:
+    """增量刷新用的按时间倒序的列表"""
+    start = page_idx * COMMENT_PAGE_SIZE
+    return (
+        f"{DOUBAN_MOVIE_BASE_URL}/subject/{movie_id}/comments"
+        f"?start={start}&limit={COMMENT_PAGE_SIZE}&status={status_flag}&sort=time"
+    )
 
-    返回：
-      {
-        "ratings": [...],
-        "watch_records": [...],
-      }
-    """
-    all_ratings: List[Dict[str, Any]] = []
-    all_watch_records: List[Dict[str, Any]] = []
-
-    for page_idx in range(num_pages):
-        url = _build_comments_url(movie_id, page_idx, status_flag)
-        html = fetch_page_with_retry(url)
-        if not html:
-            print(f"[movie={movie_id}] status={status_flag} 第 {page_idx} 页抓取失败，跳过")
-            continue
 
-        page_data = parse_comments_page(html, movie_id, status_flag=status_flag)
-        all_ratings.extend(page_data.get("ratings", []))
-        all_watch_records.extend(page_data.get("watch_records", []))
+def comments_task(movie_id: str, page_idx: int, status_flag: str) -> Task:
+    """构造某部电影某一页短评/想看的抓取任务（也是重试队列 / dead-letter / frontier 里的记录格式）"""
+    return {
+        "entity_type": "movie",
+        "entity_id": movie_id,
+        "page_type": f"comments_{status_flag}_{page_idx}",
+        "kind": "comments",
+        "url": _build_comments_url(movie_id, page_idx, status_flag),
+        "movie_id": movie_id,
+        "page_idx": page_idx,
+        "status_flag": status_flag,
+    }
+
+
+def movie_comments_tasks(movie_id: str, num_pages_p: int, num_pages_f: int) -> List[Task]:
+    """某部电影要抓的全部短评页（P）和想看页（F）"""
+    pages = [("P", idx) for idx in range(num_pages_p)] + [("F", idx) for idx in range(num_pages_f)]
+    return [comments_task(movie_id, idx, flag) for flag, idx in pages]
 
+
+def refresh_task(movie_id: str, round_id: str, num_pages_p: int, num_pages_f: int) -> Task:
+    """
+    某部电影一轮增量刷新的任务：P / F 两种状态一起刷，失败时整部电影重试。
+    url 是第一页（日志 / 指标用）；pages_p / pages_f 是没有高水位时翻几页
+    """
     return {
-        "ratings": all_ratings,
-        "watch_records": all_watch_records,
+        "entity_type": "movie",
+        "entity_id": movie_id,
+        "page_type": f"refresh_{round_id}",
+        "kind": "comments_refresh",
+        "url": _build_refresh_url(movie_id, 0, "P"),
+        "movie_id": movie_id,
+        "pages_p": num_pages_p,
+        "pages_f": num_pages_f,
     }
 
 
+def _page_order(task: Task) -> Tuple[int, int]:
+    """先 P 后 F，各自按页码"""
+    return (0 if task["status_flag"] == "P" else 1), int(task["page_idx"])
+
+
+def handle_comments_task(
+        task: Task,
+        f_ratings,
+        f_watch_records,
+        retry_queue: RetryQueue,
+) -> Optional[Tuple[int, int]]:
+    """
+    抓取并解析一页短评/想看，立即写出。
+    失败的页面交给 retry_queue 稍后重试，不阻塞后面的页面 / 电影。
+
+    返回：(写出的 ratings 条数, 写出的 watch_records 条数)；没抓到页面时返回 None
+    """
+    movie_id = task["movie_id"]
+    status_flag = task["status_flag"]
+
+    html = retry_queue.try_fetch(task)
+    if not html:
+        print(f"[movie={movie_id}] status={status_flag} 第 {task['page_idx']} 页抓取失败")
+        return None
+
+    page_data = parse_comments_page(html, movie_id, status_flag=status_flag)
+    ratings = page_data.get("ratings", [])
+    watch_records = page_data.get("watch_records", [])
+
+    for rec in ratings:
+        f_ratings.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    for rec in watch_records:
+        f_watch_records.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+    # 先落盘再标记 done
+    f_ratings.flush()
+    f_watch_records.flush()
+    retry_queue.complete(task)
+
+    return len(ratings), len(watch_records)
+
+
+def collect_new_comments(
+        task: Task,
+        marks: CommentMarks,
+        stats: Dict[str, int],
+) -> Dict[str, Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Optional[Mark]]]:
+    """
+    按时间倒序翻一部电影的短评 / 想看，收集比高水位新的记录。
+    每种状态翻到比高水位那一秒更早的记录、或者某一页不满 COMMENT_PAGE_SIZE 条就停；
+    有高水位的最多翻 COMMENT_REFRESH_MAX_PAGES 页，没有的按任务里的 pages_p / pages_f 翻。
+    任何一页抓取失败都直接抛异常（由 try_fetch 把整部电影放回重试队列，这时什么都还没写）。
+
+    返回：status_flag -> (新的 ratings, 新的 watch_records, 新的高水位或 None)
+    """
+    movie_id = task["movie_id"]
+    result = {}
+    for status_flag, depth in (("P", int(task.get("pages_p") or 0)), ("F", int(task.get("pages_f") or 0))):
+        mark = marks.get(movie_id, status_flag)
+        max_pages = COMMENT_REFRESH_MAX_PAGES if mark is not None else depth
+        ratings: List[Dict[str, Any]] = []
+        watch_records: List[Dict[str, Any]] = []
+        fetched = 0
+        for page_idx in range(max_pages):
+            html = fetch_html(_build_refresh_url(movie_id, page_idx, status_flag))
+            fetched += 1
+            page_data = parse_comments_page(html, movie_id, status_flag=status_flag)
+            page_watch = page_data.get("watch_records", [])
+
+            # 和高水位同一秒的几条顺序不定，逐条看；翻到比高水位那一秒更早的，后面的页都见过了
+            watch_records += [rec for rec in page_watch if not is_seen(rec, mark)]
+            ratings += [rec for rec in page_data.get("ratings", []) if not is_seen(rec, mark)]
+            if any(is_older(rec, mark) for rec in page_watch) or len(page_watch) < COMMENT_PAGE_SIZE:
+                break
+
+        stats["requests"] = stats.get("requests", 0) + fetched
+        stats["saved"] = stats.get("saved", 0) + max_pages - fetched
+        result[status_flag] = (ratings, watch_records, newest_mark(watch_records))
+    return result
+
+
+def handle_refresh_task(
+        task: Task,
+        f_ratings,
+        f_watch_records,
+        retry_queue: RetryQueue,
+        marks: CommentMarks,
+        stats: Optional[Dict[str, int]] = None,
+) -> None:
+    """刷新一部电影：新记录追加写出后再推高水位、标记 done"""
+    movie_id = task["movie_id"]
+    if stats is None:
+        stats = {}
+
+    # 失败了整部电影重来，这次翻过的页不计入 stats
+    attempt_stats: Dict[str, int] = {}
+    result = retry_queue.try_fetch(task, fetch=lambda: collect_new_comments(task, marks, attempt_stats))
+    if result is None:
+        print(f"[movie={movie_id}] 增量刷新失败")
+        return
+    for key, n in attempt_stats.items():
+        stats[key] = stats.get(key, 0) + n
+
+    new_marks = []
+    counts = []
+    for status_flag, (ratings, watch_records, mark) in result.items():
+        for rec in ratings:
+            f_ratings.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        for rec in watch_records:
+            f_watch_records.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        if mark is not None:
+            new_marks.append((movie_id, status_flag, mark))
+        counts.append(f"{status_flag} 新增 {len(watch_records)} 条")
+        stats["new"] = stats.get("new", 0) + len(watch_records)
+
+    # 先落盘，再推高水位、标记 done；崩在中间的电影重刷时会重复写一遍新记录（至少一次）
+    f_ratings.flush()
+    f_watch_records.flush()
+    marks.advance_many(new_marks)
+    retry_queue.complete(task)
+    print(f"[movie={movie_id}] 增量刷新完成：{'，'.join(counts)}")
+
+
 def crawl_single_movie_comments(
         movie_id: str,
         f_ratings,
         f_watch_records,
         num_pages_p: int,
         num_pages_f: int,
+        retry_queue: RetryQueue,
+        stats: Optional[Dict[str, int]] = None,
 ) -> None:
     """
-    抓取单部电影的短评/想看，写入 jsonl 文件。
+    抓取单部电影的短评（status=P，看过）和想看（status=F），逐页写入 jsonl 文件。
+    frontier 里已完成的页面跳过；以前登记过、这次计划之外的未完成页面也一并处理。
+
+    某一页不满 COMMENT_PAGE_SIZE 条时，同一状态后面的页直接标记完成，不再请求。
+    （按解析出的观影记录数判断，个别条目解析失败的满页也会被当成短页，宁可少翻一点）
+    stats 里累计 requests（请求的新页面数，不含重试）和 saved（提前停止省下的页数）。
     """
+    tasks = movie_comments_tasks(movie_id, num_pages_p, num_pages_f)
+    if retry_queue.frontier is not None:
+        planned = {task["page_type"] for task in tasks}
+        tasks += [
+            task for task in retry_queue.frontier.open_tasks("movie", movie_id)
+            if task.get("kind") == "comments" and task["page_type"] not in planned
+        ]
+    tasks = [task for task in sorted(tasks, key=_page_order) if retry_queue.should_fetch(task)]
+    if not tasks:
+        print(f"[movie={movie_id}] frontier 中短评/想看已全部完成，跳过")
+        return
+
     print(f"\n==== 开始抓取电影 {movie_id} 的短评与想看 ====")
 
-    # 短评（看过）页：status=P
-    if num_pages_p > 0:
-        data_p = fetch_movie_comments_with_retry(
-            movie_id, num_pages=num_pages_p, status_flag="P"
-        )
-        ratings_p = data_p.get("ratings", [])
-        watch_p = data_p.get("watch_records", [])
-    else:
-        ratings_p, watch_p = [], []
+    if stats is None:
+        stats = {}
+    n_ratings = 0
+    n_watch = 0
+    exhausted = set()
+    for task in tasks:
+        status_flag = task["status_flag"]
+        if status_flag in exhausted:
+            retry_queue.complete(task)
+            stats["saved"] = stats.get("saved", 0) + 1
+            continue
 
-    # 想看页：status=F
-    if num_pages_f > 0:
-        data_f = fetch_movie_comments_with_retry(
-            movie_id, num_pages=num_pages_f, status_flag="F"
+        stats["requests"] = stats.get("requests", 0) + 1
+        result = handle_comments_task(
+            task,
+            f_ratings,
+            f_watch_records,
+            retry_queue,
         )
-        ratings_f = data_f.get("ratings", [])
-        watch_f = data_f.get("watch_records", [])
-    else:
-        ratings_f, watch_f = [], []
-
-    # 按类型分别写出
-    for rec in ratings_p + ratings_f:
-        f_ratings.write(json.dumps(rec, ensure_ascii=False) + "\n")
-
-    for rec in watch_p + watch_f:
-        f_watch_records.write(json.dumps(rec, ensure_ascii=False) + "\n")
-
-    print(
-        f"[movie={movie_id}] ratings={len(ratings_p) + len(ratings_f)}, "
-        f"watch_records={len(watch_p) + len(watch_f)}"
-    )
+        if result is None:
+            continue
+        r, w = result
+        n_ratings += r
+        n_watch += w
+        if w < COMMENT_PAGE_SIZE:
+            exhausted.add(status_flag)
+            print(f"[movie={movie_id}] status={status_flag} 第 {task['page_idx']} 页只有 {w} 条，后面的页不再请求")
+
+    print(f"[movie={movie_id}] ratings={n_ratings}, watch_records={n_watch}")
     print(f"==== 电影 {movie_id} 短评与想看抓取完成 ====")
 
 
@@ -296,13 +505,19 @@ def parse_args() -> argparse.Namespace:
         "--num-workers",
         type=int,
         default=3,
-        help="总 worker 数量，用于切分种子电影（默认 3）",
+        help="总 worker 数量，仅 --dispatch static 时用于切分种子电影（默认 3）",
+    )
+    parser.add_argument(
+        "--dispatch",
+        choices=["lease", "static"],
+        default="lease",
+        help="任务分配：lease 从 frontier 动态认领（默认）；static 按行号取模静态切分",
     )
     parser.add_argument(
         "--max-movies",
         type=int,
         default=10,
-        help="当前 worker 最多处理多少部电影，默认 10（测试用）。设为 0 或负数表示不限。",
+        help="最多处理多少部电影，默认 10（测试用）；lease 模式下是全部种子的前 N 部。设为 0 或负数表示不限。",
     )
     parser.add_argument(
         "--pages-p",
@@ -316,6 +531,42 @@ def parse_args() -> argparse.Namespace:
         default=2,
         help="每部电影抓取多少页想看（status=F），默认 2 页 -> 最多 40 条。",
     )
+    parser.add_argument(
+        "--flat-depth",
+        action="store_true",
+        help="不按种子热度调整翻页深度，每部电影都翻 --pages-p / --pages-f 页",
+    )
+    parser.add_argument(
+        "--request-budget",
+        type=int,
+        default=0,
+        help="这次最多计划多少页（不含重试），按热度和页码挑价值最高的页；static 下按 worker 数平分。0 表示不限",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=METRICS_PORT,
+        help="在 127.0.0.1:(端口 + worker_id)/metrics 提供 Prometheus 指标，0 表示不开（默认 %(default)s）",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--retry-dead-letters",
+        action="store_true",
+        help="不读种子，只重放当前 worker 的 dead-letter 任务",
+    )
+    mode.add_argument(
+        "--refresh",
+        nargs="?",
+        const=date.today().strftime("%Y%m%d"),
+        default=None,
+        metavar="ROUND",
+        help="增量刷新：按时间倒序翻页，遇到上次见过的短评就停；ROUND 是这一轮的名字（默认当天日期），同一轮中断后重跑接着刷",
+    )
+    mode.add_argument(
+        "--from-archive",
+        action="store_true",
+        help="不联网，从原始响应存档（data/archive）重新解析当前 worker 的种子，输出覆盖写",
+    )
     return parser.parse_args()
 
 
@@ -331,16 +582,72 @@ def main():
     print(
         f"===> 启动 4_crawl_movie_comments.py | worker_id={worker_id}, "
         f"num_workers={num_workers}, max_movies={max_movies or '不限'}, "
-        f"pages_p={pages_p}, pages_f={pages_f}"
+        f"pages_p={pages_p}, pages_f={pages_f}, "
+        f"dispatch={args.dispatch}, retry_dead_letters={args.retry_dead_letters}, "
+        f"from_archive={args.from_archive}, refresh={args.refresh or '否'}"
     )
-    print(f"种子电影文件: {MOVIE_SEED_PATH}")
 
-    movie_ids = load_seed_movie_ids_for_worker(
-        worker_id=worker_id,
-        num_workers=num_workers,
-        max_movies=max_movies,
-    )
-    print(f"当前 worker 将抓取 {len(movie_ids)} 部电影的短评/想看。")
+    if args.from_archive:
+        # 重放存档：不联网；进度记在内存库里，不碰正式 frontier，每个页面都重新解析一遍。
+        # 存档里没有的页面不重试，直接进单独的 dead-letter 文件
+        enable_replay()
+        dead_letters = dead_letter_path("comments_archive", worker_id)
+        frontier = Frontier(path=":memory:", owner=f"comments:{worker_id}")
+    else:
+        dead_letters = dead_letter_path("comments", worker_id)
+        frontier = Frontier(owner=f"comments:{worker_id}")
+        start_metrics("comments", worker_id, port=args.metrics_port)
+        # 上次崩溃 / 被杀时遗留的 in_progress 放回 pending
+        frontier.reset_stale()
+    # 高水位只有增量刷新（包括重放刷新任务的 dead-letter）用得到；重放存档不会遇到刷新任务
+    marks = None if args.from_archive else CommentMarks()
+    if args.refresh:
+        updated = marks.bootstrap_from_raw(RAW_ROOT_DIR)
+        print(f"[refresh] 第 {args.refresh} 轮；从 {RAW_ROOT_DIR} 已有记录更新高水位 {updated} 条，共 {len(marks)} 条")
+
+    # 重放存档时各 worker 的内存 frontier 互不相通，只能静态切分
+    lease = args.dispatch == "lease" and not args.from_archive
+    if args.retry_dead_letters:
+        replay_tasks = take_dead_letters(dead_letters)
+        movie_ids: List[str] = []
+        plan: Dict[str, Tuple[int, int]] = {}
+    else:
+        print(f"种子电影文件: {MOVIE_SEED_PATH}")
+        replay_tasks = []
+        # lease：全部种子都登记，之后按需认领；static：只登记属于当前 worker 的那一份
+        movie_ids = load_seed_movie_ids_for_worker(
+            worker_id=0 if lease else worker_id,
+            num_workers=1 if lease else num_workers,
+            max_movies=max_movies,
+        )
+        # 每部电影翻几页：按热度调整，再受 --request-budget 限制
+        budget = args.request_budget if args.request_budget > 0 else None
+        if budget is not None and not lease:
+            budget = -(-budget // max(1, num_workers))
+        best_ranks = {} if args.flat_depth else load_seed_best_ranks()
+        plan = plan_comment_pages(movie_ids, best_ranks, pages_p, pages_f, budget)
+        planned = sum(p + f for p, f in plan.values())
+        print(
+            f"[depth] 计划 {planned} 页（固定 {pages_p}+{pages_f} 页/部需要 {len(movie_ids) * (pages_p + pages_f)} 页）"
+            + (f"，预算 {budget} 页" if budget is not None else "")
+        )
+        # 每一页（刷新时每部电影一个任务）都先登记进 frontier，认领时才知道哪些电影还有没抓完的
+        if args.refresh:
+            new = frontier.add_many(refresh_task(mid, args.refresh, *plan[mid]) for mid in movie_ids)
+        else:
+            new = frontier.add_many(
+                task for mid in movie_ids for task in movie_comments_tasks(mid, *plan[mid])
+            )
+        if lease:
+            print(f"种子共 {len(movie_ids)} 部电影（frontier 新登记 {new} 页），从 frontier 认领。")
+        else:
+            print(f"当前 worker 将抓取 {len(movie_ids)} 部电影的短评/想看（frontier 新登记 {new} 页）。")
+
+    def movie_source() -> Iterable[str]:
+        if lease and not args.retry_dead_letters:
+            page_types = (f"refresh_{args.refresh}",) if args.refresh else ("comments_*",)
+            return frontier.leased_entities("movie", page_types, LEASE_BATCH_SIZE)
+        return movie_ids
 
     # 输出路径：data/raw/{worker_id}/movie_ratings.jsonl & movie_watch_records.jsonl
     worker_dir = os.path.join(RAW_ROOT_DIR, str(worker_id))
@@ -350,23 +657,80 @@ def main():
     ensure_dir_for_file(ratings_path)
     ensure_dir_for_file(watch_path)
 
-    # 以覆盖模式写出（测试阶段）。以后跑正式全量，可以考虑改成 "a" 追加。
-    with open(ratings_path, "w", encoding="utf-8") as f_ratings, \
-            open(watch_path, "w", encoding="utf-8") as f_watch:
-
-        for idx, mid in enumerate(movie_ids, start=1):
-            print(f"\n===== [{idx}/{len(movie_ids)}] movie_id={mid} =====")
-            crawl_single_movie_comments(
-                movie_id=mid,
-                f_ratings=f_ratings,
-                f_watch_records=f_watch,
-                num_pages_p=pages_p,
-                num_pages_f=pages_f,
-            )
+    # 重放存档：输出覆盖写，存档里没有的页面不重试；平时：追加写入，frontier 保证不会重复抓
+    file_mode = "w" if args.from_archive else "a"
+    max_retry = 1 if args.from_archive else MAX_RETRY
+    with open(ratings_path, file_mode, encoding="utf-8") as f_ratings, \
+            open(watch_path, file_mode, encoding="utf-8") as f_watch:
+
+        retry_queue = RetryQueue(dead_letters, max_retry=max_retry, frontier=frontier)
+        stats: Dict[str, int] = {}
+
+        def handle(task: Task) -> None:
+            if task.get("kind") == "comments_refresh":
+                handle_refresh_task(task, f_ratings, f_watch, retry_queue, marks, stats)
+            else:
+                handle_comments_task(task, f_ratings, f_watch, retry_queue)
+
+        for idx, task in enumerate(replay_tasks, start=1):
+            print(f"\n===== [replay {idx}/{len(replay_tasks)}] {describe(task)} =====")
+            handle(task)
+            retry_queue.run_due(handle)
+
+        total = "" if lease else f"/{len(movie_ids)}"
+        while True:
+            n = 0
+            for n, mid in enumerate(movie_source(), start=1):
+                print(f"\n===== [{n}{total}] movie_id={mid} =====")
+                if args.refresh:
+                    task = refresh_task(mid, args.refresh, *plan.get(mid, (0, 0)))
+                    if retry_queue.should_fetch(task):
+                        handle(task)
+                    else:
+                        print(f"[movie={mid}] 第 {args.refresh} 轮已经刷新过，跳过")
+                    retry_queue.run_due(handle)
+                    continue
+                crawl_single_movie_comments(
+                    movie_id=mid,
+                    f_ratings=f_ratings,
+                    f_watch_records=f_watch,
+                    # 不在这次计划里的（以前登记的）只处理 frontier 里剩下的页
+                    num_pages_p=plan.get(mid, (0, 0))[0],
+                    num_pages_f=plan.get(mid, (0, 0))[1],
+                    retry_queue=retry_queue,
+                    stats=stats,
+                )
+                # 每部电影之后顺手跑一下已经到期的重试
+                retry_queue.run_due(handle)
+
+            # 新任务跑完，等重试队列清空
+            retry_queue.drain(handle)
+            # lease：等重试期间可能有别的 worker 崩了，再认领一轮，认领不到才结束
+            if not lease or args.retry_dead_letters or n == 0:
+                break
+
+        if args.retry_dead_letters:
+            finish_dead_letters(dead_letters)
+
+    frontier.close()
+    if marks is not None:
+        marks.close()
 
+    if args.refresh:
+        print(
+            f"\n[refresh] 请求 {stats.get('requests', 0)} 页（不含重试），新增观影记录 {stats.get('new', 0)} 条，"
+            f"遇到见过的短评 / 不满一页提前停止，省下 {stats.get('saved', 0)} 页"
+        )
+    else:
+        print(
+            f"\n[comments] 请求 {stats.get('requests', 0)} 页（不含重试），"
+            f"遇到不满 {COMMENT_PAGE_SIZE} 条的页提前停止，省下 {stats.get('saved', 0)} 页"
+        )
     print("\n当前 worker 抓取完毕。输出文件：")
     print(f"- 评分记录: {ratings_path}")
     print(f"- 观影记录: {watch_path}")
+    if os.path.exists(dead_letters) and os.path.getsize(dead_letters) > 0:
+        print(f"- 重试用尽（可用 --retry-dead-letters 重放）: {dead_letters}")
 
 
 if __name__ == "__main__":
@@ -4,12 +4,17 @@ award/movie_awards.py
     解析某部电影的获奖情况页面，得到该电影每条获奖记录
     的相关信息，建立获奖记录与电影节、人物的关联，以及
     是否获奖或只是提名。
+
+    解析后端见 crawler_config.PARSER_BACKEND：bs4（默认）或 lxml（预编译 XPath，结果一致）。
 """
 import re
 from typing import Any, Dict, List, Optional
 
 from bs4 import BeautifulSoup
+from lxml import etree
 
+import lxml_helpers
+from lxml_helpers import first, has_class
 from utils import fetch_html
 
 """正则和小工具"""
@@ -94,10 +99,6 @@ def _parse_award_ul(
     if not raw_title:
         return None
 
-    is_nomination = _is_nomination(raw_title)
-    is_winner = not is_nomination
-    award_name = _clean_award_name(raw_title)
-
     award_type: Optional[str] = None    # "Person" / "Movie"
     person_id: Optional[str] = None
     person_name: Optional[str] = None
@@ -127,6 +128,24 @@ def _parse_award_ul(
     else:
         award_type = "Movie"
 
+    return _award_record(
+        movie_douban_id, festival_info, raw_title, award_type, person_id, person_name, extra_desc
+    )
+
+def _award_record(
+        movie_douban_id: str,
+        festival_info: Dict[str, Any],
+        raw_title: str,
+        award_type: str,
+        person_id: Optional[str],
+        person_name: Optional[str],
+        extra_desc: Optional[str],
+) -> Dict[str, Any]:
+    """一条获奖/提名记录（两个解析后端共用）"""
+    is_nomination = _is_nomination(raw_title)
+    is_winner = not is_nomination
+    award_name = _clean_award_name(raw_title)
+
     record: Dict[str, Any] = {
         "movie_douban_id": movie_douban_id,
 
@@ -152,15 +171,19 @@ def _parse_award_ul(
 """主解析函数"""
 
 def parse_awards(
-        html: str, movie_douban_id: str = ""
+        html: str, movie_douban_id: str = "", backend: Optional[str] = None
 ) -> Dict[str, List[Dict[str, Any]]]:
     """
     从 /awards 页面抓取该电影的所有获奖记录信息
 
     :param html: 奖项页面 HTML 文档
     :param movie_douban_id: 电影 Douban ID
+    :param backend: 解析后端 bs4 / lxml，默认取 PARSER_BACKEND
     :return: {'awards': [record, ...]}，每个 record 为一条获奖记录
     """
+    if lxml_helpers.pick_backend(backend) == "lxml":
+        return _parse_awards_lxml(html, movie_douban_id)
+
     soup = BeautifulSoup(html, 'lxml')
 
     article = soup.select_one("#content > div > div.article")
@@ -187,6 +210,92 @@ def parse_awards(
     return {"awards": awards}
 
 
+"""lxml 后端：和上面逐行对应，find / select 换成预编译 XPath"""
+
+_X_ARTICLE = etree.XPath(f"//*[@id='content']/div/div[{has_class('article')}]")
+_X_BLOCKS = etree.XPath(f".//div[{has_class('awards')}]")
+_X_HD = etree.XPath(f".//div[{has_class('hd')}]")
+_X_H2 = etree.XPath(".//h2")
+_X_A = etree.XPath(".//a")
+_X_YEAR = etree.XPath(f".//span[{has_class('year')}]")
+_X_AWARD_ULS = etree.XPath(f"./ul[{has_class('award')}]")
+_X_LIS = etree.XPath("./li")
+
+def _parse_festival_header_lxml(block) -> Optional[Dict[str, Any]]:
+    hd = first(_X_HD, block)
+    if hd is None:
+        return None
+
+    h2 = first(_X_H2, hd)
+    if h2 is None:
+        return None
+
+    fest_link = first(_X_A, h2)
+    href = fest_link.get("href") if fest_link is not None else None
+    year_span = first(_X_YEAR, h2)
+
+    return {
+        "festival_name": lxml_helpers.text(fest_link if fest_link is not None else h2),
+        "festival_url": href.strip() if href is not None else None,
+        "festival_year": _extract_year(lxml_helpers.text(year_span, strip=False)) if year_span is not None else None,
+    }
+
+def _parse_award_ul_lxml(
+        ul,
+        festival_info: Dict[str, Any],
+        movie_douban_id: str,
+) -> Optional[Dict[str, Any]]:
+    lis = _X_LIS(ul)
+    if not lis:
+        return None
+
+    raw_title = lxml_helpers.text(lis[0])
+    if not raw_title:
+        return None
+
+    person_id: Optional[str] = None
+    person_name: Optional[str] = None
+    extra_desc: Optional[str] = None
+
+    if len(lis) >= 2:
+        links = _X_A(lis[1])
+        if links:
+            person_id = _extract_person_id_from_href(links[0].get("href", ""))
+            person_name = lxml_helpers.text(links[0])
+            award_type = "Person"
+        else:
+            extra_desc = lxml_helpers.text(lis[1]) or None
+            award_type = "Movie"
+    else:
+        award_type = "Movie"
+
+    return _award_record(
+        movie_douban_id, festival_info, raw_title, award_type, person_id, person_name, extra_desc
+    )
+
+def _parse_awards_lxml(html: str, movie_douban_id: str) -> Dict[str, List[Dict[str, Any]]]:
+    doc = lxml_helpers.document(html)
+    article = first(_X_ARTICLE, doc) if doc is not None else None
+    if article is None:
+        return {"awards": []}
+
+    awards: List[Dict[str, Any]] = []
+    for block in _X_BLOCKS(article):
+        festival_info = _parse_festival_header_lxml(block)
+        if not festival_info:
+            print("抓取一条电影节的基础信息时失败")
+            continue
+
+        for ul in _X_AWARD_ULS(block):
+            record = _parse_award_ul_lxml(ul, festival_info, movie_douban_id)
+            if record is None:
+                print("抓取一条获奖记录信息时失败")
+                continue
+            awards.append(record)
+
+    return {"awards": awards}
+
+
 """示例 main 函数"""
 
 def main():
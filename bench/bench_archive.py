@@ -0,0 +1,104 @@
+"""
+bench/bench_archive.py
+
+原始响应存档（page_archive.py）的端到端验证：
+
+  1. live    : 1_crawl_movies.py 照常抓本地假豆瓣（有延迟、有限速），响应顺手存档；
+  2. archive : 关掉假豆瓣，用 --from-archive 只从存档重新解析。
+
+输出两次的耗时 / CPU 时间、存档大小，并校验两次写出的记录完全一致（只比较内容，不比较行序和抓取时间 fetched_at）。
+第 2 步时服务器已经关了，能跑通本身就说明重放不发请求。
+
+用法（在仓库根目录）：
+    python -m bench.bench_archive --movies 30 --latency 0.2 --rps 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import time
+from typing import Tuple
+
+from bench.bench_async_engine import REPO_ROOT, _prepare_data_dir, _snapshot
+from bench.fixtures import synthetic_movie_ids
+from bench.mock_douban import start_mock_server
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            total += os.path.getsize(os.path.join(dirpath, name))
+    return total
+
+
+def _run(base_url: str, data_dir: str, n: int, rps: float, from_archive: bool) -> Tuple[float, float]:
+    """跑一遍 1_crawl_movies.py，返回 (墙钟秒数, 子进程 CPU 秒数)"""
+    env = dict(os.environ)
+    env.update({
+        "DOUBAN_MOVIE_BASE_URL": base_url,
+        "CRAWLER_DATA_DIR": data_dir,
+        "CRAWLER_RATE_LIMIT_RPS": str(rps),
+        "CRAWLER_RATE_LIMIT_ADAPTIVE": "0",
+        "CRAWLER_LONG_BREAK_MIN": "0",
+        "CRAWLER_LONG_BREAK_MAX": "0",
+    })
+    cmd = [
+        sys.executable, "1_crawl_movies.py",
+        "--worker-id", "0", "--num-workers", "1",
+        "--max-movies", str(n),
+    ]
+    if from_archive:
+        cmd.append("--from-archive")
+
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    t0 = time.perf_counter()
+    subprocess.run(cmd, cwd=REPO_ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+    wall = time.perf_counter() - t0
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    return wall, cpu
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="抓取 vs 从存档重新解析 基准测试")
+    parser.add_argument("--movies", type=int, default=30, help="抓取多少部合成电影（默认 30）")
+    parser.add_argument("--latency", type=float, default=0.2, help="每个请求注入的延迟秒数（默认 0.2）")
+    parser.add_argument("--rps", type=float, default=5.0, help="抓取时的请求速率上限（默认 5）")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    movie_ids = synthetic_movie_ids(args.movies)
+    server, base_url = start_mock_server(latency=args.latency)
+    data_dir = _prepare_data_dir(movie_ids, "archive")
+    pages = len(movie_ids) * 3
+    print(f"[bench] mock={base_url} movies={len(movie_ids)} latency={args.latency}s rps={args.rps}")
+
+    wall, cpu = _run(base_url, data_dir, len(movie_ids), args.rps, from_archive=False)
+    live = _snapshot(data_dir)
+    print(f"[live   ] {wall:7.2f}s  CPU {cpu:6.2f}s  {pages / wall:7.2f} pages/s")
+
+    archive_dir = os.path.join(data_dir, "archive")
+    print(f"[archive] {_dir_size(archive_dir) / 1024:.0f}KB（{pages} 个页面，gzip + 内容寻址）")
+
+    # 关掉服务器再重放：不应该发出任何请求
+    server.shutdown()
+    server.server_close()
+    wall, cpu = _run(base_url, data_dir, len(movie_ids), args.rps, from_archive=True)
+    replay = _snapshot(data_dir)
+    print(f"[replay ] {wall:7.2f}s  CPU {cpu:6.2f}s  {pages / wall:7.2f} pages/s")
+
+    same = live == replay
+    print(f"[check] 重放与抓取的输出记录一致: {same}")
+    if not same:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
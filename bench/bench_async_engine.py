@@ -0,0 +1,132 @@
+"""
+bench/bench_async_engine.py
+
+在本地假豆瓣（注入固定延迟）上对比 1_crawl_movies.py 的两种引擎：
+
+  - sync  : 串行抓取
+  - async : 多部电影并发
+
+两者共用 rate_limiter 的令牌桶，请求速率上限都是 rps；
+差别只在于 sync 一次只有一个请求在途，网络延迟超过令牌间隔时就跑不满速率。
+脚本为每种引擎各准备一个临时数据目录（种子文件 + 独立的 frontier），跑两遍爬虫，输出耗时 / 每秒页面数，
+并校验两种引擎写出的记录完全一致（只比较内容，不比较行序和抓取时间 fetched_at）。
+
+用法（在仓库根目录）：
+    python -m bench.bench_async_engine --movies 30 --latency 0.3 --rps 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from bench.fixtures import synthetic_movie_ids
+from bench.mock_douban import start_mock_server
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUTPUT_NAMES = [
+    "movies_basic.jsonl",
+    "movies_details.jsonl",
+    "movies_summary.jsonl",
+    "movie_cast.jsonl",
+    "movie_crew.jsonl",
+    "movie_awards.jsonl",
+]
+
+
+def _prepare_data_dir(movie_ids: List[str], engine: str) -> str:
+    # 每种引擎各用一个目录：frontier 和输出都在里面，共用的话第二遍会全部跳过
+    data_dir = tempfile.mkdtemp(prefix=f"bench_async_{engine}_")
+    seed_dir = os.path.join(data_dir, "seeds")
+    os.makedirs(seed_dir)
+    with open(os.path.join(seed_dir, "movies_seed.jsonl"), "w", encoding="utf-8") as f:
+        for mid in movie_ids:
+            f.write(json.dumps({"movie_douban_id": mid, "title": None, "sources": []}) + "\n")
+    return data_dir
+
+
+def _run_engine(engine: str, base_url: str, data_dir: str, n: int, rps: float, concurrency: int) -> float:
+    env = dict(os.environ)
+    env.update({
+        "DOUBAN_MOVIE_BASE_URL": base_url,
+        "CRAWLER_DATA_DIR": data_dir,
+        # 两种引擎共用的固定令牌桶速率（关掉自适应），且不长休息
+        "CRAWLER_RATE_LIMIT_RPS": str(rps),
+        "CRAWLER_RATE_LIMIT_ADAPTIVE": "0",
+        "CRAWLER_LONG_BREAK_MIN": "0",
+        "CRAWLER_LONG_BREAK_MAX": "0",
+    })
+    cmd = [
+        sys.executable, "1_crawl_movies.py",
+        "--worker-id", "0", "--num-workers", "1",
+        "--max-movies", str(n),
+        "--engine", engine,
+        "--concurrency", str(concurrency),
+    ]
+    t0 = time.perf_counter()
+    subprocess.run(cmd, cwd=REPO_ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - t0
+
+
+def _strip_fetched_at(line: str) -> str:
+    """去掉抓取时间（每次跑都不一样），只比较内容"""
+    rec = json.loads(line)
+    rec.pop("fetched_at", None)
+    return json.dumps(rec, ensure_ascii=False)
+
+
+def _snapshot(data_dir: str) -> Dict[str, List[str]]:
+    worker_dir = os.path.join(data_dir, "raw", "0")
+    result = {}
+    for name in OUTPUT_NAMES:
+        with open(os.path.join(worker_dir, name), "r", encoding="utf-8") as f:
+            result[name] = sorted(_strip_fetched_at(line) for line in f.read().splitlines())
+    return result
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="1_crawl_movies.py sync vs async 引擎基准测试")
+    parser.add_argument("--movies", type=int, default=30, help="抓取多少部合成电影（默认 30）")
+    parser.add_argument("--latency", type=float, default=0.3, help="每个请求注入的延迟秒数（默认 0.3）")
+    parser.add_argument("--rps", type=float, default=5.0, help="每个 host 的请求速率上限（默认 5）")
+    parser.add_argument("--concurrency", type=int, default=8, help="async 引擎同时在途的电影数（默认 8）")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    movie_ids = synthetic_movie_ids(args.movies)
+    server, base_url = start_mock_server(latency=args.latency)
+    pages = len(movie_ids) * 3
+
+    print(
+        f"[bench] mock={base_url} movies={len(movie_ids)} latency={args.latency}s "
+        f"rps={args.rps} concurrency={args.concurrency}"
+    )
+
+    results = {}
+    snapshots = {}
+    for engine in ("sync", "async"):
+        data_dir = _prepare_data_dir(movie_ids, engine)
+        sec = _run_engine(engine, base_url, data_dir, len(movie_ids), args.rps, args.concurrency)
+        results[engine] = sec
+        snapshots[engine] = _snapshot(data_dir)
+        print(f"[{engine:5s}] {sec:7.2f}s  {pages / sec:6.2f} pages/s")
+
+    server.shutdown()
+
+    print(f"[speedup] async / sync = {results['sync'] / results['async']:.2f}x")
+    same = snapshots["sync"] == snapshots["async"]
+    print(f"[check] 两种引擎输出记录一致: {same}")
+    if not same:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
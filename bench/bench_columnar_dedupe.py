@@ -0,0 +1,76 @@
+"""
+bench/bench_columnar_dedupe.py
+
+etl/10、11 逐行实现（--engine python）和 NumPy 列式引擎（--engine numpy，etl/columnar.py）的对比：
+合成 movie_ratings.csv / watching_records.csv（数据同 bench_external_dedupe：约一半重复、含并列和非法行），
+两种引擎各在子进程里跑一次，输出耗时、每秒处理的行数、峰值 RSS，并校验写出的 CSV 逐字节一致。
+
+需要安装 numpy。默认 5000 万行，合成数据就要不少时间，逐行实现的 dict 也要吃掉十几 GB 内存，
+机器不够时用 --rows 调小。
+
+用法（在仓库根目录）：
+    python -m bench.bench_columnar_dedupe --rows 50000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+from bench.bench_async_engine import REPO_ROOT
+from bench.bench_external_dedupe import _run, _write_inputs
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="10 / 11 逐行实现 vs NumPy 列式引擎 基准测试")
+    parser.add_argument("--rows", type=int, default=50000000, help="每个源 CSV 合成多少行（默认 50000000）")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        print("[bench] 需要先安装 numpy（pip install numpy）")
+        sys.exit(1)
+
+    tree = tempfile.mkdtemp(prefix="bench_columnar_")
+    try:
+        shutil.copytree(
+            os.path.join(REPO_ROOT, "etl"), os.path.join(tree, "etl"),
+            ignore=shutil.ignore_patterns("__pycache__"),
+        )
+        etl_dir = os.path.join(tree, "data", "etl")
+        _write_inputs(etl_dir, args.rows)
+        print(f"[bench] rows={args.rows} tree={tree}")
+
+        ok = True
+        for script, out_name in (
+            ("10_build_movie_ratings_for_sql.py", "movie_ratings_for_sql.csv"),
+            ("11_build_watching_records_for_sql.py", "watching_records_for_sql.csv"),
+        ):
+            outputs = {}
+            for engine in ("python", "numpy"):
+                elapsed, rss = _run(tree, script, ["--engine", engine])
+                with open(os.path.join(etl_dir, out_name), "rb") as f:
+                    outputs[engine] = f.read()
+                print(
+                    f"[{script[:2]}][{engine:6s}] {elapsed:7.2f}s  {args.rows / elapsed / 1e6:5.2f}M 行/s  "
+                    f"峰值 RSS {rss / 1024 / 1024:7.1f}MB"
+                )
+            same = outputs["python"] == outputs["numpy"]
+            print(f"[{script[:2]}][check] 输出逐字节一致: {same}")
+            ok = ok and same
+
+        if not ok:
+            sys.exit(1)
+    finally:
+        shutil.rmtree(tree, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
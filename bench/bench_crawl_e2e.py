@@ -0,0 +1,226 @@
+"""
+bench/bench_crawl_e2e.py
+
+离线端到端抓取基准：起一个本地假豆瓣（bench/mock_douban.py），
+按真实流水线的顺序把几个爬虫各跑一遍，全程不碰 douban.com：
+
+  1_crawl_movies         -> subject / celebrities / awards
+  2_build_person_seeds   （不计时，只是给 3 生成种子）
+  3_crawl_persons        -> 移动端人物接口
+  4_crawl_movie_comments -> 短评 / 想看
+  4_crawl_movie_comments --refresh（只在 --only 里写了 refresh 时跑）-> 接着上一步增量刷新两轮，
+                         第一轮从已有记录推出高水位后补齐按时间排序的新短评，第二轮看“没有新短评”时每部电影花几个请求
+
+每一步报告：
+  - pages/s   ：服务端返回 200 的页面数 / 墙钟时间
+  - CPU/page  ：爬虫子进程（user + sys）CPU 时间 / 页面数，衡量解析和写出的开销
+  - 以及请求总数、非 200 响应数（注入的错误 / 限流）、传输字节数
+
+mock 的延迟、错误率、服务端限流都可以调，用来看重试队列 / AIMD 在故障下的表现；
+爬虫的客户端限速默认放得很宽，长休息关掉，重试退避调小，让耗时主要取决于爬虫本身。
+
+用法（在仓库根目录）：
+    python -m bench.bench_crawl_e2e --movies 30 --persons 100 --latency 0.02
+    python -m bench.bench_crawl_e2e --movies 30 --error-rate 0.05 --rate-limit 100 --adaptive
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from bench.bench_async_engine import REPO_ROOT
+from bench.fixtures import synthetic_movie_ids
+from bench.mock_douban import RequestStats, start_mock_server
+
+
+def _prepare_data_dir(movie_ids: List[str]) -> str:
+    data_dir = tempfile.mkdtemp(prefix="bench_crawl_e2e_")
+    seed_dir = os.path.join(data_dir, "seeds")
+    os.makedirs(seed_dir)
+    with open(os.path.join(seed_dir, "movies_seed.jsonl"), "w", encoding="utf-8") as f:
+        for mid in movie_ids:
+            f.write(json.dumps({"movie_douban_id": mid, "title": None, "sources": []}) + "\n")
+    return data_dir
+
+
+def _crawler_env(args: argparse.Namespace, base_url: str, data_dir: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "DOUBAN_MOVIE_BASE_URL": base_url,
+        "DOUBAN_MOBILE_BASE_URL": base_url,
+        "CRAWLER_DATA_DIR": data_dir,
+        "CRAWLER_RATE_LIMIT_RPS": str(args.client_rps),
+        "CRAWLER_RATE_LIMIT_MAX_RPS": str(args.client_rps),
+        "CRAWLER_RATE_LIMIT_ADAPTIVE": "1" if args.adaptive else "0",
+        "CRAWLER_LONG_BREAK_MIN": "0",
+        "CRAWLER_LONG_BREAK_MAX": "0",
+        "CRAWLER_RETRY_BACKOFF_BASE": str(args.retry_backoff),
+        "CRAWLER_ARCHIVE": "1" if args.archive else "0",
+    })
+    return env
+
+
+def _children_cpu() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _run_stage(
+        cmds: List[List[str]],
+        env: Dict[str, str],
+        stats: RequestStats,
+        verbose: bool,
+) -> Tuple[float, float, Dict[int, int], int, List[int]]:
+    """
+    同时启动一组 worker 进程并等它们全部退出。
+    返回 (墙钟秒数, 子进程 CPU 秒数, 状态码 -> 请求数, 字节数, 各进程退出码)
+    """
+    before_status, before_bytes = stats.snapshot()
+    cpu0 = _children_cpu()
+    t0 = time.perf_counter()
+    out = None if verbose else subprocess.DEVNULL
+    procs = [subprocess.Popen(cmd, cwd=REPO_ROOT, env=env, stdout=out) for cmd in cmds]
+    codes = [p.wait() for p in procs]
+    wall = time.perf_counter() - t0
+    cpu = _children_cpu() - cpu0
+
+    after_status, after_bytes = stats.snapshot()
+    delta = {
+        status: n - before_status.get(status, 0)
+        for status, n in after_status.items()
+        if n != before_status.get(status, 0)
+    }
+    return wall, cpu, delta, after_bytes - before_bytes, codes
+
+
+def _worker_cmds(script: str, workers: int, extra: List[str]) -> List[List[str]]:
+    return [
+        [sys.executable, script, "--worker-id", str(w), "--num-workers", str(workers), "--dispatch", "lease"]
+        + extra
+        for w in range(workers)
+    ]
+
+
+def _report(name: str, wall: float, cpu: float, by_status: Dict[int, int], nbytes: int, codes: List[int]) -> None:
+    pages = by_status.get(200, 0)
+    requests_total = sum(by_status.values())
+    others = " ".join(f"{s}={n}" for s, n in sorted(by_status.items()) if s != 200) or "无"
+    pages_per_sec = pages / wall if wall > 0 else 0.0
+    cpu_per_page = cpu * 1000 / pages if pages else float("nan")
+    print(
+        f"[{name:8s}] 页面 {pages:5d}（请求 {requests_total}，非 200: {others}）  "
+        f"耗时 {wall:6.2f}s  {pages_per_sec:7.1f} pages/s  "
+        f"CPU {cpu:6.2f}s  {cpu_per_page:6.2f} ms/page  "
+        f"{nbytes / 1024 / 1024:6.1f} MB"
+    )
+    if any(codes):
+        print(f"[{name:8s}] 警告：有 worker 异常退出，退出码 {codes}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="对着本地假豆瓣跑 1 / 3 / 4 号爬虫的端到端基准")
+    parser.add_argument("--movies", type=int, default=30, help="种子电影数（默认 30）")
+    parser.add_argument("--persons", type=int, default=100, help="3_crawl_persons 抓多少个人物（默认 100）")
+    parser.add_argument("--workers", type=int, default=1, help="每个爬虫起几个 worker 进程（默认 1）")
+    parser.add_argument("--engine", choices=["sync", "async"], default="sync", help="1_crawl_movies 的引擎")
+    parser.add_argument("--person-engine", choices=["sync", "pool"], default="sync", help="3_crawl_persons 的引擎")
+    parser.add_argument("--person-concurrency", type=int, default=0, help="pool 引擎在途请求数上限，0 用默认值")
+    parser.add_argument("--person-budget", type=int, default=0, help="3_crawl_persons 的 --request-budget，0 表示不限")
+    parser.add_argument("--pages-p", type=int, default=5, help="每部电影抓几页短评（默认 5）")
+    parser.add_argument("--pages-f", type=int, default=2, help="每部电影抓几页想看（默认 2）")
+    parser.add_argument("--latency", type=float, default=0.02, help="mock 每个请求的延迟（默认 0.02s）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="mock 返回 503 的概率（默认 0）")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="mock 服务端限流（请求/秒），0 表示不限")
+    parser.add_argument("--client-rps", type=float, default=200, help="爬虫客户端限速（默认 200 请求/秒）")
+    parser.add_argument("--adaptive", action="store_true", help="打开客户端 AIMD 自适应限速")
+    parser.add_argument("--retry-backoff", type=float, default=0.5, help="重试退避的基数秒数（默认 0.5）")
+    parser.add_argument("--archive", action="store_true", help="打开原始响应存档（默认关，只测抓取和解析）")
+    parser.add_argument("--only", default="movies,persons,comments", help="只跑哪几步，逗号分隔（另有 refresh：短评增量刷新）")
+    parser.add_argument("--verbose", action="store_true", help="显示爬虫自己的输出")
+    parser.add_argument("--keep", action="store_true", help="保留临时数据目录")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    only = {s.strip() for s in args.only.split(",") if s.strip()}
+    movie_ids = synthetic_movie_ids(args.movies)
+    server, base_url = start_mock_server(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+    )
+    stats = server.RequestHandlerClass.stats
+    data_dir = _prepare_data_dir(movie_ids)
+    env = _crawler_env(args, base_url, data_dir)
+    print(
+        f"[bench] mock={base_url} movies={len(movie_ids)} persons={args.persons} workers={args.workers} "
+        f"latency={args.latency}s error_rate={args.error_rate} rate_limit={args.rate_limit or '不限'} "
+        f"client_rps={args.client_rps} adaptive={args.adaptive} archive={args.archive}"
+    )
+    print(f"[bench] 数据目录: {data_dir}")
+
+    try:
+        if "movies" in only or "persons" in only:
+            result = _run_stage(
+                _worker_cmds("1_crawl_movies.py", args.workers, [
+                    "--max-movies", str(args.movies), "--engine", args.engine,
+                ]),
+                env, stats, args.verbose,
+            )
+            _report("movies", *result)
+
+        if "persons" in only:
+            subprocess.run(
+                [sys.executable, "2_build_person_seeds.py"],
+                cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, check=True,
+            )
+            result = _run_stage(
+                _worker_cmds("3_crawl_persons.py", args.workers, [
+                    "--max-persons", str(args.persons), "--engine", args.person_engine,
+                    "--request-budget", str(args.person_budget),
+                ] + (["--concurrency", str(args.person_concurrency)] if args.person_concurrency > 0 else [])),
+                env, stats, args.verbose,
+            )
+            _report("persons", *result)
+
+        if "comments" in only:
+            result = _run_stage(
+                _worker_cmds("4_crawl_movie_comments.py", args.workers, [
+                    "--max-movies", str(args.movies),
+                    "--pages-p", str(args.pages_p),
+                    "--pages-f", str(args.pages_f),
+                ]),
+                env, stats, args.verbose,
+            )
+            _report("comments", *result)
+
+        if "refresh" in only:
+            for round_id in ("bench1", "bench2"):
+                result = _run_stage(
+                    _worker_cmds("4_crawl_movie_comments.py", args.workers, [
+                        "--max-movies", str(args.movies),
+                        "--pages-p", str(args.pages_p),
+                        "--pages-f", str(args.pages_f),
+                        "--refresh", round_id,
+                    ]),
+                    env, stats, args.verbose,
+                )
+                _report(round_id, *result)
+    finally:
+        server.shutdown()
+        if not args.keep:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+bench/bench_dispatch.py
+
+对比 1_crawl_movies.py 两种任务分配方式（--dispatch）在负载不均时的总耗时：
+
+  - static : 按种子行号 % num_workers 静态切分
+  - lease  : 从 frontier 一批批认领
+
+假豆瓣里每 num_workers 部电影有一部是“慢电影”（响应延迟 --slow-latency），
+而且正好都落在 static 模式的 worker 0 名下，模拟某个 worker 的那一份特别难抓。
+static 下总耗时取决于最慢的 worker；lease 下各 worker 谁空谁领，总耗时接近平均水平。
+
+最后再跑一次 lease 的崩溃场景：启动后杀掉一个 worker，
+剩下的 worker 在租约过期（--lease-seconds）后把它认领的电影接过来，校验全部电影都完成。
+
+用法（在仓库根目录）：
+    python -m bench.bench_dispatch --movies 30 --workers 3 --latency 0.05 --slow-latency 0.5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from bench.fixtures import synthetic_movie_ids
+from bench.mock_douban import start_mock_server
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _prepare_data_dir(movie_ids: List[str], name: str) -> str:
+    data_dir = tempfile.mkdtemp(prefix=f"bench_dispatch_{name}_")
+    seed_dir = os.path.join(data_dir, "seeds")
+    os.makedirs(seed_dir)
+    with open(os.path.join(seed_dir, "movies_seed.jsonl"), "w", encoding="utf-8") as f:
+        for mid in movie_ids:
+            f.write(json.dumps({"movie_douban_id": mid, "title": None, "sources": []}) + "\n")
+    return data_dir
+
+
+def _spawn(worker_id: int, args: argparse.Namespace, dispatch: str, base_url: str, data_dir: str) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "DOUBAN_MOVIE_BASE_URL": base_url,
+        "CRAWLER_DATA_DIR": data_dir,
+        # 速率给足，让耗时主要取决于响应延迟和任务分配
+        "CRAWLER_RATE_LIMIT_RPS": "200",
+        "CRAWLER_RATE_LIMIT_ADAPTIVE": "0",
+        "CRAWLER_LONG_BREAK_MIN": "0",
+        "CRAWLER_LONG_BREAK_MAX": "0",
+        "CRAWLER_LEASE_BATCH_SIZE": str(args.batch),
+        "CRAWLER_LEASE_SECONDS": str(args.lease_seconds),
+    })
+    cmd = [
+        sys.executable, "1_crawl_movies.py",
+        "--worker-id", str(worker_id), "--num-workers", str(args.workers),
+        "--max-movies", "0",
+        "--dispatch", dispatch,
+    ]
+    return subprocess.Popen(cmd, cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL)
+
+
+def _run(args: argparse.Namespace, dispatch: str, base_url: str, data_dir: str) -> Tuple[float, List[float]]:
+    """同时启动 workers 个进程，返回 (总耗时, 各 worker 耗时)"""
+    t0 = time.perf_counter()
+    procs = [_spawn(w, args, dispatch, base_url, data_dir) for w in range(args.workers)]
+    finished: Dict[int, float] = {}
+    while len(finished) < len(procs):
+        for w, p in enumerate(procs):
+            if w not in finished and p.poll() is not None:
+                finished[w] = time.perf_counter() - t0
+        time.sleep(0.05)
+    return max(finished.values()), [finished[w] for w in range(len(procs))]
+
+
+def _frontier_counts(data_dir: str) -> Dict[str, int]:
+    conn = sqlite3.connect(os.path.join(data_dir, "state", "frontier.sqlite3"))
+    try:
+        rows = conn.execute("SELECT status, COUNT(*) FROM tasks WHERE entity_type = 'movie' GROUP BY status")
+        return {status: n for status, n in rows}
+    finally:
+        conn.close()
+
+
+def _basic_ids(data_dir: str) -> List[str]:
+    """所有 worker 写出的 movies_basic 记录里的电影 ID（含重复）"""
+    ids = []
+    raw = os.path.join(data_dir, "raw")
+    for worker in os.listdir(raw):
+        path = os.path.join(raw, worker, "movies_basic.jsonl")
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                ids.extend(json.loads(line)["movie_douban_id"] for line in f if line.strip())
+    return ids
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="static vs lease 任务分配基准测试")
+    parser.add_argument("--movies", type=int, default=30, help="合成电影数（默认 30）")
+    parser.add_argument("--workers", type=int, default=3, help="worker 进程数（默认 3）")
+    parser.add_argument("--latency", type=float, default=0.05, help="普通页面的响应延迟（默认 0.05s）")
+    parser.add_argument("--slow-latency", type=float, default=0.5, help="慢电影的响应延迟（默认 0.5s）")
+    parser.add_argument("--batch", type=int, default=2, help="lease 每次认领多少部（默认 2）")
+    parser.add_argument("--lease-seconds", type=float, default=3.0, help="租约时长（默认 3s，崩溃场景里等它过期）")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    movie_ids = synthetic_movie_ids(args.movies)
+    # static 下行号 % workers == 0 的都归 worker 0
+    slow_ids = movie_ids[::args.workers]
+    server, base_url = start_mock_server(
+        latency=args.latency, slow_ids=slow_ids, slow_latency=args.slow_latency
+    )
+    print(
+        f"[bench] mock={base_url} movies={len(movie_ids)} workers={args.workers} "
+        f"slow={len(slow_ids)} latency={args.latency}s slow_latency={args.slow_latency}s"
+    )
+
+    results = {}
+    for dispatch in ("static", "lease"):
+        data_dir = _prepare_data_dir(movie_ids, dispatch)
+        total, per_worker = _run(args, dispatch, base_url, data_dir)
+        results[dispatch] = total
+        ids = _basic_ids(data_dir)
+        print(
+            f"[{dispatch:6s}] 总耗时 {total:6.2f}s  各 worker "
+            + " ".join(f"{t:6.2f}s" for t in per_worker)
+            + f"  电影 {len(set(ids))}/{len(movie_ids)}（重复 {len(ids) - len(set(ids))}）"
+        )
+    print(f"[speedup] static / lease = {results['static'] / results['lease']:.2f}x")
+
+    # 崩溃场景：worker 0 认领到任务后被杀，其余 worker 等租约过期后接手
+    data_dir = _prepare_data_dir(movie_ids, "crash")
+    t0 = time.perf_counter()
+    procs = [_spawn(w, args, "lease", base_url, data_dir) for w in range(args.workers)]
+    time.sleep(1.0)
+    procs[0].kill()
+    for p in procs:
+        p.wait()
+    counts = _frontier_counts(data_dir)
+    ids = _basic_ids(data_dir)
+    print(
+        f"[crash ] 杀掉 worker 0 后 {time.perf_counter() - t0:6.2f}s 结束  frontier={counts}  "
+        f"电影 {len(set(ids))}/{len(movie_ids)}"
+    )
+
+    server.shutdown()
+    ok = set(ids) == set(movie_ids) and counts.get("done", 0) == sum(counts.values())
+    print(f"[check] 崩溃后全部电影完成: {ok}")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+bench/bench_etl_scan.py
+
+ETL 01~05 单遍扫描（etl/raw_scan.py + etl/run_raw_stages.py）的验证与对比：
+
+  1. staged : 01~05 依次单独运行，每个阶段各扫一遍自己要的 raw 文件；
+  2. single : run_raw_stages 一遍扫完，记录分发给全部 5 个阶段。
+
+在临时目录里合成一份多 worker 的 raw 数据（含跨 worker 重复的电影 / 人物 / 用户），
+把 etl/ 拷过去跑（etl 脚本的路径都是相对自身写死的），
+输出两种方式读的文件数 / 字节数 / 解析的记录数、耗时，并校验写出的 CSV 逐字节一致。
+
+用法（在仓库根目录）：
+    python -m bench.bench_etl_scan --movies 3000 --workers 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from bench.bench_async_engine import REPO_ROOT
+from bench.fixtures import synthetic_movie_ids
+
+_GENRES = ["剧情", "喜剧", "动作", "爱情", "科幻", "动画", "悬疑"]
+_REGIONS = ["中国大陆", "美国", "日本", "韩国", "英国", "法国"]
+_LANGUAGES = ["汉语普通话", "英语", "日语", "韩语", "法语"]
+_ROLES = ["导演 Director", "编剧 Writer", "摄影 Cinematography", "剪辑 Film Editing", "作曲 Music"]
+_FESTIVALS = [("第95届奥斯卡金像奖", 2023), ("第76届戛纳电影节", 2023), ("第60届台北金马影展", 2023)]
+
+
+class _JsonlWriters:
+    """按 (worker, 文件名) 缓存打开的 jsonl 文件"""
+
+    def __init__(self, raw_root: str):
+        self.raw_root = raw_root
+        self._files: Dict[Tuple[int, str], io.TextIOBase] = {}
+
+    def write(self, worker: int, file_name: str, obj: dict) -> None:
+        key = (worker, file_name)
+        f = self._files.get(key)
+        if f is None:
+            worker_dir = os.path.join(self.raw_root, str(worker))
+            os.makedirs(worker_dir, exist_ok=True)
+            f = self._files[key] = open(os.path.join(worker_dir, file_name), "w", encoding="utf-8")
+        f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+
+    def close(self) -> None:
+        for f in self._files.values():
+            f.close()
+
+
+def _write_raw(data_dir: str, n_movies: int, workers: int, seed: int = 7) -> None:
+    """合成 data/raw/{worker}/*.jsonl 和 data/seeds/persons_seed.jsonl"""
+    rng = random.Random(seed)
+    out = _JsonlWriters(os.path.join(data_dir, "raw"))
+    n_persons = n_movies * 3
+    n_users = n_movies * 5
+    person_ids = [str(1000000 + i) for i in range(n_persons)]
+    user_hashes = [f"u{i:08x}" for i in range(n_users)]
+
+    for idx, mid in enumerate(synthetic_movie_ids(n_movies)):
+        # 5% 的电影被两个 worker 都抓到（重启 / 切分变化时常见），简介不一样
+        owners = [idx % workers]
+        if workers > 1 and rng.random() < 0.05:
+            owners.append((idx + 1) % workers)
+
+        for w in owners:
+            out.write(w, "movies_basic.jsonl", {
+                "movie_douban_id": mid,
+                "title": f"电影 {mid}",
+                "image_url": f"https://img.example/{mid}.jpg",
+                "release_date": f"20{idx % 24:02d}-01-01",
+                "runtime_minutes": 80 + idx % 60,
+                "genres": rng.sample(_GENRES, 2),
+            })
+            out.write(w, "movies_details.jsonl", {
+                "movie_douban_id": mid,
+                "regions": rng.sample(_REGIONS, 2),
+                "languages": rng.sample(_LANGUAGES, 2),
+            })
+            out.write(w, "movies_summary.jsonl", {
+                "movie_douban_id": mid,
+                "summary": f"worker {w} 抓到的简介\n第二行 {rng.random()}",
+            })
+            cast = rng.sample(person_ids, 8)
+            for order, pid in enumerate(cast, start=1):
+                out.write(w, "movie_cast.jsonl", {
+                    "movie_douban_id": mid, "person_douban_id": pid,
+                    "name": f"演员{pid}-{w}", "role": f"演员 Actor (饰 角色{order})", "order": order,
+                })
+            for order, pid in enumerate(rng.sample(person_ids, 6), start=1):
+                out.write(w, "movie_crew.jsonl", {
+                    "movie_douban_id": mid, "person_douban_id": pid, "name": f"职员{pid}-{w}",
+                    "role": rng.choice(_ROLES), "department": "", "order": order,
+                })
+            if rng.random() < 0.3:
+                fest_name, fest_year = rng.choice(_FESTIVALS)
+                out.write(w, "movie_awards.jsonl", {
+                    "movie_douban_id": mid, "festival_name": fest_name, "festival_year": fest_year,
+                    "festival_url": "", "award_name": "最佳影片", "award_type": "Movie",
+                    "is_winner": rng.random() < 0.5, "person_douban_id": "", "person_name": "",
+                    "extra_desc": None,
+                })
+            for file_name in ("movie_ratings.jsonl", "movie_watch_records.jsonl"):
+                for uh in rng.sample(user_hashes, 15):
+                    rec = {
+                        "movie_douban_id": mid, "user_hash": uh, "username_raw": f"用户 {uh} @{w}",
+                        "created_at": "2024-05-01 12:00:00",
+                    }
+                    if file_name == "movie_ratings.jsonl":
+                        rec.update({"rating": rng.randint(1, 5), "review": "不错\n" * rng.randint(0, 3)})
+                    else:
+                        rec.update({"status": rng.choice(["看过", "想看"]), "star": rng.random() < 0.5})
+                    out.write(w, file_name, rec)
+
+    for i, pid in enumerate(person_ids[: n_persons // 3]):
+        out.write(i % workers, "person_details_fixed.jsonl", {
+            "person_douban_id": pid, "name_cn": f"人物{pid}", "sex": "男",
+            "birth_region": rng.choice(_REGIONS),
+        })
+    out.close()
+
+    seed_dir = os.path.join(data_dir, "seeds")
+    os.makedirs(seed_dir, exist_ok=True)
+    with open(os.path.join(seed_dir, "persons_seed.jsonl"), "w", encoding="utf-8") as f:
+        for pid in person_ids[::2]:
+            f.write(json.dumps({"person_douban_id": pid, "name": f"种子 {pid}"}, ensure_ascii=False) + "\n")
+
+
+def _snapshot(etl_out: str) -> Dict[str, bytes]:
+    result: Dict[str, bytes] = {}
+    for dirpath, _, filenames in os.walk(etl_out):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            with open(path, "rb") as f:
+                result[os.path.relpath(path, etl_out)] = f.read()
+    return result
+
+
+def _run(tree: str, single: bool) -> Tuple[float, float, List[int], Dict[str, bytes]]:
+    """
+    跑一遍 01~05，返回 (墙钟秒数, CPU 秒数, [文件数, 字节数, 记录数], 输出 CSV 快照)。
+    每次都从空的 data/etl 开始（04 会读已有的 positions.csv）。
+    """
+    raw_scan = importlib.import_module("raw_scan")
+    run_raw_stages = importlib.import_module("run_raw_stages")
+    raw_root = os.path.join(tree, "data", "raw")
+    etl_out = os.path.join(tree, "data", "etl")
+    shutil.rmtree(etl_out, ignore_errors=True)
+
+    stats = [0, 0, 0]
+    t0, c0 = time.perf_counter(), time.process_time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        groups = [run_raw_stages.load_stages()] if single else [[s] for s in run_raw_stages.load_stages()]
+        for stages in groups:
+            scanner = raw_scan.run_stages(raw_root, stages)
+            stats[0] += scanner.files_read
+            stats[1] += scanner.bytes_read
+            stats[2] += scanner.records
+    wall, cpu = time.perf_counter() - t0, time.process_time() - c0
+    return wall, cpu, stats, _snapshot(etl_out)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="ETL 01~05 分阶段扫描 vs 单遍扫描 基准测试")
+    parser.add_argument("--movies", type=int, default=3000, help="合成多少部电影（默认 3000）")
+    parser.add_argument("--workers", type=int, default=3, help="合成多少个 worker 目录（默认 3）")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    tree = tempfile.mkdtemp(prefix="bench_etl_")
+    try:
+        shutil.copytree(
+            os.path.join(REPO_ROOT, "etl"), os.path.join(tree, "etl"),
+            ignore=shutil.ignore_patterns("__pycache__"),
+        )
+        _write_raw(os.path.join(tree, "data"), args.movies, args.workers)
+        sys.path.insert(0, os.path.join(tree, "etl"))
+        print(f"[bench] movies={args.movies} workers={args.workers} tree={tree}")
+
+        results = {}
+        for mode in ("staged", "single"):
+            wall, cpu, (n_files, n_bytes, n_records), snap = _run(tree, single=mode == "single")
+            results[mode] = snap
+            print(
+                f"[{mode:6s}] {wall:6.2f}s  CPU {cpu:6.2f}s  "
+                f"读 {n_files:3d} 个文件 {n_bytes / 1024 / 1024:7.1f}MB  解析 {n_records:8d} 条记录"
+            )
+
+        same = results["staged"] == results["single"]
+        print(f"[check] {len(results['single'])} 个 CSV 逐字节一致: {same}")
+        if not same:
+            diff = sorted(
+                name for name in set(results["staged"]) | set(results["single"])
+                if results["staged"].get(name) != results["single"].get(name)
+            )
+            print(f"[check] 不一致: {diff}")
+            sys.exit(1)
+    finally:
+        shutil.rmtree(tree, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+bench/bench_external_dedupe.py
+
+etl/10、11 两种去重方式的对比（etl/external_dedupe.py）：
+
+  1. memory : 默认的全内存 dict；
+  2. budget : --memory-budget，外排序 + k 路归并。
+
+在临时目录里合成 movie_ratings.csv / watching_records.csv（--rows 行，key 空间只有行数的一半，
+所以大约一半是重复；含同一时间的并列、非法行），把 etl/ 拷过去，每种方式各在子进程里跑一次，
+输出耗时和子进程的峰值 RSS，并校验两种方式写出的行集合完全一致（外存模式按 key 排序，顺序不同）。
+
+用法（在仓库根目录）：
+    python -m bench.bench_external_dedupe --rows 2000000 --memory-budget 64M
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Tuple
+
+from bench.bench_async_engine import REPO_ROOT
+
+_STATUSES = ["watched", "watching", "wishlist", "WATCHED", "unknown"]
+_STARS = ["TRUE", "FALSE", "t", "", "1"]
+
+
+def _created_at(rng: random.Random) -> str:
+    # 只取少量不同的时间，让同 key 的并列足够多
+    return f"2024-0{rng.randint(1, 3)}-0{rng.randint(1, 3)} 12:00:00"
+
+
+def _write_inputs(etl_dir: str, rows: int, seed: int = 7) -> None:
+    rng = random.Random(seed)
+    n_users = max(1, rows // 20)
+    n_movies = 10
+    os.makedirs(etl_dir, exist_ok=True)
+
+    with open(os.path.join(etl_dir, "movie_ratings.csv"), "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "movie_id", "user_id", "rating", "created_at", "review"])
+        for i in range(1, rows + 1):
+            rating = rng.choice([str(rng.randint(0, 10)), "11", "x"]) if rng.random() < 0.01 else rng.randint(1, 10)
+            created_at = "" if rng.random() < 0.01 else _created_at(rng)
+            writer.writerow([
+                i, rng.randint(1, n_movies), rng.randint(1, n_users), rating, created_at,
+                f"第 {i} 条短评，\n写得{'很' * rng.randint(0, 5)}长",
+            ])
+
+    with open(os.path.join(etl_dir, "watching_records.csv"), "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "movie_id", "user_id", "status", "created_at", "star"])
+        for i in range(1, rows + 1):
+            created_at = "" if rng.random() < 0.01 else _created_at(rng)
+            writer.writerow([
+                i, rng.randint(1, n_movies), rng.randint(1, n_users),
+                rng.choice(_STATUSES), created_at, rng.choice(_STARS),
+            ])
+
+
+# 在子进程里跑 etl 脚本，最后把本进程的峰值 RSS（KB）写到 stderr 最后一行。
+# 用 /proc/self/status 的 VmHWM：ru_maxrss 会把 fork 时父进程（本脚本，攒着上一轮的结果）的 RSS 带过来
+_WRAPPER = """
+import runpy, sys
+script = sys.argv[1]
+sys.argv = sys.argv[1:]
+sys.path.insert(0, sys.argv[0].rsplit("/", 1)[0])
+runpy.run_path(script, run_name="__main__")
+with open("/proc/self/status") as f:
+    print(next(l.split()[1] for l in f if l.startswith("VmHWM:")), file=sys.stderr)
+"""
+
+
+def _run(tree: str, script: str, extra: List[str]) -> Tuple[float, int]:
+    """在子进程里跑一个 etl 脚本，返回 (秒数, 峰值 RSS 字节)"""
+    t0 = time.perf_counter()
+    p = subprocess.run(
+        [sys.executable, "-c", _WRAPPER, os.path.join(tree, "etl", script), *extra],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    elapsed = time.perf_counter() - t0
+    if p.returncode != 0:
+        raise RuntimeError(f"{script} 失败：{p.stderr[-2000:]}")
+    return elapsed, int(p.stderr.strip().splitlines()[-1]) * 1024
+
+
+def _read_rows(path: str) -> Tuple[List[str], List[Tuple[str, ...]]]:
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        return header, [tuple(r) for r in reader]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="10 / 11 全内存去重 vs 外存去重 基准测试")
+    parser.add_argument("--rows", type=int, default=2000000, help="每个源 CSV 合成多少行（默认 2000000）")
+    parser.add_argument("--memory-budget", default="64M", help="外存模式的内存预算（默认 64M）")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    tree = tempfile.mkdtemp(prefix="bench_dedupe_")
+    try:
+        shutil.copytree(
+            os.path.join(REPO_ROOT, "etl"), os.path.join(tree, "etl"),
+            ignore=shutil.ignore_patterns("__pycache__"),
+        )
+        etl_dir = os.path.join(tree, "data", "etl")
+        _write_inputs(etl_dir, args.rows)
+        print(f"[bench] rows={args.rows} memory_budget={args.memory_budget} tree={tree}")
+
+        ok = True
+        for script, out_name in (
+            ("10_build_movie_ratings_for_sql.py", "movie_ratings_for_sql.csv"),
+            ("11_build_watching_records_for_sql.py", "watching_records_for_sql.csv"),
+        ):
+            out_path = os.path.join(etl_dir, out_name)
+            results = {}
+            for mode, extra in (("memory", []), ("budget", ["--memory-budget", args.memory_budget])):
+                elapsed, rss = _run(tree, script, extra)
+                results[mode] = _read_rows(out_path)
+                print(
+                    f"[{script[:2]}][{mode:6s}] {elapsed:6.2f}s  峰值 RSS {rss / 1024 / 1024:7.1f}MB  "
+                    f"写出 {len(results[mode][1])} 行"
+                )
+            mem_header, mem_rows = results["memory"]
+            ext_header, ext_rows = results["budget"]
+            same = mem_header == ext_header and sorted(mem_rows) == sorted(ext_rows)
+            print(f"[{script[:2]}][check] 两种方式写出的行一致: {same}")
+            ok = ok and same
+
+        if not ok:
+            sys.exit(1)
+    finally:
+        shutil.rmtree(tree, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+bench/bench_id_map.py
+
+Douban ID -> 内部 id 映射两种加载方式的对比（etl/id_map.py）：
+
+  1. csv   : 以前 04~08 的做法，csv.DictReader 读整个 persons.csv，拼成 {douban_id: id} 的 dict；
+  2. idmap : 03 写出的 persons.idmap，mmap 打开（IdMap）。
+
+合成一份 --persons 行（默认 100 万）、列和 03 写出的一致的 persons.csv，以及对应的 .idmap，
+分别测：加载耗时、加载时新分配的 Python 内存（tracemalloc 峰值）、
+随机查 --lookups 次（90% 命中）的吞吐，并校验两边查出来的结果完全一致。
+
+用法（在仓库根目录）：
+    python -m bench.bench_id_map --persons 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import importlib
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+from bench.bench_async_engine import REPO_ROOT
+
+_HEADER = [
+    "id", "person_douban_id", "name", "avatar_url", "sex", "birth_date",
+    "death_date", "birth_place_raw", "birth_region", "imdb_id",
+]
+
+
+def _write_persons_csv(path: str, n: int, seed: int = 7) -> List[Tuple[str, int]]:
+    """写 persons.csv，返回 (douban_id, id) 列表"""
+    rng = random.Random(seed)
+    douban_ids = sorted(rng.sample(range(1000000, 1000000 + n * 30), n))
+    pairs = [(str(did), i) for i, did in enumerate(douban_ids, start=1)]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(_HEADER)
+        for did, internal_id in pairs:
+            writer.writerow([
+                internal_id, did, f"人物{did}", f"https://img.example/p{did}.jpg", "男",
+                "1970-01-01", "", "中国,北京", "中国大陆", f"nm{did}",
+            ])
+    return pairs
+
+
+def _load_csv_map(path: str) -> Dict[str, int]:
+    """以前各阶段的 CSV 映射加载（列名已知的简化版）"""
+    mapping: Dict[str, int] = {}
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            douban = (row.get("person_douban_id") or "").strip()
+            if not douban:
+                continue
+            try:
+                mapping[douban] = int(str(row.get("id")).strip())
+            except (TypeError, ValueError):
+                continue
+    return mapping
+
+
+def _measure_load(load: Callable[[], object]) -> Tuple[object, float, int]:
+    """
+    返回 (加载结果, 秒数, tracemalloc 峰值字节数)。
+    tracemalloc 会把 CSV 加载拖慢好几倍，所以计时和量内存分两次加载。
+    """
+    tracemalloc.start()
+    load()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    t0 = time.perf_counter()
+    result = load()
+    return result, time.perf_counter() - t0, peak
+
+
+def _measure_lookups(mapping, keys: List[str]) -> Tuple[float, List]:
+    get = mapping.get
+    t0 = time.perf_counter()
+    found = [get(k) for k in keys]
+    return time.perf_counter() - t0, found
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="persons.csv vs persons.idmap 加载 / 查找基准测试")
+    parser.add_argument("--persons", type=int, default=1000000, help="合成多少个人物（默认 1000000）")
+    parser.add_argument("--lookups", type=int, default=1000000, help="随机查找次数（默认 1000000）")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    sys.path.insert(0, os.path.join(REPO_ROOT, "etl"))
+    id_map = importlib.import_module("id_map")
+
+    tmp = tempfile.mkdtemp(prefix="bench_id_map_")
+    try:
+        csv_path = os.path.join(tmp, "persons.csv")
+        idmap_path = os.path.join(tmp, "persons.idmap")
+        pairs = _write_persons_csv(csv_path, args.persons)
+        id_map.write_id_map(idmap_path, pairs)
+        print(
+            f"[bench] persons={args.persons}  persons.csv {os.path.getsize(csv_path) / 1024 / 1024:.1f}MB  "
+            f"persons.idmap {os.path.getsize(idmap_path) / 1024 / 1024:.1f}MB"
+        )
+
+        rng = random.Random(11)
+        keys = [
+            rng.choice(pairs)[0] if rng.random() < 0.9 else str(rng.randint(1, 999999))
+            for _ in range(args.lookups)
+        ]
+
+        results = {}
+        for mode, load in (
+            ("csv", lambda: _load_csv_map(csv_path)),
+            ("idmap", lambda: id_map.IdMap(idmap_path)),
+        ):
+            mapping, load_s, peak = _measure_load(load)
+            lookup_s, found = _measure_lookups(mapping, keys)
+            results[mode] = found
+            print(
+                f"[{mode:5s}] 加载 {load_s * 1000:9.1f}ms  分配峰值 {peak / 1024 / 1024:7.1f}MB  "
+                f"查找 {args.lookups / lookup_s / 1e6:5.2f}M 次/s"
+            )
+            if mode == "idmap":
+                mapping.close()
+
+        same = results["csv"] == results["idmap"]
+        print(f"[check] {args.lookups} 次查找结果一致: {same}")
+        if not same:
+            sys.exit(1)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
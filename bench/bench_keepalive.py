@@ -0,0 +1,114 @@
+"""
+bench/bench_keepalive.py
+
+对比两种抓取方式在本地 HTTP 替身上的耗时：
+
+  - cold   : 每次请求都 requests.get（旧版 utils.fetch_html 的做法），
+             每次都要重新建 TCP（以及 TLS）连接；
+  - pooled : 新版 utils.fetch_html，走全局 Session 的 keep-alive 连接池。
+
+输出每 1k 次请求的耗时、服务端看到的连接数，以及连接池节省下来的握手时间。
+
+用法（在仓库根目录）：
+    python -m bench.bench_keepalive --requests 1000
+    # 测 TLS 握手：自备一对自签名证书
+    python -m bench.bench_keepalive --certfile cert.pem --keyfile key.pem
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import requests
+import urllib3
+
+import page_archive
+import utils
+from bench.local_http import start_server
+from crawler_config import HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT
+
+
+def _run_cold(url: str, n: int, verify: bool) -> float:
+    """每次请求单独建连，返回总耗时（秒）"""
+    t0 = time.perf_counter()
+    for _ in range(n):
+        resp = requests.get(
+            url,
+            headers=utils.DEFAULT_HEADERS,
+            timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT),
+            verify=verify,
+        )
+        resp.raise_for_status()
+        _ = resp.text
+    return time.perf_counter() - t0
+
+
+def _run_pooled(url: str, n: int, verify: bool) -> float:
+    """走 utils.fetch_html 的连接池，返回总耗时（秒）"""
+    session = utils.get_session()
+    session.verify = verify
+    if not verify:
+        # 否则 REQUESTS_CA_BUNDLE 之类的环境变量会把 verify=False 覆盖掉
+        session.trust_env = False
+    t0 = time.perf_counter()
+    for _ in range(n):
+        # 只测连接开销，不走令牌桶
+        utils.fetch_html(url, throttle=False, feedback=False)
+    return time.perf_counter() - t0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="keep-alive 连接池 vs 每次新建连接 基准测试")
+    parser.add_argument("--requests", type=int, default=1000, help="每种方式的请求数（默认 1000）")
+    parser.add_argument("--certfile", type=str, default="", help="HTTPS 证书（可选）")
+    parser.add_argument("--keyfile", type=str, default="", help="HTTPS 私钥（可选）")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    # 压的是本地服务器，不往真实存档里写
+    page_archive.enable_archive(False)
+    n = max(1, args.requests)
+
+    server, base_url = start_server(
+        certfile=args.certfile or None,
+        keyfile=args.keyfile or None,
+    )
+    verify = not base_url.startswith("https")
+    if not verify:
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+    url = f"{base_url}/subject/1292052/"
+    print(f"[bench] 本地替身: {base_url}，每种方式 {n} 次请求")
+
+    # 先各自热身一次，排除 import / DNS 之类的一次性开销
+    _run_cold(url, 1, verify)
+    _run_pooled(url, 1, verify)
+
+    conn_before = server.connection_count
+    cold_sec = _run_cold(url, n, verify)
+    cold_conns = server.connection_count - conn_before
+
+    conn_before = server.connection_count
+    pooled_sec = _run_pooled(url, n, verify)
+    pooled_conns = server.connection_count - conn_before
+
+    server.shutdown()
+
+    per_1k = 1000.0 / n
+    cold_ms = cold_sec * 1000 * per_1k
+    pooled_ms = pooled_sec * 1000 * per_1k
+    saved_conns = max(cold_conns - pooled_conns, 1)
+
+    print(f"[cold]   {cold_ms:9.1f} ms / 1k 请求，新建连接 {cold_conns} 次")
+    print(f"[pooled] {pooled_ms:9.1f} ms / 1k 请求，新建连接 {pooled_conns} 次")
+    print(
+        f"[saved]  {cold_ms - pooled_ms:9.1f} ms / 1k 请求 "
+        f"（约 {(cold_sec - pooled_sec) * 1000 / saved_conns:.3f} ms / 次握手）"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+bench/bench_ld_json.py
+
+subject 页面基础信息（ld+json）两种取法的对拍 + 计时：
+
+  - dom  : BeautifulSoup 整页建树，再 find 那一个 script（原来的做法）
+  - fast : 在原始文本上直接切出 script 内容再解码，失败才退回 dom（movie_info/ld_json.py）
+
+页面来源：
+  - bench.fixtures 生成的合成页面，外加几种变形（CRLF 换行、大写标签、单引号 / 无引号属性、
+    注释掉的 script、没有 ld+json 的页面）；
+  - --html-dir 指定的目录（*.html / *.html.gz）；
+  - --archive 指定的原始响应存档目录（page_archive.py）里的 subject 页面，按存档里的 bytes 原样解析。
+
+两种取法的 parse_movie_basic_from_ld_json 结果必须完全一致；同时报告每页耗时和快速路径命中率。
+
+用法（在仓库根目录）：
+    python -m bench.bench_ld_json --pages 500
+    python -m bench.bench_ld_json --archive data/archive
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import time
+from typing import Any, Callable, List, Union
+
+from bs4 import BeautifulSoup
+
+from bench.bench_subject_page import _load_html_dir
+from bench.fixtures import subject_page, synthetic_movie_ids
+from metrics import endpoint_of
+from movie_info.ld_json import (
+    _FAST_MISS,
+    _parse_ld_json_fast,
+    movie_basic_from_ld,
+    parse_ld_json_from_soup,
+    parse_movie_basic_from_ld_json,
+)
+from page_archive import PageArchive
+
+Html = Union[str, bytes]
+
+
+def _variants(html: str) -> List[Html]:
+    """同一个页面的几种写法，快速扫描要么结果一致，要么老实退回 dom"""
+    ld_open = '<script type="application/ld+json">'
+    return [
+        html,
+        html.encode("utf-8"),
+        html.replace("\n", "\r\n"),
+        html.replace(ld_open, '<SCRIPT Type="application/ld+json" id="ld">').replace("</script>", "</SCRIPT >"),
+        html.replace(ld_open, "<script type='application/ld+json'>"),
+        html.replace(ld_open, "<script type=application/ld+json>"),
+        html.replace(ld_open, '<script type="application/json">'),
+        html.replace(ld_open, '<!-- <script type="application/ld+json">{"name": "注释里的"}</script> -->' + ld_open),
+        html.replace(ld_open, '<script type="application/ld+json">\n\n</script>' + ld_open),
+    ]
+
+
+def _archive_pages(root: str) -> List[bytes]:
+    archive = PageArchive(root=root)
+    conn = sqlite3.connect(os.path.join(root, "index.sqlite3"))
+    try:
+        rows = conn.execute("SELECT url, sha256 FROM responses WHERE status = 200 ORDER BY key").fetchall()
+    finally:
+        conn.close()
+    pages = [archive.read_blob(sha) for url, sha in rows if endpoint_of(url) == "subject"]
+    archive.close()
+    return pages
+
+
+def _dom(html: Html) -> Any:
+    return movie_basic_from_ld(parse_ld_json_from_soup(BeautifulSoup(html, "lxml")))
+
+
+def _cpu_per_page(fn: Callable[[Html], Any], pages: List[Html], rounds: int) -> float:
+    with contextlib.redirect_stdout(io.StringIO()):
+        t0 = time.process_time()
+        for _ in range(rounds):
+            for html in pages:
+                fn(html)
+        return (time.process_time() - t0) / (len(pages) * rounds)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="ld+json 快速切片 vs 建树 基准测试")
+    parser.add_argument("--pages", type=int, default=200, help="合成多少个 subject 页面（默认 200）")
+    parser.add_argument("--html-dir", default=None, help="再加上这个目录里的 subject 页面（*.html / *.html.gz）")
+    parser.add_argument("--archive", default=None, help="再加上这个存档目录里的 subject 页面")
+    parser.add_argument("--rounds", type=int, default=3, help="计时重复多少轮（默认 3）")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    pages: List[Html] = [subject_page(mid) for mid in synthetic_movie_ids(args.pages)]
+    if args.html_dir:
+        pages += _load_html_dir(args.html_dir)
+    if args.archive:
+        archived = _archive_pages(args.archive)
+        print(f"[bench] 存档 {args.archive} 中的 subject 页面: {len(archived)}")
+        pages += archived
+    golden = pages + [v for html in pages[:20] if isinstance(html, str) for v in _variants(html)]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        bad = [html for html in golden if _dom(html) != parse_movie_basic_from_ld_json(html)]
+        hits = sum(1 for html in golden if _parse_ld_json_fast(html) is not _FAST_MISS)
+    print(f"[check] 对拍页面 {len(golden)}，结果不一致 {len(bad)}，快速路径命中 {hits}（其余退回 dom）")
+
+    avg_kb = sum(len(p) for p in pages) / len(pages) / 1024
+    dom = _cpu_per_page(_dom, pages, args.rounds)
+    fast = _cpu_per_page(parse_movie_basic_from_ld_json, pages, args.rounds)
+    print(f"[bench] 页面 {len(pages)}，平均 {avg_kb:.1f}KB，rounds={args.rounds}")
+    print(f"[dom]   {dom * 1e6:9.1f} µs CPU / 页")
+    print(f"[fast]  {fast * 1e6:9.1f} µs CPU / 页（{dom / fast:.0f}x）")
+
+    if bad:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
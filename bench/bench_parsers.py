@@ -0,0 +1,220 @@
+"""
+bench/bench_parsers.py
+
+celebrities / awards / 短评三种页面的两个解析后端（crawler_config.PARSER_BACKEND）对拍 + 计时：
+
+  - bs4  : BeautifulSoup 建树 + find / find_all
+  - lxml : lxml.html 建树 + 预编译 XPath（lxml_helpers.py）
+
+页面来源（golden set）：
+  - bench.fixtures 生成的合成页面（--movies 部电影的演职员、获奖、短评 P / F 各页，含翻过头的空页）；
+  - 本文件里手写的边界情况（缺节点、没有链接、脚本 / 注释夹在文字里、class 带多个值等）；
+  - --archive 指定的原始响应存档目录（page_archive.py，比如 data/archive）里录下来的真实页面。
+
+每一页两个后端的结果必须完全相同（dict 逐字段比较），不一致的页面会列出来并以非 0 退出。
+然后分别报告每种页面每个后端的平均解析 CPU 时间。
+
+用法（在仓库根目录）：
+    python -m bench.bench_parsers --movies 200
+    python -m bench.bench_parsers --archive data/archive
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from award.movie_awards import parse_awards
+from bench.fixtures import (
+    awards_page,
+    celebrities_page,
+    comment_totals,
+    comments_page,
+    synthetic_movie_ids,
+)
+from comments.movie_comments import parse_comments_page
+from metrics import endpoint_of
+from page_archive import PageArchive
+from person.celebrities import parse_celebrities
+
+# 一个待解析的页面：(页面种类, 电影 ID, 短评的 status_flag, HTML)
+Page = Tuple[str, str, str, str]
+
+_PARSERS: Dict[str, Callable[[Page, str], Any]] = {
+    "celebrities": lambda p, backend: parse_celebrities(p[3], p[1], backend=backend),
+    "awards": lambda p, backend: parse_awards(p[3], p[1], backend=backend),
+    "comments": lambda p, backend: parse_comments_page(p[3], p[1], p[2], backend=backend),
+}
+
+_CELEBRITY_EDGE_CASES = [
+    "",
+    "<html><body><div id='content'>没有 #celebrities</div></body></html>",
+    """<div id="celebrities"><div class="list-wrapper"><h2>导演 <!-- 注释 -->Director</h2></div>
+<div class="list-wrapper"><ul class="celebrities-list"><li class="celebrity"><span class="name">无链接</span></li></ul></div>
+<div class="list-wrapper  extra"><h2>演员 Cast</h2><ul class="celebrities-list from-subject">
+<li class="celebrity"><a href="https://www.douban.com/personage/27000001/">头像</a></li>
+<li class="celebrity foo"><a href="/celebrity/1054439/"><span>旧链接</span></a><span class="role">演员 Actor (饰 某&amp;某)</span></li>
+<li class="celebrity"><a href="">空链接</a><div class="info"><span class="name"><a>名字<script>var x = 1;</script> 后半</a></span></div></li>
+</ul></div>
+<div class="list-wrapper"><h2>制片人 Producer</h2><ul class="celebrities-list"><li class="celebrity">
+<a href="https://www.douban.com/personage/27000002/" title="x">
+<span class="name">  名字  带空白 </span></a></li></ul></div>
+<div class="list-wrapper"><h2>Cast members</h2><ul class="celebrities-list"><li class="celebrity">
+<a href="https://www.douban.com/personage/27000003/">c</a></li></ul></div></div>""",
+]
+
+_AWARD_EDGE_CASES = [
+    "",
+    "<html><body><div id='content'><div class='article'>article 不在两层 div 之下</div></div></body></html>",
+    """<div id="wrapper"><div id="content"><div class="grid-16-8"><div class="article">
+<div class="awards"><h2>没有 hd</h2><ul class="award"><li>最佳影片</li></ul></div>
+<div class="awards"><div class="hd"><h2>没有链接的电影节 <span class="year">（2001）</span></h2></div>
+<ul class="award"><li>最佳影片</li></ul>
+<ul class="award"></ul>
+<ul class="award"><li> </li><li>空标题</li></ul>
+<ul class="award"><li>最佳导演(提名)</li><li><a href="https://www.douban.com/personage/27000001/">甲</a> / <a href="https://www.douban.com/personage/27000002/">乙</a></li></ul>
+<ul class="award"><li>最佳剧本（提名）</li><li>  团队 <!-- c --> 获奖 </li></ul>
+<ul class="award"><li>最佳摄影</li><li></li><li></li></ul>
+<div><ul class="award"><li>嵌套的 ul 不算</li></ul></div>
+</div>
+<div class="awards extra"><div class="hd"><h2><a href=" https://movie.douban.com/awards/x/1/ ">第1届<b>某</b>奖</a><span class="year"> (19 99) 2000</span></h2></div>
+<ul class="award"><li>最佳女主角</li><li><a>没有 href</a></li></ul></div>
+</div></div></div></div>""",
+]
+
+_COMMENT_EDGE_CASES = [
+    ("P", ""),
+    ("P", "<html><body>没有 #comments</body></html>"),
+    ("P", """<div id="comments">
+<div class="comment-item">没有 div.comment</div>
+<div class="comment-item"><div class="comment"><h3>没有 comment-info</h3></div></div>
+<div class="comment-item"><div class="comment"><span class="comment-info"><a></a><span>看过</span></span></div></div>
+<div class="comment-item"><div class="comment"><span class="comment-info"><a href="#">甲<!-- x --></a>
+<span> 看过 </span><span class="rating allstar50" title="力荐"></span><span class="comment-time">2020-01-01</span></span>
+<p>没有 short 的 p</p></div></div>
+<div class="comment-item"><div class="comment"><span class="comment-info"><a href="#">乙</a>
+<span><span>嵌套状态</span></span><span class="allstar00 rating"></span></span></div></div>
+<div class="comment-item"><div class="comment"><span class="comment-info"><a href="#">丙</a>
+<span class="allstarx">x</span><span class="comment-time "> 2021-02-03 04:05:06 </span><span class="xallstar30">3</span></span>
+<p class="comment-content"><span class="short">第一句<br/>第二句 &lt;b&gt;</span></p></div></div>
+<div class="comment-item"><div class="comment"><span class="comment-info"><a href="#">丁</a></span>
+<p></p></div></div>
+</div>"""),
+    ("F", """<div id="comments"><div class="comment-item"><div class="comment"><span class="comment-info">
+<a href="#">戊</a><span>想看</span><span class="allstar40 rating"></span></span><p><span class="short">想看的也有评分？</span></p>
+</div></div></div>"""),
+]
+
+
+def _fixture_pages(n_movies: int) -> List[Page]:
+    pages: List[Page] = []
+    for mid in synthetic_movie_ids(n_movies):
+        pages.append(("celebrities", mid, "", celebrities_page(mid)))
+        pages.append(("awards", mid, "", awards_page(mid)))
+        total_p, total_f = comment_totals(mid)
+        for flag, total in (("P", total_p), ("F", total_f)):
+            # 最多 5 页，外加一页翻过头的空页
+            for start in range(0, min(total, 100) + 20, 20):
+                pages.append(("comments", mid, flag, comments_page(mid, flag, start)))
+    return pages
+
+
+def _edge_case_pages() -> List[Page]:
+    pages: List[Page] = [("celebrities", "1", "", html) for html in _CELEBRITY_EDGE_CASES]
+    pages += [("awards", "1", "", html) for html in _AWARD_EDGE_CASES]
+    pages += [("comments", "1", flag, html) for flag, html in _COMMENT_EDGE_CASES]
+    return pages
+
+
+def _archive_pages(root: str) -> List[Page]:
+    """存档里状态码 200 的 celebrities / awards / 短评页面"""
+    archive = PageArchive(root=root)
+    conn = sqlite3.connect(os.path.join(root, "index.sqlite3"))
+    try:
+        rows = conn.execute("SELECT url, sha256 FROM responses WHERE status = 200 ORDER BY key").fetchall()
+    finally:
+        conn.close()
+
+    pages: List[Page] = []
+    for url, sha in rows:
+        kind = endpoint_of(url)
+        if kind not in _PARSERS:
+            continue
+        parts = urlsplit(url)
+        movie_id = parts.path.split("/")[2]
+        flag = parse_qs(parts.query).get("status", ["P"])[0]
+        html = archive.read_blob(sha).decode("utf-8", errors="replace")
+        pages.append((kind, movie_id, flag, html))
+    archive.close()
+    return pages
+
+
+def _mismatches(pages: List[Page]) -> List[Page]:
+    bad = []
+    # 边界情况会触发解析函数自己的“获取 xxx 失败”日志，对拍时不看
+    with contextlib.redirect_stdout(io.StringIO()):
+        for page in pages:
+            parse = _PARSERS[page[0]]
+            if parse(page, "bs4") != parse(page, "lxml"):
+                bad.append(page)
+    return bad
+
+
+def _cpu_per_page(pages: List[Page], backend: str, rounds: int) -> float:
+    with contextlib.redirect_stdout(io.StringIO()):
+        t0 = time.process_time()
+        for _ in range(rounds):
+            for page in pages:
+                _PARSERS[page[0]](page, backend)
+        return (time.process_time() - t0) / (len(pages) * rounds)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="bs4 / lxml 两个解析后端的对拍和计时")
+    parser.add_argument("--movies", type=int, default=100, help="合成多少部电影的页面（默认 100）")
+    parser.add_argument("--archive", default=None, help="再加上这个存档目录里录下来的真实页面")
+    parser.add_argument("--rounds", type=int, default=3, help="计时重复多少轮（默认 3）")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    pages = _fixture_pages(args.movies)
+    golden = pages + _edge_case_pages()
+    if args.archive:
+        archived = _archive_pages(args.archive)
+        print(f"[bench] 存档 {args.archive} 中的页面: {len(archived)}")
+        pages += archived
+        golden += archived
+
+    bad = _mismatches(golden)
+    print(f"[check] 对拍页面 {len(golden)}，结果不一致 {len(bad)}")
+    for kind, movie_id, flag, _ in bad[:20]:
+        print(f"[check]   不一致: {kind} movie={movie_id} {flag}")
+
+    for kind in _PARSERS:
+        subset = [p for p in pages if p[0] == kind]
+        if not subset:
+            continue
+        avg_kb = sum(len(p[3]) for p in subset) / len(subset) / 1024
+        bs4_t = _cpu_per_page(subset, "bs4", args.rounds)
+        lxml_t = _cpu_per_page(subset, "lxml", args.rounds)
+        print(
+            f"[{kind:11s}] {len(subset):5d} 页 平均 {avg_kb:5.1f}KB  "
+            f"bs4 {bs4_t * 1000:6.2f} ms/页  lxml {lxml_t * 1000:6.2f} ms/页  "
+            f"（{bs4_t / lxml_t:4.1f}x）"
+        )
+
+    if bad:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
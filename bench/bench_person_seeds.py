@@ -0,0 +1,343 @@
+"""
+bench/bench_person_seeds.py
+
+2_build_person_seeds.py 改成整数下标 + CSR 邻接表 + 按列计算（PersonStats）之后的对比：
+
+  1. legacy  : 以前的实现，每个人物一个 dict，里面 6 个装电影 ID 字符串的 set / dict（原样保留在本文件里）；
+  2. current : 现在的 2_build_person_seeds.py。
+
+在临时目录里合成 data/raw/{worker}/movie_cast / movie_crew / movie_awards.jsonl：
+默认 --scale 10，即 10 × 20000 部电影；人物出场次数是长尾分布，
+含跨 worker 重复抓到的电影、同一部电影里重复出现的人物、各种写法的 order / department / role。
+两种实现各在子进程里跑一次，输出耗时和峰值 RSS（/proc/self/status 的 VmHWM），并校验 persons_seed.jsonl 逐字节一致。
+
+用法（在仓库根目录）：
+    python -m bench.bench_person_seeds --scale 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import runpy
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from bench.bench_async_engine import REPO_ROOT
+from bench.bench_etl_scan import _JsonlWriters
+
+BASE_MOVIES = 20000
+
+_CREW = [
+    ("导演", "导演 Director"), ("编剧", "编剧 Writer"), ("", "Director"), ("Writer", ""),
+    ("", "摄影 Cinematography"), ("", "剪辑 Film Editing"), ("", "作曲 Music"), ("制片人", "Producer"),
+]
+_CAST_DEPARTMENTS = ["演员", "演员 Actor", "", "", "导演"]
+
+
+def _write_corpus(raw_root: str, n_movies: int, workers: int, seed: int = 7) -> None:
+    rng = random.Random(seed)
+    out = _JsonlWriters(raw_root)
+    n_persons = n_movies * 4
+    person_ids = [str(1000000 + i) for i in range(n_persons)]
+
+    def pick_person() -> str:
+        # 长尾：少数人物出现在大量电影里
+        return person_ids[min(int(rng.paretovariate(1.2)) - 1, n_persons - 1) if rng.random() < 0.3
+                          else rng.randrange(n_persons)]
+
+    for idx in range(n_movies):
+        mid = str(30000000 + idx)
+        owners = [idx % workers]
+        if workers > 1 and rng.random() < 0.05:
+            owners.append((idx + 1) % workers)
+        cast = [pick_person() for _ in range(rng.randint(8, 20))]
+        crew = [(pick_person(), rng.choice(_CREW)) for _ in range(rng.randint(4, 10))]
+
+        for w in owners:
+            for order, pid in enumerate(cast, start=1):
+                order_value: Any = order
+                r = rng.random()
+                if r < 0.05:
+                    order_value = None
+                elif r < 0.08:
+                    order_value = str(order)
+                elif r < 0.09:
+                    order_value = "x"
+                out.write(w, "movie_cast.jsonl", {
+                    "movie_douban_id": mid, "person_douban_id": pid,
+                    "name": "" if rng.random() < 0.1 else f"演员{pid}-{w}",
+                    "department": rng.choice(_CAST_DEPARTMENTS), "role": f"演员 Actor (饰 角色{order})",
+                    "order": order_value,
+                })
+            for pid, (department, role) in crew:
+                out.write(w, "movie_crew.jsonl", {
+                    "movie_douban_id": mid, "person_douban_id": pid, "name": f"职员{pid}-{w}",
+                    "department": department, "role": role,
+                })
+            if rng.random() < 0.3:
+                for pid in rng.sample(cast, 2):
+                    out.write(w, "movie_awards.jsonl", {
+                        "movie_douban_id": mid, "award_type": "Person", "person_douban_id": pid,
+                        "is_winner": rng.random() < 0.3,
+                    })
+                out.write(w, "movie_awards.jsonl", {
+                    "movie_douban_id": mid, "award_type": "Movie", "person_douban_id": "",
+                    "is_winner": True,
+                })
+    # 只有奖项、不在任何演职员表里的人物
+    for i in range(n_movies // 100):
+        out.write(0, "movie_awards.jsonl", {
+            "movie_douban_id": "1", "award_type": "Person", "person_douban_id": f"9{i:08d}", "is_winner": True,
+        })
+    out.close()
+
+
+# ========== 以前的实现（对照组，和改动前的 2_build_person_seeds.py 一致）==========
+
+def _legacy_new_stats(pid: str, name: Optional[str]) -> Dict[str, Any]:
+    return {
+        "person_douban_id": pid,
+        "name": name,
+        "cast_movies": set(),
+        "crew_movies": set(),
+        "cast_orders": {},
+        "best_cast_order": None,
+        "departments": set(),
+        "roles": set(),
+        "director_movies": set(),
+        "writer_movies": set(),
+        "award_wins": 0,
+        "award_noms": 0,
+    }
+
+
+def _legacy_collect(raw_root: str, iter_jsonl) -> Dict[str, Dict[str, Any]]:
+    person_stats: Dict[str, Dict[str, Any]] = {}
+    for entry in sorted(os.listdir(raw_root)):
+        worker_dir = os.path.join(raw_root, entry)
+        if not os.path.isdir(worker_dir):
+            continue
+
+        for rec in iter_jsonl(os.path.join(worker_dir, "movie_cast.jsonl")):
+            pid = str(rec.get("person_douban_id") or "").strip()
+            mid = str(rec.get("movie_douban_id") or "").strip()
+            if not pid or not mid:
+                continue
+            name = (rec.get("name") or "").strip() or None
+            department = (rec.get("department") or "").strip()
+            role = (rec.get("role") or "").strip()
+            order_raw = rec.get("order")
+            order: Optional[int] = None
+            if isinstance(order_raw, int):
+                order = order_raw
+            else:
+                try:
+                    order = int(order_raw)
+                except Exception:
+                    order = None
+            stats = person_stats.get(pid)
+            if stats is None:
+                stats = person_stats[pid] = _legacy_new_stats(pid, name)
+            if name and not stats["name"]:
+                stats["name"] = name
+            stats["cast_movies"].add(mid)
+            if department:
+                stats["departments"].add(department)
+            if role:
+                stats["roles"].add(role)
+            if order is not None:
+                prev = stats["cast_orders"].get(mid)
+                if prev is None or order < prev:
+                    stats["cast_orders"][mid] = order
+                best = stats["best_cast_order"]
+                if best is None or order < best:
+                    stats["best_cast_order"] = order
+
+        for rec in iter_jsonl(os.path.join(worker_dir, "movie_crew.jsonl")):
+            pid = str(rec.get("person_douban_id") or "").strip()
+            mid = str(rec.get("movie_douban_id") or "").strip()
+            if not pid or not mid:
+                continue
+            name = (rec.get("name") or "").strip() or None
+            department = (rec.get("department") or "").strip()
+            role = (rec.get("role") or "").strip()
+            stats = person_stats.get(pid)
+            if stats is None:
+                stats = person_stats[pid] = _legacy_new_stats(pid, name)
+            if name and not stats["name"]:
+                stats["name"] = name
+            stats["crew_movies"].add(mid)
+            if department:
+                stats["departments"].add(department)
+            if role:
+                stats["roles"].add(role)
+            dept_lower = department.lower()
+            role_lower = role.lower()
+            if "导演" in department or "director" in dept_lower or "director" in role_lower:
+                stats["director_movies"].add(mid)
+            if "编剧" in department or "writer" in dept_lower or "writer" in role_lower:
+                stats["writer_movies"].add(mid)
+
+        for rec in iter_jsonl(os.path.join(worker_dir, "movie_awards.jsonl")):
+            if rec.get("award_type") != "Person":
+                continue
+            pid = str(rec.get("person_douban_id") or "").strip()
+            if not pid:
+                continue
+            stats = person_stats.get(pid)
+            if stats is None:
+                stats = person_stats[pid] = _legacy_new_stats(pid, None)
+            if rec.get("is_winner"):
+                stats["award_wins"] += 1
+            else:
+                stats["award_noms"] += 1
+    return person_stats
+
+
+def _legacy_build(raw_root: str, output_path: str, iter_jsonl, max_frequent: int = 300,
+                  min_total_movies_for_frequent: int = 2) -> None:
+    person_stats = _legacy_collect(raw_root, iter_jsonl)
+    frequent_candidates: List[Dict[str, Any]] = []
+    all_records: List[Dict[str, Any]] = []
+
+    for pid, stats in person_stats.items():
+        cast_movies: Set[str] = stats["cast_movies"]
+        crew_movies: Set[str] = stats["crew_movies"]
+        director_movies: Set[str] = stats["director_movies"]
+        writer_movies: Set[str] = stats["writer_movies"]
+        cast_count = len(cast_movies)
+        total_movies = len(cast_movies | crew_movies)
+        best_cast_order = stats["best_cast_order"]
+        if total_movies == 0:
+            continue
+
+        is_director = any("导演" in d or "director" in d.lower() for d in stats["departments"]) \
+            or any("director" in r.lower() for r in stats["roles"])
+        is_writer = any("编剧" in d or "writer" in d.lower() for d in stats["departments"]) \
+            or any("writer" in r.lower() for r in stats["roles"])
+
+        actor_score = sum(3 if o <= 3 else 2 if o <= 8 else 1 for o in stats["cast_orders"].values())
+        director_count = len(director_movies)
+        writer_count = len(writer_movies)
+        other_crew_count = len(crew_movies - director_movies - writer_movies)
+        crew_score = director_count * 3 + writer_count * 2 + other_crew_count
+        award_score = stats["award_wins"] * 3 + stats["award_noms"]
+        total_score = actor_score + crew_score + award_score
+
+        seed_reasons: List[str] = []
+        if cast_count >= 3 or (cast_count >= 2 and best_cast_order is not None and best_cast_order <= 3):
+            seed_reasons.append("core_actor")
+        if is_director and director_count >= 2:
+            seed_reasons.append("core_director")
+        if is_writer and writer_count >= 3:
+            seed_reasons.append("core_writer")
+        if stats["award_wins"] >= 1 or stats["award_noms"] >= 3:
+            seed_reasons.append("awarded_person")
+
+        record = {
+            "person_douban_id": pid,
+            "name": stats["name"],
+            "total_movies": total_movies,
+            "total_cast_movies": cast_count,
+            "total_crew_movies": len(crew_movies),
+            "best_cast_order": best_cast_order,
+            "is_actor": cast_count > 0,
+            "is_director": is_director,
+            "is_writer": is_writer,
+            "award_wins": stats["award_wins"],
+            "award_noms": stats["award_noms"],
+            "actor_score": actor_score,
+            "crew_score": crew_score,
+            "award_score": award_score,
+            "total_score": total_score,
+            "seed_reasons": seed_reasons,
+        }
+        all_records.append(record)
+        if not seed_reasons and total_movies >= min_total_movies_for_frequent and total_score > 0:
+            frequent_candidates.append(record)
+
+    frequent_candidates.sort(key=lambda r: r["total_score"], reverse=True)
+    for r in frequent_candidates[:max_frequent]:
+        r["seed_reasons"].append("frequent_person")
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        for r in all_records:
+            if r["seed_reasons"]:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+
+# ========== 子进程 ==========
+
+def _child(impl: str, output_path: str) -> None:
+    """在子进程里跑一种实现（CRAWLER_DATA_DIR 由父进程设置），最后把峰值 RSS（KB）打到 stderr"""
+    sys.path.insert(0, REPO_ROOT)
+    module = runpy.run_path(os.path.join(REPO_ROOT, "2_build_person_seeds.py"), run_name="bench")
+    if impl == "legacy":
+        _legacy_build(module["RAW_ROOT_DIR"], output_path, module["iter_jsonl"])
+    else:
+        module["build_person_seeds"](output_path=output_path)
+    with open("/proc/self/status") as f:
+        print(next(line.split()[1] for line in f if line.startswith("VmHWM:")), file=sys.stderr)
+
+
+def _run(impl: str, data_dir: str, output_path: str) -> Tuple[float, int]:
+    """返回 (秒数, 峰值 RSS 字节)"""
+    env = dict(os.environ, CRAWLER_DATA_DIR=data_dir)
+    t0 = time.perf_counter()
+    p = subprocess.run(
+        [sys.executable, "-m", "bench.bench_person_seeds", "--child", impl, "--output", output_path],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    elapsed = time.perf_counter() - t0
+    if p.returncode != 0:
+        raise RuntimeError(f"{impl} 失败：{p.stderr[-2000:]}")
+    return elapsed, int(p.stderr.strip().splitlines()[-1]) * 1024
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="2_build_person_seeds 旧实现 vs 数组实现 基准测试")
+    parser.add_argument("--scale", type=int, default=10, help=f"合成 scale × {BASE_MOVIES} 部电影（默认 10）")
+    parser.add_argument("--workers", type=int, default=4, help="合成多少个 worker 目录（默认 4）")
+    parser.add_argument("--child", choices=["legacy", "current"], help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.child:
+        _child(args.child, args.output)
+        return
+
+    tree = tempfile.mkdtemp(prefix="bench_person_seeds_")
+    try:
+        data_dir = os.path.join(tree, "data")
+        n_movies = args.scale * BASE_MOVIES
+        _write_corpus(os.path.join(data_dir, "raw"), n_movies, args.workers)
+        print(f"[bench] movies={n_movies} workers={args.workers} tree={tree}")
+
+        outputs = {}
+        for impl in ("legacy", "current"):
+            output_path = os.path.join(tree, f"persons_seed_{impl}.jsonl")
+            elapsed, rss = _run(impl, data_dir, output_path)
+            with open(output_path, "rb") as f:
+                outputs[impl] = f.read()
+            n_seeds = outputs[impl].count(b"\n")
+            print(f"[{impl:7s}] {elapsed:6.2f}s  峰值 RSS {rss / 1024 / 1024:7.1f}MB  种子人物 {n_seeds} 个")
+        same = outputs["legacy"] == outputs["current"]
+        print(f"[check] 输出逐字节一致: {same}")
+        if not same:
+            sys.exit(1)
+    finally:
+        shutil.rmtree(tree, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+bench/bench_rate_limiter.py
+
+验证 rate_limiter.TokenBucketLimiter 的跨进程效果：
+
+起 N 个进程，共用同一个临时状态文件，每个进程各自 acquire() M 次，
+统计全部进程合计的实际速率，应该等于配置的 rate（而不是 N 倍），
+同时打印每个进程拿到的令牌数，看分配是否公平。
+
+用法（在仓库根目录）：
+    python -m bench.bench_rate_limiter --procs 3 --per-proc 20 --rate 10 --burst 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+import time
+from typing import List, Tuple
+
+from rate_limiter import TokenBucketLimiter
+
+
+def _worker(state_path: str, rate: float, burst: int, n: int, out: "mp.Queue") -> None:
+    limiter = TokenBucketLimiter(
+        state_path=state_path,
+        rate=rate,
+        burst=burst,
+        long_break_every=0,
+        adaptive=False,
+    )
+    stamps: List[float] = []
+    for _ in range(n):
+        limiter.acquire("bench.local")
+        stamps.append(time.time())
+    out.put((os.getpid(), stamps))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="跨进程令牌桶基准测试")
+    parser.add_argument("--procs", type=int, default=3, help="进程数（默认 3）")
+    parser.add_argument("--per-proc", type=int, default=20, help="每个进程请求多少次令牌（默认 20）")
+    parser.add_argument("--rate", type=float, default=10.0, help="全机合计速率，次/秒（默认 10）")
+    parser.add_argument("--burst", type=int, default=3, help="桶容量（默认 3）")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    state_path = os.path.join(tempfile.mkdtemp(prefix="bench_rl_"), "rate_limiter.json")
+
+    out: "mp.Queue[Tuple[int, List[float]]]" = mp.Queue()
+    procs = [
+        mp.Process(target=_worker, args=(state_path, args.rate, args.burst, args.per_proc, out))
+        for _ in range(args.procs)
+    ]
+    for p in procs:
+        p.start()
+    results = [out.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    stamps = sorted(t for _, ts in results for t in ts)
+    total = len(stamps)
+    # 去掉开头的突发，只看稳态速率
+    steady = stamps[args.burst - 1:]
+    span = steady[-1] - steady[0]
+    actual = (len(steady) - 1) / span if span > 0 else float("inf")
+
+    print(f"[bench] procs={args.procs} per_proc={args.per_proc} rate={args.rate} burst={args.burst}")
+    for pid, ts in results:
+        print(f"  pid={pid} tokens={len(ts)}")
+    print(f"[result] 总令牌 {total}，稳态速率 {actual:.2f} 次/秒（配置 {args.rate}）")
+    print(f"[result] 若每个进程各自限速，合计会是 {args.rate * args.procs:.2f} 次/秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+bench/bench_subject_page.py
+
+对比 subject 页面的两种解析方式的 CPU 耗时：
+
+  - legacy : parse_movie_basic_from_ld_json / parse_details / parse_summary 各解析一遍
+  - shared : SubjectPage 只建一次文档树
+
+页面来源：
+  - --html-dir 指定的目录（抓下来存档的 subject 页面，*.html 或 *.html.gz）；
+  - 不指定时用 bench.fixtures 生成的合成页面。
+
+同时校验两种方式的解析结果完全一致。
+
+用法（在仓库根目录）：
+    python -m bench.bench_subject_page --pages 200
+    python -m bench.bench_subject_page --html-dir path/to/archived_subject_pages
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import os
+import time
+from typing import Any, Callable, List, Tuple
+
+from bench.fixtures import subject_page, synthetic_movie_ids
+from movie_info.details import parse_details
+from movie_info.ld_json import parse_movie_basic_from_ld_json
+from movie_info.subject_page import SubjectPage
+from movie_info.summary import parse_summary
+
+
+def _load_html_dir(path: str) -> List[str]:
+    pages = []
+    for name in sorted(os.listdir(path)):
+        full = os.path.join(path, name)
+        if name.endswith(".html.gz"):
+            with gzip.open(full, "rt", encoding="utf-8") as f:
+                pages.append(f.read())
+        elif name.endswith(".html"):
+            with open(full, "r", encoding="utf-8") as f:
+                pages.append(f.read())
+    return pages
+
+
+def _legacy(html: str) -> Tuple[Any, Any, Any]:
+    return parse_movie_basic_from_ld_json(html), parse_details(html), parse_summary(html)
+
+
+def _shared(html: str) -> Tuple[Any, Any, Any]:
+    page = SubjectPage(html)
+    return page.basic(), page.details(), page.summary()
+
+
+def _cpu_time(fn: Callable[[str], Any], pages: List[str], rounds: int) -> float:
+    t0 = time.process_time()
+    for _ in range(rounds):
+        for html in pages:
+            fn(html)
+    return time.process_time() - t0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="subject 页面解析一次 vs 三次 基准测试")
+    parser.add_argument("--html-dir", default=None, help="存档 subject 页面所在目录（*.html / *.html.gz）")
+    parser.add_argument("--pages", type=int, default=100, help="不指定 --html-dir 时生成多少个合成页面（默认 100）")
+    parser.add_argument("--rounds", type=int, default=3, help="重复多少轮（默认 3）")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.html_dir:
+        pages = _load_html_dir(args.html_dir)
+        source = args.html_dir
+    else:
+        pages = [subject_page(mid) for mid in synthetic_movie_ids(args.pages)]
+        source = "bench.fixtures"
+
+    if not pages:
+        print(f"[bench] 没有找到页面: {source}")
+        return
+
+    avg_kb = sum(len(p) for p in pages) / len(pages) / 1024
+    print(f"[bench] 页面来源={source} 页数={len(pages)} 平均大小={avg_kb:.1f}KB rounds={args.rounds}")
+
+    mismatched = sum(1 for html in pages if _legacy(html) != _shared(html))
+
+    n = len(pages) * args.rounds
+    legacy = _cpu_time(_legacy, pages, args.rounds)
+    shared = _cpu_time(_shared, pages, args.rounds)
+    print(f"[legacy] {legacy * 1000 / n:7.2f} ms CPU / 页")
+    print(f"[shared] {shared * 1000 / n:7.2f} ms CPU / 页")
+    print(f"[saved]  {(legacy - shared) * 1000 / n:7.2f} ms CPU / 页（{1 - shared / legacy:.0%}）")
+    print(f"[check] 解析结果不一致的页面数: {mismatched}")
+
+
+if __name__ == "__main__":
+    main()
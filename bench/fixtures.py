@@ -0,0 +1,348 @@
+"""
+bench/fixtures.py
+
+按 Douban ID 确定性地生成“长得像豆瓣”的合成页面，给本地替身服务器和基准测试用。
+
+页面结构只保证各个解析函数（movie_info / person / award / comments / chart_top_list）能正常工作，
+内容是随机的，但同一个 ID 每次生成的结果都一样。
+"""
+
+from __future__ import annotations
+
+import json
+import random
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+_GENRES = ["剧情", "喜剧", "动作", "爱情", "科幻", "动画", "悬疑", "惊悚", "犯罪", "奇幻"]
+_REGIONS = ["中国大陆", "美国", "日本", "韩国", "英国", "法国", "中国香港", "德国"]
+_LANGUAGES = ["汉语普通话", "英语", "日语", "韩语", "法语", "粤语", "德语"]
+_DEPARTMENTS = [
+    ("导演 Director", "导演 Director"),
+    ("编剧 Writer", "编剧 Writer"),
+    ("制片人 Producer", None),
+    ("摄影 Cinematography", "摄影 Cinematography"),
+]
+
+
+def _rng(entity_id: str) -> random.Random:
+    return random.Random(int(entity_id) if entity_id.isdigit() else entity_id)
+
+
+def person_ids_for_movie(movie_id: str, n: int) -> List[str]:
+    """每部电影的演职员 ID：部分在电影之间共享，方便构造“常客”"""
+    rng = _rng(movie_id)
+    return [str(27000000 + rng.randrange(0, 5000)) for _ in range(n)]
+
+
+def _filler_html(rng: random.Random, n_items: int) -> str:
+    """主页面上的“喜欢这部电影的人也喜欢”之类的杂项区块，把页面撑到真实大小"""
+    items = []
+    for _ in range(n_items):
+        mid = rng.randrange(1000000, 36000000)
+        items.append(
+            f'<dl class=""><dt><a href="https://movie.douban.com/subject/{mid}/">'
+            f'<img src="https://img1.doubanio.com/view/photo/s_ratio_poster/public/p{mid}.webp" '
+            f'alt="推荐 {mid}" class=""></a></dt><dd><a href="https://movie.douban.com/subject/{mid}/" '
+            f'class="">推荐电影 {mid}</a><span class="subject-rate">{rng.randint(60, 95) / 10}</span></dd></dl>'
+        )
+    return '<div class="recommendations-bd">' + "\n".join(items) + "</div>"
+
+
+def subject_page(movie_id: str, filler_items: int = 120) -> str:
+    """/subject/{id}/ 主页面：ld+json + #info + 剧情简介"""
+    rng = _rng(movie_id)
+    genres = rng.sample(_GENRES, rng.randint(1, 3))
+    regions = rng.sample(_REGIONS, rng.randint(1, 2))
+    languages = rng.sample(_LANGUAGES, rng.randint(1, 2))
+    ld = {
+        "@context": "http://schema.org",
+        "name": f"合成电影 {movie_id} Synthetic Movie",
+        "url": f"/subject/{movie_id}/",
+        "image": f"https://img2.doubanio.com/view/photo/s_ratio_poster/public/p{movie_id}.jpg",
+        "datePublished": f"{rng.randint(1950, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "genre": genres,
+        "duration": f"PT{rng.randint(1, 2)}H{rng.randint(0, 59)}M",
+        "@type": "Movie",
+        # 真实页面里 description 经常带控制字符，lenient decoder 要能吃下
+        "description": "一段\t带控制字符的简介",
+    }
+    summary_lines = [f"第 {i} 段剧情简介，电影 {movie_id}。" for i in range(1, rng.randint(2, 5))]
+    summary_html = "<br />\n".join(f"　　{line}" for line in summary_lines)
+    ld_text = json.dumps(ld, ensure_ascii=False).replace("\\t", "\t")
+
+    return f"""<!DOCTYPE html>
+<html lang="zh-CN" class="ua-mac ua-webkit">
+<head>
+<meta http-equiv="Content-Type" content="text/html; charset=utf-8">
+<title>合成电影 {movie_id} (豆瓣)</title>
+<script type="application/ld+json">
+{ld_text}
+</script>
+</head>
+<body>
+<div id="wrapper"><div id="content">
+<h1><span property="v:itemreviewed">合成电影 {movie_id}</span><span class="year">(2001)</span></h1>
+<div class="grid-16-8 clearfix"><div class="article">
+<div id="info">
+<span ><span class='pl'>导演</span>: <span class='attrs'><a href="/celebrity/1054439/" rel="v:directedBy">某导演</a></span></span><br/>
+<span class="pl">类型:</span> {" / ".join(f'<span property="v:genre">{g}</span>' for g in genres)}<br/>
+<span class="pl">制片国家/地区:</span> {" / ".join(regions)}<br/>
+<span class="pl">语言:</span> {" / ".join(languages)}<br/>
+<span class="pl">IMDb:</span> tt{movie_id}<br>
+</div>
+<div class="related-info">
+<div class="indent" id="link-report-intra">
+<span property="v:summary" class="">
+{summary_html}
+</span>
+</div>
+</div>
+{_filler_html(rng, filler_items)}
+</div></div>
+</div></div>
+</body>
+</html>
+"""
+
+
+def _celebrity_li(pid: str, name: str, role: str) -> str:
+    role_html = f'<span class="role" title="{role}">{role}</span>' if role else ""
+    return f"""<li class="celebrity">
+<a href="https://www.douban.com/personage/{pid}/" title="{name}" class="">
+<div class="avatar" style="background-image: url(https://img9.doubanio.com/view/personage/m/public/{pid}.jpg)"></div></a>
+<div class="info"><span class="name"><a href="https://www.douban.com/personage/{pid}/" title="{name}" class="name">{name}</a></span>
+{role_html}
+<span class="works">代表作：<a href="https://movie.douban.com/subject/1291561/" target="_blank" title="某作品">某作品</a></span></div>
+</li>"""
+
+
+def celebrities_page(movie_id: str) -> str:
+    """/subject/{id}/celebrities 演职员页面"""
+    rng = _rng(movie_id)
+    pids = person_ids_for_movie(movie_id, 24)
+    blocks = []
+
+    # 导演 / 编剧 / 制片 / 摄影
+    cursor = 0
+    for dept, role in _DEPARTMENTS:
+        n = rng.randint(1, 2)
+        lis = []
+        for _ in range(n):
+            pid = pids[cursor]
+            cursor += 1
+            lis.append(_celebrity_li(pid, f"人物{pid} Person {pid}", role or ""))
+        blocks.append((dept, lis))
+
+    # 演员
+    cast_lis = []
+    for pid in pids[cursor:cursor + rng.randint(6, 14)]:
+        cast_lis.append(_celebrity_li(pid, f"演员{pid} Actor {pid}", f"演员 Actor (饰 角色{pid})"))
+    blocks.insert(1, ("演员 Cast", cast_lis))
+
+    wrappers = []
+    for dept, lis in blocks:
+        wrappers.append(
+            f'<div class="list-wrapper"><h2>{dept}</h2>'
+            f'<ul class="celebrities-list from-subject __oneline">{"".join(lis)}</ul></div>'
+        )
+
+    return f"""<!DOCTYPE html>
+<html lang="zh-CN"><head><meta charset="utf-8"><title>合成电影 {movie_id} 全部演职员</title></head>
+<body><div id="wrapper"><div id="content"><div class="grid-16-8 clearfix"><div class="article">
+<div id="celebrities" class="celebrities">
+{"".join(wrappers)}
+</div>
+</div></div></div></div></body></html>
+"""
+
+
+def _award_blocks(movie_id: str, rng: random.Random) -> List[Tuple[str, str, int, List[Tuple[str, str]]]]:
+    festivals = [
+        ("奥斯卡金像奖", "Oscar"),
+        ("戛纳电影节", "Cannes"),
+        ("金马奖", "GoldenHorse"),
+        ("柏林国际电影节", "Berlinale"),
+    ]
+    pids = person_ids_for_movie(movie_id, 24)
+    result = []
+    for name, slug in rng.sample(festivals, rng.randint(0, 3)):
+        year = rng.randint(1980, 2024)
+        awards = []
+        for _ in range(rng.randint(1, 4)):
+            title = rng.choice(["最佳影片", "最佳导演", "最佳男主角", "最佳女主角", "最佳剧本"])
+            if rng.random() < 0.5:
+                title += "(提名)"
+            winner = rng.choice(pids) if "影片" not in title else ""
+            awards.append((title, winner))
+        result.append((name, slug, year, awards))
+    return result
+
+
+def awards_page(movie_id: str) -> str:
+    """/subject/{id}/awards/ 获奖页面"""
+    rng = _rng(movie_id)
+    blocks = []
+    for idx, (name, slug, year, awards) in enumerate(_award_blocks(movie_id, rng), start=1):
+        uls = []
+        for title, winner in awards:
+            if winner:
+                second = f'<a href="https://www.douban.com/personage/{winner}/" target="_blank">人物{winner}</a>'
+            else:
+                second = ""
+            uls.append(f'<ul class="award"><li>{title}</li><li>{second}</li><li></li></ul>')
+        blocks.append(
+            f'<div class="awards"><div class="hd"><h2>'
+            f'<a href="https://movie.douban.com/awards/{slug}/{idx}/">第{idx}届{name}</a>'
+            f'<span class="year"> ({year})</span></h2></div>{"".join(uls)}</div>'
+        )
+
+    return f"""<!DOCTYPE html>
+<html lang="zh-CN"><head><meta charset="utf-8"><title>合成电影 {movie_id} 获奖情况</title></head>
+<body><div id="wrapper"><div id="content"><h1>合成电影 {movie_id} 获奖情况</h1>
+<div class="grid-16-8 clearfix"><div class="article">
+{"".join(blocks)}
+</div></div></div></div></body></html>
+"""
+
+
+def comment_totals(movie_id: str) -> Tuple[int, int]:
+    """某部电影一共有多少条短评（P）和想看（F）：长尾分布，不少电影不到 5 页"""
+    rng = random.Random(f"comments:{movie_id}")
+    return int(rng.paretovariate(1.2) * 12), int(rng.paretovariate(1.5) * 6)
+
+
+def _comment_item(rng: random.Random, status_flag: str, ts: Optional[str] = None) -> str:
+    # 用户名从一个共享的池子里挑，不同电影之间会重复，和真实数据一样
+    uid = rng.randrange(0, 50000)
+    if status_flag == "P":
+        status_text = "看过"
+        stars = rng.randint(1, 5)
+        rating_html = f'<span class="allstar{stars}0 rating" title="推荐"></span>' if rng.random() < 0.9 else ""
+    else:
+        status_text = "想看"
+        rating_html = ""
+    random_ts = f"20{rng.randint(5, 24):02d}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}"
+    ts = ts or random_ts
+    text = "，".join(f"第 {i} 句短评" for i in range(rng.randint(1, 8)))
+    return f"""<div class="comment-item " data-cid="{rng.randrange(10 ** 9, 4 * 10 ** 9)}">
+<div class="avatar"><a title="用户{uid}" href="https://www.douban.com/people/u{uid}/"><img src="https://img1.doubanio.com/icon/u{uid}-1.jpg" class="" /></a></div>
+<div class="comment">
+<h3><span class="comment-vote"><span class="votes vote-count">{rng.randint(0, 3000)}</span><a href="javascript:;" class="j a_show_login" onclick="">有用</a></span>
+<span class="comment-info">
+<a href="https://www.douban.com/people/u{uid}/" class="">用户{uid}</a>
+<span>{status_text}</span>
+{rating_html}
+<span class="comment-time " title="{ts}">
+{ts}
+</span>
+<span class="comment-location">北京</span>
+</span></h3>
+<p class=" comment-content"><span class="short">{text}</span></p>
+</div></div>"""
+
+
+def _comment_time(movie_id: str, status_flag: str, index: int) -> str:
+    """sort=time 列表里第 index 条（从新到旧）的时间：每部电影一个最新时间，往后每条早几个小时"""
+    rng = random.Random(f"comment-time:{movie_id}:{status_flag}")
+    newest = datetime(2024, 6, 1) + timedelta(seconds=rng.randrange(0, 180 * 86400))
+    gap = timedelta(seconds=rng.randrange(600, 86400))
+    return (newest - gap * index).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def comments_page(movie_id: str, status_flag: str = "P", start: int = 0, limit: int = 20, sort: str = "") -> str:
+    """
+    /subject/{id}/comments?start=..&limit=..&status=P|F 短评 / 想看页面；翻过总数后是空列表。
+    sort=time 时按时间从新到旧排列（其他排序下时间是随机的）
+    """
+    status_flag = (status_flag or "P").upper()
+    total_p, total_f = comment_totals(movie_id)
+    total = total_p if status_flag == "P" else total_f
+    rng = random.Random(f"{movie_id}:{status_flag}:{start}")
+    items = [
+        _comment_item(rng, status_flag, _comment_time(movie_id, status_flag, start + i) if sort == "time" else None)
+        for i in range(max(0, min(limit, total - start)))
+    ]
+    body = "\n".join(items) if items else '<p class="comment-empty">还没有人写过短评</p>'
+    return f"""<!DOCTYPE html>
+<html lang="zh-CN"><head><meta charset="utf-8"><title>合成电影 {movie_id} 短评</title></head>
+<body><div id="wrapper"><div id="content"><h1>合成电影 {movie_id} 短评</h1>
+<div class="grid-16-8 clearfix"><div class="article">
+<div class="mod-bd" id="comments">
+{body}
+</div>
+<div id="paginator" class="center"><a href="?start={start + limit}&amp;limit={limit}&amp;status={status_flag}" class="next">后页 &gt;</a></div>
+</div>
+<div class="aside">{_filler_html(rng, 20)}</div>
+</div></div></div></body></html>
+"""
+
+
+# 每个榜单类型一共多少部，足够 0_build_movie_seeds 的 TOTAL_LIMIT_PER_TYPE * multiplier
+TOP_LIST_SIZE = 1000
+
+
+def top_list_json(type_id: int, start: int = 0, limit: int = 20) -> str:
+    """/j/chart/top_list?type=..&start=..&limit=.. 榜单接口（JSON 数组）"""
+    items = []
+    for rank in range(start, min(TOP_LIST_SIZE, start + limit)):
+        rng = random.Random(f"top:{type_id}:{rank}")
+        # 不同类型的榜单之间有重叠
+        movie_id = str(1290000 + 7 * rng.randrange(0, 4000))
+        items.append({
+            "rating": [f"{rng.randint(80, 97) / 10}", "45"],
+            "rank": rank + 1,
+            "cover_url": f"https://img2.doubanio.com/view/photo/s_ratio_poster/public/p{movie_id}.jpg",
+            "is_playable": rng.random() < 0.5,
+            "id": movie_id,
+            "types": rng.sample(_GENRES, 2),
+            "regions": rng.sample(_REGIONS, 1),
+            "title": f"合成电影 {movie_id}",
+            "url": f"https://movie.douban.com/subject/{movie_id}/",
+            "release_date": f"{rng.randint(1950, 2024)}-01-01",
+            "actor_count": rng.randint(5, 40),
+            "vote_count": rng.randint(1000, 3000000),
+            "score": f"{rng.randint(80, 97) / 10}",
+            "actors": [f"演员{27000000 + rng.randrange(0, 5000)}" for _ in range(5)],
+            "is_watched": False,
+        })
+    return json.dumps(items, ensure_ascii=False)
+
+
+def person_api_json(person_id: str) -> str:
+    """/rexxar/api/v2/elessar/subject/{id} 移动端人物接口（JSON）"""
+    rng = _rng(person_id)
+    info = [
+        ["性别", rng.choice(["男", "女"])],
+        ["出生日期", f"{rng.randint(1920, 2005)}年{rng.randint(1, 12)}月{rng.randint(1, 28)}日"],
+        ["出生地", rng.choice(["美国,纽约,皇后区", "中国,北京", "日本,东京", "英国,伦敦", "中国香港"])],
+        ["IMDb编号", f"nm{rng.randrange(0, 9999999):07d}"],
+    ]
+    if rng.random() < 0.1:
+        info.insert(2, ["去世日期", f"{rng.randint(1990, 2024)}年{rng.randint(1, 12)}月{rng.randint(1, 28)}日"])
+    data = {
+        "id": person_id,
+        "title": f"人物{person_id}",
+        "latin_title": f"Person {person_id}",
+        "type": "person",
+        "extra": {"info": info, "short_info": f"{info[0][1]} / {info[1][1]}"},
+        "cover": {
+            "normal": {"url": f"https://img9.doubanio.com/view/personage/m/public/{person_id}.jpg"},
+            "large": {"url": f"https://img9.doubanio.com/view/personage/l/public/{person_id}.jpg"},
+        },
+        "cover_img": {"url": f"https://img9.doubanio.com/view/personage/raw/public/{person_id}.jpg"},
+        "desc": "".join(f"<p>第 {i} 段人物简介，人物 {person_id}。</p>" for i in range(rng.randint(2, 8))),
+        # 真实接口里还有一大串作品 / 合作者，把响应撑到真实大小
+        "modules": [
+            {"type": "works", "items": [
+                {"id": str(1290000 + 7 * rng.randrange(0, 4000)), "title": f"作品{i}", "year": rng.randint(1950, 2024)}
+                for i in range(rng.randint(5, 40))
+            ]},
+        ],
+    }
+    return json.dumps(data, ensure_ascii=False)
+
+
+def synthetic_movie_ids(n: int, start: int = 1290000) -> List[str]:
+    """生成 n 个合成 movie ID"""
+    return [str(start + i * 7) for i in range(n)]
@@ -0,0 +1,92 @@
+"""
+bench/local_http.py
+
+本地 HTTP 替身服务器的小工具，给 bench/ 下的各个基准脚本共用。
+
+- 基于标准库 ThreadingHTTPServer，HTTP/1.1，支持 keep-alive；
+- 在后台 daemon 线程里 serve_forever，脚本结束自动退出；
+- 可选传入证书走 HTTPS，用来测 TLS 握手开销；
+- 统计服务端一共接受了多少条 TCP 连接，便于验证连接复用。
+"""
+
+from __future__ import annotations
+
+import ssl
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple, Type
+
+
+class CountingHTTPServer(ThreadingHTTPServer):
+    """记录累计连接数的 ThreadingHTTPServer"""
+
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connection_count = 0
+        self._count_lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        with self._count_lock:
+            self.connection_count += 1
+        super().process_request(request, client_address)
+
+    def handle_error(self, request, client_address):
+        # 客户端进程被杀 / 提前断开是测试里的正常情况，不打印堆栈
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+class StaticPageHandler(BaseHTTPRequestHandler):
+    """对任意 GET 都返回同一段 HTML 的 handler"""
+
+    protocol_version = "HTTP/1.1"
+    # 头和 body 是分两次 send 的，不关 Nagle 会撞上 delayed ACK，每个请求白等 40ms
+    disable_nagle_algorithm = True
+    body: bytes = b"<html><body>ok</body></html>"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        # 基准测试时不要刷屏
+        pass
+
+
+def start_server(
+        handler_cls: Type[BaseHTTPRequestHandler] = StaticPageHandler,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        certfile: Optional[str] = None,
+        keyfile: Optional[str] = None,
+) -> Tuple[CountingHTTPServer, str]:
+    """
+    在后台线程启动服务器。
+
+    :param handler_cls: 请求处理类
+    :param host: 监听地址
+    :param port: 监听端口，0 表示随机分配
+    :param certfile: 证书文件，给了就走 HTTPS
+    :param keyfile: 私钥文件
+    :return: (server, base_url)，base_url 形如 http://127.0.0.1:54321
+    """
+    server = CountingHTTPServer((host, port), handler_cls)
+    scheme = "http"
+    if certfile:
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ctx.load_cert_chain(certfile, keyfile)
+        server.socket = ctx.wrap_socket(server.socket, server_side=True)
+        scheme = "https"
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    real_host, real_port = server.server_address[:2]
+    return server, f"{scheme}://{real_host}:{real_port}"
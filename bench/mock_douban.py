@@ -0,0 +1,293 @@
+"""
+bench/mock_douban.py
+
+本地“假豆瓣”服务器：按 URL 返回 bench/fixtures.py 生成的合成页面，
+并可以给每个请求注入固定延迟，模拟真实网络往返；
+还可以指定一批“慢电影”（slow_ids），这些电影的页面用另一个延迟，模拟负载不均。
+
+目前支持的路由：
+  - /subject/{id}/
+  - /subject/{id}/celebrities
+  - /subject/{id}/awards/
+  - /subject/{id}/comments?start=..&limit=..&status=P|F[&sort=time]
+  - /j/chart/top_list?type=..&start=..&limit=..
+  - /rexxar/api/v2/elessar/subject/{id}（移动端人物接口）
+
+故障注入：
+  - error_rate：每个请求按这个概率返回 error_status（默认 503），模拟服务端抖动；
+  - rate_limit：服务端令牌桶，全局超过这么多请求/秒的部分返回 limit_status（默认 403，豆瓣封禁时就是 403）。
+
+给了 archive_dir（page_archive.py 的存档目录，比如 data/archive）时，
+优先按 path + query 返回存档里录下来的真实响应，存档里没有的再用合成页面。
+
+用法：
+    python -m bench.mock_douban --port 8000 --latency 0.3 --error-rate 0.02 --rate-limit 50
+    DOUBAN_MOVIE_BASE_URL=http://127.0.0.1:8000 DOUBAN_MOBILE_BASE_URL=http://127.0.0.1:8000 \\
+        python 1_crawl_movies.py ...
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import threading
+import time
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Pattern, Tuple
+from urllib.parse import parse_qs
+
+from bench import fixtures
+from bench.local_http import CountingHTTPServer, StaticPageHandler, start_server
+from page_archive import PageArchive
+
+_HTML = "text/html; charset=utf-8"
+_JSON = "application/json; charset=utf-8"
+
+
+def _int_param(query: Dict[str, List[str]], name: str, default: int = 0) -> int:
+    try:
+        return int(query[name][0])
+    except (KeyError, IndexError, ValueError):
+        return default
+
+
+def _str_param(query: Dict[str, List[str]], name: str, default: str = "") -> str:
+    values = query.get(name)
+    return values[0] if values else default
+
+
+# (path 正则, render(匹配到的分组, query) -> body, Content-Type)
+_ROUTES: Tuple[Tuple[Pattern[str], Callable[[Tuple[str, ...], Dict[str, List[str]]], str], str], ...] = (
+    (re.compile(r"^/subject/(\d+)/?$"), lambda g, q: fixtures.subject_page(g[0]), _HTML),
+    (re.compile(r"^/subject/(\d+)/celebrities/?$"), lambda g, q: fixtures.celebrities_page(g[0]), _HTML),
+    (re.compile(r"^/subject/(\d+)/awards/?$"), lambda g, q: fixtures.awards_page(g[0]), _HTML),
+    (
+        re.compile(r"^/subject/(\d+)/comments/?$"),
+        lambda g, q: fixtures.comments_page(
+            g[0], _str_param(q, "status", "P"), _int_param(q, "start"), _int_param(q, "limit", 20),
+            _str_param(q, "sort"),
+        ),
+        _HTML,
+    ),
+    (
+        re.compile(r"^/j/chart/top_list/?$"),
+        lambda g, q: fixtures.top_list_json(
+            _int_param(q, "type"), _int_param(q, "start"), _int_param(q, "limit", 20)
+        ),
+        _JSON,
+    ),
+    (
+        re.compile(r"^/rexxar/api/v2/elessar/subject/(\d+)/?$"),
+        lambda g, q: fixtures.person_api_json(g[0]),
+        _JSON,
+    ),
+)
+_SUBJECT_ID = re.compile(r"^/subject/(\d+)")
+
+
+class _ServerBucket:
+    """服务端的令牌桶：超过 rate 请求/秒（允许 rate 个的突发）就拒绝"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class RequestStats:
+    """服务端按状态码统计的请求数和响应字节数，基准脚本用来算每秒页数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.by_status: Dict[int, int] = {}
+        self.bytes_sent = 0
+
+    def record(self, status: int, size: int) -> None:
+        with self._lock:
+            self.by_status[status] = self.by_status.get(status, 0) + 1
+            self.bytes_sent += size
+
+    def snapshot(self) -> Tuple[Dict[int, int], int]:
+        """(状态码 -> 请求数, 响应字节数)"""
+        with self._lock:
+            return dict(self.by_status), self.bytes_sent
+
+
+class MockDoubanHandler(StaticPageHandler):
+    """按路由返回合成页面；延迟 / 故障注入 / 存档由 make_handler 注入"""
+
+    latency: float = 0.0
+    slow_ids: FrozenSet[str] = frozenset()
+    slow_latency: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 503
+    limit_status: int = 403
+    bucket: Optional[_ServerBucket] = None
+    archive: Optional[PageArchive] = None
+    stats: RequestStats = RequestStats()
+    # 页面生成本身也要花 CPU，缓存起来避免服务端成为瓶颈
+    _cache: Dict[str, Tuple[bytes, str]] = {}
+
+    def _render(self, target: str) -> Optional[Tuple[int, bytes, str]]:
+        """path + query -> (状态码, body, Content-Type)；没有对应路由返回 None"""
+        if self.archive is not None:
+            found = self.archive.load(target)
+            if found is not None:
+                status, headers, body = found
+                content_type = next((v for k, v in headers.items() if k.lower() == "content-type"), _HTML)
+                return status, body, content_type
+
+        cached = self._cache.get(target)
+        if cached is not None:
+            return (200,) + cached
+        path, _, query = target.partition("?")
+        for pattern, render, content_type in _ROUTES:
+            m = pattern.match(path)
+            if m:
+                body = render(m.groups(), parse_qs(query)).encode("utf-8")
+                self._cache[target] = (body, content_type)
+                return 200, body, content_type
+        return None
+
+    def _latency_for(self, path: str) -> float:
+        if self.slow_ids:
+            m = _SUBJECT_ID.match(path)
+            if m and m.group(1) in self.slow_ids:
+                return self.slow_latency
+        return self.latency
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = _HTML) -> None:
+        self.send_response(status)
+        if body:
+            self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+        self.stats.record(status, len(body))
+
+    def do_GET(self):
+        # 被限流的请求服务端很快就拒掉，不占用正常的响应时间
+        if self.bucket is not None and not self.bucket.allow():
+            self._send(self.limit_status)
+            return
+
+        latency = self._latency_for(self.path.split("?", 1)[0])
+        if latency > 0:
+            time.sleep(latency)
+
+        if self.error_rate > 0 and random.random() < self.error_rate:
+            self._send(self.error_status)
+            return
+
+        found = self._render(self.path)
+        if found is None:
+            self._send(404)
+            return
+        self._send(*found)
+
+
+def make_handler(
+        latency: float = 0.0,
+        slow_ids: Iterable[str] = (),
+        slow_latency: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        rate_limit: float = 0.0,
+        limit_status: int = 403,
+        archive_dir: Optional[str] = None,
+):
+    """
+    生成带指定延迟 / 故障注入的 handler 类；slow_ids 里的电影用 slow_latency。
+
+    :param error_rate: 每个请求返回 error_status 的概率
+    :param rate_limit: 服务端每秒最多放行多少请求，超出的返回 limit_status；0 表示不限
+    :param archive_dir: 给了就优先返回这个存档目录里录下来的响应
+    """
+    return type("ConfiguredMockDoubanHandler", (MockDoubanHandler,), {
+        "latency": latency,
+        "slow_ids": frozenset(slow_ids),
+        "slow_latency": slow_latency,
+        "error_rate": error_rate,
+        "error_status": error_status,
+        "limit_status": limit_status,
+        "bucket": _ServerBucket(rate_limit) if rate_limit > 0 else None,
+        "archive": PageArchive(root=archive_dir) if archive_dir else None,
+        "stats": RequestStats(),
+    })
+
+
+def start_mock_server(
+        latency: float = 0.0,
+        port: int = 0,
+        slow_ids: Iterable[str] = (),
+        slow_latency: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        rate_limit: float = 0.0,
+        limit_status: int = 403,
+        archive_dir: Optional[str] = None,
+) -> Tuple[CountingHTTPServer, str]:
+    """
+    在后台线程启动 mock 服务器，返回 (server, base_url)；
+    请求统计在 server.RequestHandlerClass.stats
+    """
+    handler = make_handler(
+        latency, slow_ids, slow_latency,
+        error_rate=error_rate,
+        error_status=error_status,
+        rate_limit=rate_limit,
+        limit_status=limit_status,
+        archive_dir=archive_dir,
+    )
+    return start_server(handler, port=port)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="本地假豆瓣服务器")
+    parser.add_argument("--port", type=int, default=8000, help="监听端口（默认 8000）")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求注入的延迟秒数")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 --error-status 的概率（默认 0）")
+    parser.add_argument("--error-status", type=int, default=503, help="注入错误时的状态码（默认 503）")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="服务端每秒最多放行多少请求，0 表示不限")
+    parser.add_argument("--limit-status", type=int, default=403, help="超过 --rate-limit 时的状态码（默认 403）")
+    parser.add_argument("--archive", default=None, help="优先返回这个存档目录（如 data/archive）里录下来的响应")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    server, base_url = start_mock_server(
+        latency=args.latency,
+        port=args.port,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        rate_limit=args.rate_limit,
+        limit_status=args.limit_status,
+        archive_dir=args.archive,
+    )
+    print(
+        f"[mock] 假豆瓣已启动: {base_url}（latency={args.latency}s, error_rate={args.error_rate}, "
+        f"rate_limit={args.rate_limit or '不限'}, archive={args.archive or '无'}），Ctrl+C 退出"
+    )
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
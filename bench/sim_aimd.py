@@ -0,0 +1,196 @@
+"""
+bench/sim_aimd.py
+
+自适应限速（rate_limiter 的 AIMD）模拟：
+
+本地起一个“藏着限流阈值”的服务器：
+  - 最近 1 秒内的请求数达到 hidden_rps 就返回 429；
+  - 负载超过阈值的 75% 时开始排队，响应延迟随负载上升。
+
+客户端用若干线程循环调用 utils.fetch_html（和爬虫走同一条路径），依次跑：
+  - static-low  : 固定速率 = hidden_rps / 4（旧版的“保守猜测”）
+  - static-high : 固定速率 = hidden_rps * 2（猜得太激进）
+  - adaptive    : 从 1 次/秒起步，AIMD 自己找阈值
+  - adaptive-2  : 复用 adaptive 的状态文件再跑一遍，验证学到的速率能跨运行保留
+
+每秒打印一行时间线，最后汇总每种模式的成功吞吐和 429 比例。
+
+用法（在仓库根目录）：
+    python -m bench.sim_aimd --hidden-rps 8 --duration 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import collections
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from typing import Deque, Dict, List, Tuple
+
+import requests
+
+import rate_limiter
+import page_archive
+import utils
+from bench.local_http import start_server
+from rate_limiter import TokenBucketLimiter
+
+
+def make_hidden_limit_handler(hidden_rps: float, base_latency: float):
+    """生成一个按 1 秒滑动窗口限流的 handler 类"""
+
+    window: Deque[float] = collections.deque()
+    lock = threading.Lock()
+
+    class HiddenLimitHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            now = time.monotonic()
+            with lock:
+                while window and now - window[0] > 1.0:
+                    window.popleft()
+                load = len(window) / hidden_rps
+                limited = load >= 1.0
+                if not limited:
+                    window.append(now)
+
+            if limited:
+                status, body = 429, b"slow down"
+            else:
+                # 接近阈值时开始排队，延迟随负载上升
+                latency = base_latency * (1 + 16 * max(0.0, load - 0.75))
+                time.sleep(latency)
+                status, body = 200, b"<html><body>ok</body></html>"
+
+            self.send_response(status)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return HiddenLimitHandler
+
+
+def run_mode(
+        name: str,
+        url: str,
+        limiter: TokenBucketLimiter,
+        threads: int,
+        duration: float,
+) -> Tuple[int, int]:
+    """用 threads 个线程压 duration 秒，返回 (成功数, 429 数)"""
+    rate_limiter.set_limiter(limiter)
+    key = rate_limiter.host_of(url)
+
+    counts: Dict[str, int] = collections.Counter()
+    latencies: List[float] = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def _loop():
+        while time.monotonic() < deadline:
+            # 先等令牌再计时，延迟一栏只反映服务端排队
+            rate_limiter.throttle(url)
+            t0 = time.perf_counter()
+            try:
+                utils.fetch_html(url, throttle=False)
+                kind = "ok"
+            except requests.HTTPError as e:
+                kind = str(e.response.status_code) if e.response is not None else "err"
+            except requests.RequestException:
+                kind = "err"
+            with lock:
+                counts[kind] += 1
+                if kind == "ok":
+                    latencies.append(time.perf_counter() - t0)
+
+    workers = [threading.Thread(target=_loop, daemon=True) for _ in range(threads)]
+    for w in workers:
+        w.start()
+
+    print(f"\n[{name}]   t   rate     2xx   429  avg_latency")
+    last = collections.Counter()
+    for sec in range(1, int(duration) + 1):
+        time.sleep(1.0)
+        with lock:
+            snap = collections.Counter(counts)
+            lat = latencies[:]
+            latencies.clear()
+        avg = sum(lat) / len(lat) if lat else 0.0
+        print(
+            f"[{name}] {sec:3d}  {limiter.current_rate(key):5.2f}  "
+            f"{snap['ok'] - last['ok']:5d} {snap['429'] - last['429']:5d}  {avg:.3f}s"
+        )
+        last = snap
+
+    for w in workers:
+        w.join()
+    return counts["ok"], counts["429"]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="AIMD 自适应限速模拟")
+    parser.add_argument("--hidden-rps", type=float, default=8.0, help="服务端隐藏的限流阈值（默认 8 次/秒）")
+    parser.add_argument("--latency", type=float, default=0.1, help="服务端基础延迟秒数（默认 0.1）")
+    parser.add_argument("--threads", type=int, default=6, help="客户端并发线程数（默认 6）")
+    parser.add_argument("--duration", type=float, default=30, help="每种模式压多少秒（默认 30）")
+    parser.add_argument("--step", type=float, default=0.5, help="加性增：每秒速率增量（默认 0.5，模拟里调快一点）")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    # 压的是本地服务器，不往真实存档里写
+    page_archive.enable_archive(False)
+    handler = make_hidden_limit_handler(args.hidden_rps, args.latency)
+    server, base_url = start_server(handler)
+    url = base_url + "/subject/1/"
+    state_dir = tempfile.mkdtemp(prefix="sim_aimd_")
+
+    def _limiter(state_name: str, rate: float, adaptive: bool) -> TokenBucketLimiter:
+        return TokenBucketLimiter(
+            state_path=os.path.join(state_dir, state_name),
+            rate=rate,
+            burst=1,
+            long_break_every=0,
+            adaptive=adaptive,
+            max_rate=args.hidden_rps * 4,
+            increase_step=args.step,
+            decrease_cooldown=2.0,
+        )
+
+    modes = [
+        ("static-low", _limiter("low.json", args.hidden_rps / 4, False)),
+        ("static-high", _limiter("high.json", args.hidden_rps * 2, False)),
+        ("adaptive", _limiter("adaptive.json", 1.0, True)),
+        # 同一个状态文件，初始 rate 参数不起作用，直接接着上次学到的速率跑
+        ("adaptive-2", _limiter("adaptive.json", 1.0, True)),
+    ]
+
+    summary = []
+    for name, limiter in modes:
+        ok, limited = run_mode(name, url, limiter, args.threads, args.duration)
+        summary.append((name, ok, limited))
+
+    server.shutdown()
+
+    print(f"\n[summary] hidden_rps={args.hidden_rps} duration={args.duration}s")
+    for name, ok, limited in summary:
+        total = ok + limited
+        ratio = limited / total if total else 0.0
+        print(
+            f"  {name:12s} 成功 {ok / args.duration:5.2f} 次/秒  "
+            f"429 {limited:5d} 次（{ratio:6.1%}）"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+comment_marks.py
+
+短评增量刷新（4_crawl_movie_comments.py --refresh）用的“高水位”，存在 data/state/comment_marks.sqlite3。
+
+每部电影每种状态（P 看过 / F 想看）记一个高水位：见过的最新一条短评的 created_at，
+外加这一秒里见过的全部 user_hash。
+刷新时按时间倒序（sort=time）翻页，跳过不比高水位新的短评，翻到比高水位那一秒更早的就停，
+只追加新的记录，再把高水位推到这次见到的最新一秒。
+
+created_at 是“2009-03-31 10:11:04”这种格式，直接按字符串比较就是按时间比较。
+同一秒可能有好几条短评：和高水位同一秒的，user_hash 在见过的集合里才算见过，
+不在的当作新短评（只记一个 user_hash 的话，同一秒的其他短评每次刷新都会被当成新的重复追加）。
+
+每次刷新前先用 bootstrap_from_raw() 扫一遍 data/raw/*/movie_watch_records.jsonl，
+把普通抓取（不带 --refresh）写出的观影记录也算进高水位（观影记录 P / F 都有，和评分记录一一对应）；
+第一次刷新时库是空的，全靠这一步。
+
+多个 worker 可以同时读写同一个库（WAL 模式 + busy timeout），每部电影只会被一个 worker 刷新。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Tuple
+
+from crawler_config import COMMENT_MARKS_DB_PATH
+
+# (created_at, 这一秒里见过的 user_hash)
+Mark = Tuple[str, FrozenSet[str]]
+
+# 观影记录的 status -> 短评页 URL 里的 status
+_STATUS_FLAGS = {"watched": "P", "wishlist": "F"}
+
+# marks：每部电影每种状态的高水位时间（user_hash 列是老版本只记一条时留下的，读的时候也算进集合）；
+# mark_hashes：高水位那一秒里见过的全部 user_hash
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS marks (
+    movie_id    TEXT NOT NULL,
+    status_flag TEXT NOT NULL,
+    created_at  TEXT NOT NULL,
+    user_hash   TEXT NOT NULL,
+    updated_at  REAL NOT NULL,
+    PRIMARY KEY (movie_id, status_flag)
+);
+CREATE TABLE IF NOT EXISTS mark_hashes (
+    movie_id    TEXT NOT NULL,
+    status_flag TEXT NOT NULL,
+    user_hash   TEXT NOT NULL,
+    PRIMARY KEY (movie_id, status_flag, user_hash)
+);
+"""
+
+
+def mark_of(record: Dict[str, Any]) -> Optional[Mark]:
+    """一条评分 / 观影记录自己的高水位；没有时间的返回 None（没法比较新旧）"""
+    created_at = str(record.get("created_at") or "").strip()
+    if not created_at:
+        return None
+    return created_at, frozenset([str(record.get("user_hash") or "")])
+
+
+def merge_marks(a: Optional[Mark], b: Optional[Mark]) -> Optional[Mark]:
+    """两个高水位取新的；同一秒的合并 user_hash 集合"""
+    if a is None:
+        return b
+    if b is None or a[0] > b[0]:
+        return a
+    if b[0] > a[0]:
+        return b
+    return a[0], a[1] | b[1]
+
+
+def newest_mark(records: Iterable[Dict[str, Any]]) -> Optional[Mark]:
+    """一批记录里最新的那一秒 + 这一秒的全部 user_hash"""
+    mark: Optional[Mark] = None
+    for rec in records:
+        mark = merge_marks(mark, mark_of(rec))
+    return mark
+
+
+def is_seen(record: Dict[str, Any], mark: Optional[Mark]) -> bool:
+    """这条记录是不是上次已经见过了：比高水位那一秒早，或者就在那一秒且 user_hash 见过"""
+    if mark is None:
+        return False
+    current = mark_of(record)
+    if current is None:
+        return False
+    return current[0] < mark[0] or (current[0] == mark[0] and current[1] <= mark[1])
+
+
+def is_older(record: Dict[str, Any], mark: Optional[Mark]) -> bool:
+    """这条记录是不是比高水位那一秒还早（按时间倒序翻页时，之后的全都见过了）"""
+    if mark is None:
+        return False
+    current = mark_of(record)
+    return current is not None and current[0] < mark[0]
+
+
+class CommentMarks:
+    """
+    短评高水位的 SQLite 存储。
+
+    :param path: 数据库文件路径；":memory:" 用于不落盘的场景（比如重放存档）
+    """
+
+    def __init__(self, path: str = COMMENT_MARKS_DB_PATH):
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM marks").fetchone()[0]
+
+    def get(self, movie_id: str, status_flag: str) -> Optional[Mark]:
+        row = self._conn.execute(
+            "SELECT created_at, user_hash FROM marks WHERE movie_id = ? AND status_flag = ?",
+            (movie_id, status_flag),
+        ).fetchone()
+        if row is None:
+            return None
+        hashes = {row[1]}
+        hashes.update(r[0] for r in self._conn.execute(
+            "SELECT user_hash FROM mark_hashes WHERE movie_id = ? AND status_flag = ?",
+            (movie_id, status_flag),
+        ))
+        return row[0], frozenset(hashes)
+
+    def advance(self, movie_id: str, status_flag: str, mark: Mark) -> None:
+        """把高水位推到 mark（比现有的旧就不动，同一秒的合并 user_hash）"""
+        self.advance_many([(movie_id, status_flag, mark)])
+
+    def advance_many(self, marks: Iterable[Tuple[str, str, Mark]]) -> int:
+        """批量 advance（一个事务），返回实际变了多少个高水位"""
+        now = time.time()
+        updated = 0
+        # BEGIN IMMEDIATE：先拿写锁再读旧值，别的 worker 不会在中间改掉
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            for movie_id, flag, (created_at, hashes) in marks:
+                key = (movie_id, flag)
+                row = self._conn.execute(
+                    "SELECT created_at FROM marks WHERE movie_id = ? AND status_flag = ?", key
+                ).fetchone()
+                if row is not None and created_at < row[0]:
+                    continue
+                if row is None or created_at > row[0]:
+                    # 推到新的一秒：上一秒的 user_hash 不用再记
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO marks (movie_id, status_flag, created_at, user_hash, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (movie_id, flag, created_at, max(hashes), now),
+                    )
+                    self._conn.execute("DELETE FROM mark_hashes WHERE movie_id = ? AND status_flag = ?", key)
+                    changed = True
+                else:
+                    changed = False
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO mark_hashes (movie_id, status_flag, user_hash) VALUES (?, ?, ?)",
+                    [(movie_id, flag, h) for h in sorted(hashes)],
+                )
+                if changed or self._conn.total_changes > before:
+                    updated += 1
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return updated
+
+    def bootstrap_from_raw(self, raw_root: str) -> int:
+        """
+        从 raw_root/*/movie_watch_records.jsonl 推出每部电影每种状态的高水位，写进库里。
+        高水位只会往新推，不会推回去；返回变了多少个高水位。
+        """
+        newest: Dict[Tuple[str, str], Mark] = {}
+        if os.path.isdir(raw_root):
+            for name in sorted(os.listdir(raw_root)):
+                path = os.path.join(raw_root, name, "movie_watch_records.jsonl")
+                if not os.path.exists(path):
+                    continue
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            rec = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+                        flag = _STATUS_FLAGS.get(rec.get("status"))
+                        mark = mark_of(rec)
+                        mid = str(rec.get("movie_douban_id") or "").strip()
+                        if flag is None or mark is None or not mid:
+                            continue
+                        key = (mid, flag)
+                        newest[key] = merge_marks(newest.get(key), mark)
+
+        return self.advance_many((mid, flag, mark) for (mid, flag), mark in newest.items())
@@ -7,6 +7,8 @@ comments/movie_comments.py
     - /subject/{movie_id}/comments?status=F  : 想看
 
     默认一页 20 条记录，通过 start = 0, 20, 40, ... 翻页。
+
+    解析后端见 crawler_config.PARSER_BACKEND：bs4（默认）或 lxml（预编译 XPath，结果一致）。
 """
 from __future__ import annotations
 
@@ -15,7 +17,11 @@ import re
 from typing import Any, Dict, List, Optional, Tuple
 
 from bs4 import BeautifulSoup
+from lxml import etree
 
+import lxml_helpers
+from crawler_config import DOUBAN_MOVIE_BASE_URL
+from lxml_helpers import first, has_class
 from utils import fetch_html
 
 
@@ -63,7 +69,10 @@ def _parse_rating_from_span(span) -> Optional[int]:
         return None
 
     classes = span.get("class", [])
-    class_str = " ".join(classes)
+    return _rating_from_class_str(" ".join(classes))
+
+def _rating_from_class_str(class_str: str) -> Optional[int]:
+    """allstar40 rating -> 8"""
     m = _RATING_CLASS_RE.search(class_str)
     if not m:
         return None
@@ -137,12 +146,8 @@ def _parse_single_comment_item(
         print("获取用户名失败")
         return None, None
 
-    # 保护隐私，存用户名哈希值
-    user_hash = _hash_username(username)
-
     # 观影状态 for sanity check
     status_text = _pick_status_from_info_span(info_span)
-    logical_status = _status_flag_to_logical_status(status_flag)
 
     # 评分
     rating_span = info_span.find("span", class_=re.compile(r"allstar\d+"))
@@ -165,6 +170,23 @@ def _parse_single_comment_item(
     else:
         print("获取短评 p-tag 失败")
 
+    return _comment_records(
+        movie_douban_id, status_flag, username, status_text, rating_value, created_at, review_text
+    )
+
+def _comment_records(
+        movie_douban_id: str,
+        status_flag: str,
+        username: str,
+        status_text: Optional[str],
+        rating_value: Optional[int],
+        created_at: Optional[str],
+        review_text: str,
+) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+    """由一条短评的各字段组装 (rating_record, watch_record)，两个解析后端共用"""
+    user_hash = _hash_username(username)
+    logical_status = _status_flag_to_logical_status(status_flag)
+
     watch_record: Dict[str, Any] = {
         "movie_douban_id": movie_douban_id,
         "user_hash": user_hash,
@@ -196,7 +218,8 @@ def _parse_single_comment_item(
 def parse_comments_page(
         html: str,
         movie_douban_id: str,
-        status_flag: str = "P"
+        status_flag: str = "P",
+        backend: Optional[str] = None,
 ) -> Dict[str, List[Dict[str, Any]]]:
     """
     解析一页短评/想看页面的 HTML 文档，返回该页全部（20 条）记录
@@ -204,8 +227,12 @@ def parse_comments_page(
     :param html: 页面 HTML 文档
     :param movie_douban_id: 所属的电影 Douban ID
     :param status_flag: P-短评页，F-想看页
+    :param backend: 解析后端 bs4 / lxml，默认取 PARSER_BACKEND
     :return: {"ratings": [{...}, ...], "watch_records": [{...}, ...]}
     """
+    if lxml_helpers.pick_backend(backend) == "lxml":
+        return _parse_comments_page_lxml(html, movie_douban_id, status_flag)
+
     soup = BeautifulSoup(html, "lxml")
 
     root = soup.select_one("#comments")
@@ -230,6 +257,98 @@ def parse_comments_page(
         "watch_records": watch_records,
     }
 
+"""lxml 后端：和上面逐行对应，find / select 换成预编译 XPath"""
+
+_X_ROOT = etree.XPath("//*[@id='comments']")
+_X_ITEMS = etree.XPath(f".//div[{has_class('comment-item')}]")
+_X_COMMENT = etree.XPath(f".//div[{has_class('comment')}]")
+_X_INFO = etree.XPath(f".//span[{has_class('comment-info')}]")
+_X_A = etree.XPath(".//a")
+_X_CHILD_SPANS = etree.XPath("./span")
+_X_STAR_SPANS = etree.XPath(".//span[contains(@class, 'allstar')]")
+_X_TIME = etree.XPath(f".//span[{has_class('comment-time')}]")
+_X_P = etree.XPath(".//p")
+_X_SHORT = etree.XPath(f".//span[{has_class('short')}]")
+# BS4 的 class_=re.compile(...) 是对每个 class 分别 search
+_STAR_CLASS_RE = re.compile(r"allstar\d+")
+
+def _rating_span_lxml(info_span):
+    for span in _X_STAR_SPANS(info_span):
+        if any(_STAR_CLASS_RE.search(c) for c in span.get("class", "").split()):
+            return span
+    return None
+
+def _parse_single_comment_item_lxml(
+        item,
+        movie_douban_id: str,
+        status_flag: str,
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    comment_div = first(_X_COMMENT, item)
+    if comment_div is None:
+        print("获取 comment-div 失败")
+        return None, None
+
+    info_span = first(_X_INFO, comment_div)
+    if info_span is None:
+        print("获取 info-span 失败")
+        return None, None
+
+    user_a = first(_X_A, info_span)
+    username = lxml_helpers.text(user_a) if user_a is not None else ""
+    if not username:
+        print("获取用户名失败")
+        return None, None
+
+    spans = _X_CHILD_SPANS(info_span)
+    status_text = (lxml_helpers.text(spans[0]) or None) if spans else None
+
+    rating_span = _rating_span_lxml(info_span)
+    rating_value = (
+        _rating_from_class_str(" ".join(rating_span.get("class", "").split()))
+        if rating_span is not None else None
+    )
+
+    time_span = first(_X_TIME, info_span)
+    created_at = lxml_helpers.text(time_span) if time_span is not None else None
+
+    p_tag = first(_X_P, comment_div)
+    review_text = ""
+    if p_tag is not None:
+        short_span = first(_X_SHORT, p_tag)
+        review_text = lxml_helpers.text(short_span if short_span is not None else p_tag)
+    else:
+        print("获取短评 p-tag 失败")
+
+    return _comment_records(
+        movie_douban_id, status_flag, username, status_text, rating_value, created_at, review_text
+    )
+
+def _parse_comments_page_lxml(
+        html: str,
+        movie_douban_id: str,
+        status_flag: str,
+) -> Dict[str, List[Dict[str, Any]]]:
+    doc = lxml_helpers.document(html)
+    root = first(_X_ROOT, doc) if doc is not None else None
+    if root is None:
+        print("获取文档 root 失败")
+        return {"ratings": [], "watch_records": []}
+
+    ratings: List[Dict[str, Any]] = []
+    watch_records: List[Dict[str, Any]] = []
+
+    for item in _X_ITEMS(root):
+        rating_rec, watch_rec = _parse_single_comment_item_lxml(item, movie_douban_id, status_flag)
+        if watch_rec is not None:
+            watch_records.append(watch_rec)
+        if rating_rec is not None:
+            ratings.append(rating_rec)
+
+    return {
+        "ratings": ratings,
+        "watch_records": watch_records,
+    }
+
 def fetch_movie_comments(
         movie_douban_id: str,
         num_pages: int = 3,
@@ -250,12 +369,12 @@ def fetch_movie_comments(
         start = page_idx * 20
         if status_flag.upper() == "P":
             url = (
-                f"https://movie.douban.com/subject/{movie_douban_id}/comments"
+                f"{DOUBAN_MOVIE_BASE_URL}/subject/{movie_douban_id}/comments"
                 f"?start={start}&limit=20&status=P&sort=new_score"
             )
         else:
             url = (
-                f"https://movie.douban.com/subject/{movie_douban_id}/comments"
+                f"{DOUBAN_MOVIE_BASE_URL}/subject/{movie_douban_id}/comments"
                 f"?start={start}&limit=20&status=F"
             )
 
@@ -8,13 +8,67 @@ from __future__ import annotations
 
 import os
 
+
+def _env_str(name: str, default: str) -> str:
+    """允许用环境变量临时覆盖配置（主要给本地 mock / 基准测试用）"""
+    return os.environ.get(name) or default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    raw = os.environ.get(name)
+    if not raw:
+        return default
+    return raw.strip().lower() not in ("0", "false", "no", "off")
+
+
+def _env_float(name: str, default: float) -> float:
+    raw = os.environ.get(name)
+    if not raw:
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        return default
+
+
+# ===== 站点地址 =====
+
+# 指向本地 mock 服务器时，设置 DOUBAN_MOVIE_BASE_URL=http://127.0.0.1:8000 即可
+DOUBAN_MOVIE_BASE_URL = _env_str("DOUBAN_MOVIE_BASE_URL", "https://movie.douban.com").rstrip("/")
+# 人物信息走的移动端接口（person/details_api.py），同理可以用 DOUBAN_MOBILE_BASE_URL 指向 mock
+DOUBAN_MOBILE_BASE_URL = _env_str("DOUBAN_MOBILE_BASE_URL", "https://m.douban.com").rstrip("/")
+
 # ===== 路径相关 =====
 
-BASE_DATA_DIR = "data"
+BASE_DATA_DIR = _env_str("CRAWLER_DATA_DIR", "data")
 
 SEED_DIR = os.path.join(BASE_DATA_DIR, "seeds")
 # RAW_DIR = os.path.join(BASE_DATA_DIR, "raw")
 RAW_ROOT_DIR = os.path.join(BASE_DATA_DIR, "raw")
+# 跨进程共享的运行状态（限速器、frontier、dead-letter 等）
+STATE_DIR = os.path.join(BASE_DATA_DIR, "state")
+# 抓取进度（frontier.py）：每个 (实体, 页面) 任务的状态，断点续爬靠它
+FRONTIER_DB_PATH = os.path.join(STATE_DIR, "frontier.sqlite3")
+# 动态分配任务（--dispatch lease）：每次认领多少个实体（电影 / 人物），
+# 小一点收尾更均衡，大一点认领的开销更小
+LEASE_BATCH_SIZE = int(_env_float("CRAWLER_LEASE_BATCH_SIZE", 5))
+# 租约时长（秒）：worker 崩了以后，它认领的任务过这么久会被别的 worker 接手。
+# 要比“处理一个实体 + 一次长休息”长得多
+LEASE_SECONDS    = _env_float("CRAWLER_LEASE_SECONDS", 600)
+# 短评增量刷新（4_crawl_movie_comments.py --refresh）：每部电影每种状态见过的最新一条短评
+COMMENT_MARKS_DB_PATH = os.path.join(STATE_DIR, "comment_marks.sqlite3")
+# 实体缓存（entity_cache.py）：每个人物 / 电影上次抓到的时间 + 内容哈希
+ENTITY_CACHE_DB_PATH = os.path.join(STATE_DIR, "entity_cache.sqlite3")
+# 实体缓存有效期（天）：抓到后这么久之内不再抓，过期了重新抓；<= 0 表示不按缓存跳过
+ENTITY_TTL_DAYS = {
+    "person": _env_float("CRAWLER_PERSON_TTL_DAYS", 90),
+    "movie": _env_float("CRAWLER_MOVIE_TTL_DAYS", 30),
+}
+
+# 原始响应存档（page_archive.py）：每次抓到的页面压缩存档，改了解析器可以 --from-archive 重跑
+ARCHIVE_DIR = os.path.join(BASE_DATA_DIR, "archive")
+ARCHIVE_ENABLED = _env_bool("CRAWLER_ARCHIVE", True)
+ARCHIVE_COMPRESS_LEVEL = 6
 
 # 种子电影列表（由 0_build_movie_seeds.py 生成）
 MOVIE_SEED_PATH = os.path.join(SEED_DIR, "movies_seed.jsonl")
@@ -29,16 +83,108 @@ MOVIE_SEED_PATH = os.path.join(SEED_DIR, "movies_seed.jsonl")
 
 # ===== 抓取节奏相关 =====
 
-# 普通请求之间的随机间隔
-REQUEST_MIN_INTERVAL = 1.5
-REQUEST_MAX_INTERVAL = 3.0
+# 令牌桶限速（rate_limiter.py），同一台机器上所有 worker 进程共享：
+# 对同一个 host 合计每秒多少次请求。
+# 旧版每个 worker 各自 1.5~3s 一次，3 个 worker 合计大约每秒 1 次
+RATE_LIMIT_RPS   = _env_float("CRAWLER_RATE_LIMIT_RPS", 1.0)
+# 桶容量：空闲一段时间后最多允许连发几次
+RATE_LIMIT_BURST = 3
+# 令牌桶状态文件（带文件锁）
+RATE_LIMIT_STATE_PATH = os.path.join(STATE_DIR, "rate_limiter.json")
+
+# 自适应限速（AIMD）：开启后 RATE_LIMIT_RPS 只是初始速率，
+# 之后根据响应状态码 / 延迟自动调整，学到的速率存在状态文件里，下次启动接着用
+RATE_LIMIT_ADAPTIVE = _env_bool("CRAWLER_RATE_LIMIT_ADAPTIVE", True)
+RATE_LIMIT_MIN_RPS  = 0.1
+RATE_LIMIT_MAX_RPS  = _env_float("CRAWLER_RATE_LIMIT_MAX_RPS", 3.0)
+# 加性增：一直又快又 2xx 时，速率每秒加多少（次/秒），即每个响应加 STEP / 当前速率
+AIMD_INCREASE_STEP     = 0.05
+# 乘性减：遇到限流 / 5xx / 延迟飙升时速率乘以多少
+AIMD_DECREASE_FACTOR   = 0.5
+# 两次乘性减之间至少间隔多少秒（同一波错误只减一次）
+AIMD_DECREASE_COOLDOWN = 5.0
+# 被当成“在限流 / 封禁”的状态码（5xx 另外统一处理）
+AIMD_THROTTLE_STATUSES = (403, 418, 429)
+# 延迟 EWMA 超过基线的多少倍、且至少高出多少秒，算延迟飙升
+AIMD_LATENCY_TOLERANCE = 2.0
+AIMD_LATENCY_MIN_DELTA = 0.2
 
-# 每多少次请求后长休息一次
+# 同一个 host 每发出多少次请求（全机合计）后长休息一次
 LONG_BREAK_EVERY = 40
-LONG_BREAK_MIN   = 15
-LONG_BREAK_MAX   = 30
+LONG_BREAK_MIN   = _env_float("CRAWLER_LONG_BREAK_MIN", 15)
+LONG_BREAK_MAX   = _env_float("CRAWLER_LONG_BREAK_MAX", 30)
+
+# 重试相关（retry_queue.py）：失败的页面进延迟重试队列，不再原地 sleep
+# 同一个页面最多尝试几次，用完进 dead-letter 文件
+MAX_RETRY          = 5
+# 第 n 次失败后等 BASE * 2^(n-1) 秒再重试，最多等 CAP 秒（带 ±20% 抖动）
+# （对着本地 mock 注入错误跑基准时可以用 CRAWLER_RETRY_BACKOFF_BASE 调小）
+RETRY_BACKOFF_BASE = _env_float("CRAWLER_RETRY_BACKOFF_BASE", 10)
+RETRY_BACKOFF_CAP  = 160
+# 重试用尽的任务：data/state/dead_letters/{爬虫名}_{worker_id}.jsonl，
+# 之后用 --retry-dead-letters 重放
+DEAD_LETTER_DIR    = os.path.join(STATE_DIR, "dead_letters")
+
+# ===== 页面解析 =====
+
+# celebrities / awards / 短评页面的解析后端：
+#   "bs4"  BeautifulSoup 建树 + find / find_all（默认，原来的实现）
+#   "lxml" lxml.html 建树 + 预编译 XPath（lxml_helpers.py），记录完全一致，每页快好几倍
+PARSER_BACKENDS = ("bs4", "lxml")
+PARSER_BACKEND = _env_str("CRAWLER_PARSER_BACKEND", "bs4")
+
+# ===== 请求指标（metrics.py） =====
+
+# Prometheus 文本格式的指标文件：data/state/metrics/{爬虫名}_{worker_id}.prom
+METRICS_DIR           = os.path.join(STATE_DIR, "metrics")
+METRICS_ENABLED       = _env_bool("CRAWLER_METRICS", True)
+# 指标文件多久覆盖写一次（秒），进程退出时再写一次
+METRICS_FLUSH_SECONDS = _env_float("CRAWLER_METRICS_FLUSH_SECONDS", 15)
+# --metrics-port 的 /metrics 端点只监听本机
+METRICS_HTTP_HOST     = "127.0.0.1"
+# 默认不开 HTTP 端点；给了端口时 worker k 监听 端口 + k
+METRICS_PORT          = int(_env_float("CRAWLER_METRICS_PORT", 0))
+
+# ===== HTTP 连接池相关 =====
+
+# 全局 Session 最多缓存多少个 host 的连接池
+# （movie.douban.com / m.douban.com / img*.doubanio.com 之类，够用即可）
+HTTP_POOL_CONNECTIONS = 8
+# 每个 host 的连接池里最多保留多少条 keep-alive 连接
+HTTP_POOL_MAXSIZE     = 4
+
+# 超时（秒）：建连超时 / 读超时
+HTTP_CONNECT_TIMEOUT  = 5
+HTTP_READ_TIMEOUT     = 10
+
+# ===== asyncio 抓取引擎（1_crawl_movies.py --engine async） =====
+
+# 同时在途的电影数
+ASYNC_MAX_MOVIES_IN_FLIGHT = 8
+# 同一个 host 同时在途的请求数，不要超过连接池大小，否则多出来的连接用完就被丢弃
+# （请求速率由上面的令牌桶统一控制）
+ASYNC_PER_HOST_MAX_CONCURRENCY = HTTP_POOL_MAXSIZE
+
+# ===== 人物抓取（3_crawl_persons.py） =====
+
+# --engine pool 同时在途的请求数上限；实际在途数按 当前速率 × 平均延迟 + 1 自动调整，
+# 上限取连接池大小：超过连接池的连接用完就被丢弃，白白多握手
+PERSON_MAX_IN_FLIGHT = HTTP_POOL_MAXSIZE
+# 抓取顺序：优先级 = total_score（2_build_person_seeds.py 算的）+ 下面各入选理由（seed_reasons）的加分，
+# 导演 / 获奖者比同分的普通演员更值得先抓；--file-order 按种子文件顺序
+PERSON_REASON_BONUS = {"core_director": 10, "core_writer": 5, "awarded_person": 10}
+
+# ===== 短评翻页（4_crawl_movie_comments.py） =====
 
-# 重试相关
-MAX_RETRY          = 3
-RETRY_BACKOFF_MIN  = 10
-RETRY_BACKOFF_MAX  = 30
+# 每页多少条；返回不足这么多条的页说明已经翻到底，后面的页不再请求
+COMMENT_PAGE_SIZE = 20
+# 每部电影每种状态（P / F）最多翻几页（未登录大概只能看到前 200 条）
+COMMENT_MAX_PAGES = 10
+# 按种子热度（sources[].rank_in_type 里最好的名次）放大 / 缩小 --pages-p / --pages-f：
+# (名次上限, 倍数)，从上往下第一个满足的生效；榜单外的电影用 COMMENT_DEPTH_TAIL，没有名次信息的按 1 倍
+COMMENT_DEPTH_TIERS = ((10, 2.0), (50, 1.5), (150, 1.0))
+COMMENT_DEPTH_TAIL = 0.6
+# --request-budget 分配页数时，想看（F）页相对短评（P）页的价值
+COMMENT_F_PAGE_WEIGHT = 0.5
+# --refresh 时已经有高水位的电影每种状态最多翻几页（没有高水位的按上面的深度翻）
+COMMENT_REFRESH_MAX_PAGES = 5
@@ -0,0 +1,284 @@
+"""
+entity_cache.py
+
+跨运行的实体缓存索引，存在 data/state/entity_cache.sqlite3：
+每个实体（人物 / 电影）记一行 —— 上次抓到的时间 + 内容哈希。
+
+frontier 只知道“这个页面抓没抓过”，抓过就永远不再抓；实体缓存按实体类型给一个有效期（TTL，
+见 crawler_config.ENTITY_TTL_DAYS），爬虫登记任务前先查一遍：
+
+    还在有效期内   不登记、直接在 frontier 里记为 done（换了 frontier 库、别的 worker 抓过的也算）
+    过了有效期     frontier 里已完成的任务重新放回 pending，再抓一次
+    没有记录       照常交给 frontier
+
+重新抓到的内容哈希和上次一样时不再往输出里追加重复的记录，只刷新抓取时间；
+变了的照常追加。记录都带 fetched_at（抓取时间），同一个实体在 raw 里有多条时，
+ETL 取 fetched_at 最新的那条（见 etl/raw_scan.LatestById）。
+
+一个实体的内容是它的全部输出记录：记录类型 -> 记录列表（Records），
+电影是 subject 页面的 basic / details / summary 三类，人物是 person 一类。
+内容哈希：去掉 fetched_at 后按 key 排序序列化，取 sha256 的前 16 位。
+
+建库：启动时 scan_raw() 扫一遍 data/raw/*/ 下的输出，把里面的实体补进索引（已有的不动），
+同一个实体有多条时每类记录取最新的一条，和 ETL 一致。抓取时间取记录里的 fetched_at，
+老数据没有这个字段，按所在文件的修改时间算。
+扫过的文件记下大小和修改时间，一个 worker 目录里的文件都没变时下次不再扫。
+之后每写出一个实体就 record() 一次。
+
+多个 worker 可以同时读写同一个库（WAL 模式 + busy timeout）。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from crawler_config import ENTITY_CACHE_DB_PATH, ENTITY_TTL_DAYS
+from page_archive import get_archive, replay_enabled
+
+# 记录类型 -> 记录列表（一个实体的全部输出）
+Records = Dict[str, List[Dict[str, Any]]]
+
+# 记录里的抓取时间字段（ISO 格式，到秒），不算进内容哈希
+FETCHED_AT = "fetched_at"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entities (
+    entity_type  TEXT NOT NULL,
+    entity_id    TEXT NOT NULL,
+    fetched_at   REAL NOT NULL,
+    content_hash TEXT NOT NULL,
+    PRIMARY KEY (entity_type, entity_id)
+);
+CREATE TABLE IF NOT EXISTS shards (
+    path  TEXT PRIMARY KEY,
+    size  INTEGER NOT NULL,
+    mtime REAL NOT NULL
+);
+"""
+
+_DAY_SECONDS = 86400
+
+
+def fetched_at_stamp(url: Optional[str] = None) -> str:
+    """写进记录的抓取时间：平时是现在；重放存档时是 url 当初存进存档的时间（存档里没有就是现在）"""
+    ts = time.time()
+    if url and replay_enabled():
+        meta = get_archive().lookup(url)
+        if meta is not None:
+            ts = meta["fetched_at"]
+    return datetime.fromtimestamp(ts).isoformat(timespec="seconds")
+
+
+def _stamp_seconds(stamp: Any) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(str(stamp)).timestamp()
+    except ValueError:
+        return None
+
+
+def is_newer(rec: Dict[str, Any], old: Dict[str, Any]) -> bool:
+    """同一个实体的两条记录里 rec 是不是更新：fetched_at 大的新，一样（或者都没有）时后读到的算新"""
+    return str(rec.get(FETCHED_AT) or "") >= str(old.get(FETCHED_AT) or "")
+
+
+def content_hash(records: Records) -> str:
+    """一个实体全部输出记录的内容哈希（和字段顺序、fetched_at 无关）"""
+    stripped = {
+        kind: [{k: v for k, v in rec.items() if k != FETCHED_AT} for rec in recs]
+        for kind, recs in records.items()
+    }
+    raw = json.dumps(stripped, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def ttl_seconds(entity_type: str) -> float:
+    """某类实体的有效期（秒）；没配置或 <= 0 表示不按缓存跳过"""
+    return ENTITY_TTL_DAYS.get(entity_type, 0) * _DAY_SECONDS
+
+
+class EntityCache:
+    """
+    实体缓存索引的 SQLite 存储。
+
+    :param path: 数据库文件路径
+    """
+
+    def __init__(self, path: str = ENTITY_CACHE_DB_PATH):
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM entities").fetchone()[0]
+
+    def get(self, entity_type: str, entity_id: str) -> Optional[Tuple[float, str]]:
+        """(上次抓到的时间, 内容哈希)，没有记录返回 None"""
+        row = self._conn.execute(
+            "SELECT fetched_at, content_hash FROM entities WHERE entity_type = ? AND entity_id = ?",
+            (entity_type, entity_id),
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def changed(self, entity_type: str, entity_id: str, records: Records) -> bool:
+        """这次抓到的记录和上次的内容是否不同（缓存里没有算不同）"""
+        entry = self.get(entity_type, entity_id)
+        return entry is None or entry[1] != content_hash(records)
+
+    def record(self, entity_type: str, entity_id: str, records: Records) -> None:
+        """记录写出之后调用：抓取时间记为现在，更新内容哈希"""
+        self._conn.execute(
+            "INSERT INTO entities (entity_type, entity_id, fetched_at, content_hash) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (entity_type, entity_id) DO UPDATE SET "
+            "fetched_at = excluded.fetched_at, content_hash = excluded.content_hash",
+            (entity_type, entity_id, time.time(), content_hash(records)),
+        )
+
+    def split(self, entity_type: str, entity_ids: Iterable[str]) -> Tuple[Set[str], Set[str]]:
+        """
+        按有效期把 entity_ids 分成 (还新鲜的, 已过期的)，缓存里没有的两边都不算。
+        有效期 <= 0 时不按缓存跳过，两个集合都是空的。
+        """
+        ttl = ttl_seconds(entity_type)
+        if ttl <= 0:
+            return set(), set()
+
+        wanted = set(entity_ids)
+        cutoff = time.time() - ttl
+        fresh: Set[str] = set()
+        stale: Set[str] = set()
+        for entity_id, fetched_at in self._conn.execute(
+                "SELECT entity_id, fetched_at FROM entities WHERE entity_type = ?", (entity_type,)
+        ):
+            if entity_id in wanted:
+                (fresh if fetched_at >= cutoff else stale).add(entity_id)
+        return fresh, stale
+
+    def scan_raw(self, raw_root: str, entity_type: str, files: Dict[str, str], id_field: str) -> int:
+        """
+        把 raw_root/*/ 下的实体补进索引（已有的不动），返回新增了多少个。
+
+        :param files: 记录类型 -> 文件名，和爬虫写出时的 Records 一一对应；
+                      第一个是主文件，实体以它为准（其他文件里多出来的 ID 不算）
+        :param id_field: 记录里的实体 ID 字段
+
+        一个 worker 目录里这些文件的大小和修改时间都没变时跳过；
+        同一个实体每类记录取最新的一条（is_newer），和 ETL 一致。
+        """
+        if not os.path.isdir(raw_root):
+            return 0
+
+        known = {
+            path: (size, mtime)
+            for path, size, mtime in self._conn.execute("SELECT path, size, mtime FROM shards")
+        }
+        primary = next(iter(files))
+        # (实体 ID) -> (抓取时间, 记录类型 -> 最新记录)
+        latest: Dict[str, Tuple[float, Dict[str, Dict[str, Any]]]] = {}
+        scanned: List[Tuple[str, int, float]] = []
+        for name in sorted(os.listdir(raw_root)):
+            paths = {kind: os.path.join(raw_root, name, file_name) for kind, file_name in files.items()}
+            if not os.path.exists(paths[primary]):
+                continue
+            stats = {kind: os.stat(path) for kind, path in paths.items() if os.path.exists(path)}
+            shard = [(paths[kind], st.st_size, st.st_mtime) for kind, st in stats.items()]
+            if all(known.get(path) == (size, mtime) for path, size, mtime in shard):
+                continue
+            scanned += shard
+
+            by_kind: Dict[str, Dict[str, Dict[str, Any]]] = {kind: {} for kind in files}
+            for kind in stats:
+                for rec in _read_jsonl(paths[kind]):
+                    entity_id = str(rec.get(id_field) or "").strip()
+                    if not entity_id:
+                        continue
+                    old = by_kind[kind].get(entity_id)
+                    if old is None or is_newer(rec, old):
+                        by_kind[kind][entity_id] = rec
+
+            mtime = stats[primary].st_mtime
+            for entity_id, rec in by_kind[primary].items():
+                fetched_at = _stamp_seconds(rec.get(FETCHED_AT)) or mtime
+                entry = latest.get(entity_id)
+                if entry is not None and entry[0] > fetched_at:
+                    continue
+                latest[entity_id] = (fetched_at, {
+                    kind: recs[entity_id] for kind, recs in by_kind.items() if entity_id in recs
+                })
+
+        if not scanned:
+            return 0
+
+        rows = [
+            (entity_type, entity_id, fetched_at,
+             content_hash({kind: [recs[kind]] if kind in recs else [] for kind in files}))
+            for entity_id, (fetched_at, recs) in latest.items()
+        ]
+        self._conn.execute("BEGIN")
+        try:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO entities (entity_type, entity_id, fetched_at, content_hash) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            new = self._conn.total_changes - before
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO shards (path, size, mtime) VALUES (?, ?, ?)",
+                scanned,
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        print(f"[cache] 扫描 {len(scanned)} 个文件（{', '.join(files.values())}），新增 {new} 个 {entity_type}")
+        return new
+
+
+def _read_jsonl(path: str) -> Iterable[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(rec, dict):
+                yield rec
+
+
+# ====== 进程内共享的缓存 ======
+
+_cache: Optional[EntityCache] = None
+
+
+def open_entity_cache(path: str = ENTITY_CACHE_DB_PATH) -> EntityCache:
+    """
+    打开进程内共享的实体缓存。爬虫启动时调用（重放存档时不调用，不碰正式缓存），
+    之后写记录的地方用 get_entity_cache() 取。
+    """
+    global _cache
+    if _cache is None:
+        _cache = EntityCache(path)
+    return _cache
+
+
+def get_entity_cache() -> Optional[EntityCache]:
+    """进程内共享的实体缓存，没打开时为 None（写记录时不更新缓存）"""
+    return _cache
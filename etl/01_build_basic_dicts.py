@@ -27,21 +27,22 @@ build_basic_dicts.py
     ../data/raw/{worker_id}/movies_basic.jsonl
     ../data/raw/{worker_id}/movies_details.jsonl
     ../data/raw/{worker_id}/movie_awards.jsonl
-    ../data/raw/{worker_id}/person_details.jsonl
+    ../data/raw/{worker_id}/person_details_fixed.jsonl
+
+原始数据由 raw_scan.RawScanner 读取（BasicDictsStage）；和 02~05 一起单遍扫描见 run_raw_stages.py。
 
 使用方式（在仓库根目录）：
-    python -m etl.build_basic_dicts
-或
-    cd etl && python build_basic_dicts.py
+    python etl/01_build_basic_dicts.py
 """
 
 from __future__ import annotations
 
 import csv
-import json
 from pathlib import Path
 from typing import Dict, Tuple, Set, Optional
 
+from raw_scan import LatestById, RawConsumer, run_stages
+
 
 # ========== 路径配置（相对 etl 目录） ==========
 
@@ -54,39 +55,6 @@ ETL_OUT_DIR = DATA_DIR / "etl" / "basic_dicts"         # ../data/etl/basic_dicts
 
 # ========== 小工具函数 ==========
 
-def iter_worker_files(filename: str):
-    """
-    遍历 ../data/raw 下所有 worker 目录，依次 yield 某个文件存在的路径。
-
-    例如 iter_worker_files("movies_basic.jsonl")
-    """
-    if not RAW_ROOT_DIR.exists():
-        raise FileNotFoundError(f"RAW_ROOT_DIR 不存在: {RAW_ROOT_DIR}")
-
-    for child in sorted(RAW_ROOT_DIR.iterdir()):
-        if not child.is_dir():
-            continue
-        path = child / filename
-        if path.exists():
-            yield path
-
-
-def load_jsonl_lines(path: Path):
-    """读取一个 jsonl 文件，逐行 yield 解析后的对象（dict）。"""
-    with path.open("r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                obj = json.loads(line)
-            except json.JSONDecodeError as e:
-                print(f"[warn] JSON decode 失败，文件={path.name}，跳过一行: {e}")
-                continue
-            if isinstance(obj, dict):
-                yield obj
-
-
 def normalize_str(s: Optional[str]) -> Optional[str]:
     """简单字符串清洗：strip + 去掉首尾奇怪引号 / 空白。"""
     if not s:
@@ -97,128 +65,145 @@ def normalize_str(s: Optional[str]) -> Optional[str]:
     return s.strip(' "\u3000“”')
 
 
+def normalize_award_type(award_type_raw: Optional[str]) -> Optional[str]:
+    """标准化 award_type 为 'movie' / 'person'（如果识别不出就保留原样小写）"""
+    if not award_type_raw:
+        return None
+    lowered = award_type_raw.lower()
+    if "person" in lowered or "个人" in lowered or "演员" in lowered or "导演" in lowered or "编剧" in lowered:
+        return "person"
+    if "movie" in lowered or "影片" in lowered or "电影" in lowered:
+        return "movie"
+    return lowered
+
+
 # ========== 聚合阶段：从 raw 中收集所有候选值 ==========
 
-def collect_basic_sets():
+class BasicDictsStage(RawConsumer):
     """
-    扫描所有 worker 的原始 jsonl，汇总出若干 set/dict 结构，返回一个总 dict：
-        {
-          "genres": set[str],
-          "languages": set[str],
-          "regions": set[str],
-          "festivals": dict[(name, year) -> {"name":..., "year":..., "url":...}],
-          "awards": set[(festival_name, festival_year, award_name, award_type)],
-        }
+    扫描所有 worker 的原始 jsonl，汇总出若干 set/dict 结构：
+        genres    : set[str]                                  <- movies_basic.jsonl
+        languages : set[str]                                  <- movies_details.jsonl
+        regions   : set[str]                                  <- movies_details.jsonl + person_details_fixed.jsonl
+        festivals : dict[(name, year) -> {"name":..., "year":..., "url":...}]   <- movie_awards.jsonl
+        awards    : set[(festival_name, festival_year, award_name, award_type)] <- movie_awards.jsonl
+    同一部电影 / 同一个人物有多条记录时只看最新的一条（LatestById），
+    genres / languages / regions 在 finish() 里从最新的记录汇总，然后写出 5 张字典表。
     """
-    genres: Set[str] = set()
-    languages: Set[str] = set()
-    regions: Set[str] = set()
-
-    festivals: Dict[Tuple[str, Optional[int]], Dict[str, Optional[str]]] = {}
-    awards: Set[Tuple[str, Optional[int], str, Optional[str]]] = set()
-
-    # ---- 1. 从 movies_basic.jsonl 抽取 genres ----
-    print(">>> 收集电影类型（genres）...")
-    for path in iter_worker_files("movies_basic.jsonl"):
-        print(f"  - 扫描 {path}")
-        for obj in load_jsonl_lines(path):
-            raw_genres = obj.get("genres") or []
-            if not isinstance(raw_genres, list):
+
+    name = "01_build_basic_dicts"
+    files = (
+        "movies_basic.jsonl",
+        "movies_details.jsonl",
+        "person_details_fixed.jsonl",
+        "movie_awards.jsonl",
+    )
+
+    def __init__(self):
+        self.genres: Set[str] = set()
+        self.languages: Set[str] = set()
+        self.regions: Set[str] = set()
+        self.latest_basic = LatestById("movie_douban_id")
+        self.latest_details = LatestById("movie_douban_id")
+        self.latest_persons = LatestById("person_douban_id")
+
+        self.festivals: Dict[Tuple[str, Optional[int]], Dict[str, Optional[str]]] = {}
+        self.awards: Set[Tuple[str, Optional[int], str, Optional[str]]] = set()
+
+    def consume(self, file_name: str, obj: dict) -> None:
+        if file_name == "movies_basic.jsonl":
+            self.latest_basic.add(obj)
+        elif file_name == "movies_details.jsonl":
+            self.latest_details.add(obj)
+        elif file_name == "person_details_fixed.jsonl":
+            self.latest_persons.add(obj)
+        elif file_name == "movie_awards.jsonl":
+            self._collect_festival_award(obj)
+
+    def _collect_genres(self, obj: dict) -> None:
+        raw_genres = obj.get("genres") or []
+        if not isinstance(raw_genres, list):
+            return
+        for g in raw_genres:
+            name = normalize_str(g)
+            if not name:
                 continue
-            for g in raw_genres:
-                name = normalize_str(g)
-                if not name:
-                    continue
-                genres.add(name)
-
-    # ---- 2. 从 movies_details.jsonl 抽取 regions, languages ----
-    print(">>> 收集电影地区（regions）和语言（languages）...")
-    for path in iter_worker_files("movies_details.jsonl"):
-        print(f"  - 扫描 {path}")
-        for obj in load_jsonl_lines(path):
-            raw_regions = obj.get("regions") or []
-            if isinstance(raw_regions, list):
-                for r in raw_regions:
-                    name = normalize_str(r)
-                    if name:
-                        regions.add(name)
-
-            raw_langs = obj.get("languages") or []
-            if isinstance(raw_langs, list):
-                for lang in raw_langs:
-                    name = normalize_str(lang)
-                    if name:
-                        languages.add(name)
-
-    # ---- 3. 从 person_details.jsonl 抽取 birth_region，补充到 regions ----
-    print(">>> 收集人物出生地区（birth_region -> regions）...")
-    for path in iter_worker_files("person_details_fixed.jsonl"):
-        print(f"  - 扫描 {path}")
-        for obj in load_jsonl_lines(path):
+            self.genres.add(name)
+
+    def _collect_regions_languages(self, obj: dict) -> None:
+        raw_regions = obj.get("regions") or []
+        if isinstance(raw_regions, list):
+            for r in raw_regions:
+                name = normalize_str(r)
+                if name:
+                    self.regions.add(name)
+
+        raw_langs = obj.get("languages") or []
+        if isinstance(raw_langs, list):
+            for lang in raw_langs:
+                name = normalize_str(lang)
+                if name:
+                    self.languages.add(name)
+
+    def _collect_festival_award(self, obj: dict) -> None:
+        fest_name = normalize_str(obj.get("festival_name"))
+        fest_year = obj.get("festival_year")
+        fest_url = normalize_str(obj.get("festival_url"))
+
+        if fest_year is not None:
+            try:
+                fest_year = int(fest_year)
+            except (TypeError, ValueError):
+                fest_year = None
+
+        if fest_name:
+            key = (fest_name, fest_year)
+            if key not in self.festivals:
+                self.festivals[key] = {
+                    "name": fest_name,
+                    "year": fest_year,
+                    "url": fest_url,
+                }
+            else:
+                # 如果之前没有 url，这次有 url，就补上
+                if not self.festivals[key].get("url") and fest_url:
+                    self.festivals[key]["url"] = fest_url
+
+        award_name = normalize_str(obj.get("award_name"))
+        if award_name:
+            award_type = normalize_award_type(normalize_str(obj.get("award_type")))
+            self.awards.add((fest_name or "", fest_year, award_name, award_type))
+
+    def finish(self) -> None:
+        for obj in self.latest_basic.records.values():
+            self._collect_genres(obj)
+        for obj in self.latest_details.records.values():
+            self._collect_regions_languages(obj)
+        for obj in self.latest_persons.records.values():
+            # 人物出生地区（birth_region）补充到 regions
             br = normalize_str(obj.get("birth_region"))
             if br:
-                regions.add(br)
-
-    # ---- 4. 从 movie_awards.jsonl 抽取 festival + award ----
-    print(">>> 收集电影节（festivals）和奖项（awards）...")
-    for path in iter_worker_files("movie_awards.jsonl"):
-        print(f"  - 扫描 {path}")
-        for obj in load_jsonl_lines(path):
-            fest_name = normalize_str(obj.get("festival_name"))
-            fest_year = obj.get("festival_year")
-            fest_url = normalize_str(obj.get("festival_url"))
-
-            if fest_year is not None:
-                try:
-                    fest_year = int(fest_year)
-                except (TypeError, ValueError):
-                    fest_year = None
-
-            if fest_name:
-                key = (fest_name, fest_year)
-                if key not in festivals:
-                    festivals[key] = {
-                        "name": fest_name,
-                        "year": fest_year,
-                        "url": fest_url,
-                    }
-                else:
-                    # 如果之前没有 url，这次有 url，就补上
-                    if not festivals[key].get("url") and fest_url:
-                        festivals[key]["url"] = fest_url
-
-            award_name = normalize_str(obj.get("award_name"))
-            award_type_raw = normalize_str(obj.get("award_type"))
-            if award_name:
-                # 标准化 award_type 为 'movie' / 'person'（如果识别不出就保留原样小写）
-                award_type: Optional[str]
-                if award_type_raw:
-                    lowered = award_type_raw.lower()
-                    if "person" in lowered or "个人" in lowered or "演员" in lowered or "导演" in lowered or "编剧" in lowered:
-                        award_type = "person"
-                    elif "movie" in lowered or "影片" in lowered or "电影" in lowered:
-                        award_type = "movie"
-                    else:
-                        award_type = lowered
-                else:
-                    award_type = None
-
-                awards.add((fest_name or "", fest_year, award_name, award_type))
-
-    print("\n>>> 聚合结果：")
-    print(f"  - 类型（genres）数量           : {len(genres)}")
-    print(f"  - 语言（languages）数量        : {len(languages)}")
-    print(f"  - 地区（regions）数量          : {len(regions)}")
-    print(f"  - 电影节（festivals）数量      : {len(festivals)}")
-    print(f"  - 奖项（awards）组合数量       : {len(awards)}")
-
-    return {
-        "genres": genres,
-        "languages": languages,
-        "regions": regions,
-        "festivals": festivals,
-        "awards": awards,
-    }
+                self.regions.add(br)
+
+        print(">>> 聚合结果：")
+        print(f"  - 类型（genres）数量           : {len(self.genres)}")
+        print(f"  - 语言（languages）数量        : {len(self.languages)}")
+        print(f"  - 地区（regions）数量          : {len(self.regions)}")
+        print(f"  - 电影节（festivals）数量      : {len(self.festivals)}")
+        print(f"  - 奖项（awards）组合数量       : {len(self.awards)}")
+
+        ensure_out_dir()
+
+        # 1) 简单字典：genre, language, region
+        write_genre_dict(self.genres)
+        write_language_dict(self.languages)
+        write_region_dict(self.regions)
+
+        # 2) festival 字典（需要返回 ID 映射给 award 用）
+        festival_id_map = write_festival_dict(self.festivals)
+
+        # 3) award 字典
+        write_award_dict(self.awards, festival_id_map)
 
 
 # ========== 写 CSV 阶段：根据聚合结果生成字典表 ==========
@@ -331,19 +316,7 @@ def write_award_dict(
 def main():
     print("=== 构建基础字典表：genre / language / region / festival / award ===")
 
-    data = collect_basic_sets()
-    ensure_out_dir()
-
-    # 1) 简单字典：genre, language, region
-    write_genre_dict(data["genres"])
-    write_language_dict(data["languages"])
-    write_region_dict(data["regions"])
-
-    # 2) festival 字典（需要返回 ID 映射给 award 用）
-    festival_id_map = write_festival_dict(data["festivals"])
-
-    # 3) award 字典
-    write_award_dict(data["awards"], festival_id_map)
+    run_stages(str(RAW_ROOT_DIR), [BasicDictsStage()])
 
     print("\n=== 基础字典表构建完成 ===")
     print(f"输出目录: {ETL_OUT_DIR}")
@@ -46,14 +46,18 @@ build_movie_bridges_and_awards.py
 - 在数据库侧可以先建若干 staging 表，
   再通过 JOIN 到 Movie / Genre / Region / Language / Festival / Award，
   插入最终的 Movie_Genre / Movie_Region / Movie_Language / Award_Record。
+- 同一部电影在 movies_basic / movies_details 里有多条时（实体缓存过期后重新抓到、内容变了），
+  桥表只按最新的一条摊平（raw_scan.LatestById），旧记录里的类型 / 地区 / 语言不会留下来。
+- 原始数据由 raw_scan.RawScanner 读取（MovieBridgesStage）；和 01、03~05 一起单遍扫描见 run_raw_stages.py。
 """
 
 from __future__ import annotations
 
 import csv
-import json
 import os
-from typing import Dict, Iterable, List, Set, Tuple
+from typing import Dict, List, Set, Tuple
+
+from raw_scan import LatestById, RawConsumer, run_stages
 
 
 # ====== 路径配置（以 ./etl 为当前目录） ======
@@ -81,122 +85,15 @@ def ensure_dir(path: str) -> None:
         os.makedirs(path, exist_ok=True)
 
 
-def iter_worker_subdirs(root_dir: str) -> Iterable[str]:
-    """
-    遍历 ../data/raw 下所有 worker 子目录，返回绝对路径。
-    默认按目录名排序，便于结果稳定。
-    """
-    if not os.path.exists(root_dir):
-        raise FileNotFoundError(f"RAW_ROOT_DIR 不存在: {root_dir}")
-
-    for name in sorted(os.listdir(root_dir)):
-        subdir = os.path.join(root_dir, name)
-        if os.path.isdir(subdir):
-            yield subdir
-
-
-def iter_jsonl(path: str) -> Iterable[Dict]:
-    """逐行读取 jsonl 文件，yield 每一行的 dict"""
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                obj = json.loads(line)
-            except json.JSONDecodeError as e:
-                print(f"[warn] JSON decode 失败，文件={path}，错误={e}")
-                continue
-            yield obj
-
-
-# ====== 1. Movie-Genre / Movie-Region / Movie-Language 构建 ======
+# ====== 1. Movie-Genre / Movie-Region / Movie-Language + 2. Award_Record ======
 
-def build_movie_genre_region_language() -> Tuple[
-    List[Tuple[str, str]],
-    List[Tuple[str, str]],
-    List[Tuple[str, str]],
-]:
-    """
-    从 movies_basic.jsonl & movies_details.jsonl 中构建 3 个桥表的 (movie_douban_id, xxx_name) 记录。
-
-    返回值：
-        (movie_genres, movie_regions, movie_languages)
-        每个都是 list[(movie_douban_id, name)]
-    """
-    movie_genres_set: Set[Tuple[str, str]] = set()
-    movie_regions_set: Set[Tuple[str, str]] = set()
-    movie_languages_set: Set[Tuple[str, str]] = set()
-
-    # --- 1.1 从 movies_basic.jsonl 里抓类型 ---
-    for worker_dir in iter_worker_subdirs(RAW_ROOT_DIR):
-        basic_path = os.path.join(worker_dir, MOVIES_BASIC_FILENAME)
-        if not os.path.exists(basic_path):
-            continue
-
-        print(f"[movie-genre] 处理 {basic_path}")
-        for obj in iter_jsonl(basic_path):
-            mid = str(obj.get("movie_douban_id") or "").strip()
-            if not mid:
-                continue
-
-            genres = obj.get("genres") or []
-            if not isinstance(genres, list):
-                continue
-
-            for g in genres:
-                g_name = str(g).strip()
-                if not g_name:
-                    continue
-                movie_genres_set.add((mid, g_name))
-
-    # --- 1.2 从 movies_details.jsonl 里抓地区/语言 ---
-    for worker_dir in iter_worker_subdirs(RAW_ROOT_DIR):
-        details_path = os.path.join(worker_dir, MOVIES_DETAILS_FILENAME)
-        if not os.path.exists(details_path):
-            continue
-
-        print(f"[movie-region/lang] 处理 {details_path}")
-        for obj in iter_jsonl(details_path):
-            mid = str(obj.get("movie_douban_id") or "").strip()
-            if not mid:
-                continue
-
-            regions = obj.get("regions") or []
-            if isinstance(regions, list):
-                for r in regions:
-                    r_name = str(r).strip()
-                    if not r_name:
-                        continue
-                    movie_regions_set.add((mid, r_name))
-
-            languages = obj.get("languages") or []
-            if isinstance(languages, list):
-                for lang in languages:
-                    lang_name = str(lang).strip()
-                    if not lang_name:
-                        continue
-                    movie_languages_set.add((mid, lang_name))
-
-    # 转成 list 返回，顺便 sort 一下便于 diff
-    movie_genres = sorted(movie_genres_set)
-    movie_regions = sorted(movie_regions_set)
-    movie_languages = sorted(movie_languages_set)
-
-    print(f"[movie-genre] 总记录数: {len(movie_genres)}")
-    print(f"[movie-region] 总记录数: {len(movie_regions)}")
-    print(f"[movie-language] 总记录数: {len(movie_languages)}")
-
-    return movie_genres, movie_regions, movie_languages
-
-
-# ====== 2. Award_Record 构建（staging） ======
-
-def build_award_records() -> List[Dict[str, str]]:
+class MovieBridgesStage(RawConsumer):
     """
+    从 movies_basic.jsonl & movies_details.jsonl 中构建 3 个桥表的 (movie_douban_id, xxx_name) 记录，
     从 movie_awards.jsonl 中构建 Award_Record 的 staging 数据（不直接映射到 award_id / movie_id / person_id）。
+    basic / details 每部电影只取最新的一条，finish() 时再摊平。
 
-    返回 list[dict]，字段：
+    award_records 的每条 dict 字段：
         - festival_name
         - festival_year
         - award_name
@@ -207,57 +104,125 @@ def build_award_records() -> List[Dict[str, str]]:
         - person_name
         - extra_desc
     """
-    records: List[Dict[str, str]] = []
-
-    for worker_dir in iter_worker_subdirs(RAW_ROOT_DIR):
-        awards_path = os.path.join(worker_dir, MOVIE_AWARDS_FILENAME)
-        if not os.path.exists(awards_path):
-            continue
-
-        print(f"[award-record] 处理 {awards_path}")
-        for obj in iter_jsonl(awards_path):
-            movie_douban_id = str(obj.get("movie_douban_id") or "").strip()
-            fest_name = str(obj.get("festival_name") or "").strip()
-            fest_year = obj.get("festival_year")
-            award_name = str(obj.get("award_name") or "").strip()
-            award_type = str(obj.get("award_type") or "").strip()  # "Movie" / "Person"
-            is_winner = bool(obj.get("is_winner"))  # True / False
-
-            person_douban_id = str(obj.get("person_douban_id") or "").strip()
-            person_name = str(obj.get("person_name") or "").strip()
-            extra_desc = obj.get("extra_desc")
-            if extra_desc is not None:
-                extra_desc = str(extra_desc).strip()
-                if not extra_desc:
-                    extra_desc = None
-
-            # 基本字段缺失直接丢弃
-            if not movie_douban_id or not fest_name or fest_year is None or not award_name:
-                continue
 
-            # 规范化年份为 int
-            try:
-                fest_year_int = int(fest_year)
-            except Exception:
-                # 年份异常就略过
+    name = "02_build_movie_bridges_and_awards"
+    files = (MOVIES_BASIC_FILENAME, MOVIES_DETAILS_FILENAME, MOVIE_AWARDS_FILENAME)
+
+    def __init__(self):
+        self.movie_genres_set: Set[Tuple[str, str]] = set()
+        self.movie_regions_set: Set[Tuple[str, str]] = set()
+        self.movie_languages_set: Set[Tuple[str, str]] = set()
+        self.latest_basic = LatestById("movie_douban_id")
+        self.latest_details = LatestById("movie_douban_id")
+        self.award_records: List[Dict[str, str]] = []
+
+    def consume(self, file_name: str, obj: dict) -> None:
+        if file_name == MOVIES_BASIC_FILENAME:
+            self.latest_basic.add(obj)
+        elif file_name == MOVIES_DETAILS_FILENAME:
+            self.latest_details.add(obj)
+        elif file_name == MOVIE_AWARDS_FILENAME:
+            self._collect_award_record(obj)
+
+    # --- 1.1 从 movies_basic.jsonl 里抓类型 ---
+    def _collect_genres(self, obj: dict) -> None:
+        mid = str(obj.get("movie_douban_id") or "").strip()
+        if not mid:
+            return
+
+        genres = obj.get("genres") or []
+        if not isinstance(genres, list):
+            return
+
+        for g in genres:
+            g_name = str(g).strip()
+            if not g_name:
                 continue
+            self.movie_genres_set.add((mid, g_name))
 
-            # 记录一条 staging Award_Record
-            rec = {
-                "festival_name": fest_name,
-                "festival_year": fest_year_int,
-                "award_name": award_name,
-                "award_type": award_type,
-                "is_winner": "1" if is_winner else "0",
-                "movie_douban_id": movie_douban_id,
-                "person_douban_id": person_douban_id or "",
-                "person_name": person_name or "",
-                "extra_desc": extra_desc or "",
-            }
-            records.append(rec)
+    # --- 1.2 从 movies_details.jsonl 里抓地区/语言 ---
+    def _collect_regions_languages(self, obj: dict) -> None:
+        mid = str(obj.get("movie_douban_id") or "").strip()
+        if not mid:
+            return
+
+        regions = obj.get("regions") or []
+        if isinstance(regions, list):
+            for r in regions:
+                r_name = str(r).strip()
+                if not r_name:
+                    continue
+                self.movie_regions_set.add((mid, r_name))
 
-    print(f"[award-record] 总记录数: {len(records)}")
-    return records
+        languages = obj.get("languages") or []
+        if isinstance(languages, list):
+            for lang in languages:
+                lang_name = str(lang).strip()
+                if not lang_name:
+                    continue
+                self.movie_languages_set.add((mid, lang_name))
+
+    # --- 2. 从 movie_awards.jsonl 里抓奖项记录 ---
+    def _collect_award_record(self, obj: dict) -> None:
+        movie_douban_id = str(obj.get("movie_douban_id") or "").strip()
+        fest_name = str(obj.get("festival_name") or "").strip()
+        fest_year = obj.get("festival_year")
+        award_name = str(obj.get("award_name") or "").strip()
+        award_type = str(obj.get("award_type") or "").strip()  # "Movie" / "Person"
+        is_winner = bool(obj.get("is_winner"))  # True / False
+
+        person_douban_id = str(obj.get("person_douban_id") or "").strip()
+        person_name = str(obj.get("person_name") or "").strip()
+        extra_desc = obj.get("extra_desc")
+        if extra_desc is not None:
+            extra_desc = str(extra_desc).strip()
+            if not extra_desc:
+                extra_desc = None
+
+        # 基本字段缺失直接丢弃
+        if not movie_douban_id or not fest_name or fest_year is None or not award_name:
+            return
+
+        # 规范化年份为 int
+        try:
+            fest_year_int = int(fest_year)
+        except Exception:
+            # 年份异常就略过
+            return
+
+        # 记录一条 staging Award_Record
+        self.award_records.append({
+            "festival_name": fest_name,
+            "festival_year": fest_year_int,
+            "award_name": award_name,
+            "award_type": award_type,
+            "is_winner": "1" if is_winner else "0",
+            "movie_douban_id": movie_douban_id,
+            "person_douban_id": person_douban_id or "",
+            "person_name": person_name or "",
+            "extra_desc": extra_desc or "",
+        })
+
+    def finish(self) -> None:
+        for obj in self.latest_basic.records.values():
+            self._collect_genres(obj)
+        for obj in self.latest_details.records.values():
+            self._collect_regions_languages(obj)
+
+        print("=== 构建 Movie-Genre / Movie-Region / Movie-Language 桥表（staging） ===")
+        # 转成 list，顺便 sort 一下便于 diff
+        movie_genres = sorted(self.movie_genres_set)
+        movie_regions = sorted(self.movie_regions_set)
+        movie_languages = sorted(self.movie_languages_set)
+
+        print(f"[movie-genre] 总记录数: {len(movie_genres)}")
+        print(f"[movie-region] 总记录数: {len(movie_regions)}")
+        print(f"[movie-language] 总记录数: {len(movie_languages)}")
+        write_movie_bridges_csv(movie_genres, movie_regions, movie_languages)
+
+        print("\n=== 构建 Award_Record 事实表（staging） ===")
+        print(f"[award-record] 总记录数: {len(self.award_records)}")
+        write_award_records_csv(self.award_records)
 
 
 # ====== 3. 写出 CSV ======
@@ -321,14 +286,7 @@ def write_award_records_csv(records: List[Dict[str, str]]) -> None:
 # ====== main ======
 
 def main() -> None:
-    print("=== 构建 Movie-Genre / Movie-Region / Movie-Language 桥表（staging） ===")
-    movie_genres, movie_regions, movie_languages = build_movie_genre_region_language()
-    write_movie_bridges_csv(movie_genres, movie_regions, movie_languages)
-
-    print("\n=== 构建 Award_Record 事实表（staging） ===")
-    award_records = build_award_records()
-    write_award_records_csv(award_records)
-
+    run_stages(RAW_ROOT_DIR, [MovieBridgesStage()])
     print("\n所有桥表 / 奖项记录 ETL 完成。")
 
 
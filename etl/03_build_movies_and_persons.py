@@ -21,15 +21,23 @@
 输出（etl）：
   ../data/etl/movies.csv
   ../data/etl/persons.csv
+  ../data/etl/movies.idmap
+  ../data/etl/persons.idmap
 
 注意：
   - summary 中的换行会被压成空格，避免 CSV 换行问题。
+  - 同一部电影 / 同一个人物在 raw 里有多条时（实体缓存过期后重新抓到、内容变了），
+    取 fetched_at 最新的一条（raw_scan.LatestById）。
   - persons.csv 的 name 优先顺序：
       1) persons_seed.jsonl 中的 name（中英混合）
       2) movie_cast / movie_crew 中的 name
       3) person_details_fixed.jsonl 中的 name_cn（退路）
-  - 本脚本会为 Movie 和 Person 分配自增整数 id 列，
+  - 本脚本会为 Movie 和 Person 分配整数 id 列（id_registry.py，已分配的 id 不会变），
     后续脚本通过 (douban_id -> id) 映射来写各种桥表 / 事实表。
+  - 同时写出 ../data/etl/movies.idmap、persons.idmap（Douban ID -> id 的二进制映射，见 id_map.py），
+    后续阶段用它代替重新解析 movies.csv / persons.csv。
+  - 同时输出相对上一版的 delta：../data/etl/delta/movies.csv、persons.csv（新增 + 变化的行）。
+  - 原始数据由 raw_scan.RawScanner 读取（MoviesPersonsStage）；和 01、02、04、05 一起单遍扫描见 run_raw_stages.py。
 """
 
 from __future__ import annotations
@@ -37,7 +45,11 @@ from __future__ import annotations
 import csv
 import json
 import os
-from typing import Dict, Iterable
+from typing import Dict
+
+from id_map import MOVIES_IDMAP, PERSONS_IDMAP, write_id_map
+from id_registry import DELTA_DIR, DeltaCsvWriter, IdRegistry, load_row_digests
+from raw_scan import FETCHED_AT, LatestById, RawConsumer, run_stages
 
 # ========= 路径配置 =========
 
@@ -49,6 +61,9 @@ ETL_DIR = os.path.join(BASE_DIR, "..", "data", "etl")
 MOVIES_CSV = os.path.join(ETL_DIR, "movies.csv")
 PERSONS_CSV = os.path.join(ETL_DIR, "persons.csv")
 
+MOVIES_DELTA_CSV = os.path.join(DELTA_DIR, "movies.csv")
+PERSONS_DELTA_CSV = os.path.join(DELTA_DIR, "persons.csv")
+
 PERSON_SEED_PATH = os.path.join(SEED_DIR, "persons_seed.jsonl")
 
 
@@ -60,90 +75,43 @@ def ensure_dir_for_file(path: str) -> None:
         os.makedirs(d, exist_ok=True)
 
 
-def iter_worker_jsonl(file_name: str) -> Iterable[dict]:
-    """
-    遍历 ../data/raw 下所有 worker 目录，依次读取指定的 jsonl 文件。
-    """
-    if not os.path.exists(RAW_ROOT_DIR):
-        return
-
-    for entry in os.listdir(RAW_ROOT_DIR):
-        worker_dir = os.path.join(RAW_ROOT_DIR, entry)
-        if not os.path.isdir(worker_dir):
-            continue
-
-        path = os.path.join(worker_dir, file_name)
-        if not os.path.exists(path):
-            continue
-
-        print(f"[load] 读取 {path}")
-        with open(path, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    obj = json.loads(line)
-                except json.JSONDecodeError as e:
-                    print(f"[warn] JSON decode 失败: {path} {e}")
-                    continue
-                if isinstance(obj, dict):
-                    yield obj
-
-
 # ========= 构建 movies.csv =========
 
-def build_movies() -> None:
+def build_movies(basic_by_mid: Dict[str, dict], summary_by_mid: Dict[str, str]) -> None:
     """
-    从 movies_basic.jsonl + movies_summary.jsonl 构建 movies.csv。
+    从 movies_basic.jsonl + movies_summary.jsonl 的汇总结果构建 movies.csv。
 
     这里不做类型/语言/地区桥表，那些已经在其他 ETL 里处理。
     """
-    # 汇总基础信息：movie_douban_id -> record
-    basic_by_mid: Dict[str, dict] = {}
-    for rec in iter_worker_jsonl("movies_basic.jsonl"):
-        mid = str(rec.get("movie_douban_id") or "").strip()
-        if not mid:
-            continue
-        # 若有重复，以第一条为准即可
-        if mid not in basic_by_mid:
-            basic_by_mid[mid] = rec
-
-    # 剧情简介（可能缺失）
-    summary_by_mid: Dict[str, str] = {}
-    for rec in iter_worker_jsonl("movies_summary.jsonl"):
-        mid = str(rec.get("movie_douban_id") or "").strip()
-        if not mid:
-            continue
-        summary = str(rec.get("summary") or "").strip()
-        if not summary:
-            continue
-        # 压平换行，避免 CSV 中断行
-        summary_clean = " ".join(summary.split())
-        summary_by_mid[mid] = summary_clean
-
     print(f"[movies] 基本信息条数: {len(basic_by_mid)}")
     print(f"[movies] 有剧情简介的条数: {len(summary_by_mid)}")
 
-    # 为电影分配内部整数 id（1,2,3,...)。
-    # 为了稳定可复现，这里按照 Douban ID 数字升序来排。
+    # 为电影分配内部整数 id：已登记的沿用，新电影按 Douban ID 数字升序接着往后编。
     all_mids_sorted = sorted(basic_by_mid.keys(), key=lambda x: int(x))
-
+    with IdRegistry() as registry:
+        registry.bootstrap_from_csv("movie", MOVIES_CSV, "movie_douban_id")
+        movie_ids = registry.assign("movie", all_mids_sorted)
+
+    # 注意增加了 id 列，后续脚本会用它作为内部主键
+    header = [
+        "id",                # 内部 id（id_registry 分配，不会变）
+        "movie_douban_id",   # Douban ID（字符串）
+        "title",
+        "image_url",
+        "release_date",
+        "runtime_minutes",
+        "summary",
+    ]
+
+    # 上一版 movies.csv 要在覆盖之前读出来，用来算 delta
+    old_rows = load_row_digests(MOVIES_CSV)
     ensure_dir_for_file(MOVIES_CSV)
-    with open(MOVIES_CSV, "w", encoding="utf-8", newline="") as f:
+    with open(MOVIES_CSV, "w", encoding="utf-8", newline="") as f, \
+            DeltaCsvWriter(MOVIES_DELTA_CSV, header, old_rows) as delta:
         writer = csv.writer(f)
-        # 注意增加了 id 列，后续脚本会用它作为内部主键
-        writer.writerow([
-            "id",                # 内部自增 id（这里预先分配好）
-            "movie_douban_id",   # Douban ID（字符串）
-            "title",
-            "image_url",
-            "release_date",
-            "runtime_minutes",
-            "summary",
-        ])
-
-        for idx, mid in enumerate(all_mids_sorted, start=1):
+        writer.writerow(header)
+
+        for mid in all_mids_sorted:
             b = basic_by_mid[mid]
             title = b.get("title") or ""
             image_url = b.get("image_url") or ""
@@ -151,17 +119,21 @@ def build_movies() -> None:
             runtime = b.get("runtime_minutes") or ""
             summary = summary_by_mid.get(mid, "")
 
-            writer.writerow([
-                idx,        # id
-                mid,        # movie_douban_id
+            row = [
+                movie_ids[mid],     # id
+                mid,                # movie_douban_id
                 title,
                 image_url,
                 release_date,
                 runtime,
                 summary,
-            ])
+            ]
+            writer.writerow(row)
+            delta.add(row)
 
     print(f"[movies] 已写出 {MOVIES_CSV}")
+    # 给 04~08 用的二进制映射（movies.csv 里的每一行）
+    write_id_map(MOVIES_IDMAP, ((mid, movie_ids[mid]) for mid in all_mids_sorted))
 
 
 # ========= 构建 persons.csv =========
@@ -202,78 +174,12 @@ def load_seed_person_names() -> Dict[str, str]:
     return mapping
 
 
-def load_person_details_fixed() -> Dict[str, dict]:
-    """
-    从各 worker 的 person_details_fixed.jsonl 中读取人物详细信息：
-
-    字段示例：
-      - person_douban_id
-      - name_cn
-      - avatar_url
-      - sex
-      - birth_date
-      - death_date
-      - birth_place_raw
-      - birth_region
-      - imdb_id
-    """
-    details_by_pid: Dict[str, dict] = {}
-
-    for rec in iter_worker_jsonl("person_details_fixed.jsonl"):
-        pid = str(rec.get("person_douban_id") or "").strip()
-        if not pid:
-            continue
-        # 若有重复（多 worker），取第一条为主
-        if pid not in details_by_pid:
-            details_by_pid[pid] = rec
-
-    print(f"[person_details_fixed] 读取到 {len(details_by_pid)} 条人物详情")
-    return details_by_pid
-
-
-def load_person_names_from_credits() -> Dict[str, str]:
-    """
-    从 movie_cast.jsonl + movie_crew.jsonl 中收集人物名称（中英混合），
-    防止那些没进种子的人完全没名字。
-    """
-    name_by_pid: Dict[str, str] = {}
-
-    # cast
-    for rec in iter_worker_jsonl("movie_cast.jsonl"):
-        pid = str(rec.get("person_douban_id") or "").strip()
-        if not pid:
-            continue
-        if pid in name_by_pid:
-            continue
-        name = str(rec.get("name") or "").strip()
-        if not name:
-            continue
-        name_by_pid[pid] = name
-
-    # crew
-    for rec in iter_worker_jsonl("movie_crew.jsonl"):
-        pid = str(rec.get("person_douban_id") or "").strip()
-        if not pid:
-            continue
-        if pid in name_by_pid:
-            continue
-        name = str(rec.get("name") or "").strip()
-        if not name:
-            continue
-        name_by_pid[pid] = name
-
-    print(f"[credits] 从 cast/crew 中补充到 {len(name_by_pid)} 条人物名称")
-    return name_by_pid
-
-
-def build_persons() -> None:
+def build_persons(details_by_pid: Dict[str, dict], credit_names: Dict[str, str]) -> None:
     """
     综合 persons_seed + person_details_fixed + cast/crew 中的人物，
     构建 persons.csv，并为每个人物分配整数 id。
     """
     seed_names = load_seed_person_names()
-    details_by_pid = load_person_details_fixed()
-    credit_names = load_person_names_from_credits()
 
     # 最终要进入 persons.csv 的人物集合：
     #   - 在 person_details_fixed 中出现的（即我们调过 API 的种子人物）
@@ -281,30 +187,39 @@ def build_persons() -> None:
     all_pids = set(details_by_pid.keys()) | set(credit_names.keys())
     print(f"[persons] 汇总人物 ID 总数: {len(all_pids)}")
 
-    # 为了保证 id 稳定，按 Douban ID 数字升序
+    # 新人物按 Douban ID 数字升序接着往后编（拿不到名字、不写出的人也占一个 id，和以前一样）
     all_pids_sorted = sorted(all_pids, key=lambda x: int(x))
-
+    with IdRegistry() as registry:
+        registry.bootstrap_from_csv("person", PERSONS_CSV, "person_douban_id")
+        person_ids = registry.assign("person", all_pids_sorted)
+
+    # 注意：增加了 id 列，其余列保持原有设计，方便后续使用
+    header = [
+        "id",                # 内部 id（id_registry 分配，不会变）
+        "person_douban_id",  # Douban ID
+        "name",
+        "avatar_url",
+        "sex",
+        "birth_date",
+        "death_date",
+        "birth_place_raw",
+        "birth_region",
+        "imdb_id",
+    ]
+
+    old_rows = load_row_digests(PERSONS_CSV)
     ensure_dir_for_file(PERSONS_CSV)
-    with open(PERSONS_CSV, "w", encoding="utf-8", newline="") as f:
+    with open(PERSONS_CSV, "w", encoding="utf-8", newline="") as f, \
+            DeltaCsvWriter(PERSONS_DELTA_CSV, header, old_rows) as delta:
         writer = csv.writer(f)
-        # 注意：增加了 id 列，其余列保持原有设计，方便后续使用
-        writer.writerow([
-            "id",                # 内部自增 id
-            "person_douban_id",  # Douban ID
-            "name",
-            "avatar_url",
-            "sex",
-            "birth_date",
-            "death_date",
-            "birth_place_raw",
-            "birth_region",
-            "imdb_id",
-        ])
+        writer.writerow(header)
 
         wrote = 0
         skipped_no_name = 0
+        # 实际写进 persons.csv 的 (person_douban_id, id)，写二进制映射用
+        written_ids = []
 
-        for idx, pid in enumerate(all_pids_sorted, start=1):
+        for pid in all_pids_sorted:
             info = details_by_pid.get(pid, {})
 
             # name 优先级：
@@ -330,9 +245,9 @@ def build_persons() -> None:
             birth_region = str(info.get("birth_region") or "").strip()
             imdb_id = str(info.get("imdb_id") or "").strip()
 
-            writer.writerow([
-                idx,          # id
-                pid,          # person_douban_id
+            row = [
+                person_ids[pid],    # id
+                pid,                # person_douban_id
                 name,
                 avatar_url,
                 sex,
@@ -341,21 +256,97 @@ def build_persons() -> None:
                 birth_place_raw,
                 birth_region,
                 imdb_id,
-            ])
+            ]
+            writer.writerow(row)
+            delta.add(row)
+            written_ids.append((pid, person_ids[pid]))
             wrote += 1
 
     print(f"[persons] 共写入 {wrote} 条人物记录")
     if skipped_no_name:
         print(f"[persons] 跳过 {skipped_no_name} 条（完全拿不到名字）")
     print(f"[persons] 已写出 {PERSONS_CSV}")
+    write_id_map(PERSONS_IDMAP, written_ids)
+
+
+# ========= 扫描阶段：从 raw 中汇总 =========
+
+class MoviesPersonsStage(RawConsumer):
+    """
+    扫描时汇总：
+      - movies_basic.jsonl          -> 每部电影最新的基本信息
+      - movies_summary.jsonl        -> 每部电影最新的剧情简介（比基本信息旧的不要：那次重新抓到时已经没有简介了）
+      - person_details_fixed.jsonl  -> 每个人物最新的详情
+      - movie_cast / movie_crew     -> 人物名称，防止那些没进种子的人完全没名字
+    扫描结束后写出 movies.csv / persons.csv。
+    """
+
+    name = "03_build_movies_and_persons"
+    files = (
+        "movies_basic.jsonl",
+        "movies_summary.jsonl",
+        "person_details_fixed.jsonl",
+        "movie_cast.jsonl",
+        "movie_crew.jsonl",
+    )
+
+    def __init__(self):
+        self.latest_basic = LatestById("movie_douban_id")
+        self.latest_summary = LatestById("movie_douban_id")
+        self.latest_details = LatestById("person_douban_id")
+        # cast / crew 分开记：名称以 cast 为先，crew 只补 cast 里没有的人；
+        # 单遍扫描时两个文件按 worker 交替到达，合在一起记会改变先后
+        self.cast_names: Dict[str, str] = {}
+        self.crew_names: Dict[str, str] = {}
+
+    def consume(self, file_name: str, rec: dict) -> None:
+        if file_name == "movies_basic.jsonl":
+            self.latest_basic.add(rec)
+
+        elif file_name == "movies_summary.jsonl":
+            if str(rec.get("summary") or "").strip():
+                self.latest_summary.add(rec)
+
+        elif file_name == "person_details_fixed.jsonl":
+            self.latest_details.add(rec)
+
+        else:
+            names = self.cast_names if file_name == "movie_cast.jsonl" else self.crew_names
+            pid = str(rec.get("person_douban_id") or "").strip()
+            if not pid or pid in names:
+                return
+            name = str(rec.get("name") or "").strip()
+            if name:
+                names[pid] = name
+
+    def summaries(self) -> Dict[str, str]:
+        """每部电影最新的剧情简介（压平换行，避免 CSV 中断行）"""
+        summary_by_mid: Dict[str, str] = {}
+        for mid, rec in self.latest_summary.records.items():
+            basic = self.latest_basic.get(mid) or {}
+            # subject 的三类记录是同一次抓取一起写出的，fetched_at 相同；
+            # 简介比基本信息旧，说明最新那次抓到的页面已经没有简介了
+            if str(rec.get(FETCHED_AT) or "") < str(basic.get(FETCHED_AT) or ""):
+                continue
+            summary_by_mid[mid] = " ".join(str(rec["summary"]).split())
+        return summary_by_mid
+
+    def finish(self) -> None:
+        build_movies(self.latest_basic.records, self.summaries())
+
+        details_by_pid = self.latest_details.records
+        print(f"[person_details_fixed] 读取到 {len(details_by_pid)} 条人物详情")
+        credit_names = dict(self.crew_names)
+        credit_names.update(self.cast_names)
+        print(f"[credits] 从 cast/crew 中补充到 {len(credit_names)} 条人物名称")
+        build_persons(details_by_pid, credit_names)
 
 
 # ========= main =========
 
 def main():
     print("===> 构建 movies.csv / persons.csv（含内部整数 id 与 Douban ID 映射）")
-    build_movies()
-    build_persons()
+    run_stages(RAW_ROOT_DIR, [MoviesPersonsStage()], missing_ok=True)
     print("===> 03_build_movies_and_persons.py 完成")
 
 
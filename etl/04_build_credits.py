@@ -10,8 +10,8 @@
 - 幕后职员信息表 Crew_Credit
 
 输入：
-  - ../data/etl/movies.csv
-  - ../data/etl/persons.csv
+  - ../data/etl/movies.idmap     (03 写出的 movie_douban_id -> movie_id 映射，见 id_map.py)
+  - ../data/etl/persons.idmap    (person_douban_id -> person_id)
   - ../data/etl/positions.csv    (可选，若不存在则自动创建)
   - ../data/raw/{worker_id}/movie_cast.jsonl
   - ../data/raw/{worker_id}/movie_crew.jsonl
@@ -20,15 +20,21 @@
   - ../data/etl/positions.csv
   - ../data/etl/cast_credit.csv
   - ../data/etl/crew_credit.csv
+  - ../data/etl/delta/ 下三张表相对上一版的 delta 和删除文件（见 id_registry.py）
+
+原始数据由 raw_scan.RawScanner 读取（CreditsStage）；和 01~03、05 一起单遍扫描见 run_raw_stages.py。
 """
 
 from __future__ import annotations
 
 import csv
-import json
 import os
 import re
-from typing import Dict, Iterable, List, Tuple, Optional
+from typing import Any, Dict, Iterable, List, Tuple, Optional
+
+from id_map import MOVIES_IDMAP, PERSONS_IDMAP, IdMap
+from id_registry import ID_KEY, csv_delta
+from raw_scan import RawConsumer, run_stages
 
 
 # ====== 路径配置（etl 脚本在 ./etl 下） ======
@@ -37,13 +43,21 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 RAW_ROOT_DIR = os.path.join(BASE_DIR, "..", "data", "raw")
 ETL_DIR = os.path.join(BASE_DIR, "..", "data", "etl")
 
-MOVIES_CSV = os.path.join(ETL_DIR, "movies.csv")
-PERSONS_CSV = os.path.join(ETL_DIR, "persons.csv")
 POSITIONS_CSV = os.path.join(ETL_DIR, "positions.csv")
 
 CREW_CREDIT_CSV = os.path.join(ETL_DIR, "crew_credit.csv")
 CAST_CREDIT_CSV = os.path.join(ETL_DIR, "cast_credit.csv")
 
+# delta 的自然键（列下标，见 id_registry.csv_delta）
+CREW_CREDIT_KEY = (0, 1, 2)  # movie_id, person_id, position_id
+CAST_CREDIT_KEY = (0, 1, 2)  # movie_id, person_id, role_name
+
+# 扫描时留下的字段：
+#   crew: (movie_douban_id, person_douban_id, role, department, order)
+#   cast: (movie_douban_id, person_douban_id, role, order)
+CrewRow = Tuple[str, str, str, str, Any]
+CastRow = Tuple[str, str, str, Any]
+
 
 # ====== 小工具 ======
 
@@ -53,111 +67,6 @@ def ensure_dir_for_file(path: str) -> None:
         os.makedirs(d, exist_ok=True)
 
 
-def _detect_columns(kind: str, fieldnames: List[str]) -> Tuple[Optional[str], Optional[str]]:
-    """
-    自动检测：
-      - douban 列名
-      - 内部 id 列名
-
-    kind: "movie" 或 "person"
-    返回 (douban_col, id_col)，某个找不到则为 None。
-    """
-    fieldnames_set = set(fieldnames)
-
-    if kind == "movie":
-        douban_candidates = ["douban_id", "movie_douban_id", "movie_id"]
-        id_candidates = ["id", "movie_id"]
-    else:
-        douban_candidates = ["douban_id", "person_douban_id", "person_id"]
-        id_candidates = ["id", "person_id"]
-
-    douban_col = next((c for c in douban_candidates if c in fieldnames_set), None)
-    id_col = next((c for c in id_candidates if c in fieldnames_set), None)
-
-    return douban_col, id_col
-
-
-def load_id_map_from_csv(path: str, kind: str) -> Dict[str, int]:
-    """
-    从 CSV 中加载 Douban ID -> 内部整数 ID 的映射。
-
-    - kind="movie":  movie_douban_id -> movie_id
-    - kind="person": person_douban_id -> person_id
-
-    若没有独立的 id 列，则直接使用 douban_id 作为内部 ID
-    （即 movie_id = int(movie_douban_id)）。
-    """
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"缺少映射 CSV：{path}")
-
-    with open(path, "r", encoding="utf-8", newline="") as f:
-        reader = csv.DictReader(f)
-        fieldnames = reader.fieldnames or []
-        if not fieldnames:
-            print(f"[{kind}] CSV 无表头：{path}")
-            return {}
-
-        douban_col, id_col = _detect_columns(kind, fieldnames)
-        print(f"[{kind}] 检测到列: douban_col={douban_col!r}, id_col={id_col!r}")
-
-        if douban_col is None:
-            print(f"[{kind}] 未找到豆瓣 ID 列（{path}），返回空映射")
-            return {}
-
-        mapping: Dict[str, int] = {}
-        for row in reader:
-            douban_raw = row.get(douban_col)
-            if douban_raw is None:
-                continue
-            douban = str(douban_raw).strip()
-            if not douban:
-                continue
-
-            # 如果没有独立的 id 列，就用 douban 自己当 id
-            internal_raw = row.get(id_col) if id_col is not None else douban
-            try:
-                internal_id = int(str(internal_raw).strip())
-            except (TypeError, ValueError):
-                # 实在不行就跳过这一行
-                continue
-
-            mapping[douban] = internal_id
-
-    return mapping
-
-
-def iter_worker_jsonl(file_name: str) -> Iterable[Dict]:
-    """
-    遍历 ../data/raw 下所有 worker 目录，依次读取给定文件名的 jsonl。
-    file_name: "movie_cast.jsonl" 或 "movie_crew.jsonl"
-    """
-    if not os.path.exists(RAW_ROOT_DIR):
-        return
-
-    for entry in os.listdir(RAW_ROOT_DIR):
-        worker_dir = os.path.join(RAW_ROOT_DIR, entry)
-        if not os.path.isdir(worker_dir):
-            continue
-
-        path = os.path.join(worker_dir, file_name)
-        if not os.path.exists(path):
-            continue
-
-        print(f"[load] 读取 {path}")
-        with open(path, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    obj = json.loads(line)
-                except json.JSONDecodeError as e:
-                    print(f"[warn] JSON decode 失败: {path} {e}")
-                    continue
-                if isinstance(obj, dict):
-                    yield obj
-
-
 # ====== 职位表 Position 维护 ======
 
 def load_positions(path: str) -> Tuple[Dict[str, int], List[Dict[str, str]], int]:
@@ -284,8 +193,9 @@ def is_principal_by_order(order_val: Optional[int], threshold: int = 3) -> bool:
 # ====== 核心 ETL ======
 
 def build_crew_credit(
-        movie_id_map: Dict[str, int],
-        person_id_map: Dict[str, int],
+        crew_rows: Iterable[CrewRow],
+        movie_id_map: IdMap,
+        person_id_map: IdMap,
         positions_by_name: Dict[str, int],
         position_rows: List[Dict[str, str]],
         max_position_id_ref: List[int],
@@ -308,23 +218,16 @@ def build_crew_credit(
         skipped_no_movie = 0
         skipped_no_person = 0
 
-        for rec in iter_worker_jsonl("movie_crew.jsonl"):
-            movie_did = str(rec.get("movie_douban_id") or "").strip()
-            person_did = str(rec.get("person_douban_id") or "").strip()
-            role_field = (rec.get("role") or "").strip()
-            department = (rec.get("department") or "").strip()
-            order_val = rec.get("order")
-
-            if not movie_did or movie_did not in movie_id_map:
+        for movie_did, person_did, role_field, department, order_val in crew_rows:
+            movie_id = movie_id_map.get(movie_did) if movie_did else None
+            if movie_id is None:
                 skipped_no_movie += 1
                 continue
-            if not person_did or person_did not in person_id_map:
+            person_id = person_id_map.get(person_did) if person_did else None
+            if person_id is None:
                 skipped_no_person += 1
                 continue
 
-            movie_id = movie_id_map[movie_did]
-            person_id = person_id_map[person_did]
-
             # 职位名：优先 role，退化到 department，最后 Unknown
             pos_raw = role_field or department or "Unknown"
             pos_name = " ".join(pos_raw.split())  # 去掉内部换行/多空格，保留中英文原样
@@ -354,8 +257,9 @@ def build_crew_credit(
 
 
 def build_cast_credit(
-        movie_id_map: Dict[str, int],
-        person_id_map: Dict[str, int],
+        cast_rows: Iterable[CastRow],
+        movie_id_map: IdMap,
+        person_id_map: IdMap,
         out_path: str,
 ) -> None:
     """
@@ -375,22 +279,16 @@ def build_cast_credit(
         skipped_no_movie = 0
         skipped_no_person = 0
 
-        for rec in iter_worker_jsonl("movie_cast.jsonl"):
-            movie_did = str(rec.get("movie_douban_id") or "").strip()
-            person_did = str(rec.get("person_douban_id") or "").strip()
-            role_field = (rec.get("role") or "").strip()
-            order_val = rec.get("order")
-
-            if not movie_did or movie_did not in movie_id_map:
+        for movie_did, person_did, role_field, order_val in cast_rows:
+            movie_id = movie_id_map.get(movie_did) if movie_did else None
+            if movie_id is None:
                 skipped_no_movie += 1
                 continue
-            if not person_did or person_did not in person_id_map:
+            person_id = person_id_map.get(person_did) if person_did else None
+            if person_id is None:
                 skipped_no_person += 1
                 continue
 
-            movie_id = movie_id_map[movie_did]
-            person_id = person_id_map[person_did]
-
             role_name = extract_role_name(role_field)
             role_name = " ".join(role_name.split())  # 去掉内部换行 / 多余空白
 
@@ -411,41 +309,76 @@ def build_cast_credit(
         print(f"[cast] 跳过 {skipped_no_person} 条（缺 person 映射）")
 
 
-def main():
-    print("===> 构建 Cast_Credit / Crew_Credit 以及 Position 字典")
-
-    # 1. 读取电影 / 人员映射（列名自动探测）
-    movie_id_map = load_id_map_from_csv(MOVIES_CSV, kind="movie")
-    person_id_map = load_id_map_from_csv(PERSONS_CSV, kind="person")
-    print(f"[movies] 映射条数: {len(movie_id_map)}")
-    print(f"[persons] 映射条数: {len(person_id_map)}")
-
-    # 2. 职位表：加载已有数据，稍后可能扩展
-    positions_by_name, position_rows, max_id = load_positions(POSITIONS_CSV)
-    max_id_ref = [max_id]
-    print(f"[positions] 已有职位 {len(positions_by_name)} 个，当前 max_id={max_id}")
-
-    # 3. 生成 Crew_Credit（会动态新增 Position）
-    build_crew_credit(
-        movie_id_map,
-        person_id_map,
-        positions_by_name,
-        position_rows,
-        max_id_ref,
-        CREW_CREDIT_CSV,
-    )
-
-    # 4. 生成 Cast_Credit
-    build_cast_credit(
-        movie_id_map,
-        person_id_map,
-        CAST_CREDIT_CSV,
-    )
-
-    # 5. 回写 / 新建 Position 表
-    save_positions(POSITIONS_CSV, position_rows)
-    print(f"[positions] 最终职位数 {len(position_rows)}，已写回 {POSITIONS_CSV}")
+class CreditsStage(RawConsumer):
+    """
+    扫描时只记下 cast / crew 里用得到的字段（movies.idmap / persons.idmap 可能还没写出来，
+    单遍扫描时它们由同一轮的 03 在 finish 里写），finish() 里再加载 ID 映射、写出 Credit 表。
+    """
+
+    name = "04_build_credits"
+    files = ("movie_crew.jsonl", "movie_cast.jsonl")
+
+    def __init__(self):
+        self.crew_rows: List[CrewRow] = []
+        self.cast_rows: List[CastRow] = []
+
+    def consume(self, file_name: str, rec: dict) -> None:
+        movie_did = str(rec.get("movie_douban_id") or "").strip()
+        person_did = str(rec.get("person_douban_id") or "").strip()
+        role_field = (rec.get("role") or "").strip()
+        order_val = rec.get("order")
+        if file_name == "movie_crew.jsonl":
+            department = (rec.get("department") or "").strip()
+            self.crew_rows.append((movie_did, person_did, role_field, department, order_val))
+        else:
+            self.cast_rows.append((movie_did, person_did, role_field, order_val))
+
+    def finish(self) -> None:
+        print("===> 构建 Cast_Credit / Crew_Credit 以及 Position 字典")
+
+        # 1. 电影 / 人员映射（mmap，打开即用）
+        movie_id_map = IdMap(MOVIES_IDMAP)
+        person_id_map = IdMap(PERSONS_IDMAP)
+        print(f"[movies] 映射条数: {len(movie_id_map)}")
+        print(f"[persons] 映射条数: {len(person_id_map)}")
+
+        with csv_delta(POSITIONS_CSV, ID_KEY), \
+                csv_delta(CREW_CREDIT_CSV, CREW_CREDIT_KEY), \
+                csv_delta(CAST_CREDIT_CSV, CAST_CREDIT_KEY):
+            # 2. 职位表：加载已有数据，稍后可能扩展
+            positions_by_name, position_rows, max_id = load_positions(POSITIONS_CSV)
+            max_id_ref = [max_id]
+            print(f"[positions] 已有职位 {len(positions_by_name)} 个，当前 max_id={max_id}")
+
+            # 3. 生成 Crew_Credit（会动态新增 Position）
+            build_crew_credit(
+                self.crew_rows,
+                movie_id_map,
+                person_id_map,
+                positions_by_name,
+                position_rows,
+                max_id_ref,
+                CREW_CREDIT_CSV,
+            )
+
+            # 4. 生成 Cast_Credit
+            build_cast_credit(
+                self.cast_rows,
+                movie_id_map,
+                person_id_map,
+                CAST_CREDIT_CSV,
+            )
+
+            movie_id_map.close()
+            person_id_map.close()
 
+            # 5. 回写 / 新建 Position 表
+            save_positions(POSITIONS_CSV, position_rows)
+            print(f"[positions] 最终职位数 {len(position_rows)}，已写回 {POSITIONS_CSV}")
+
+
+def main():
+    run_stages(RAW_ROOT_DIR, [CreditsStage()], missing_ok=True)
     print("===> build_credits.py 完成")
 
 
@@ -10,7 +10,7 @@
 - 观影记录事实表 watching_records.csv
 
 输入：
-  - ../data/etl/basic_dicts/movies.csv
+  - ../data/etl/movies.idmap（03 写出的 movie_douban_id -> movie_id 映射，见 id_map.py）
   - ../data/raw/{worker_id}/movie_ratings.jsonl
   - ../data/raw/{worker_id}/movie_watch_records.jsonl
 
@@ -18,15 +18,21 @@
   - ../data/etl/basic_dicts/users.csv
   - ../data/etl/basic_dicts/movie_ratings.csv
   - ../data/etl/basic_dicts/watching_records.csv
+  - ../data/etl/delta/users.csv（相对上一版新增 / 变化的用户，user id 由 id_registry.py 分配，不会变）
+
+原始数据由 raw_scan.RawScanner 读取（UsersAndCommentsStage）；和 01~04 一起单遍扫描见 run_raw_stages.py。
 """
 
 from __future__ import annotations
 
 import csv
-import json
 import os
 import re
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from id_map import MOVIES_IDMAP, IdMap
+from id_registry import DELTA_DIR, DeltaCsvWriter, IdRegistry, load_row_digests
+from raw_scan import RawConsumer, run_stages
 
 
 # ====== 路径配置（etl 脚本在 ./etl 下） ======
@@ -35,12 +41,18 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 RAW_ROOT_DIR = os.path.join(BASE_DIR, "..", "data", "raw")
 ETL_DIR = os.path.join(BASE_DIR, "..", "data", "etl")
 
-MOVIES_CSV = os.path.join(ETL_DIR, "movies.csv")
-
 USERS_CSV = os.path.join(ETL_DIR, "users.csv")
 MOVIE_RATINGS_CSV = os.path.join(ETL_DIR, "movie_ratings.csv")
 WATCHING_RECORDS_CSV = os.path.join(ETL_DIR, "watching_records.csv")
 
+USERS_DELTA_CSV = os.path.join(DELTA_DIR, "users.csv")
+
+# 扫描时留下的字段：
+#   rating: (movie_douban_id, user_hash, rating, created_at, review)
+#   watch : (movie_douban_id, user_hash, status, created_at, star)
+RatingRow = Tuple[str, str, Any, str, str]
+WatchRow = Tuple[str, str, str, str, str]
+
 
 # ====== 小工具 ======
 
@@ -50,102 +62,6 @@ def ensure_dir_for_file(path: str) -> None:
         os.makedirs(d, exist_ok=True)
 
 
-def iter_worker_jsonl(file_name: str) -> Iterable[Dict]:
-    """
-    遍历 ../data/raw 下所有 worker 目录，依次读取给定文件名的 jsonl。
-    file_name: "movie_ratings.jsonl" 或 "movie_watch_records.jsonl"
-    """
-    if not os.path.exists(RAW_ROOT_DIR):
-        return
-
-    for entry in sorted(os.listdir(RAW_ROOT_DIR)):
-        worker_dir = os.path.join(RAW_ROOT_DIR, entry)
-        if not os.path.isdir(worker_dir):
-            continue
-
-        path = os.path.join(worker_dir, file_name)
-        if not os.path.exists(path):
-            continue
-
-        print(f"[load] 读取 {path}")
-        with open(path, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    obj = json.loads(line)
-                except json.JSONDecodeError as e:
-                    print(f"[warn] JSON decode 失败: {path} {e}")
-                    continue
-                if isinstance(obj, dict):
-                    yield obj
-
-
-def _detect_columns(kind: str, fieldnames: List[str]) -> Tuple[Optional[str], Optional[str]]:
-    """
-    自动检测：
-      - douban 列名
-      - 内部 id 列名
-
-    kind: "movie"
-    返回 (douban_col, id_col)，某个找不到则为 None。
-    """
-    fieldnames_set = set(fieldnames)
-
-    if kind == "movie":
-        douban_candidates = ["douban_id", "movie_douban_id", "movie_id"]
-        id_candidates = ["id", "movie_id"]
-    else:
-        raise ValueError(f"未知 kind: {kind}")
-
-    douban_col = next((c for c in douban_candidates if c in fieldnames_set), None)
-    id_col = next((c for c in id_candidates if c in fieldnames_set), None)
-
-    return douban_col, id_col
-
-
-def load_movie_id_map(path: str) -> Dict[str, int]:
-    """
-    从 movies.csv 中加载 Douban ID -> 内部整数 ID 的映射。
-    """
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"缺少 movies 映射 CSV：{path}")
-
-    with open(path, "r", encoding="utf-8", newline="") as f:
-        reader = csv.DictReader(f)
-        fieldnames = reader.fieldnames or []
-        if not fieldnames:
-            print("[movie] CSV 无表头")
-            return {}
-
-        douban_col, id_col = _detect_columns("movie", fieldnames)
-        print(f"[movie] 检测到列: douban_col={douban_col!r}, id_col={id_col!r}")
-
-        if douban_col is None:
-            print("[movie] 未找到豆瓣 ID 列，返回空映射")
-            return {}
-
-        mapping: Dict[str, int] = {}
-        for row in reader:
-            douban_raw = row.get(douban_col)
-            if douban_raw is None:
-                continue
-            douban = str(douban_raw).strip()
-            if not douban:
-                continue
-
-            internal_raw = row.get(id_col) if id_col is not None else douban
-            try:
-                internal_id = int(str(internal_raw).strip())
-            except (TypeError, ValueError):
-                continue
-
-            mapping[douban] = internal_id
-
-    return mapping
-
-
 # 文本清洗：去掉换行并压缩空白，防止 summary / review 在 CSV 里断行
 _TEXT_WS_RE = re.compile(r"\s+")
 
@@ -178,56 +94,58 @@ def normalize_text(value: Optional[str], max_len: Optional[int] = None) -> str:
 
 # ====== 第一步：收集用户，生成 users.csv ======
 
-def collect_users() -> Dict[str, Dict[str, str]]:
+def collect_user(users: Dict[str, Dict[str, str]], rec: dict) -> None:
     """
-    从 movie_ratings.jsonl / movie_watch_records.jsonl 里收集所有 user_hash。
-    返回:
+    从一条 movie_ratings / movie_watch_records 记录里收集 user_hash（第一次出现为准）：
       user_hash -> {"name": name, "email": email}
     """
-    users: Dict[str, Dict[str, str]] = {}
-
-    for file_name in ("movie_ratings.jsonl", "movie_watch_records.jsonl"):
-        for rec in iter_worker_jsonl(file_name):
-            user_hash = str(rec.get("user_hash") or "").strip()
-            if not user_hash:
-                continue
-
-            username_raw = normalize_text(rec.get("username_raw") or "", max_len=50)
+    user_hash = str(rec.get("user_hash") or "").strip()
+    if not user_hash:
+        return
 
-            if user_hash not in users:
-                # 构造一个安全的占位邮箱
-                email = f"{user_hash}@douban.example"
-                users[user_hash] = {
-                    "name": username_raw,
-                    "email": email,
-                }
+    username_raw = normalize_text(rec.get("username_raw") or "", max_len=50)
 
-    return users
+    if user_hash not in users:
+        # 构造一个安全的占位邮箱
+        email = f"{user_hash}@douban.example"
+        users[user_hash] = {
+            "name": username_raw,
+            "email": email,
+        }
 
 
 def build_users_csv(users: Dict[str, Dict[str, str]]) -> Dict[str, int]:
     """
-    写出 users.csv，并返回 user_hash -> user_id 映射。
+    写出 users.csv（以及相对上一版的 delta/users.csv），并返回 user_hash -> user_id 映射。
+    user_id 由 id_registry 分配：老用户沿用原 id，新用户按 user_hash 排序接着往后编。
     """
-    ensure_dir_for_file(USERS_CSV)
+    hashes_sorted = sorted(users.keys())
+    with IdRegistry() as registry:
+        registry.bootstrap_from_csv("user", USERS_CSV, "user_hash")
+        registered = registry.assign("user", hashes_sorted)
 
+    header = ["id", "user_hash", "name", "email"]
     user_id_map: Dict[str, int] = {}
-    next_id = 1
 
-    with open(USERS_CSV, "w", encoding="utf-8", newline="") as f:
+    # 上一版 users.csv 要在覆盖之前读出来，用来算 delta
+    old_rows = load_row_digests(USERS_CSV)
+    ensure_dir_for_file(USERS_CSV)
+    with open(USERS_CSV, "w", encoding="utf-8", newline="") as f, \
+            DeltaCsvWriter(USERS_DELTA_CSV, header, old_rows) as delta:
         writer = csv.writer(f)
-        writer.writerow(["id", "user_hash", "name", "email"])
+        writer.writerow(header)
 
-        for user_hash in sorted(users.keys()):
+        for user_hash in hashes_sorted:
             info = users[user_hash]
             name = normalize_text(info.get("name") or "", max_len=50)
             email = normalize_text(info.get("email") or "", max_len=100)
 
-            user_id = next_id
-            next_id += 1
+            user_id = registered[user_hash]
             user_id_map[user_hash] = user_id
 
-            writer.writerow([user_id, user_hash, name, email])
+            row = [user_id, user_hash, name, email]
+            writer.writerow(row)
+            delta.add(row)
 
     print(f"[users] 共写入 {len(user_id_map)} 个用户到 {USERS_CSV}")
     return user_id_map
@@ -236,7 +154,8 @@ def build_users_csv(users: Dict[str, Dict[str, str]]) -> Dict[str, int]:
 # ====== 第二步：生成 movie_ratings.csv ======
 
 def build_movie_ratings(
-        movie_id_map: Dict[str, int],
+        rating_rows: Iterable[RatingRow],
+        movie_id_map: IdMap,
         user_id_map: Dict[str, int],
 ) -> None:
     """
@@ -255,31 +174,23 @@ def build_movie_ratings(
 
         next_id = 1
 
-        for rec in iter_worker_jsonl("movie_ratings.jsonl"):
-            movie_did = str(rec.get("movie_douban_id") or "").strip()
-            user_hash = str(rec.get("user_hash") or "").strip()
-
-            if not movie_did or movie_did not in movie_id_map:
+        for movie_did, user_hash, rating_val, created_at, review in rating_rows:
+            movie_id = movie_id_map.get(movie_did) if movie_did else None
+            if movie_id is None:
                 skipped_no_movie += 1
                 continue
             if not user_hash or user_hash not in user_id_map:
                 skipped_no_user += 1
                 continue
 
-            movie_id = movie_id_map[movie_did]
             user_id = user_id_map[user_hash]
 
-            rating_val = rec.get("rating")
             try:
                 rating = int(rating_val)
             except (TypeError, ValueError):
                 # rating 不合法就跳过
                 continue
 
-            created_at = (rec.get("created_at") or "").strip()
-            review_raw = rec.get("review") or ""
-            review = normalize_text(review_raw, max_len=1000)
-
             writer.writerow([
                 next_id,
                 movie_id,
@@ -301,7 +212,8 @@ def build_movie_ratings(
 # ====== 第三步：生成 watching_records.csv ======
 
 def build_watching_records(
-        movie_id_map: Dict[str, int],
+        watch_rows: Iterable[WatchRow],
+        movie_id_map: IdMap,
         user_id_map: Dict[str, int],
 ) -> None:
     """
@@ -320,25 +232,17 @@ def build_watching_records(
 
         next_id = 1
 
-        for rec in iter_worker_jsonl("movie_watch_records.jsonl"):
-            movie_did = str(rec.get("movie_douban_id") or "").strip()
-            user_hash = str(rec.get("user_hash") or "").strip()
-
-            if not movie_did or movie_did not in movie_id_map:
+        for movie_did, user_hash, status, created_at, star_str in watch_rows:
+            movie_id = movie_id_map.get(movie_did) if movie_did else None
+            if movie_id is None:
                 skipped_no_movie += 1
                 continue
             if not user_hash or user_hash not in user_id_map:
                 skipped_no_user += 1
                 continue
 
-            movie_id = movie_id_map[movie_did]
             user_id = user_id_map[user_hash]
 
-            status = (rec.get("status") or "").strip() or "unknown"
-            created_at = (rec.get("created_at") or "").strip()
-            star_flag = bool(rec.get("star"))
-            star_str = "TRUE" if star_flag else "FALSE"
-
             writer.writerow([
                 next_id,
                 movie_id,
@@ -357,26 +261,64 @@ def build_watching_records(
         print(f"[watch] 跳过 {skipped_no_user} 条（缺 user 映射）")
 
 
-# ====== 主流程 ======
+# ====== 扫描阶段 ======
 
-def main():
-    print("===> 构建 users / movie_ratings / watching_records")
+class UsersAndCommentsStage(RawConsumer):
+    """
+    扫描时收集用户，并记下评分 / 观影记录里用得到的字段（review 先清洗截断，不留整段原文）；
+    finish() 里再打开 movies.idmap 映射、写出三张表。
+    """
 
-    # 1. 加载电影映射
-    movie_id_map = load_movie_id_map(MOVIES_CSV)
-    print(f"[movies] 映射条数: {len(movie_id_map)}")
+    name = "05_build_users_and_comments"
+    files = ("movie_ratings.jsonl", "movie_watch_records.jsonl")
+
+    def __init__(self):
+        # 两个文件分开收集用户：同一个 user_hash 以 movie_ratings 里的名字为先
+        self.rating_users: Dict[str, Dict[str, str]] = {}
+        self.watch_users: Dict[str, Dict[str, str]] = {}
+        self.rating_rows: List[RatingRow] = []
+        self.watch_rows: List[WatchRow] = []
+
+    def consume(self, file_name: str, rec: dict) -> None:
+        movie_did = str(rec.get("movie_douban_id") or "").strip()
+        user_hash = str(rec.get("user_hash") or "").strip()
+        created_at = (rec.get("created_at") or "").strip()
+
+        if file_name == "movie_ratings.jsonl":
+            collect_user(self.rating_users, rec)
+            review = normalize_text(rec.get("review") or "", max_len=1000)
+            self.rating_rows.append((movie_did, user_hash, rec.get("rating"), created_at, review))
+        else:
+            collect_user(self.watch_users, rec)
+            status = (rec.get("status") or "").strip() or "unknown"
+            star_str = "TRUE" if bool(rec.get("star")) else "FALSE"
+            self.watch_rows.append((movie_did, user_hash, status, created_at, star_str))
 
-    # 2. 收集所有用户并写出 users.csv
-    users = collect_users()
-    print(f"[users] 收集到 {len(users)} 个唯一 user_hash")
-    user_id_map = build_users_csv(users)
+    def finish(self) -> None:
+        print("===> 构建 users / movie_ratings / watching_records")
 
-    # 3. 生成评分表
-    build_movie_ratings(movie_id_map, user_id_map)
+        # 1. 电影映射（mmap，打开即用）
+        movie_id_map = IdMap(MOVIES_IDMAP)
+        print(f"[movies] 映射条数: {len(movie_id_map)}")
 
-    # 4. 生成观影记录表
-    build_watching_records(movie_id_map, user_id_map)
+        # 2. 汇总所有用户并写出 users.csv
+        users = dict(self.watch_users)
+        users.update(self.rating_users)
+        print(f"[users] 收集到 {len(users)} 个唯一 user_hash")
+        user_id_map = build_users_csv(users)
 
+        # 3. 生成评分表
+        build_movie_ratings(self.rating_rows, movie_id_map, user_id_map)
+
+        # 4. 生成观影记录表
+        build_watching_records(self.watch_rows, movie_id_map, user_id_map)
+        movie_id_map.close()
+
+
+# ====== 主流程 ======
+
+def main():
+    run_stages(RAW_ROOT_DIR, [UsersAndCommentsStage()], missing_ok=True)
     print("===> 05_build_users_and_comments.py 完成")
 
 
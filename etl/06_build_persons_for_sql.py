@@ -11,11 +11,11 @@ build_award_record_for_sql.py
         festival_name,festival_year,award_name,award_type,is_winner,
         movie_douban_id,person_douban_id,person_name,extra_desc
 
-  - ../data/etl/movies.csv
-      用于 movie_douban_id -> movie.id 映射
+  - ../data/etl/movies.idmap
+      03 写出的 movie_douban_id -> movie.id 映射（见 id_map.py）
 
-  - ../data/etl/persons.csv
-      用于 person_douban_id -> person.id 映射
+  - ../data/etl/persons.idmap
+      person_douban_id -> person.id 映射
 
   - ../data/etl/basic_dicts/dict_festival.csv
       festival_id, name, year
@@ -28,6 +28,9 @@ build_award_record_for_sql.py
       字段：
         award_id,movie_id,person_id,is_winner,description
 
+  - ../data/etl/delta/award_record_for_sql.csv、award_record_for_sql.removed.csv
+      相对上一版的 delta 和删除文件（按 award_id, movie_id, person_id 对行，见 id_registry.py）
+
 然后可在 psql 中执行：
   \copy award_record (award_id, movie_id, person_id, is_winner, description)
     from '.../data/etl/award_record_for_sql.csv'
@@ -40,17 +43,20 @@ import csv
 import os
 from typing import Dict, Tuple, Optional
 
+from id_map import MOVIES_IDMAP, PERSONS_IDMAP, IdMap
+from id_registry import csv_delta
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 ETL_DIR = os.path.join(BASE_DIR, "..", "data", "etl")
 DICT_DIR = os.path.join(ETL_DIR, "basic_dicts")
 
 AWARD_RECORDS_CSV = os.path.join(ETL_DIR, "award_records.csv")
-MOVIES_CSV = os.path.join(ETL_DIR, "movies.csv")
-PERSONS_CSV = os.path.join(ETL_DIR, "persons.csv")
 DICT_FESTIVAL_CSV = os.path.join(DICT_DIR, "dict_festival.csv")
 DICT_AWARD_CSV = os.path.join(DICT_DIR, "dict_award.csv")
 
 OUT_CSV = os.path.join(ETL_DIR, "award_record_for_sql.csv")
+# delta 的自然键：award_id, movie_id, person_id
+OUT_KEY = (0, 1, 2)
 
 
 def ensure_dir_for_file(path: str) -> None:
@@ -61,58 +67,6 @@ def ensure_dir_for_file(path: str) -> None:
 
 # ========== 1. 基础映射加载 ==========
 
-def load_movie_id_map() -> Dict[str, int]:
-    """
-    movies.csv: id,movie_douban_id,title,...
-    返回: {movie_douban_id: movie_id}
-    """
-    path = MOVIES_CSV
-    mapping: Dict[str, int] = {}
-
-    print(f"[movie] 读取 {path}")
-    with open(path, "r", encoding="utf-8", newline="") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            did = str(row.get("movie_douban_id") or "").strip()
-            mid_raw = row.get("id")
-            if not did or mid_raw is None:
-                continue
-            try:
-                mid = int(str(mid_raw).strip())
-            except ValueError:
-                continue
-            mapping[did] = mid
-
-    print(f"[movie] 映射条数: {len(mapping)}")
-    return mapping
-
-
-def load_person_id_map() -> Dict[str, int]:
-    """
-    persons.csv: id,person_douban_id,name,...
-    返回: {person_douban_id: person_id}
-    """
-    path = PERSONS_CSV
-    mapping: Dict[str, int] = {}
-
-    print(f"[person] 读取 {path}")
-    with open(path, "r", encoding="utf-8", newline="") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            did = str(row.get("person_douban_id") or "").strip()
-            pid_raw = row.get("id")
-            if not did or pid_raw is None:
-                continue
-            try:
-                pid = int(str(pid_raw).strip())
-            except ValueError:
-                continue
-            mapping[did] = pid
-
-    print(f"[person] 映射条数: {len(mapping)}")
-    return mapping
-
-
 def load_festival_map() -> Dict[Tuple[str, int], int]:
     """
     dict_festival.csv: festival_id,name,year
@@ -201,8 +155,10 @@ def clean_description(text: Optional[str]) -> str:
 
 
 def build_award_record_for_sql() -> None:
-    movie_map = load_movie_id_map()
-    person_map = load_person_id_map()
+    movie_map = IdMap(MOVIES_IDMAP)
+    person_map = IdMap(PERSONS_IDMAP)
+    print(f"[movie] 映射条数: {len(movie_map)}")
+    print(f"[person] 映射条数: {len(person_map)}")
     fest_map = load_festival_map()
     award_map = load_award_map()
 
@@ -295,6 +251,9 @@ def build_award_record_for_sql() -> None:
             })
             written += 1
 
+    movie_map.close()
+    person_map.close()
+
     print(f"[award_record] 总记录数: {total}")
     print(f"[award_record] 成功写入: {written}")
     if skipped_missing_movie:
@@ -308,7 +267,8 @@ def build_award_record_for_sql() -> None:
 
 
 def main() -> None:
-    build_award_record_for_sql()
+    with csv_delta(OUT_CSV, OUT_KEY):
+        build_award_record_for_sql()
     print("===> award_record_for_sql.csv 构建完成")
 
 
@@ -3,13 +3,14 @@
 """
 06_build_movie_bridges.py
 
-根据 movie_* 源 CSV + basic_dicts 字典 + movies.csv，
+根据 movie_* 源 CSV + basic_dicts 字典 + movies.idmap（03 写出的电影 ID 映射），
 生成可以直接 \copy INTO 三张桥表的 CSV：
 
 输出：
   - movie_genre_for_sql.csv   : movie_id, genre_id
   - movie_region_for_sql.csv  : movie_id, region_id
   - movie_language_for_sql.csv: movie_id, language_id
+  - ../data/etl/delta/ 下三张桥表相对上一版的 delta 和删除文件（整行就是键，见 id_registry.py）
 """
 
 from __future__ import annotations
@@ -18,6 +19,9 @@ import csv
 import os
 from typing import Dict, Set, Tuple
 
+from id_map import MOVIES_IDMAP, IdMap
+from id_registry import csv_delta
+
 
 # ====== 路径配置（etl 脚本在 ./etl 下） ======
 
@@ -25,8 +29,6 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 ETL_DIR = os.path.join(BASE_DIR, "..", "data", "etl")
 BASIC_DICTS_DIR = os.path.join(ETL_DIR, "basic_dicts")
 
-MOVIES_CSV = os.path.join(ETL_DIR, "movies.csv")
-
 MOVIE_GENRES_SRC = os.path.join(ETL_DIR, "movie_genres.csv")
 MOVIE_REGIONS_SRC = os.path.join(ETL_DIR, "movie_regions.csv")
 MOVIE_LANGUAGES_SRC = os.path.join(ETL_DIR, "movie_languages.csv")
@@ -38,6 +40,8 @@ DICT_LANGUAGE_CSV = os.path.join(BASIC_DICTS_DIR, "dict_language.csv")
 OUT_MOVIE_GENRE = os.path.join(ETL_DIR, "movie_genre_for_sql.csv")
 OUT_MOVIE_REGION = os.path.join(ETL_DIR, "movie_region_for_sql.csv")
 OUT_MOVIE_LANGUAGE = os.path.join(ETL_DIR, "movie_language_for_sql.csv")
+# delta 的自然键：movie_id, xxx_id
+BRIDGE_KEY = (0, 1)
 
 
 def ensure_dir_for_file(path: str) -> None:
@@ -48,32 +52,6 @@ def ensure_dir_for_file(path: str) -> None:
 
 # ====== 通用加载函数 ======
 
-def load_movie_id_map(path: str) -> Dict[str, int]:
-    """
-    从 movies.csv 加载 movie_douban_id -> movie_id 映射。
-    """
-    mapping: Dict[str, int] = {}
-    print(f"[movie] 加载电影映射: {path}")
-
-    with open(path, "r", encoding="utf-8", newline="") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            douban_raw = row.get("movie_douban_id")
-            id_raw = row.get("id")
-            if not douban_raw or not id_raw:
-                continue
-            douban = str(douban_raw).strip()
-            try:
-                mid = int(str(id_raw).strip())
-            except ValueError:
-                continue
-            if douban:
-                mapping[douban] = mid
-
-    print(f"[movie] 共加载 {len(mapping)} 条 douban_id -> movie_id 映射")
-    return mapping
-
-
 def load_name_id_dict(path: str, id_field: str, name_field: str, label: str) -> Dict[str, int]:
     """
     从 basic_dicts/*.csv 加载 name -> id 映射。
@@ -113,7 +91,7 @@ def load_name_id_dict(path: str, id_field: str, name_field: str, label: str) ->
 def build_bridge_csv(
         source_path: str,
         out_path: str,
-        movie_map: Dict[str, int],
+        movie_map: IdMap,
         dict_map: Dict[str, int],
         name_col: str,
         label: str,
@@ -204,8 +182,9 @@ def build_bridge_csv(
 def main() -> None:
     print("===> 构建 movie_genre / movie_region / movie_language 三张桥表 CSV")
 
-    # 1. movie 映射
-    movie_map = load_movie_id_map(MOVIES_CSV)
+    # 1. movie 映射（mmap，打开即用）
+    movie_map = IdMap(MOVIES_IDMAP)
+    print(f"[movie] 共 {len(movie_map)} 条 douban_id -> movie_id 映射")
 
     # 2. 三个字典映射
     genre_map = load_name_id_dict(DICT_GENRE_CSV, "genre_id", "name", "genre")
@@ -213,33 +192,37 @@ def main() -> None:
     language_map = load_name_id_dict(DICT_LANGUAGE_CSV, "lang_id", "name", "language")
 
     # 3. 逐个构建桥表 CSV
-    build_bridge_csv(
-        source_path=MOVIE_GENRES_SRC,
-        out_path=OUT_MOVIE_GENRE,
-        movie_map=movie_map,
-        dict_map=genre_map,
-        name_col="genre_name",
-        label="genre",
-    )
-
-    build_bridge_csv(
-        source_path=MOVIE_REGIONS_SRC,
-        out_path=OUT_MOVIE_REGION,
-        movie_map=movie_map,
-        dict_map=region_map,
-        name_col="region_name",
-        label="region",
-    )
-
-    build_bridge_csv(
-        source_path=MOVIE_LANGUAGES_SRC,
-        out_path=OUT_MOVIE_LANGUAGE,
-        movie_map=movie_map,
-        dict_map=language_map,
-        name_col="language_name",
-        label="language",
-    )
-
+    with csv_delta(OUT_MOVIE_GENRE, BRIDGE_KEY):
+        build_bridge_csv(
+            source_path=MOVIE_GENRES_SRC,
+            out_path=OUT_MOVIE_GENRE,
+            movie_map=movie_map,
+            dict_map=genre_map,
+            name_col="genre_name",
+            label="genre",
+        )
+
+    with csv_delta(OUT_MOVIE_REGION, BRIDGE_KEY):
+        build_bridge_csv(
+            source_path=MOVIE_REGIONS_SRC,
+            out_path=OUT_MOVIE_REGION,
+            movie_map=movie_map,
+            dict_map=region_map,
+            name_col="region_name",
+            label="region",
+        )
+
+    with csv_delta(OUT_MOVIE_LANGUAGE, BRIDGE_KEY):
+        build_bridge_csv(
+            source_path=MOVIE_LANGUAGES_SRC,
+            out_path=OUT_MOVIE_LANGUAGE,
+            movie_map=movie_map,
+            dict_map=language_map,
+            name_col="language_name",
+            label="language",
+        )
+
+    movie_map.close()
     print("===> 三张桥表 CSV 构建完成")
 
 
@@ -6,8 +6,8 @@ build_award_records_for_sql.py
 把 ETL 层的 award_records.csv 转成可以直接 \copy INTO award_record 的 CSV：
 
 输入（都在 ../data/etl/）：
-  - movies.csv            （movie_douban_id -> movie.id）
-  - persons.csv           （person_douban_id -> person.id）
+  - movies.idmap          （movie_douban_id -> movie.id，03 写出，见 id_map.py）
+  - persons.idmap         （person_douban_id -> person.id）
   - festivals.csv         （id, name, year）
   - awards.csv            （id, fest_id, name, type）
   - award_records.csv     （festival_name,festival_year,award_name,award_type,is_winner,
@@ -15,6 +15,11 @@ build_award_records_for_sql.py
 
 输出：
   - award_record_for_sql.csv （award_id,movie_id,person_id,is_winner,description）
+
+注意：本脚本已被 06_build_persons_for_sql.py 取代（同一个输出文件）。
+这里读的还是旧的字典列名（id / fest_id / type），对不上 01 写出的
+dict_festival.csv / dict_award.csv（festival_id / award_id / award_type），
+只会写出表头。run_etl.py 不运行本脚本。
 """
 
 from __future__ import annotations
@@ -23,11 +28,11 @@ import csv
 import os
 from typing import Dict, Tuple
 
+from id_map import MOVIES_IDMAP, PERSONS_IDMAP, IdMap
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 ETL_DIR = os.path.join(BASE_DIR, "..", "data", "etl")
 
-MOVIES_CSV = os.path.join(ETL_DIR, "movies.csv")
-PERSONS_CSV = os.path.join(ETL_DIR, "persons.csv")
 FESTIVALS_CSV = os.path.join(ETL_DIR, "basic_dicts/dict_festival.csv")
 AWARDS_CSV = os.path.join(ETL_DIR, "basic_dicts/dict_award.csv")
 AWARD_RECORDS_SRC = os.path.join(ETL_DIR, "award_records.csv")
@@ -35,52 +40,6 @@ AWARD_RECORDS_SRC = os.path.join(ETL_DIR, "award_records.csv")
 AWARD_RECORDS_OUT = os.path.join(ETL_DIR, "award_record_for_sql.csv")
 
 
-def load_movie_map(path: str) -> Dict[str, int]:
-    """
-    movies.csv: id,movie_douban_id,...
-    -> {movie_douban_id: id}
-    """
-    m: Dict[str, int] = {}
-    print(f"[movie] 读取 {path}")
-    with open(path, "r", encoding="utf-8", newline="") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            did = (row.get("movie_douban_id") or "").strip()
-            mid_raw = row.get("id")
-            if not did or not mid_raw:
-                continue
-            try:
-                mid = int(mid_raw)
-            except ValueError:
-                continue
-            m[did] = mid
-    print(f"[movie] 映射条数: {len(m)}")
-    return m
-
-
-def load_person_map(path: str) -> Dict[str, int]:
-    """
-    persons.csv: id,person_douban_id,...
-    -> {person_douban_id: id}
-    """
-    m: Dict[str, int] = {}
-    print(f"[person] 读取 {path}")
-    with open(path, "r", encoding="utf-8", newline="") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            did = (row.get("person_douban_id") or "").strip()
-            pid_raw = row.get("id")
-            if not did or not pid_raw:
-                continue
-            try:
-                pid = int(pid_raw)
-            except ValueError:
-                continue
-            m[did] = pid
-    print(f"[person] 映射条数: {len(m)}")
-    return m
-
-
 def load_festival_map(path: str) -> Dict[Tuple[str, int], int]:
     """
     festivals.csv: id,name,year
@@ -140,8 +99,8 @@ def ensure_dir_for_file(path: str) -> None:
 
 
 def build_award_records() -> None:
-    movie_map = load_movie_map(MOVIES_CSV)
-    person_map = load_person_map(PERSONS_CSV)
+    movie_map = IdMap(MOVIES_IDMAP)
+    person_map = IdMap(PERSONS_IDMAP)
     festival_map = load_festival_map(FESTIVALS_CSV)
     award_map = load_award_map(AWARDS_CSV)
 
@@ -15,6 +15,8 @@ build_app_users_for_sql.py
     - id   -> 直接沿用 users.csv 里的 id
     - name -> 使用 user_hash 作为用户名（脱敏、稳定）
     - mail -> 使用 email 字段
+
+同时写出相对上一版的 delta：../data/etl/delta/app_users_for_sql.csv、app_users_for_sql.removed.csv（按 id 对行）。
 """
 
 from __future__ import annotations
@@ -23,6 +25,8 @@ import csv
 import os
 from typing import Dict, Set
 
+from id_registry import ID_KEY, csv_delta
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 ETL_DIR = os.path.join(BASE_DIR, "..", "data", "etl")
 
@@ -94,7 +98,8 @@ def build_app_users_for_sql() -> None:
 
 
 def main() -> None:
-    build_app_users_for_sql()
+    with csv_delta(APP_USERS_FOR_SQL_CSV, ID_KEY):
+        build_app_users_for_sql()
     print("===> app_users_for_sql.csv 构建完成")
 
 
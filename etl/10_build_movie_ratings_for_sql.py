@@ -18,21 +18,49 @@ build_movie_ratings_for_sql.py
   - review 去掉换行，压成一行，并截断到 200 字符；
   - 对于重复的 (user_id, movie_id)，只保留一条记录：
         默认保留 created_at 较晚的一条。
+
+去重默认在内存里做（一个 (user_id, movie_id) -> 行 的 dict）。评论太多放不下时加 --memory-budget，
+改用 external_dedupe.ExternalDedupe 外排序 + k 路归并，保留规则不变，输出改为按 (user_id, movie_id) 排序：
+    python etl/10_build_movie_ratings_for_sql.py --memory-budget 512M
+
+装了 numpy 时可以用 --engine numpy 走列式引擎（见 columnar.py），输出和默认实现逐字节一致。
+
+同时写出相对上一版的 delta：../data/etl/delta/movie_ratings_for_sql.csv、movie_ratings_for_sql.removed.csv
+（按 (user_id, movie_id) 对行，见 id_registry.py；上一版只记每行的摘要，和去重引擎无关）。
 """
 
 from __future__ import annotations
 
+import argparse
 import csv
 import os
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
+
+from columnar import (
+    CHUNK_ROWS,
+    ENGINES,
+    int_strs,
+    np,
+    parse_int_column,
+    read_column_chunks,
+    require_numpy,
+    str_array,
+    WinnerSet,
+)
+from external_dedupe import ExternalDedupe, parse_memory_budget
+from id_registry import csv_delta
 
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 ETL_DIR = os.path.join(BASE_DIR, "..", "data", "etl")
 
 SRC_CSV = os.path.join(ETL_DIR, "movie_ratings.csv")
+# delta 的自然键：user_id, movie_id
+OUT_KEY = (0, 1)
 OUT_CSV = os.path.join(ETL_DIR, "movie_ratings_for_sql.csv")
 
+OUT_HEADER = ["user_id", "movie_id", "rating", "created_at", "review"]
+
 
 def ensure_dir_for_file(path: str) -> None:
     d = os.path.dirname(path)
@@ -56,7 +84,26 @@ def clean_review(text: str, max_len: int = 200) -> str:
     return text
 
 
-def build_movie_ratings_for_sql() -> None:
+def print_summary(
+    total: int,
+    written: int,
+    skipped_rating_or_id: int,
+    skipped_created_at: int,
+    duplicate_keys: int,
+) -> None:
+    print(f"[ratings] 总记录数: {total}")
+    print(f"[ratings] 去重后写入行数: {written}")
+    print(f"[ratings] 跳过行数（rating 或 id 异常）: {skipped_rating_or_id}")
+    print(f"[ratings] 跳过行数（created_at 为空）: {skipped_created_at}")
+    print(f"[ratings] 检测到重复 (user_id, movie_id) 键对: {duplicate_keys}")
+    print("===> movie_ratings_for_sql.csv 构建完成")
+
+
+def build_movie_ratings_for_sql(memory_budget: Optional[int] = None, engine: str = "python") -> None:
+    """
+    :param memory_budget: 给定时用外存去重，内存大致不超过这么多字节；None 为全内存
+    :param engine: "python"（逐行）或 "numpy"（列式，不支持 memory_budget）
+    """
     print(f"[ratings] 读取源文件: {SRC_CSV}")
     print(f"[ratings] 输出文件: {OUT_CSV}")
 
@@ -65,13 +112,19 @@ def build_movie_ratings_for_sql() -> None:
 
     ensure_dir_for_file(OUT_CSV)
 
+    if engine == "numpy":
+        build_with_numpy()
+        return
+
     total = 0
     skipped_rating_or_id = 0
     skipped_created_at = 0
     duplicate_keys = 0
+    valid = 0
 
-    # key: (user_id, movie_id)  ->  row dict
-    dedup_map: Dict[Tuple[int, int], Dict[str, str]] = {}
+    # key: (user_id, movie_id)  ->  输出行
+    dedup_map: Dict[Tuple[int, int], Tuple[str, ...]] = {}
+    external = ExternalDedupe(memory_budget, tag="ratings") if memory_budget else None
 
     with open(SRC_CSV, "r", encoding="utf-8", newline="") as f_in:
         reader = csv.DictReader(f_in)
@@ -109,50 +162,127 @@ def build_movie_ratings_for_sql() -> None:
 
             review_clean = clean_review(review_raw, max_len=200)
 
+            valid += 1
             key = (user_id, movie_id)
-            new_row = {
-                "user_id": str(user_id),
-                "movie_id": str(movie_id),
-                "rating": str(rating),
-                "created_at": created_at_raw,
-                "review": review_clean,
-            }
-
-            if key not in dedup_map:
+            new_row = (str(user_id), str(movie_id), str(rating), created_at_raw, review_clean)
+
+            if external is not None:
+                # 外存模式：rank 就是 created_at，越晚越好，相同保留先出现的
+                external.add(user_id, movie_id, created_at_raw, new_row)
+            elif key not in dedup_map:
                 dedup_map[key] = new_row
             else:
                 # 已经存在一条，按 created_at 选择“较晚”的那条
                 duplicate_keys += 1
-                old_row = dedup_map[key]
-                old_ts = old_row.get("created_at", "")
-                new_ts = created_at_raw
+                old_ts = dedup_map[key][3]
 
                 # 时间格式为 "YYYY-MM-DD HH:MM:SS"，字符串比较就够用
-                if new_ts > old_ts:
+                if created_at_raw > old_ts:
                     dedup_map[key] = new_row
 
     # 写出 CSV
     with open(OUT_CSV, "w", encoding="utf-8", newline="") as f_out:
-        writer = csv.DictWriter(
-            f_out,
-            fieldnames=["user_id", "movie_id", "rating", "created_at", "review"],
-        )
-        writer.writeheader()
-        for row in dedup_map.values():
-            writer.writerow(row)
+        writer = csv.writer(f_out)
+        writer.writerow(OUT_HEADER)
+        if external is None:
+            writer.writerows(dedup_map.values())
+            written = len(dedup_map)
+        else:
+            written = 0
+            with external:
+                for entry in external.results():
+                    writer.writerow(entry[4])
+                    written += 1
+            duplicate_keys = valid - written
+
+    print_summary(total, written, skipped_rating_or_id, skipped_created_at, duplicate_keys)
+
+
+def build_with_numpy() -> None:
+    """
+    列式引擎：校验规则、保留规则、写出顺序都和逐行实现一样（见 columnar.py）。
+    review 只对最终写出的行做 clean_review。
+    """
+    require_numpy()
 
-    written = len(dedup_map)
+    total = 0
+    skipped_rating_or_id = 0
+    skipped_created_at = 0
+    valid = 0
+
+    winners = WinnerSet(rank_fields=["created_at"])
+    columns = ["movie_id", "user_id", "rating", "created_at", "review"]
+    for start, cols in read_column_chunks(SRC_CSV, columns):
+        n = len(cols["movie_id"])
+        total += n
+
+        movie_ids, movie_ok = parse_int_column(cols["movie_id"])
+        user_ids, user_ok = parse_int_column(cols["user_id"])
+        ratings, rating_ok = parse_int_column(cols["rating"], overflow_invalid=True)
+        basic_ok = movie_ok & user_ok & rating_ok & (ratings >= 0) & (ratings <= 10)
+        created = str_array(cols["created_at"], strip=True)
+        ok = basic_ok & (created != "")
+
+        n_basic, n_ok = int(basic_ok.sum()), int(ok.sum())
+        skipped_rating_or_id += n - n_basic
+        skipped_created_at += n_basic - n_ok
+        valid += n_ok
+
+        idx = np.flatnonzero(ok)
+        reviews = cols["review"]
+        winners.add({
+            "user_id": user_ids[idx],
+            "movie_id": movie_ids[idx],
+            "rating": ratings[idx],
+            "created_at": created[idx],
+            "row_no": idx + start,
+            "review": np.array([reviews[i] for i in idx], dtype=object),
+        })
+
+    result = winners.result()
+    written = len(result["row_no"]) if result is not None else 0
 
-    print(f"[ratings] 总记录数: {total}")
-    print(f"[ratings] 去重后写入行数: {written}")
-    print(f"[ratings] 跳过行数（rating 或 id 异常）: {skipped_rating_or_id}")
-    print(f"[ratings] 跳过行数（created_at 为空）: {skipped_created_at}")
-    print(f"[ratings] 检测到重复 (user_id, movie_id) 键对: {duplicate_keys}")
-    print("===> movie_ratings_for_sql.csv 构建完成")
+    with open(OUT_CSV, "w", encoding="utf-8", newline="") as f_out:
+        writer = csv.writer(f_out)
+        writer.writerow(OUT_HEADER)
+        # 分段转成字符串写出，避免整列的 str 列表同时留在内存里
+        for lo in range(0, written, CHUNK_ROWS):
+            part = {k: v[lo:lo + CHUNK_ROWS] for k, v in result.items()}
+            writer.writerows(zip(
+                int_strs(part["user_id"]),
+                int_strs(part["movie_id"]),
+                int_strs(part["rating"]),
+                part["created_at"].tolist(),
+                (clean_review(r, max_len=200) for r in part["review"]),
+            ))
+
+    print_summary(total, written, skipped_rating_or_id, skipped_created_at, valid - written)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="movie_ratings.csv -> movie_ratings_for_sql.csv")
+    parser.add_argument(
+        "--memory-budget",
+        type=parse_memory_budget,
+        default=None,
+        help="去重的内存预算（如 512M、2G）；给定时用外存排序去重，默认全内存",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="python",
+        help="python：逐行处理（默认）；numpy：列式向量化处理，需要 numpy，不能和 --memory-budget 同用",
+    )
+    args = parser.parse_args()
+    if args.engine == "numpy" and args.memory_budget:
+        parser.error("--engine numpy 不支持 --memory-budget")
+    return args
 
 
 def main() -> None:
-    build_movie_ratings_for_sql()
+    args = parse_args()
+    with csv_delta(OUT_CSV, OUT_KEY):
+        build_movie_ratings_for_sql(memory_budget=args.memory_budget, engine=args.engine)
 
 
 if __name__ == "__main__":
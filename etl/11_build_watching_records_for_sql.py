@@ -19,21 +19,50 @@ build_watching_records_for_sql.py
         1) 按 status 优先级 watched > watching > wishlist；
         2) 同 status 时保留 created_at 较晚的一条；
         3) 再相同则优先 star = TRUE 的那条。
+
+去重默认在内存里做（一个 (user_id, movie_id) -> 行 的 dict）。记录太多放不下时加 --memory-budget，
+改用 external_dedupe.ExternalDedupe 外排序 + k 路归并，保留规则不变，输出改为按 (user_id, movie_id) 排序：
+    python etl/11_build_watching_records_for_sql.py --memory-budget 512M
+
+装了 numpy 时可以用 --engine numpy 走列式引擎（见 columnar.py），输出和默认实现逐字节一致。
+
+同时写出相对上一版的 delta：../data/etl/delta/watching_records_for_sql.csv、watching_records_for_sql.removed.csv
+（按 (user_id, movie_id) 对行，见 id_registry.py；上一版只记每行的摘要，和去重引擎无关）。
 """
 
 from __future__ import annotations
 
+import argparse
 import csv
 import os
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
+
+from columnar import (
+    CHUNK_ROWS,
+    ENGINES,
+    int_strs,
+    map_distinct,
+    np,
+    parse_int_column,
+    read_column_chunks,
+    require_numpy,
+    str_array,
+    WinnerSet,
+)
+from external_dedupe import ExternalDedupe, parse_memory_budget
+from id_registry import csv_delta
 
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 ETL_DIR = os.path.join(BASE_DIR, "..", "data", "etl")
 
 SRC_CSV = os.path.join(ETL_DIR, "watching_records.csv")
+# delta 的自然键：user_id, movie_id
+OUT_KEY = (0, 1)
 OUT_CSV = os.path.join(ETL_DIR, "watching_records_for_sql.csv")
 
+OUT_HEADER = ["user_id", "movie_id", "star", "status", "created_at"]
+
 
 def ensure_dir_for_file(path: str) -> None:
     d = os.path.dirname(path)
@@ -69,7 +98,34 @@ def normalize_star(s: str) -> str:
     return "FALSE"
 
 
-def build_watching_records_for_sql() -> None:
+def record_rank(status: str, created_at: str, star: str) -> Tuple[int, str, bool]:
+    """
+    重复记录的保留顺序，越大越好：status 优先级 > created_at 较晚 > star = TRUE。
+    只有严格更大才替换，全部相同时保留先出现的那条。
+    """
+    return STATUS_PRIORITY.get(status, 0), created_at, star == "TRUE"
+
+
+def print_summary(
+    total: int,
+    written: int,
+    skipped_basic: int,
+    skipped_created_at: int,
+    duplicate_keys: int,
+) -> None:
+    print(f"[watch] 总记录数: {total}")
+    print(f"[watch] 去重后写入行数: {written}")
+    print(f"[watch] 跳过行数（id / status / 解析失败）: {skipped_basic}")
+    print(f"[watch] 跳过行数（created_at 为空）: {skipped_created_at}")
+    print(f"[watch] 检测到重复 (user_id, movie_id) 键对: {duplicate_keys}")
+    print("===> watching_records_for_sql.csv 构建完成")
+
+
+def build_watching_records_for_sql(memory_budget: Optional[int] = None, engine: str = "python") -> None:
+    """
+    :param memory_budget: 给定时用外存去重，内存大致不超过这么多字节；None 为全内存
+    :param engine: "python"（逐行）或 "numpy"（列式，不支持 memory_budget）
+    """
     print(f"[watch] 读取源文件: {SRC_CSV}")
     print(f"[watch] 输出文件: {OUT_CSV}")
 
@@ -78,13 +134,19 @@ def build_watching_records_for_sql() -> None:
 
     ensure_dir_for_file(OUT_CSV)
 
+    if engine == "numpy":
+        build_with_numpy()
+        return
+
     total = 0
     skipped_basic = 0
     skipped_created_at = 0
     duplicate_keys = 0
+    valid = 0
 
-    # key: (user_id, movie_id) -> row dict
-    dedup_map: Dict[Tuple[int, int], Dict[str, str]] = {}
+    # key: (user_id, movie_id) -> (rank, 输出行)
+    dedup_map: Dict[Tuple[int, int], Tuple[Tuple[int, str, bool], Tuple[str, ...]]] = {}
+    external = ExternalDedupe(memory_budget, tag="watch") if memory_budget else None
 
     with open(SRC_CSV, "r", encoding="utf-8", newline="") as f_in:
         reader = csv.DictReader(f_in)
@@ -121,68 +183,130 @@ def build_watching_records_for_sql() -> None:
 
             star = normalize_star(star_raw)
 
+            valid += 1
             key = (user_id, movie_id)
-            new_row = {
-                "user_id": str(user_id),
-                "movie_id": str(movie_id),
-                "star": star,
-                "status": status,
-                "created_at": created_at_raw,
-            }
-
-            if key not in dedup_map:
-                dedup_map[key] = new_row
+            rank = record_rank(status, created_at_raw, star)
+            new_row = (str(user_id), str(movie_id), star, status, created_at_raw)
+
+            if external is not None:
+                external.add(user_id, movie_id, rank, new_row)
+            elif key not in dedup_map:
+                dedup_map[key] = (rank, new_row)
             else:
-                # 已存在一条，按规则决定是否用新记录替换
+                # 已存在一条，按规则（见 record_rank）决定是否用新记录替换
                 duplicate_keys += 1
-                old_row = dedup_map[key]
-
-                old_status = old_row["status"]
-                old_created = old_row["created_at"]
-                old_star = old_row["star"]
-
-                old_pri = STATUS_PRIORITY.get(old_status, 0)
-                new_pri = STATUS_PRIORITY.get(status, 0)
-
-                replace = False
-
-                # 1) status 优先级更高
-                if new_pri > old_pri:
-                    replace = True
-                elif new_pri == old_pri:
-                    # 2) 同 status 时，created_at 更晚
-                    if created_at_raw > old_created:
-                        replace = True
-                    elif created_at_raw == old_created:
-                        # 3) 再相同，star = TRUE 优先
-                        if star == "TRUE" and old_star != "TRUE":
-                            replace = True
-
-                if replace:
-                    dedup_map[key] = new_row
+                if rank > dedup_map[key][0]:
+                    dedup_map[key] = (rank, new_row)
 
     # 写出 CSV
     with open(OUT_CSV, "w", encoding="utf-8", newline="") as f_out:
-        writer = csv.DictWriter(
-            f_out,
-            fieldnames=["user_id", "movie_id", "star", "status", "created_at"],
-        )
-        writer.writeheader()
-        for row in dedup_map.values():
-            writer.writerow(row)
+        writer = csv.writer(f_out)
+        writer.writerow(OUT_HEADER)
+        if external is None:
+            writer.writerows(row for _, row in dedup_map.values())
+            written = len(dedup_map)
+        else:
+            written = 0
+            with external:
+                for entry in external.results():
+                    writer.writerow(entry[4])
+                    written += 1
+            duplicate_keys = valid - written
+
+    print_summary(total, written, skipped_basic, skipped_created_at, duplicate_keys)
+
+
+def build_with_numpy() -> None:
+    """
+    列式引擎：校验规则、保留规则（status 优先级 > created_at > star）、写出顺序都和逐行实现一样。
+    status 存成优先级编码（int8），star 存成布尔。
+    """
+    require_numpy()
 
-    written = len(dedup_map)
+    total = 0
+    skipped_basic = 0
+    skipped_created_at = 0
+    valid = 0
+
+    # 优先级编码 -> status 文本（0 表示非法）
+    status_names = np.array([""] + sorted(STATUS_PRIORITY, key=STATUS_PRIORITY.get))
+
+    winners = WinnerSet(rank_fields=["priority", "created_at", "star"])
+    columns = ["movie_id", "user_id", "status", "created_at", "star"]
+    for start, cols in read_column_chunks(SRC_CSV, columns):
+        n = len(cols["movie_id"])
+        total += n
+
+        movie_ids, movie_ok = parse_int_column(cols["movie_id"])
+        user_ids, user_ok = parse_int_column(cols["user_id"])
+        status = map_distinct(cols["status"], normalize_status)
+        priority = np.zeros(n, dtype=np.int8)
+        for name, pri in STATUS_PRIORITY.items():
+            priority[status == name] = pri
+        basic_ok = movie_ok & user_ok & (priority > 0)
+        created = str_array(cols["created_at"], strip=True)
+        ok = basic_ok & (created != "")
+        star = map_distinct(cols["star"], normalize_star) == "TRUE"
+
+        n_basic, n_ok = int(basic_ok.sum()), int(ok.sum())
+        skipped_basic += n - n_basic
+        skipped_created_at += n_basic - n_ok
+        valid += n_ok
+
+        idx = np.flatnonzero(ok)
+        winners.add({
+            "user_id": user_ids[idx],
+            "movie_id": movie_ids[idx],
+            "priority": priority[idx],
+            "created_at": created[idx],
+            "star": star[idx],
+            "row_no": idx + start,
+        })
+
+    result = winners.result()
+    written = len(result["row_no"]) if result is not None else 0
 
-    print(f"[watch] 总记录数: {total}")
-    print(f"[watch] 去重后写入行数: {written}")
-    print(f"[watch] 跳过行数（id / status / 解析失败）: {skipped_basic}")
-    print(f"[watch] 跳过行数（created_at 为空）: {skipped_created_at}")
-    print(f"[watch] 检测到重复 (user_id, movie_id) 键对: {duplicate_keys}")
-    print("===> watching_records_for_sql.csv 构建完成")
+    with open(OUT_CSV, "w", encoding="utf-8", newline="") as f_out:
+        writer = csv.writer(f_out)
+        writer.writerow(OUT_HEADER)
+        # 分段转成字符串写出，避免整列的 str 列表同时留在内存里
+        for lo in range(0, written, CHUNK_ROWS):
+            part = {k: v[lo:lo + CHUNK_ROWS] for k, v in result.items()}
+            writer.writerows(zip(
+                int_strs(part["user_id"]),
+                int_strs(part["movie_id"]),
+                np.where(part["star"], "TRUE", "FALSE").tolist(),
+                status_names[part["priority"]].tolist(),
+                part["created_at"].tolist(),
+            ))
+
+    print_summary(total, written, skipped_basic, skipped_created_at, valid - written)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="watching_records.csv -> watching_records_for_sql.csv")
+    parser.add_argument(
+        "--memory-budget",
+        type=parse_memory_budget,
+        default=None,
+        help="去重的内存预算（如 512M、2G）；给定时用外存排序去重，默认全内存",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="python",
+        help="python：逐行处理（默认）；numpy：列式向量化处理，需要 numpy，不能和 --memory-budget 同用",
+    )
+    args = parser.parse_args()
+    if args.engine == "numpy" and args.memory_budget:
+        parser.error("--engine numpy 不支持 --memory-budget")
+    return args
 
 
 def main() -> None:
-    build_watching_records_for_sql()
+    args = parse_args()
+    with csv_delta(OUT_CSV, OUT_KEY):
+        build_watching_records_for_sql(memory_budget=args.memory_budget, engine=args.engine)
 
 
 if __name__ == "__main__":
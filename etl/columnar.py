@@ -0,0 +1,278 @@
+"""
+columnar.py
+
+10 / 11 可选的 NumPy 列式引擎（--engine numpy）用到的公共部分。
+
+原来的实现每一行都在 Python 里做 int() 解析、范围检查、元组 key 的 dict 更新；
+列式引擎改成按块（CHUNK_ROWS 行）处理：
+
+  1. csv.reader 读一块，按列取出原始字符串（和 csv.DictReader 的语义一致：跳过空行，缺列为 None）；
+  2. 列转成 NumPy 数组，整型列走向量化解析（纯 ASCII 数字直接 astype），
+     带符号 / 下划线 / 空白等少见写法才逐个交给 int()，保证和原来的判定完全一样；
+     status / star 这类取值很少的列只对不同的值调用原来的规范化函数；
+  3. 校验得到掩码，按 (user_id, movie_id, 排名键..., 行号) lexsort，每组取第一条
+     （created_at 是标准的 "YYYY-MM-DD HH:MM:SS" 时转成 int64 的 YYYYMMDDHHMMSS 再排，顺序和字符串比较一样），
+     同时记下每组第一次出现的行号（原来 dict 的写出顺序）；
+  4. 各块的胜者攒在 WinnerSet 里，攒到和已合并的胜者一样多时再合并一次（规则满足结合律；
+     摊还 O(n log n)，同时留在内存里的行数不超过不同 key 数的两倍左右），最后按第一次出现的行号排序写出。
+
+numpy 是可选依赖：没装时 np 为 None，只有显式 --engine numpy 才报错。
+"""
+
+from __future__ import annotations
+
+import csv
+import gc
+from itertools import islice
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # 可选依赖，只有 --engine numpy 用得到
+    np = None
+
+
+CHUNK_ROWS = 200000
+
+ENGINES = ("python", "numpy")
+
+_INT64_MIN = -(2 ** 63)
+_INT64_MAX = 2 ** 63 - 1
+_ASCII_0 = ord("0")
+_ASCII_9 = ord("9")
+
+# "YYYY-MM-DD HH:MM:SS" 里数字和分隔符的位置
+_TS_LEN = 19
+_TS_DIGITS = [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18]
+_TS_SEPS = [(4, "-"), (7, "-"), (10, " "), (13, ":"), (16, ":")]
+
+
+def require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("--engine numpy 需要先安装 numpy（pip install numpy）")
+
+
+def read_column_chunks(
+    path: str,
+    columns: Sequence[str],
+    chunk_rows: int = CHUNK_ROWS,
+) -> Iterator[Tuple[int, Dict[str, List[Optional[str]]]]]:
+    """
+    按块读取 CSV 的若干列，产出 (本块第一行的行号, {列名: 原始字符串列表})。
+
+    行号从 0 开始，只数 DictReader 会产出的行（跳过空行）；
+    某行缺这一列（行太短、或表头里没有这一列）时值为 None，和 row.get(col) 一样。
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        # 表头重名时 DictReader 取最后一个
+        index = {name: i for i, name in enumerate(header)}
+        wanted = [(col, index.get(col)) for col in columns]
+
+        start = 0
+        while True:
+            # 一块几十万个 list 同时活着，循环 GC 会被反复触发去扫它们（又没有环），读的时候先关掉
+            gc_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                rows = [r for r in islice(reader, chunk_rows) if r]
+            finally:
+                if gc_enabled:
+                    gc.enable()
+            if not rows:
+                return
+            shortest = min(map(len, rows))
+            out: Dict[str, List[Optional[str]]] = {}
+            for col, i in wanted:
+                if i is None:
+                    out[col] = [None] * len(rows)
+                elif i < shortest:
+                    out[col] = list(map(itemgetter(i), rows))
+                else:
+                    out[col] = [r[i] if i < len(r) else None for r in rows]
+            yield start, out
+            start += len(rows)
+
+
+def str_array(values: List[Optional[str]], strip: bool = False):
+    """原始字符串列 -> NumPy 字符串数组，None 当作 ""；strip=True 时逐个 str.strip()"""
+    arr = np.array(["" if v is None else v for v in values], dtype=str)
+    return np.char.strip(arr) if strip and arr.size else arr
+
+
+def map_distinct(values: List[Optional[str]], fn: Callable[[str], str]):
+    """
+    对取值很少的列（status / star 这类）逐个“不同值”调用 fn，再按下标映射回去；
+    语义和逐行调用 fn 完全一样（None 当作 ""，fn 需要对两者给出同样的结果）。
+    """
+    arr = str_array(values)
+    if arr.size == 0:
+        return arr
+    distinct, inverse = np.unique(arr, return_inverse=True)
+    return np.array([fn(v) for v in distinct.tolist()], dtype=str)[inverse.reshape(-1)]
+
+
+def parse_int_column(values: List[Optional[str]], overflow_invalid: bool = False):
+    """
+    按 int(str(v).strip()) 的规则解析一列，返回 (int64 数组, 成功掩码)；None / "" 算失败。
+
+    纯 ASCII 数字且不超过 18 位的直接向量化转换；其余（带空白、符号、下划线、全角数字……）
+    逐个用 int() 判定。解析成功但超出 int64 的值放不进数组：overflow_invalid=True 时
+    （调用方反正还要做范围检查，比如 rating）按失败处理，否则报错。
+    """
+    n = len(values)
+    result = np.zeros(n, dtype=np.int64)
+    ok = np.zeros(n, dtype=bool)
+    if n == 0:
+        return result, ok
+
+    arr = str_array(values)
+    width = arr.dtype.itemsize // 4
+    if width == 0:
+        return result, ok
+    chars = arr.view(np.uint32).reshape(n, width)
+    # 短字符串后面补的是 0
+    is_digit = (chars >= _ASCII_0) & (chars <= _ASCII_9)
+    fast = (is_digit | (chars == 0)).all(axis=1) & (chars[:, 0] != 0)
+    if width > 18:
+        fast &= chars[:, 18] == 0
+    if fast.any():
+        # 按列累加数字（比 astype(np.int64) 的字符串解析快得多），补位的 0 跳过
+        digits = chars[fast, :min(width, 18)].astype(np.int64)
+        value = np.zeros(len(digits), dtype=np.int64)
+        for j in range(digits.shape[1]):
+            col = digits[:, j]
+            value = np.where(col != 0, value * 10 + (col - _ASCII_0), value)
+        result[fast] = value
+        ok[fast] = True
+
+    for i in np.flatnonzero(~fast & (arr != "")):
+        try:
+            v = int(str(values[i]).strip())
+        except (TypeError, ValueError):
+            continue
+        if not _INT64_MIN <= v <= _INT64_MAX:
+            if overflow_invalid:
+                continue
+            raise OverflowError(f"第 {i} 个值超出 int64：{values[i]!r}（请用 --engine python）")
+        result[i] = v
+        ok[i] = True
+    return result, ok
+
+
+def int_strs(values) -> List[str]:
+    """int64 数组 -> str(int) 列表（比 astype(str) 快）"""
+    return list(map(str, values.tolist()))
+
+
+def timestamp_keys(values):
+    """
+    全部是 "YYYY-MM-DD HH:MM:SS" 时返回 int64 的 YYYYMMDDHHMMSS（大小顺序和字符串比较一致），
+    有任何一个不是这个格式就返回 None。
+    """
+    n = len(values)
+    width = values.dtype.itemsize // 4
+    if n == 0 or width < _TS_LEN:
+        return None
+    chars = values.view(np.uint32).reshape(n, width)
+    if width > _TS_LEN and chars[:, _TS_LEN].any():
+        return None
+    for pos, sep in _TS_SEPS:
+        if (chars[:, pos] != ord(sep)).any():
+            return None
+    digits = chars[:, _TS_DIGITS].astype(np.int64) - _ASCII_0
+    if ((digits < 0) | (digits > 9)).any():
+        return None
+    return digits @ (10 ** np.arange(len(_TS_DIGITS) - 1, -1, -1, dtype=np.int64))
+
+
+def rank_codes(values):
+    """
+    排名键 -> int64，大小顺序不变：标准格式的时间字符串直接转数字，
+    其他字符串按字典序编码（和 Python 字符串比较一致），数值 / 布尔直接转换。
+    """
+    if values.dtype.kind in "US":
+        keys = timestamp_keys(values)
+        if keys is not None:
+            return keys
+        return np.unique(values, return_inverse=True)[1].astype(np.int64).reshape(-1)
+    return values.astype(np.int64)
+
+
+def pick_winners(user_ids, movie_ids, ranks: Sequence, row_no, first_no):
+    """
+    每个 (user_id, movie_id) 选一条：ranks 依次比较、越大越好，全部相同取 row_no 最小的。
+
+    :param ranks: 排名键数组列表，优先级从高到低
+    :param row_no: 每条记录自己的行号
+    :param first_no: 每条记录所在 key 已知的最早行号（第一轮就是 row_no）
+    :return: (胜者下标数组, 每个胜者对应 key 的最早行号)
+    """
+    if len(user_ids) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    keys = [row_no] + [-rank_codes(r) for r in reversed(ranks)] + [movie_ids, user_ids]
+    order = np.lexsort(keys)
+    u, m = user_ids[order], movie_ids[order]
+    starts = np.flatnonzero(np.r_[True, (u[1:] != u[:-1]) | (m[1:] != m[:-1])])
+    return order[starts], np.minimum.reduceat(first_no[order], starts)
+
+
+class WinnerSet:
+    """
+    按块累积每个 (user_id, movie_id) 的胜者。
+
+    每块是一组等长的列：必须有 user_id / movie_id / row_no 和 rank_fields 里的排名键，
+    其余列（要写出的字段）原样跟着走。
+
+    :param rank_fields: 排名键列名，优先级从高到低，越大越好
+    """
+
+    def __init__(self, rank_fields: Sequence[str]):
+        self.rank_fields = list(rank_fields)
+        self._merged: Optional[Dict[str, Any]] = None
+        self._pending: List[Dict[str, Any]] = []
+        self._pending_rows = 0
+
+    def _reduce(self, cols: Dict[str, Any]) -> Dict[str, Any]:
+        win, first_no = pick_winners(
+            cols["user_id"], cols["movie_id"], [cols[f] for f in self.rank_fields],
+            cols["row_no"], cols["first_no"],
+        )
+        out = {k: v[win] for k, v in cols.items()}
+        out["first_no"] = first_no
+        return out
+
+    def add(self, cols: Dict[str, Any]) -> None:
+        cols = dict(cols)
+        cols.setdefault("first_no", cols["row_no"])
+        part = self._reduce(cols)
+        self._pending.append(part)
+        self._pending_rows += len(part["row_no"])
+        merged = len(self._merged["row_no"]) if self._merged is not None else 0
+        if self._pending_rows >= merged:
+            self._merge()
+
+    def _merge(self) -> None:
+        parts = ([self._merged] if self._merged is not None else []) + self._pending
+        if not parts:
+            return
+        cols = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+        # 先放掉旧的块再合并，峰值少一份拷贝
+        del parts
+        self._merged = None
+        self._pending = []
+        self._pending_rows = 0
+        self._merged = self._reduce(cols)
+
+    def result(self) -> Optional[Dict[str, Any]]:
+        """全部胜者，按 key 第一次出现的顺序（原来 dict 的插入顺序）；一条都没有时返回 None。只能调用一次"""
+        self._merge()
+        if self._merged is None:
+            return None
+        merged, self._merged = self._merged, None
+        order = np.argsort(merged["first_no"], kind="stable")
+        return {k: merged.pop(k)[order] for k in list(merged)}
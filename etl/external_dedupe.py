@@ -0,0 +1,218 @@
+"""
+external_dedupe.py
+
+10 / 11 的外存去重：按 (user_id, movie_id) 分组，每组只留“最好”的一条，内存占用大致不超过给定预算。
+
+原来的做法是一个 {(user_id, movie_id): row} 的 dict，评论上亿条时内存放不下。这里改成经典的外排序：
+
+  1. add() 的记录先攒在内存里，估算的占用超过预算就按 (user_id, movie_id) 排序，
+     同一个 key 先在块内合并成一条，写成一个有序的临时文件（run）；
+  2. 全部 add 完后用 heapq.merge 对所有 run 做 k 路归并，相邻的同 key 记录再合并一次，依次吐出。
+     run 太多（超过 fan_in）时先分组归并成更少的 run，避免同时打开太多文件、每路的读缓冲占满预算。
+
+“最好”由调用方给的 rank 决定：rank 越大越好，rank 相同时保留先 add 的那条，
+和原来“逐条比较、更好才替换”的结果完全一样（该规则下合并满足结合律，所以可以先块内合并再归并）。
+
+结果按 (user_id, movie_id) 升序输出，不再是原来“第一次出现的顺序”；\\copy 导入不受影响。
+临时文件放在 tmp_dir 下（默认 ../data/etl，/tmp 常常是内存盘），结束后删除。
+"""
+
+from __future__ import annotations
+
+import heapq
+import os
+import pickle
+import re
+import shutil
+import sys
+import tempfile
+from operator import itemgetter
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ETL_DIR = os.path.join(BASE_DIR, "..", "data", "etl")
+
+DEFAULT_FAN_IN = 64
+
+# 每次 pickle.dump 的记录条数：归并时每路 run 只在内存里留一块
+_CHUNK_ROWS = 2048
+
+_KEY = itemgetter(0, 1)
+
+# 内部记录：(user_id, movie_id, rank, -seq, row)
+Entry = Tuple[int, int, Any, int, Tuple]
+
+_UNITS = {"": 1, "B": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_memory_budget(text: str) -> int:
+    """'512M' / '2G' / '65536' -> 字节数"""
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?)B?\s*", text.upper())
+    if not m:
+        raise ValueError(f"无法解析内存预算：{text!r}（例如 512M、2G）")
+    n = int(float(m.group(1)) * _UNITS[m.group(2)])
+    if n <= 0:
+        raise ValueError(f"内存预算必须大于 0：{text!r}")
+    return n
+
+
+def _entry_size(entry: Entry) -> int:
+    """一条记录大致占多少内存（列表槽位 + 元组 + 各字段对象）"""
+    size = 8 + sys.getsizeof(entry) + sys.getsizeof(entry[0]) + sys.getsizeof(entry[1]) + 32
+    rank = entry[2]
+    if isinstance(rank, tuple):
+        size += sys.getsizeof(rank) + sum(sys.getsizeof(x) for x in rank)
+    else:
+        size += sys.getsizeof(rank)
+    row = entry[4]
+    return size + sys.getsizeof(row) + sum(sys.getsizeof(x) for x in row)
+
+
+def _better(a: Entry, b: Entry) -> Entry:
+    # rank 大的赢；rank 相同 -seq 大（先 add）的赢
+    return a if (a[2], a[3]) >= (b[2], b[3]) else b
+
+
+def _fold(entries: Iterable[Entry]) -> Iterator[Entry]:
+    """按 key 有序的记录流里，相邻同 key 的合并成一条"""
+    best: Optional[Entry] = None
+    for e in entries:
+        if best is not None and e[0] == best[0] and e[1] == best[1]:
+            best = _better(best, e)
+            continue
+        if best is not None:
+            yield best
+        best = e
+    if best is not None:
+        yield best
+
+
+def _write_run(path: str, entries: Iterable[Entry]) -> int:
+    n = 0
+    chunk: List[Entry] = []
+    with open(path, "wb") as f:
+        for e in entries:
+            chunk.append(e)
+            if len(chunk) >= _CHUNK_ROWS:
+                pickle.dump(chunk, f, pickle.HIGHEST_PROTOCOL)
+                n += len(chunk)
+                chunk = []
+        if chunk:
+            pickle.dump(chunk, f, pickle.HIGHEST_PROTOCOL)
+            n += len(chunk)
+    return n
+
+
+def _read_run(path: str) -> Iterator[Entry]:
+    with open(path, "rb") as f:
+        while True:
+            try:
+                chunk = pickle.load(f)
+            except EOFError:
+                return
+            yield from chunk
+
+
+class ExternalDedupe:
+    """
+    有内存上限的 (user_id, movie_id) 去重。
+
+    :param memory_budget: 内存预算（字节），攒在内存里的记录估算超过它就落盘
+    :param tag: 日志前缀
+    :param tmp_dir: 临时 run 文件放在哪个目录下
+    :param fan_in: 一次最多归并几个 run
+    """
+
+    def __init__(
+        self,
+        memory_budget: int,
+        tag: str = "dedupe",
+        tmp_dir: str = ETL_DIR,
+        fan_in: int = DEFAULT_FAN_IN,
+    ):
+        self.memory_budget = memory_budget
+        self.tag = tag
+        self.fan_in = max(2, fan_in)
+        self.tmp_dir = tmp_dir
+        self._dir: Optional[str] = None  # 第一次落盘时才创建
+        self._buf: List[Entry] = []
+        self._buf_bytes = 0
+        self._seq = 0
+        self._runs: List[str] = []
+        self.rows = 0
+        self.runs_written = 0
+        self.merge_passes = 0
+
+    def add(self, user_id: int, movie_id: int, rank: Any, row: Tuple) -> None:
+        """rank 越大越好（必须可比较）；row 是最终要写出的一行"""
+        self._seq += 1
+        entry = (user_id, movie_id, rank, -self._seq, row)
+        self._buf.append(entry)
+        self._buf_bytes += _entry_size(entry)
+        self.rows += 1
+        if self._buf_bytes >= self.memory_budget:
+            self._spill()
+
+    def _new_run_path(self) -> str:
+        if self._dir is None:
+            os.makedirs(self.tmp_dir, exist_ok=True)
+            self._dir = tempfile.mkdtemp(prefix=".dedupe_", dir=self.tmp_dir)
+        self.runs_written += 1
+        return os.path.join(self._dir, f"run_{self.runs_written:06d}.bin")
+
+    def _spill(self) -> None:
+        if not self._buf:
+            return
+        self._buf.sort(key=_KEY)
+        path = self._new_run_path()
+        _write_run(path, _fold(self._buf))
+        self._runs.append(path)
+        self._buf = []
+        self._buf_bytes = 0
+
+    def _merge(self, paths: List[str]) -> Iterator[Entry]:
+        return _fold(heapq.merge(*(_read_run(p) for p in paths), key=_KEY))
+
+    def results(self) -> Iterator[Entry]:
+        """
+        按 (user_id, movie_id) 升序吐出每个 key 的最终记录 (user_id, movie_id, rank, -seq, row)。
+        只能调用一次。
+        """
+        if not self._runs:
+            # 全部放得下内存，不落盘
+            self._buf.sort(key=_KEY)
+            buf, self._buf = self._buf, []
+            yield from _fold(buf)
+            return
+
+        self._spill()
+        runs = self._runs
+        while len(runs) > self.fan_in:
+            self.merge_passes += 1
+            merged: List[str] = []
+            for i in range(0, len(runs), self.fan_in):
+                group = runs[i:i + self.fan_in]
+                path = self._new_run_path()
+                _write_run(path, self._merge(group))
+                for p in group:
+                    os.remove(p)
+                merged.append(path)
+            runs = merged
+        self._runs = runs
+        print(
+            f"[{self.tag}] 外存去重：{self.rows} 条记录，写了 {self.runs_written} 个 run，"
+            f"中间归并 {self.merge_passes} 轮，最终 {len(runs)} 路归并"
+        )
+        yield from self._merge(runs)
+
+    def close(self) -> None:
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+
+    def __enter__(self) -> "ExternalDedupe":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
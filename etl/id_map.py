@@ -0,0 +1,132 @@
+"""
+id_map.py
+
+Douban ID -> 内部 id 的二进制映射文件（03 写出，04~08 读取）。
+
+以前 04~08 每个阶段都要把整个 movies.csv / persons.csv 用 csv.DictReader 读一遍，
+为每一行建 dict、转 int，再拼成一个 {douban_id: id} 的大 dict；人物上百万时光加载就要好几秒、几百 MB。
+现在 03 在写 CSV 的同时写出：
+
+    ../data/etl/movies.idmap
+    ../data/etl/persons.idmap
+
+文件格式（本机字节序）：
+
+    8 字节   魔数 b"IDMAP01" + 字节序标记（b"L" / b"B"）
+    8 字节   条目数 n（uint64）
+    8n 字节  Douban ID，int64，升序
+    4n 字节  对应的内部 id，int32
+
+IdMap 用 mmap 打开，两段数组直接 memoryview.cast 出来，打开是 O(1)、不分配；
+查找在 key 数组上二分（bisect 直接作用在 memoryview 上）。
+对外提供 dict 的只读子集：`in` / [] / get / len，可以直接替换原来的 dict。
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Iterator, Optional, Tuple
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ETL_DIR = os.path.join(BASE_DIR, "..", "data", "etl")
+
+MOVIES_IDMAP = os.path.join(ETL_DIR, "movies.idmap")
+PERSONS_IDMAP = os.path.join(ETL_DIR, "persons.idmap")
+
+_MAGIC = b"IDMAP01" + (b"L" if sys.byteorder == "little" else b"B")
+_HEADER_SIZE = 16
+
+
+def write_id_map(path: str, items: Iterable[Tuple[str, int]]) -> int:
+    """
+    写出映射文件（先写临时文件再改名）；items 是 (douban_id, 内部 id)，顺序随意。
+    返回条目数。
+    """
+    pairs = sorted((int(k), v) for k, v in items)
+    keys = array("q", (k for k, _ in pairs))
+    values = array("i", (v for _, v in pairs))
+
+    d = os.path.dirname(path)
+    if d and not os.path.exists(d):
+        os.makedirs(d, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_MAGIC)
+        f.write(len(pairs).to_bytes(8, sys.byteorder))
+        keys.tofile(f)
+        values.tofile(f)
+    os.replace(tmp, path)
+    print(f"[id_map] 已写出 {path}（{len(pairs)} 条）")
+    return len(pairs)
+
+
+class IdMap:
+    """
+    只读的 Douban ID -> 内部 id 映射（mmap）。key 可以是 str 或 int。
+
+    :param path: write_id_map 写出的文件
+    """
+
+    def __init__(self, path: str):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"缺少 ID 映射文件：{path}（先运行 03_build_movies_and_persons.py）")
+
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:8] != _MAGIC:
+            self._mm.close()
+            raise ValueError(f"不是本机生成的 ID 映射文件：{path}")
+
+        n = int.from_bytes(self._mm[8:_HEADER_SIZE], sys.byteorder)
+        buf = memoryview(self._mm)
+        self._n = n
+        self._keys = buf[_HEADER_SIZE:_HEADER_SIZE + 8 * n].cast("q")
+        self._values = buf[_HEADER_SIZE + 8 * n:_HEADER_SIZE + 12 * n].cast("i")
+        buf.release()
+
+    def close(self) -> None:
+        self._keys.release()
+        self._values.release()
+        self._mm.close()
+
+    def __enter__(self) -> "IdMap":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _index(self, key) -> int:
+        """key 在数组里的下标，不存在返回 -1"""
+        try:
+            k = int(key)
+        except (TypeError, ValueError):
+            return -1
+        i = bisect_left(self._keys, k)
+        if i < self._n and self._keys[i] == k:
+            return i
+        return -1
+
+    def get(self, key, default: Optional[int] = None) -> Optional[int]:
+        i = self._index(key)
+        return self._values[i] if i >= 0 else default
+
+    def __getitem__(self, key) -> int:
+        i = self._index(key)
+        if i < 0:
+            raise KeyError(key)
+        return self._values[i]
+
+    def __contains__(self, key) -> bool:
+        return self._index(key) >= 0
+
+    def __len__(self) -> int:
+        return self._n
+
+    def items(self) -> Iterator[Tuple[int, int]]:
+        """(Douban ID, 内部 id)，按 Douban ID 升序；Douban ID 是 int"""
+        return zip(self._keys, self._values)
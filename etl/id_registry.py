@@ -0,0 +1,292 @@
+"""
+id_registry.py
+
+Douban ID / user_hash -> 内部整数 id 的持久登记表，以及增量导入用的 delta CSV。
+
+以前 03 / 05 每次都按排序后的 Douban ID / user_hash 从 1 开始编号，新增一部电影，
+后面所有电影的 id 都会后移，下游各表跟着全变，只能清空数据库重新 \\copy。
+现在 id 记在 ../data/etl/id_registry.sqlite3 里：
+
+  - 已经分配过的 key 永远沿用原来的 id；
+  - 新 key 按本次传入的顺序（各阶段都是排好序的）接着当前最大 id 往后分配；
+  - 登记表还是空的时候，如果旧的 movies.csv / persons.csv / users.csv 已经存在，
+    先把里面的 id 导进来（和已经导入数据库的 id 保持一致）。
+第一次运行（没有旧 CSV）时分配出来的 id 和以前按排序编号的完全一样。
+
+DeltaCsvWriter 在写全量 CSV 的同时，和上一版 CSV 逐行比较，把新增 / 内容变化的行
+另写一份到 ../data/etl/delta/ 下（表头相同）。数据库侧导入 delta 到临时表后 upsert 即可，例如：
+
+    CREATE TEMP TABLE movie_delta (LIKE movie INCLUDING DEFAULTS);
+    \\copy movie_delta FROM '.../data/etl/delta/movies.csv' WITH (FORMAT csv, HEADER true);
+    INSERT INTO movie SELECT * FROM movie_delta
+        ON CONFLICT (id) DO UPDATE SET title = EXCLUDED.title, ...;
+
+movies / persons / users 按 id 对行，上一版有、这一版没有的只统计个数，不生成删除（别的表还引用着它们）。
+其余导入数据库的表按自然键对行（csv_delta 包住写全量的代码）：
+
+    positions.csv                 id
+    cast_credit.csv               movie_id, person_id, role_name
+    crew_credit.csv               movie_id, person_id, position_id
+    movie_*_for_sql.csv           movie_id, genre_id / region_id / language_id
+    award_record_for_sql.csv      award_id, movie_id, person_id
+    app_users_for_sql.csv         id
+    movie_ratings_for_sql.csv     user_id, movie_id
+    watching_records_for_sql.csv  user_id, movie_id
+
+这些表另外写出 delta/{name}.removed.csv：上一版有、这一版没有的键，数据库侧先按键删除再 upsert delta。
+基础字典（dict_*.csv）很小，照旧全量导入。
+
+delta 是相对“上一次 ETL 的输出”算的：每次跑完 ETL 都要导入一次；中间漏导了就做一次全量导入。
+run_etl.py 跳过的阶段留着上一次的 delta 和删除文件，再导入一遍结果不变（upsert / 按键删除都是幂等的）。
+"""
+
+from __future__ import annotations
+
+import contextlib
+import csv
+import hashlib
+import os
+import sqlite3
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Set, Tuple
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ETL_DIR = os.path.join(BASE_DIR, "..", "data", "etl")
+
+REGISTRY_PATH = os.path.join(ETL_DIR, "id_registry.sqlite3")
+DELTA_DIR = os.path.join(ETL_DIR, "delta")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ids (
+    kind TEXT NOT NULL,
+    key  TEXT NOT NULL,
+    id   INTEGER NOT NULL,
+    PRIMARY KEY (kind, key)
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_ids_kind_id ON ids (kind, id);
+"""
+
+
+class IdRegistry:
+    """
+    只追加的 ID 登记表。kind 区分不同实体（"movie" / "person" / "user"），各自独立编号。
+
+    :param path: SQLite 文件路径
+    """
+
+    def __init__(self, path: str = REGISTRY_PATH):
+        d = os.path.dirname(path)
+        if d and not os.path.exists(d):
+            os.makedirs(d, exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "IdRegistry":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def count(self, kind: str) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM ids WHERE kind = ?", (kind,)).fetchone()[0]
+
+    def bootstrap_from_csv(self, kind: str, path: str, key_col: str, id_col: str = "id") -> int:
+        """
+        登记表里还没有这个 kind 时，从旧版 CSV 导入 (key, id)；返回导入条数。
+        已经有记录就什么都不做。
+        """
+        if self.count(kind) or not os.path.exists(path):
+            return 0
+
+        rows = []
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                key = (row.get(key_col) or "").strip()
+                try:
+                    internal_id = int(str(row.get(id_col)).strip())
+                except (TypeError, ValueError):
+                    continue
+                if key:
+                    rows.append((kind, key, internal_id))
+
+        with self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO ids (kind, key, id) VALUES (?, ?, ?)", rows)
+        print(f"[id_registry] {kind}: 从旧版 {path} 导入 {len(rows)} 个 id")
+        return len(rows)
+
+    def assign(self, kind: str, keys: Iterable[str]) -> Dict[str, int]:
+        """
+        给 keys 分配 id：已登记的沿用，新的按传入顺序接着最大 id 往后编。
+        返回这个 kind 的全部 key -> id（包括本次没传入的旧 key）。
+        """
+        mapping: Dict[str, int] = dict(
+            self._conn.execute("SELECT key, id FROM ids WHERE kind = ?", (kind,))
+        )
+        next_id = max(mapping.values(), default=0) + 1
+        known = len(mapping)
+
+        new_rows = []
+        for key in keys:
+            if key in mapping:
+                continue
+            mapping[key] = next_id
+            new_rows.append((kind, key, next_id))
+            next_id += 1
+
+        with self._conn:
+            self._conn.executemany("INSERT INTO ids (kind, key, id) VALUES (?, ?, ?)", new_rows)
+        print(f"[id_registry] {kind}: 已登记 {known} 个，本次新分配 {len(new_rows)} 个")
+        return mapping
+
+
+# ====== delta CSV ======
+
+# 默认按第一列（id）对行
+ID_KEY: Tuple[int, ...] = (0,)
+
+RowKey = Tuple[str, ...]
+
+
+def _row_key(cells: Sequence[str], key_cols: Sequence[int]) -> RowKey:
+    return tuple(cells[i] for i in key_cols)
+
+
+def _row_digest(cells: Sequence[str]) -> bytes:
+    """整行的摘要：上一版只记摘要不记整行，评分 / 观影这种大表也放得下"""
+    return hashlib.blake2b("\x1f".join(cells).encode("utf-8"), digest_size=8).digest()
+
+
+def delta_paths(out_path: str) -> Tuple[str, str]:
+    """全量 CSV 对应的 (delta 文件, 删除文件)：delta/{name}.csv、delta/{name}.removed.csv"""
+    name = os.path.splitext(os.path.basename(out_path))[0]
+    return os.path.join(DELTA_DIR, name + ".csv"), os.path.join(DELTA_DIR, name + ".removed.csv")
+
+
+def load_row_digests(path: str, key_cols: Sequence[int] = ID_KEY) -> Dict[RowKey, bytes]:
+    """读上一版全量 CSV：键（key_cols 那几列）-> 整行摘要；文件不存在返回空 dict"""
+    rows: Dict[RowKey, bytes] = {}
+    if not os.path.exists(path):
+        return rows
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)  # 表头
+        for row in reader:
+            if row:
+                rows[_row_key(row, key_cols)] = _row_digest(row)
+    return rows
+
+
+class DeltaCsvWriter:
+    """
+    和全量 CSV 一起写：每一行都 add() 进来，和上一版同键的行比较，
+    新增 / 变化的行写进 delta 文件（表头与全量 CSV 相同）。
+
+    上一版 CSV 必须在全量文件被覆盖之前读好（load_row_digests），作为 old_rows 传入。
+
+    键默认是 id 列（movies / persons / users）；桥表、credit、评分这类没有自己 id 的表按自然键，
+    比如 (movie_id, genre_id)、(user_id, movie_id)。同一个键在本次出现多次时只写第一条。
+    给了 removed_path 时，上一版有、本次没有的键写进这个文件（表头是键的列名），
+    数据库侧按键删除；不给就只统计个数。
+
+    :param path: delta 文件路径
+    :param header: 表头
+    :param old_rows: 上一版 键 -> 行摘要
+    :param key_cols: 键是哪几列（下标）
+    :param removed_path: 删除文件路径
+    """
+
+    def __init__(
+            self,
+            path: str,
+            header: Sequence[str],
+            old_rows: Dict[RowKey, bytes],
+            key_cols: Sequence[int] = ID_KEY,
+            removed_path: Optional[str] = None,
+    ):
+        d = os.path.dirname(path)
+        if d and not os.path.exists(d):
+            os.makedirs(d, exist_ok=True)
+        self.path = path
+        self.header = list(header)
+        self.old_rows = old_rows
+        self.key_cols = tuple(key_cols)
+        self.removed_path = removed_path
+        self.new = 0
+        self.changed = 0
+        self.unchanged = 0
+        self.duplicate = 0
+        self._seen: Set[RowKey] = set()
+        self._f = open(path, "w", encoding="utf-8", newline="")
+        self._writer = csv.writer(self._f)
+        self._writer.writerow(header)
+
+    def add(self, row: Sequence) -> None:
+        # 按 csv 模块写出去的样子比较：None -> ""，其余 str()
+        cells = ["" if v is None else str(v) for v in row]
+        key = _row_key(cells, self.key_cols)
+        if key in self._seen:
+            self.duplicate += 1
+            return
+        self._seen.add(key)
+        old = self.old_rows.get(key)
+        if old is None:
+            self.new += 1
+        elif old != _row_digest(cells):
+            self.changed += 1
+        else:
+            self.unchanged += 1
+            return
+        self._writer.writerow(cells)
+
+    def _removed_keys(self) -> Iterable[RowKey]:
+        return (key for key in self.old_rows if key not in self._seen)
+
+    @property
+    def removed(self) -> int:
+        """上一版有、这一版没写的行数"""
+        return sum(1 for _ in self._removed_keys())
+
+    def close(self) -> None:
+        self._f.close()
+        removed = self.removed
+        if self.removed_path:
+            with open(self.removed_path, "w", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow([self.header[i] for i in self.key_cols])
+                writer.writerows(self._removed_keys())
+        duplicate = f"，重复键 {self.duplicate}" if self.duplicate else ""
+        print(
+            f"[delta] {self.path}: 新增 {self.new}，变化 {self.changed}，"
+            f"未变 {self.unchanged}，上一版有但本次没有 {removed}{duplicate}"
+        )
+
+    def __enter__(self) -> "DeltaCsvWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+@contextlib.contextmanager
+def csv_delta(out_path: str, key_cols: Sequence[int]) -> Iterator[None]:
+    """
+    包住写全量 CSV 的那段代码：进去前记下上一版，出来后把新写出的全量文件过一遍 DeltaCsvWriter，
+    写出 delta_paths(out_path) 的 delta 文件和删除文件。写全量的代码不用改（比如 10 / 11 的几种去重引擎）。
+    中途抛异常、或者没写出全量文件时不写 delta。
+    """
+    old_rows = load_row_digests(out_path, key_cols)
+    yield
+    if not os.path.exists(out_path):
+        return
+    delta_path, removed_path = delta_paths(out_path)
+    with open(out_path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None) or []
+        with DeltaCsvWriter(delta_path, header, old_rows, key_cols, removed_path) as delta:
+            for row in reader:
+                if row:
+                    delta.add(row)
@@ -0,0 +1,168 @@
+"""
+raw_scan.py
+
+ETL 前几步（01~05）共用的原始数据单遍扫描器。
+
+以前 01~05 各自遍历 ../data/raw/{worker_id}/，同一个 jsonl 被重复读取、重复 json.loads
+（movies_basic.jsonl 至少被读三遍）。现在每个阶段实现成一个 RawConsumer：
+
+    - files            关心哪些 jsonl 文件；
+    - consume(f, rec)  扫描时每解析出一条记录就调用一次；
+    - finish()         扫描结束后调用，写出 CSV。
+
+RawScanner 按 worker 目录名排序逐个目录扫描，每个文件只读一遍、每行只解析一次，
+分发给所有订阅了这个文件的阶段；扫描完按注册顺序依次 finish()。
+同一种文件的记录总是按 worker 目录名顺序到达，和各阶段单独运行时完全一样，输出逐字节一致。
+
+单独运行某个阶段（python etl/03_build_movies_and_persons.py）时扫描器里只有它自己；
+一次跑完 01~05 用 run_raw_stages.py。
+
+同一个实体（电影 / 人物）在 raw 里可能有好几条：实体缓存过期后重新抓到、内容变了的会再追加一条。
+这类文件用 LatestById 按 ID 取最新的一条：比记录里的 fetched_at（爬虫写出时打的抓取时间），
+一样或者都没有时后到的为准（worker 目录名靠后的、同一个文件里靠后的）。
+
+有的阶段依赖前面阶段写出的 CSV（比如 04 要 03 写出的 ID 映射），
+这类阶段在 consume() 里只把需要的字段存下来，到 finish() 里再查映射、写文件。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 爬虫给每条实体记录打的抓取时间（ISO 格式，到秒，见 entity_cache.py）
+FETCHED_AT = "fetched_at"
+
+
+class RawConsumer:
+    """一个 ETL 阶段在单遍扫描中的接口"""
+
+    # 阶段名（日志用）
+    name: str = ""
+    # 关心的 jsonl 文件名
+    files: Tuple[str, ...] = ()
+
+    def consume(self, file_name: str, rec: dict) -> None:
+        raise NotImplementedError
+
+    def finish(self) -> None:
+        raise NotImplementedError
+
+
+class LatestById:
+    """
+    按 ID 字段保留每个实体最新的一条记录（fetched_at 大的为准，一样时后到的为准）。
+    records 保持每个 ID 第一次出现的顺序。
+
+    :param id_field: 记录里的 ID 字段，比如 movie_douban_id
+    """
+
+    def __init__(self, id_field: str):
+        self.id_field = id_field
+        self.records: Dict[str, dict] = {}
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def add(self, rec: dict) -> None:
+        rid = str(rec.get(self.id_field) or "").strip()
+        if not rid:
+            return
+        old = self.records.get(rid)
+        if old is None or str(rec.get(FETCHED_AT) or "") >= str(old.get(FETCHED_AT) or ""):
+            self.records[rid] = rec
+
+    def get(self, rid: str) -> Optional[dict]:
+        return self.records.get(rid)
+
+
+class RawScanner:
+    """
+    单遍扫描 raw_root 下所有 worker 目录，把记录分发给注册的阶段。
+
+    :param raw_root: ../data/raw
+    :param missing_ok: raw_root 不存在时是当作空目录（True）还是报错（False）
+    """
+
+    def __init__(self, raw_root: str, missing_ok: bool = False):
+        self.raw_root = raw_root
+        self.missing_ok = missing_ok
+        self._consumers: List[RawConsumer] = []
+        # 统计：读了多少文件 / 字节 / 记录
+        self.files_read = 0
+        self.bytes_read = 0
+        self.records = 0
+
+    def register(self, consumer: RawConsumer) -> "RawScanner":
+        self._consumers.append(consumer)
+        return self
+
+    def _subscribers(self) -> Dict[str, List[RawConsumer]]:
+        """文件名 -> 订阅它的阶段（按注册顺序）"""
+        subs: Dict[str, List[RawConsumer]] = {}
+        for consumer in self._consumers:
+            for file_name in consumer.files:
+                subs.setdefault(file_name, []).append(consumer)
+        return subs
+
+    def _worker_dirs(self) -> Iterable[str]:
+        if not os.path.exists(self.raw_root):
+            if self.missing_ok:
+                print(f"[scan] RAW_ROOT_DIR 不存在，当作空目录: {self.raw_root}")
+                return
+            raise FileNotFoundError(f"RAW_ROOT_DIR 不存在: {self.raw_root}")
+
+        for name in sorted(os.listdir(self.raw_root)):
+            path = os.path.join(self.raw_root, name)
+            if os.path.isdir(path):
+                yield path
+
+    def _scan_file(self, path: str, consumers: Sequence[RawConsumer]) -> None:
+        file_name = os.path.basename(path)
+        print(f"[scan] 读取 {path} -> {', '.join(c.name for c in consumers)}")
+        self.files_read += 1
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                self.bytes_read += len(line)
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    obj = json.loads(line)
+                except json.JSONDecodeError as e:
+                    print(f"[warn] JSON decode 失败，文件={path}，跳过一行: {e}")
+                    continue
+                if not isinstance(obj, dict):
+                    continue
+                self.records += 1
+                for consumer in consumers:
+                    consumer.consume(file_name, obj)
+
+    def run(self) -> None:
+        """扫描一遍并依次 finish 所有阶段"""
+        subs = self._subscribers()
+        t0 = time.perf_counter()
+        for worker_dir in self._worker_dirs():
+            for file_name in sorted(subs):
+                path = os.path.join(worker_dir, file_name)
+                if os.path.exists(path):
+                    self._scan_file(path, subs[file_name])
+        print(
+            f"[scan] 扫描完成：{self.files_read} 个文件，{self.bytes_read / 1024 / 1024:.1f}MB，"
+            f"{self.records} 条记录，用时 {time.perf_counter() - t0:.2f}s"
+        )
+
+        for consumer in self._consumers:
+            print(f"\n[scan] ===== {consumer.name} =====")
+            consumer.finish()
+
+
+def run_stages(raw_root: str, consumers: Iterable[RawConsumer], missing_ok: bool = False) -> RawScanner:
+    """注册若干阶段，扫描一遍并全部 finish，返回扫描器（带统计）"""
+    scanner = RawScanner(raw_root, missing_ok=missing_ok)
+    for consumer in consumers:
+        scanner.register(consumer)
+    scanner.run()
+    return scanner
@@ -0,0 +1,495 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+run_etl.py
+
+ETL 编排：按声明的输入 / 输出把 etl/NN_*.py 排成 DAG，只重跑过期的阶段，互不依赖的阶段并行跑。
+
+每个阶段在 STAGES 里声明：
+    inputs  : 读哪些文件（相对项目根目录，可以带通配符，如 data/raw/*/movie_cast.jsonl）
+    outputs : 写哪些文件
+    code    : 除了脚本本身，还依赖哪些代码文件（01~05 依赖 raw_scan.py，03~07、09~11 还有 id_registry.py，03~07 还有 id_map.py）
+阶段之间的依赖由“A 的输出是 B 的输入”自动推出来，不用另外写。
+
+判断过期靠内容哈希（sha256），不看修改时间：
+  - 输入（含脚本代码）的哈希和上次成功运行时记录的不一样 -> 重跑；
+  - 输出缺失，或者被改过（哈希对不上）-> 重跑；
+  - 上游重跑了但输出内容没变 -> 下游照样跳过。
+哈希按 (size, mtime) 缓存，文件没动过就不再读内容，数据没变时重跑一遍只是 stat 一圈，不到一秒。
+
+状态记在 data/etl/.etl_state.json；每个阶段的输出（stdout / stderr）在 data/etl/.logs/{阶段}.log。
+
+08_build_award_records_for_sql.py 不在 DAG 里：它和 06 写同一个 award_record_for_sql.csv，
+读的还是旧的字典列名（id / fest_id / type），已经被 06 取代。
+
+使用方式（在仓库根目录）：
+    python etl/run_etl.py                  # 只重跑过期的阶段
+    python etl/run_etl.py --dry-run        # 只看哪些阶段过期
+    python etl/run_etl.py 07 10            # 只更新 07、10（连同它们过期的上游）
+    python etl/run_etl.py --force 04       # 不管哈希，强制重跑 04（下游按哈希决定）
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Set, Tuple
+
+
+# ====== 路径配置（etl 脚本在 ./etl 下） ======
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BASE_DIR)
+ETL_DIR = os.path.join(PROJECT_ROOT, "data", "etl")
+
+STATE_PATH = os.path.join(ETL_DIR, ".etl_state.json")
+LOG_DIR = os.path.join(ETL_DIR, ".logs")
+
+_RAW = "data/raw/*/"
+_ETL = "data/etl/"
+_DICT = "data/etl/basic_dicts/"
+
+
+# ====== 阶段声明 ======
+
+STAGES: List[Dict] = [
+    {
+        "name": "01_build_basic_dicts",
+        "inputs": [
+            _RAW + "movies_basic.jsonl",
+            _RAW + "movies_details.jsonl",
+            _RAW + "person_details_fixed.jsonl",
+            _RAW + "movie_awards.jsonl",
+        ],
+        "outputs": [
+            _DICT + "dict_genre.csv",
+            _DICT + "dict_language.csv",
+            _DICT + "dict_region.csv",
+            _DICT + "dict_festival.csv",
+            _DICT + "dict_award.csv",
+        ],
+        "code": ["etl/raw_scan.py"],
+    },
+    {
+        "name": "02_build_movie_bridges_and_awards",
+        "inputs": [
+            _RAW + "movies_basic.jsonl",
+            _RAW + "movies_details.jsonl",
+            _RAW + "movie_awards.jsonl",
+        ],
+        "outputs": [
+            _ETL + "movie_genres.csv",
+            _ETL + "movie_regions.csv",
+            _ETL + "movie_languages.csv",
+            _ETL + "award_records.csv",
+        ],
+        "code": ["etl/raw_scan.py"],
+    },
+    {
+        "name": "03_build_movies_and_persons",
+        "inputs": [
+            _RAW + "movies_basic.jsonl",
+            _RAW + "movies_summary.jsonl",
+            _RAW + "person_details_fixed.jsonl",
+            _RAW + "movie_cast.jsonl",
+            _RAW + "movie_crew.jsonl",
+            "data/seeds/persons_seed.jsonl",
+        ],
+        "outputs": [
+            _ETL + "movies.csv",
+            _ETL + "persons.csv",
+            _ETL + "movies.idmap",
+            _ETL + "persons.idmap",
+            _ETL + "delta/movies.csv",
+            _ETL + "delta/persons.csv",
+        ],
+        "code": ["etl/raw_scan.py", "etl/id_registry.py", "etl/id_map.py"],
+    },
+    {
+        # positions.csv 04 自己也会先读（已有职位保留原 id），这里只当输出
+        "name": "04_build_credits",
+        "inputs": [
+            _ETL + "movies.idmap",
+            _ETL + "persons.idmap",
+            _RAW + "movie_cast.jsonl",
+            _RAW + "movie_crew.jsonl",
+        ],
+        "outputs": [
+            _ETL + "positions.csv",
+            _ETL + "crew_credit.csv",
+            _ETL + "cast_credit.csv",
+            _ETL + "delta/positions.csv",
+            _ETL + "delta/crew_credit.csv",
+            _ETL + "delta/cast_credit.csv",
+        ],
+        "code": ["etl/raw_scan.py", "etl/id_registry.py", "etl/id_map.py"],
+    },
+    {
+        "name": "05_build_users_and_comments",
+        "inputs": [
+            _ETL + "movies.idmap",
+            _RAW + "movie_ratings.jsonl",
+            _RAW + "movie_watch_records.jsonl",
+        ],
+        "outputs": [
+            _ETL + "users.csv",
+            _ETL + "movie_ratings.csv",
+            _ETL + "watching_records.csv",
+            _ETL + "delta/users.csv",
+        ],
+        "code": ["etl/raw_scan.py", "etl/id_registry.py", "etl/id_map.py"],
+    },
+    {
+        "name": "06_build_persons_for_sql",
+        "inputs": [
+            _ETL + "award_records.csv",
+            _ETL + "movies.idmap",
+            _ETL + "persons.idmap",
+            _DICT + "dict_festival.csv",
+            _DICT + "dict_award.csv",
+        ],
+        "outputs": [_ETL + "award_record_for_sql.csv", _ETL + "delta/award_record_for_sql.csv"],
+        "code": ["etl/id_registry.py", "etl/id_map.py"],
+    },
+    {
+        "name": "07_build_movie_bridges_for_sql",
+        "inputs": [
+            _ETL + "movies.idmap",
+            _ETL + "movie_genres.csv",
+            _ETL + "movie_regions.csv",
+            _ETL + "movie_languages.csv",
+            _DICT + "dict_genre.csv",
+            _DICT + "dict_region.csv",
+            _DICT + "dict_language.csv",
+        ],
+        "outputs": [
+            _ETL + "movie_genre_for_sql.csv",
+            _ETL + "movie_region_for_sql.csv",
+            _ETL + "movie_language_for_sql.csv",
+            _ETL + "delta/movie_genre_for_sql.csv",
+            _ETL + "delta/movie_region_for_sql.csv",
+            _ETL + "delta/movie_language_for_sql.csv",
+        ],
+        "code": ["etl/id_registry.py", "etl/id_map.py"],
+    },
+    {
+        "name": "09_build_app_user_for_sql",
+        "inputs": [_ETL + "users.csv"],
+        "outputs": [_ETL + "app_users_for_sql.csv", _ETL + "delta/app_users_for_sql.csv"],
+        "code": ["etl/id_registry.py"],
+    },
+    {
+        "name": "10_build_movie_ratings_for_sql",
+        "inputs": [_ETL + "movie_ratings.csv"],
+        "outputs": [_ETL + "movie_ratings_for_sql.csv", _ETL + "delta/movie_ratings_for_sql.csv"],
+        "code": ["etl/external_dedupe.py", "etl/columnar.py", "etl/id_registry.py"],
+    },
+    {
+        "name": "11_build_watching_records_for_sql",
+        "inputs": [_ETL + "watching_records.csv"],
+        "outputs": [_ETL + "watching_records_for_sql.csv", _ETL + "delta/watching_records_for_sql.csv"],
+        "code": ["etl/external_dedupe.py", "etl/columnar.py", "etl/id_registry.py"],
+    },
+]
+
+
+def script_path(stage: Dict) -> str:
+    return f"etl/{stage['name']}.py"
+
+
+def upstream_map(stages: List[Dict]) -> Dict[str, Set[str]]:
+    """阶段名 -> 直接上游阶段名（某个输入正是上游的输出）"""
+    producer: Dict[str, str] = {}
+    for stage in stages:
+        for out in stage["outputs"]:
+            if out in producer:
+                raise ValueError(f"{out} 同时由 {producer[out]} 和 {stage['name']} 产出")
+            producer[out] = stage["name"]
+
+    ups: Dict[str, Set[str]] = {}
+    for stage in stages:
+        ups[stage["name"]] = {
+            producer[i] for i in stage["inputs"] if i in producer and producer[i] != stage["name"]
+        }
+    return ups
+
+
+# ====== 内容哈希 & 状态 ======
+
+class FingerprintStore:
+    """
+    文件内容哈希（按 size + mtime 缓存）+ 每个阶段上次成功运行时的输入 / 输出哈希。
+    多个阶段并行时共用一个实例，内部加锁。
+    """
+
+    def __init__(self, path: str = STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._cache: Dict[str, Tuple[int, int, str]] = {}
+        self.stages: Dict[str, Dict[str, Dict[str, str]]] = {}
+        self.hashed = 0  # 本次实际读内容算哈希的文件数
+
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+                self._cache = {k: tuple(v) for k, v in state.get("files", {}).items()}
+                self.stages = state.get("stages", {})
+            except (OSError, ValueError) as e:
+                print(f"[etl] 状态文件损坏，当作全部过期: {e}")
+
+    def file_hash(self, rel: str) -> Optional[str]:
+        """文件内容的 sha256；文件不存在返回 None"""
+        path = os.path.join(PROJECT_ROOT, rel)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            cached = self._cache.get(rel)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        sha = h.hexdigest()
+        with self._lock:
+            self._cache[rel] = (st.st_size, st.st_mtime_ns, sha)
+            self.hashed += 1
+        return sha
+
+    def fingerprint(self, patterns: List[str]) -> Dict[str, str]:
+        """展开通配符，返回 {相对路径: sha256}；不存在的非通配路径记为空串"""
+        result: Dict[str, str] = {}
+        for pattern in patterns:
+            if glob.has_magic(pattern):
+                matches = sorted(glob.glob(os.path.join(PROJECT_ROOT, pattern)))
+                rels = [os.path.relpath(m, PROJECT_ROOT).replace(os.sep, "/") for m in matches]
+            else:
+                rels = [pattern]
+            for rel in rels:
+                result[rel] = self.file_hash(rel) or ""
+        return result
+
+    def record(self, name: str, inputs: Dict[str, str], outputs: Dict[str, str]) -> None:
+        with self._lock:
+            self.stages[name] = {"inputs": inputs, "outputs": outputs}
+            self._save_locked()
+
+    def forget(self, name: str) -> None:
+        with self._lock:
+            self.stages.pop(name, None)
+            self._save_locked()
+
+    def save(self) -> None:
+        with self._lock:
+            self._save_locked()
+
+    def _save_locked(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"files": self._cache, "stages": self.stages}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+
+def stale_reason(stage: Dict, store: FingerprintStore, force: bool) -> Tuple[Optional[str], Dict[str, str]]:
+    """
+    返回 (过期原因, 当前输入指纹)；原因为 None 表示最新，可以跳过。
+    """
+    inputs = store.fingerprint([script_path(stage)] + stage.get("code", []) + stage["inputs"])
+    if force:
+        return "--force", inputs
+
+    last = store.stages.get(stage["name"])
+    if last is None:
+        return "没有运行记录", inputs
+
+    if last["inputs"] != inputs:
+        changed = sorted(k for k in set(inputs) | set(last["inputs"]) if inputs.get(k) != last["inputs"].get(k))
+        more = f" 等 {len(changed)} 个" if len(changed) > 1 else ""
+        return f"输入变化: {changed[0]}{more}", inputs
+
+    for out in stage["outputs"]:
+        sha = store.file_hash(out)
+        if sha is None:
+            return f"输出缺失: {out}", inputs
+        if sha != last["outputs"].get(out):
+            return f"输出被改动: {out}", inputs
+
+    return None, inputs
+
+
+# ====== 执行 ======
+
+def run_stage(stage: Dict) -> Tuple[bool, float]:
+    """子进程跑一个阶段脚本，输出写到 .logs/{name}.log；返回 (是否成功, 用时)"""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    log_path = os.path.join(LOG_DIR, f"{stage['name']}.log")
+    t0 = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log:
+        proc = subprocess.run(
+            [sys.executable, os.path.join(PROJECT_ROOT, script_path(stage))],
+            cwd=PROJECT_ROOT,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+    return proc.returncode == 0, time.perf_counter() - t0
+
+
+def select_stages(stages: List[Dict], targets: List[str], ups: Dict[str, Set[str]]) -> List[Dict]:
+    """targets（名字或编号前缀，如 04）及其全部上游；没给 targets 就是全部"""
+    if not targets:
+        return stages
+
+    by_name = {s["name"]: s for s in stages}
+    wanted: Set[str] = set()
+    for t in targets:
+        hits = [n for n in by_name if n == t or n.startswith(t + "_")]
+        if not hits:
+            raise SystemExit(f"[etl] 未知阶段: {t}（可选: {', '.join(by_name)}）")
+        wanted.update(hits)
+
+    todo = list(wanted)
+    while todo:
+        for up in ups[todo.pop()]:
+            if up not in wanted:
+                wanted.add(up)
+                todo.append(up)
+    return [s for s in stages if s["name"] in wanted]
+
+
+def run_dag(
+        stages: List[Dict],
+        jobs: int,
+        force: Set[str],
+        dry_run: bool = False,
+        store: Optional[FingerprintStore] = None,
+) -> bool:
+    """
+    按依赖调度：上游全部结束（跑完或跳过）的阶段进线程池，线程里判断是否过期、起子进程。
+    上游失败的阶段不跑。返回是否全部成功。
+    """
+    store = store or FingerprintStore()
+    ups = upstream_map(STAGES)
+    names = {s["name"] for s in stages}
+    pending = {s["name"]: s for s in stages}
+    # 只考虑本次选中的上游
+    waiting = {n: ups[n] & names for n in pending}
+    done: Set[str] = set()
+    failed: Set[str] = set()
+    # dry-run 时“会重跑”的阶段，它们的下游也算会重跑
+    would_run: Set[str] = set()
+
+    def work(stage: Dict) -> Tuple[str, Optional[str], bool, float]:
+        name = stage["name"]
+        reason, inputs = stale_reason(stage, store, name in force)
+        if reason is None and dry_run and waiting[name] & would_run:
+            reason = "上游会重跑"
+        if reason is None:
+            return "skip", None, True, 0.0
+        if dry_run:
+            return "stale", reason, True, 0.0
+
+        ok, elapsed = run_stage(stage)
+        if ok:
+            store.record(name, inputs, store.fingerprint(stage["outputs"]))
+        else:
+            store.forget(name)
+        return "run", reason, ok, elapsed
+
+    futures: Dict[Future, str] = {}
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while pending or futures:
+            for name in [n for n in pending if not (waiting[n] - done)]:
+                stage = pending.pop(name)
+                if waiting[name] & failed:
+                    failed.add(name)
+                    done.add(name)
+                    print(f"[etl] {name:36s} 不运行（上游失败）")
+                    continue
+                futures[pool.submit(work, stage)] = name
+            if not futures:
+                continue
+
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                name = futures.pop(fut)
+                action, reason, ok, elapsed = fut.result()
+                done.add(name)
+                if action == "skip":
+                    print(f"[etl] {name:36s} 最新，跳过")
+                elif action == "stale":
+                    would_run.add(name)
+                    print(f"[etl] {name:36s} 过期（{reason}）")
+                elif ok:
+                    print(f"[etl] {name:36s} 完成 {elapsed:6.2f}s（{reason}）")
+                else:
+                    failed.add(name)
+                    log_path = os.path.join(LOG_DIR, f"{name}.log")
+                    print(f"[etl] {name:36s} 失败 {elapsed:6.2f}s，日志: {log_path}")
+
+    store.save()
+    print(
+        f"[etl] 结束：{len(done)} 个阶段，失败 {len(failed)} 个，"
+        f"重新计算哈希 {store.hashed} 个文件，用时 {time.perf_counter() - t0:.2f}s"
+    )
+    return not failed
+
+
+# ====== main ======
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="按输入 / 输出内容哈希增量运行 ETL 各阶段")
+    parser.add_argument(
+        "stages",
+        nargs="*",
+        help="只更新这些阶段（名字或编号，如 04）及其上游；默认全部",
+    )
+    parser.add_argument(
+        "--jobs", "-j",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="最多同时跑几个阶段（默认 CPU 核数）",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="强制重跑命令行上指定的阶段（没指定就是全部）；下游仍按哈希决定",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="只列出过期的阶段，不运行",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    ups = upstream_map(STAGES)
+    stages = select_stages(STAGES, args.stages, ups)
+
+    force: Set[str] = set()
+    if args.force:
+        force = {s["name"] for s in select_stages(STAGES, args.stages, {n: set() for n in ups})}
+
+    ok = run_dag(stages, jobs=args.jobs, force=force, dry_run=args.dry_run)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,512 @@
+"""
+frontier.py
+
+持久化的抓取边界（frontier），用 SQLite 存在 data/state/frontier.sqlite3。
+
+每个抓取任务以 (entity_type, entity_id, page_type) 为主键记录一行，例如：
+
+    ("movie",  "1292052",  "subject")
+    ("movie",  "1292052",  "celebrities")
+    ("movie",  "1292052",  "comments_P_0")
+    ("person", "27242075", "details_api")
+
+状态：
+    pending      待抓取（包括等待重试的）
+    in_progress  正在抓取（记录是哪个爬虫的哪个 worker：owner）
+    done         已完成（记录已写出），以后不会再抓（除非实体缓存过期，见 entity_cache.py）
+    failed       重试用尽（同时写进了 dead-letter 文件）
+
+爬虫启动时先把自己上次没跑完的 in_progress 改回 pending（进程崩了留下的），
+然后只处理没完成的任务，输出文件以追加模式打开：
+崩在第 900 部电影，重启后从第 900 部接着跑，前面的结果原样保留。
+
+记录先写出并 flush，再标记 done；崩在两者之间的页面重启后会再抓一次（至少一次）。
+
+任务分配（--dispatch）：
+
+    lease   默认。所有 worker 登记全部种子，然后各自从 frontier 里“认领”一小批实体
+            （一部电影 / 一个人物），认领时给这些实体的未完成任务加上租约
+            （owner + lease_expires_at）。干完一批再认领下一批，快的 worker 自然多干，
+            总耗时接近平均水平而不是最慢的那个；加减 worker 也不用重新切分。
+            worker 崩了不续租，租约过期后其他 worker 会把这些任务重新认领走。
+    static  旧方式：按种子行号 % num_workers 静态切分，不认领。
+
+租约在处理过程中不断续期（每处理一个实体续一次，开始抓取某个页面时也会续），
+等待重试的任务一直持有租约到重试到期之后，不会被别的 worker 抢走重复抓取。
+
+任务就是 retry_queue 里的 task dict，额外带上 entity_type / entity_id / page_type 三个字段，
+整个 dict 以 json 存在 payload 列里，下次启动时原样取回。
+
+任务可以带 priority 字段（数值，默认 0），存在单独的 priority 列里：认领时优先给
+未完成任务里 priority 最高的实体，相同的按登记顺序。add_many 重新登记已有任务时会更新 priority，
+种子的优先级变了（比如人物评分重算）不用清库。
+
+共享请求预算：claim 可以带一个预算 (名字, 总数)，所有 worker 共用。认领时在同一个事务里
+给新认领的实体各记一笔（budget_charges 表，每个实体只记一次：崩掉的 worker 认领过的被别人接手不重复记），
+记满总数后只能认领已经记过账的实体；release_leases 还回去的实体把账退掉。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from crawler_config import FRONTIER_DB_PATH, LEASE_SECONDS
+
+Task = Dict[str, Any]
+# 共享请求预算：(名字, 总数)
+Budget = Tuple[str, int]
+
+PENDING = "pending"
+IN_PROGRESS = "in_progress"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    entity_type TEXT NOT NULL,
+    entity_id   TEXT NOT NULL,
+    page_type   TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    payload     TEXT NOT NULL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    owner       TEXT,
+    error       TEXT,
+    updated_at  REAL NOT NULL,
+    lease_expires_at REAL,
+    priority    REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (entity_type, entity_id, page_type)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, owner);
+CREATE TABLE IF NOT EXISTS budget_charges (
+    budget      TEXT NOT NULL,
+    entity_type TEXT NOT NULL,
+    entity_id   TEXT NOT NULL,
+    owner       TEXT,
+    PRIMARY KEY (budget, entity_type, entity_id)
+);
+"""
+
+# 建索引放在补列之后（老库里没有 lease_expires_at 列）
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_tasks_claim ON tasks (entity_type, status, lease_expires_at);
+"""
+
+
+def task_priority(task: Task) -> float:
+    """任务的优先级（越大越先被认领），没有或不是数值时为 0"""
+    try:
+        return float(task.get("priority") or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def task_key(task: Task) -> Optional[Tuple[str, str, str]]:
+    """任务的主键；老格式的任务（比如早期的 dead-letter）没有这三个字段，返回 None"""
+    try:
+        return str(task["entity_type"]), str(task["entity_id"]), str(task["page_type"])
+    except KeyError:
+        return None
+
+
+class Frontier:
+    """
+    SQLite frontier。每个进程各开一个连接，多个 worker 可以同时读写同一个库
+    （WAL 模式 + busy timeout）。
+
+    :param path: 数据库文件路径
+    :param owner: 当前进程的身份，一般是 "{爬虫名}:{worker_id}"，用来认领 / 回收任务
+    :param lease_seconds: 租约时长，超过这么久没续期的任务可以被别的 worker 认领
+    """
+
+    def __init__(self, path: str = FRONTIER_DB_PATH, owner: str = "", lease_seconds: float = LEASE_SECONDS):
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+
+        self.path = path
+        self.owner = owner
+        self.lease_seconds = max(1.0, lease_seconds)
+        # isolation_level=None：每条语句自动提交，需要事务时显式 BEGIN
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+        self._conn.executescript(_INDEXES)
+
+    def _migrate(self) -> None:
+        """老版本建的库补上后来加的列"""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(tasks)")}
+        if "lease_expires_at" not in columns:
+            self._conn.execute("ALTER TABLE tasks ADD COLUMN lease_expires_at REAL")
+        if "priority" not in columns:
+            self._conn.execute("ALTER TABLE tasks ADD COLUMN priority REAL NOT NULL DEFAULT 0")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    # ====== 登记任务 ======
+
+    def add(self, task: Task, hold: bool = False) -> bool:
+        """
+        登记一个任务（已存在则不动），返回是否是新任务。
+
+        hold=True 用于处理过程中新发现的任务（比如 subject 派生出的 celebrities / awards）：
+        登记时直接带上当前 owner 的租约，马上就要抓，别让其他 worker 认领走。
+        """
+        key = task_key(task)
+        if key is None:
+            return False
+        now = time.time()
+        owner, lease = (self.owner, now + self.lease_seconds) if hold else (None, None)
+        cur = self._conn.execute(
+            "INSERT OR IGNORE INTO tasks "
+            "(entity_type, entity_id, page_type, status, payload, updated_at, owner, lease_expires_at, priority) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (*key, PENDING, json.dumps(task, ensure_ascii=False), now, owner, lease, task_priority(task)),
+        )
+        return cur.rowcount > 0
+
+    def add_many(self, tasks: Iterable[Task]) -> int:
+        """批量登记任务（一个事务），返回新增了多少个；已有的任务只更新 priority"""
+        now = time.time()
+        rows = []
+        for task in tasks:
+            key = task_key(task)
+            if key is not None:
+                rows.append((*key, PENDING, json.dumps(task, ensure_ascii=False), now, task_priority(task)))
+
+        self._conn.execute("BEGIN")
+        try:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO tasks "
+                "(entity_type, entity_id, page_type, status, payload, updated_at, priority) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            new = self._conn.total_changes - before
+            self._conn.executemany(
+                "UPDATE tasks SET priority = ? "
+                "WHERE entity_type = ? AND entity_id = ? AND page_type = ? AND priority != ?",
+                [(row[-1], *row[:3], row[-1]) for row in rows],
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return new
+
+    def mark_done_many(self, tasks: Iterable[Task]) -> int:
+        """
+        登记这些任务并直接记为 done（一个事务），返回改成 done 的条数。
+        用于实体缓存里还新鲜的实体（见 entity_cache.py）：不用抓，也别让 worker 认领走。
+        只动 pending 的：正在抓的、重试用尽的保持原样。
+        """
+        now = time.time()
+        rows = []
+        for task in tasks:
+            key = task_key(task)
+            if key is not None:
+                rows.append((key, json.dumps(task, ensure_ascii=False), task_priority(task)))
+
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO tasks "
+                "(entity_type, entity_id, page_type, status, payload, updated_at, priority) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(*key, PENDING, payload, now, priority) for key, payload, priority in rows],
+            )
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "UPDATE tasks SET status = ?, owner = NULL, lease_expires_at = NULL, updated_at = ? "
+                "WHERE entity_type = ? AND entity_id = ? AND page_type = ? AND status = ?",
+                [(DONE, now, *key, PENDING) for key, _, _ in rows],
+            )
+            changed = self._conn.total_changes - before
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return changed
+
+    def reopen_many(self, tasks: Iterable[Task]) -> int:
+        """
+        把已完成的任务放回 pending（一个事务），返回放回了多少条。
+        用于实体缓存里过期的实体：frontier 里记着 done，但该重新抓了。
+        """
+        keys = [key for key in map(task_key, tasks) if key is not None]
+        now = time.time()
+        self._conn.execute("BEGIN")
+        try:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "UPDATE tasks SET status = ?, owner = NULL, lease_expires_at = NULL, "
+                "error = NULL, attempts = 0, updated_at = ? "
+                "WHERE entity_type = ? AND entity_id = ? AND page_type = ? AND status = ?",
+                [(PENDING, now, *key, DONE) for key in keys],
+            )
+            changed = self._conn.total_changes - before
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return changed
+
+    # ====== 查询 ======
+
+    def status_of(self, task: Task) -> Optional[str]:
+        key = task_key(task)
+        if key is None:
+            return None
+        row = self._conn.execute(
+            "SELECT status FROM tasks WHERE entity_type = ? AND entity_id = ? AND page_type = ?",
+            key,
+        ).fetchone()
+        return row[0] if row else None
+
+    def is_done(self, task: Task) -> bool:
+        return self.status_of(task) == DONE
+
+    def open_tasks(self, entity_type: str, entity_id: str) -> List[Task]:
+        """某个实体下所有没完成的任务（pending / in_progress），按登记顺序"""
+        rows = self._conn.execute(
+            "SELECT payload FROM tasks "
+            "WHERE entity_type = ? AND entity_id = ? AND status IN (?, ?) "
+            "ORDER BY rowid",
+            (entity_type, entity_id, PENDING, IN_PROGRESS),
+        ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def counts(self, entity_type: str) -> Dict[str, int]:
+        """某类实体下各状态的任务数"""
+        rows = self._conn.execute(
+            "SELECT status, COUNT(*) FROM tasks WHERE entity_type = ? GROUP BY status",
+            (entity_type,),
+        ).fetchall()
+        return {status: n for status, n in rows}
+
+    # ====== 状态流转 ======
+
+    def _mark(
+            self,
+            task: Task,
+            status: str,
+            error: Optional[str] = None,
+            bump: bool = False,
+            lease_until: Optional[float] = None,
+    ) -> None:
+        """更新任务状态；lease_until 为 None 时释放租约（done / failed）"""
+        key = task_key(task)
+        if key is None:
+            return
+        # 行不存在时（比如重放的 dead-letter 任务）顺便登记上
+        self.add(task)
+        self._conn.execute(
+            "UPDATE tasks SET status = ?, owner = ?, error = ?, updated_at = ?, "
+            "attempts = attempts + ?, lease_expires_at = ? "
+            "WHERE entity_type = ? AND entity_id = ? AND page_type = ?",
+            (status, self.owner, error, time.time(), 1 if bump else 0, lease_until, *key),
+        )
+
+    def mark_in_progress(self, task: Task) -> None:
+        self._mark(task, IN_PROGRESS, bump=True, lease_until=time.time() + self.lease_seconds)
+
+    def mark_pending(self, task: Task, error: Optional[str] = None, retry_at: Optional[float] = None) -> None:
+        """
+        放回 pending。retry_at（time.time() 时间戳）表示本 worker 打算在那时重试，
+        租约保留到那之后再加一个租期；不给则释放租约，谁都可以认领。
+        """
+        lease_until = retry_at + self.lease_seconds if retry_at is not None else None
+        self._mark(task, PENDING, error, lease_until=lease_until)
+
+    def mark_done(self, task: Task) -> None:
+        self._mark(task, DONE)
+
+    def mark_failed(self, task: Task, error: Optional[str] = None) -> None:
+        self._mark(task, FAILED, error)
+
+    def reset_stale(self) -> int:
+        """
+        进程启动时调用：把本 owner 上次遗留的 in_progress 改回 pending（上次进程崩溃 / 被杀），
+        并释放本 owner 上次持有的全部租约，返回改回 pending 的条数。
+        """
+        now = time.time()
+        cur = self._conn.execute(
+            "UPDATE tasks SET status = ?, updated_at = ? WHERE status = ? AND owner = ?",
+            (PENDING, now, IN_PROGRESS, self.owner),
+        )
+        self._conn.execute(
+            "UPDATE tasks SET lease_expires_at = NULL "
+            "WHERE owner = ? AND status = ? AND lease_expires_at IS NOT NULL",
+            (self.owner, PENDING),
+        )
+        if cur.rowcount:
+            print(f"[frontier] {self.owner} 上次遗留 {cur.rowcount} 个未完成任务，重新放回 pending")
+        return cur.rowcount
+
+    # ====== 租约：动态分配任务 ======
+
+    def claim(
+            self,
+            entity_type: str,
+            page_types: Sequence[str],
+            limit: int,
+            budget: Optional[Budget] = None,
+    ) -> List[str]:
+        """
+        认领至多 limit 个实体：它们在 page_types 范围内还有没完成、且没有有效租约的任务。
+        被认领实体在该范围内的全部未完成任务都记到当前 owner 名下，租期 lease_seconds。
+        返回实体 ID 列表（按未完成任务的最高 priority 从高到低，相同的按登记顺序）。
+
+        page_types 是 GLOB 模式，比如 ("subject", "celebrities", "awards") 或 ("comments_*",)：
+        同一部电影的详情页和短评页由不同的爬虫各自认领，互不影响。
+
+        budget=(名字, 总数)：所有 worker 共用的请求预算，每个新认领的实体在同一个事务里记一笔，
+        记满以后只认领已经记过账的实体（比如崩掉的 worker 认领过、租约过期的）。
+        """
+        if limit <= 0 or not page_types:
+            return []
+
+        page_cond = "(" + " OR ".join("page_type GLOB ?" for _ in page_types) + ")"
+        now = time.time()
+        # BEGIN IMMEDIATE：先拿写锁再查，多个 worker 同时认领不会拿到同一批
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            remaining = limit
+            charged_cond, charged_args = "", ()
+            if budget is not None:
+                remaining = budget[1] - self._conn.execute(
+                    "SELECT COUNT(*) FROM budget_charges WHERE budget = ?", (budget[0],)
+                ).fetchone()[0]
+                if remaining <= 0:
+                    # 预算记满了：只剩已经记过账的实体可以认领
+                    charged_cond = (
+                        "AND EXISTS (SELECT 1 FROM budget_charges c WHERE c.budget = ? "
+                        "AND c.entity_type = t.entity_type AND c.entity_id = t.entity_id) "
+                    )
+                    charged_args = (budget[0],)
+            rows = self._conn.execute(
+                f"SELECT t.entity_id FROM tasks t "
+                f"WHERE t.entity_type = ? AND t.status IN (?, ?) AND {page_cond} "
+                f"AND COALESCE(t.lease_expires_at, 0) < ? {charged_cond}"
+                f"AND NOT EXISTS ("
+                f"  SELECT 1 FROM tasks o WHERE o.entity_type = t.entity_type "
+                f"  AND o.entity_id = t.entity_id AND o.status IN (?, ?) "
+                f"  AND {page_cond.replace('page_type', 'o.page_type')} "
+                f"  AND o.lease_expires_at >= ? AND o.owner != ?"
+                f") "
+                f"GROUP BY t.entity_id ORDER BY MAX(t.priority) DESC, MIN(t.rowid) LIMIT ?",
+                (
+                    entity_type, PENDING, IN_PROGRESS, *page_types, now, *charged_args,
+                    PENDING, IN_PROGRESS, *page_types, now, self.owner,
+                    limit,
+                ),
+            ).fetchall()
+            entity_ids = [r[0] for r in rows]
+
+            if budget is not None:
+                # 按顺序记账：已经记过的不占预算，新的记满 remaining 个为止
+                charged = {
+                    r[0] for r in self._conn.execute(
+                        f"SELECT entity_id FROM budget_charges WHERE budget = ? AND entity_type = ? "
+                        f"AND entity_id IN ({','.join('?' for _ in entity_ids)})",
+                        (budget[0], entity_type, *entity_ids),
+                    )
+                }
+                claimed = []
+                for eid in entity_ids:
+                    if eid not in charged:
+                        if remaining <= 0:
+                            continue
+                        self._conn.execute(
+                            "INSERT INTO budget_charges (budget, entity_type, entity_id, owner) VALUES (?, ?, ?, ?)",
+                            (budget[0], entity_type, eid, self.owner),
+                        )
+                        remaining -= 1
+                    claimed.append(eid)
+                entity_ids = claimed
+
+            self._conn.executemany(
+                f"UPDATE tasks SET owner = ?, lease_expires_at = ?, updated_at = ? "
+                f"WHERE entity_type = ? AND entity_id = ? AND status IN (?, ?) AND {page_cond}",
+                [
+                    (self.owner, now + self.lease_seconds, now, entity_type, eid,
+                     PENDING, IN_PROGRESS, *page_types)
+                    for eid in entity_ids
+                ],
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return entity_ids
+
+    def renew_leases(self) -> int:
+        """给当前 owner 名下所有未完成任务的租约续期，返回续了多少条"""
+        now = time.time()
+        cur = self._conn.execute(
+            "UPDATE tasks SET lease_expires_at = MAX(lease_expires_at, ?) "
+            "WHERE owner = ? AND status IN (?, ?) AND lease_expires_at IS NOT NULL",
+            (now + self.lease_seconds, self.owner, PENDING, IN_PROGRESS),
+        )
+        return cur.rowcount
+
+    def release_leases(self, budget: Optional[str] = None) -> int:
+        """
+        提前收工时调用：释放当前 owner 名下 pending 任务的租约，别的 worker 马上可以认领。
+        给了 budget（预算名字）时，这些实体在该预算上记的账也退掉。
+        """
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            entities = self._conn.execute(
+                "SELECT DISTINCT entity_type, entity_id FROM tasks "
+                "WHERE owner = ? AND status = ? AND lease_expires_at IS NOT NULL",
+                (self.owner, PENDING),
+            ).fetchall()
+            cur = self._conn.execute(
+                "UPDATE tasks SET lease_expires_at = NULL, updated_at = ? "
+                "WHERE owner = ? AND status = ? AND lease_expires_at IS NOT NULL",
+                (time.time(), self.owner, PENDING),
+            )
+            if budget is not None:
+                self._conn.executemany(
+                    "DELETE FROM budget_charges WHERE budget = ? AND entity_type = ? AND entity_id = ?",
+                    [(budget, *entity) for entity in entities],
+                )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return cur.rowcount
+
+    def budget_spent(self, budget: str) -> int:
+        """共享预算已经记了多少个实体"""
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM budget_charges WHERE budget = ?", (budget,)
+        ).fetchone()[0]
+
+    def leased_entities(
+            self,
+            entity_type: str,
+            page_types: Sequence[str],
+            batch_size: int,
+            budget: Optional[Budget] = None,
+    ) -> Iterator[str]:
+        """
+        一批一批认领实体并逐个产出，认领不到（或者共享预算记满）时结束。
+        每产出一个实体前续一次租约，处理得慢也不会被别的 worker 抢走。
+        """
+        while True:
+            batch = self.claim(entity_type, page_types, batch_size, budget=budget)
+            if not batch:
+                return
+            print(f"[frontier] {self.owner} 认领 {len(batch)} 个 {entity_type}")
+            for entity_id in batch:
+                self.renew_leases()
+                yield entity_id
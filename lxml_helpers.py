@@ -0,0 +1,71 @@
+"""
+lxml_helpers.py
+
+lxml 解析后端（PARSER_BACKEND = "lxml"）共用的小工具。
+
+celebrities / awards / 短评页面的解析函数原来都是 BeautifulSoup(html, "lxml") 建树，
+再用一堆带 class 条件的 find / find_all 找节点，每页的 CPU 大头都花在这上面。
+lxml 后端直接用 lxml.html 建树，节点查找换成预编译的 XPath，返回的记录和 BS4 版逐字段一致：
+
+  - document(html)     建树；空文档返回 None
+  - text(el, strip)    等价于 BS4 的 get_text(strip=...)：不含注释、<script> / <style> 里的文字
+  - has_class(name)    等价于 BS4 class_="name" 的 XPath 条件（按空白切开后任一 class 相等）
+  - first(xpath, el)   第一个匹配的节点，没有为 None
+  - pick_backend(b)    解析函数的 backend 参数：None 用配置里的 PARSER_BACKEND
+
+两个后端的一致性用 bench/bench_parsers.py 在合成页面和存档页面上对拍。
+"""
+
+from __future__ import annotations
+
+from typing import Any, Optional
+
+import lxml.html
+from lxml import etree
+
+from crawler_config import PARSER_BACKEND, PARSER_BACKENDS
+
+# BS4 的 get_text 只收普通字符串，注释、脚本、样式、<template> 里的文字都不算
+_TEXT = etree.XPath(
+    "descendant-or-self::text()[not(parent::script or parent::style or ancestor::template)]"
+)
+
+
+def document(html: str) -> Optional[Any]:
+    """HTML 文本 -> lxml 文档树根节点；空文档返回 None"""
+    if not html or not html.strip():
+        return None
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # 带 <?xml encoding=...?> 声明的 str 不能直接喂给 lxml，转成 bytes 再解析
+        return lxml.html.document_fromstring(html.encode("utf-8"))
+    except etree.ParserError:
+        return None
+
+
+def text(el: Any, strip: bool = True) -> str:
+    """节点下的全部文字；strip=True 时每段先去掉首尾空白再拼接（同 BS4 get_text(strip=True)）"""
+    parts = _TEXT(el)
+    if strip:
+        return "".join(s for s in (p.strip() for p in parts) if s)
+    return "".join(parts)
+
+
+def has_class(name: str) -> str:
+    """XPath 条件：class 属性按空白切开后含有 name"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def first(xpath: etree.XPath, el: Any) -> Optional[Any]:
+    """预编译 XPath 在 el 上的第一个匹配"""
+    found = xpath(el)
+    return found[0] if found else None
+
+
+def pick_backend(backend: Optional[str] = None) -> str:
+    """解析后端：显式给的优先，否则用 PARSER_BACKEND（CRAWLER_PARSER_BACKEND）"""
+    backend = backend or PARSER_BACKEND
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"未知的解析后端: {backend!r}（可选 {', '.join(PARSER_BACKENDS)}）")
+    return backend
@@ -0,0 +1,280 @@
+"""
+metrics.py
+
+抓取路径上的请求级指标，1/3/4 三个爬虫共用。
+
+以前只能看 fetch 的 print 输出，不知道 subject / celebrities / awards / 短评 / 人物 API
+各自多慢、拉了多少字节。现在 utils.fetch_html 每次请求都按“接口类别”（endpoint_of）记：
+
+  douban_requests_total{endpoint, status}        请求数，按状态码；网络异常（超时、连接失败）记为 status="error"
+  douban_request_duration_seconds{endpoint}      请求耗时直方图（发出请求到读完 body）
+  douban_response_size_bytes{endpoint}           响应 body 大小直方图
+  douban_retries_total{endpoint}                 失败后放回重试的次数（retry_queue / async 引擎）
+  douban_throttle_sleep_seconds_total{endpoint}  等令牌桶放行（含长休息）累计睡了多少秒
+
+每个指标都带 crawler / worker 两个固定 label，多个 worker 的文件可以直接合在一起。
+
+导出方式（各爬虫 main 里调 start_metrics）：
+  - Prometheus 文本格式文件：data/state/metrics/{crawler}_{worker_id}.prom，
+    每 METRICS_FLUSH_SECONDS 秒和进程退出时原子覆盖写，node_exporter 的 textfile collector 可以直接收；
+  - 可选的本地 HTTP 端点：--metrics-port N 时 worker k 在 127.0.0.1:(N + k)/metrics 上提供同样的内容。
+
+重放存档（--from-archive）不发请求，不计入请求指标。
+"""
+
+from __future__ import annotations
+
+import atexit
+import bisect
+import os
+import re
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from crawler_config import (
+    METRICS_DIR,
+    METRICS_ENABLED,
+    METRICS_FLUSH_SECONDS,
+    METRICS_HTTP_HOST,
+)
+
+# 接口类别：按 URL path 匹配，先匹配先得
+_ENDPOINTS: Tuple[Tuple[str, "re.Pattern[str]"], ...] = (
+    ("subject", re.compile(r"^/subject/\d+/?$")),
+    ("celebrities", re.compile(r"^/subject/\d+/celebrities/?$")),
+    ("awards", re.compile(r"^/subject/\d+/awards/?$")),
+    ("comments", re.compile(r"^/subject/\d+/comments/?$")),
+    ("person_api", re.compile(r"^/rexxar/api/")),
+    ("person_page", re.compile(r"^/(personage|celebrity)/\d+")),
+    ("top_list", re.compile(r"^/j/chart/top_list")),
+)
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# 指标名 -> (类型, label 名, 直方图分桶, 说明)
+_SPECS: Dict[str, Tuple[str, Tuple[str, ...], Sequence[float], str]] = {
+    "douban_requests_total": (
+        "counter", ("endpoint", "status"), (), "请求数（按接口类别、状态码；网络异常为 error）",
+    ),
+    "douban_request_duration_seconds": (
+        "histogram", ("endpoint",), LATENCY_BUCKETS, "请求耗时（秒，含读 body）",
+    ),
+    "douban_response_size_bytes": (
+        "histogram", ("endpoint",), SIZE_BUCKETS, "响应 body 大小（字节）",
+    ),
+    "douban_retries_total": (
+        "counter", ("endpoint",), (), "失败后放回重试的次数",
+    ),
+    "douban_throttle_sleep_seconds_total": (
+        "counter", ("endpoint",), (), "等待令牌桶放行累计秒数（含长休息）",
+    ),
+}
+
+Labels = Tuple[str, ...]
+
+
+def endpoint_of(url: str) -> str:
+    """URL -> 接口类别（subject / celebrities / awards / comments / person_api / ...，其余为 other）"""
+    path = urlsplit(url).path or "/"
+    for name, pattern in _ENDPOINTS:
+        if pattern.match(path):
+            return name
+    return "other"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metrics:
+    """
+    进程内的指标注册表，线程安全（asyncio 引擎在线程池里调 fetch_html）。
+
+    :param const_labels: 每个指标都带的固定 label，比如 {"crawler": "movies", "worker": "0"}
+    """
+
+    def __init__(self, const_labels: Optional[Dict[str, str]] = None):
+        self.const_labels: Dict[str, str] = dict(const_labels or {})
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        # 直方图：label -> [各桶计数..., +Inf 计数, sum]
+        self._histograms: Dict[str, Dict[Labels, List[float]]] = {}
+        for name, (kind, _, _, _) in _SPECS.items():
+            (self._histograms if kind == "histogram" else self._counters)[name] = {}
+
+    def inc(self, name: str, labels: Labels, value: float = 1.0) -> None:
+        with self._lock:
+            series = self._counters[name]
+            series[labels] = series.get(labels, 0.0) + value
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        buckets = _SPECS[name][2]
+        # 第一个 >= value 的桶；比最大的桶还大时落在 +Inf
+        idx = bisect.bisect_left(buckets, value)
+        with self._lock:
+            series = self._histograms[name]
+            h = series.get(labels)
+            if h is None:
+                h = series[labels] = [0.0] * (len(buckets) + 2)
+            h[idx] += 1
+            h[-1] += value
+
+    # ---- 抓取路径上的埋点 ----
+
+    def record_request(self, endpoint: str, status: Optional[int], seconds: float, size: int) -> None:
+        """一次请求结束；status 为 None 表示网络异常（此时没有响应大小）"""
+        self.inc("douban_requests_total", (endpoint, "error" if status is None else str(status)))
+        self.observe("douban_request_duration_seconds", (endpoint,), seconds)
+        if status is not None:
+            self.observe("douban_response_size_bytes", (endpoint,), size)
+
+    def record_retry(self, endpoint: str) -> None:
+        self.inc("douban_retries_total", (endpoint,))
+
+    def record_throttle(self, endpoint: str, seconds: float) -> None:
+        if seconds > 0:
+            self.inc("douban_throttle_sleep_seconds_total", (endpoint,), seconds)
+
+    # ---- 导出 ----
+
+    def _label_str(self, names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+        pairs = list(self.const_labels.items()) + list(zip(names, values))
+        parts = [f'{k}="{_escape(str(v))}"' for k, v in pairs]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def render(self) -> str:
+        """Prometheus 文本格式（0.0.4）"""
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {
+                name: {k: list(v) for k, v in series.items()} for name, series in self._histograms.items()
+            }
+
+        lines: List[str] = []
+        for name, (kind, label_names, buckets, help_text) in _SPECS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for labels, value in sorted(counters[name].items()):
+                    lines.append(f"{name}{self._label_str(label_names, labels)} {_format_value(value)}")
+                continue
+            for labels, h in sorted(histograms[name].items()):
+                cumulative = 0.0
+                for bound, n in zip(list(buckets) + ["+Inf"], h[:-1]):
+                    cumulative += n
+                    le = bound if bound == "+Inf" else _format_value(bound)
+                    label_str = self._label_str(label_names, labels, 'le="%s"' % le)
+                    lines.append(f"{name}_bucket{label_str} {_format_value(cumulative)}")
+                label_str = self._label_str(label_names, labels)
+                lines.append(f"{name}_sum{label_str} {_format_value(h[-1])}")
+                lines.append(f"{name}_count{label_str} {_format_value(cumulative)}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str) -> None:
+        """原子覆盖写 .prom 文件（先写临时文件再 rename，采集方不会读到半个文件）"""
+        dirname = os.path.dirname(path) or "."
+        os.makedirs(dirname, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".metrics_", dir=dirname)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.render())
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+
+# ====== 进程内共享的注册表 ======
+
+_metrics: Optional[Metrics] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """返回进程内共享的注册表（懒加载）；没调 start_metrics 时照样计数，只是不导出"""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = Metrics()
+    return _metrics
+
+
+def set_metrics(metrics: Metrics) -> None:
+    """替换进程内共享的注册表（基准测试用）"""
+    global _metrics
+    with _metrics_lock:
+        _metrics = metrics
+
+
+def metrics_path(crawler: str, worker_id: int) -> str:
+    """某个爬虫某个 worker 的 .prom 文件路径"""
+    return os.path.join(METRICS_DIR, f"{crawler}_{worker_id}.prom")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = get_metrics().render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 别让每次抓取都刷一行访问日志
+        pass
+
+
+def serve_metrics(port: int, host: str = METRICS_HTTP_HOST) -> ThreadingHTTPServer:
+    """在后台线程里提供 http://host:port/metrics"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def start_metrics(crawler: str, worker_id: int, port: int = 0) -> None:
+    """
+    爬虫启动时调用：给指标打上 crawler / worker label，定期写 .prom 文件（METRICS_ENABLED），
+    port > 0 时再起一个本地 /metrics 端点（端口 port + worker_id）。
+    """
+    metrics = get_metrics()
+    metrics.const_labels = {"crawler": crawler, "worker": str(worker_id)}
+
+    if METRICS_ENABLED:
+        path = metrics_path(crawler, worker_id)
+        stop = threading.Event()
+
+        def _flush_loop():
+            while not stop.wait(METRICS_FLUSH_SECONDS):
+                try:
+                    metrics.write_textfile(path)
+                except OSError as e:
+                    print(f"[metrics] 写 {path} 失败: {e!r}")
+
+        def _final_flush():
+            stop.set()
+            metrics.write_textfile(path)
+
+        threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True).start()
+        atexit.register(_final_flush)
+        print(f"[metrics] 指标文件: {path}（每 {METRICS_FLUSH_SECONDS:g}s 更新）")
+
+    if port > 0:
+        serve_metrics(port + worker_id)
+        print(f"[metrics] HTTP 端点: http://{METRICS_HTTP_HOST}:{port + worker_id}/metrics")
@@ -16,9 +16,10 @@ import json
 from typing import Any, Dict, List, Optional
 from urllib.parse import urlencode
 
+from crawler_config import DOUBAN_MOVIE_BASE_URL
 from utils import fetch_html
 
-BASE_URL = "https://movie.douban.com/j/chart/top_list"
+BASE_URL = DOUBAN_MOVIE_BASE_URL + "/j/chart/top_list"
 
 def _build_top_list_url(
         type_id: int,
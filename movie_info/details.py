@@ -56,7 +56,10 @@ def  _extract_list_field_from(info_div, label_keyword: str) -> List[str]:
     return [p for p in parts if p]
 
 def parse_details(html: str) -> Dict[str, Any]:
-    soup = BeautifulSoup(html, "lxml")
+    return parse_details_from_soup(BeautifulSoup(html, "lxml"))
+
+def parse_details_from_soup(soup: BeautifulSoup) -> Dict[str, Any]:
+    """从已经解析好的文档树中提取制片国家/地区、语言"""
     info_div = soup.select_one("#info")
 
     if info_div is None:
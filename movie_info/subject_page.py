@@ -0,0 +1,67 @@
+"""
+movie_info/subject_page.py
+
+    /subject 主页面的解析文档。
+
+    ld+json 基本信息、#info 里的地区/语言、剧情简介都来自同一个页面，
+    以前三个解析函数各自 BeautifulSoup(html, "lxml") 一次，最大的页面被解析三遍。
+    SubjectPage 只建一次文档树（第一次用到时才建），三类字段都从这棵树上取。
+    ld+json 先在原始文本上快速切片（见 ld_json.py），只取 basic() 时根本不建树。
+
+    用法：
+        page = SubjectPage(html)
+        page.basic()    # 同 parse_movie_basic_from_ld_json(html)
+        page.details()  # 同 parse_details(html)
+        page.summary()  # 同 parse_summary(html)
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+from bs4 import BeautifulSoup
+
+from movie_info.ld_json import parse_ld_json, movie_basic_from_ld
+from movie_info.details import parse_details_from_soup
+from movie_info.summary import parse_summary_from_soup
+
+_UNSET = object()
+
+
+class SubjectPage:
+    """/subject 页面：文档树懒加载且只建一次，ld+json / 地区语言 / 简介的解析结果也缓存（basic() 每次从缓存的 ld+json 现拼）"""
+
+    def __init__(self, html: str):
+        self.html = html
+        self._soup: Optional[BeautifulSoup] = None
+        self._ld: Any = _UNSET
+        self._details: Any = _UNSET
+        self._summary: Any = _UNSET
+
+    @property
+    def soup(self) -> BeautifulSoup:
+        if self._soup is None:
+            self._soup = BeautifulSoup(self.html, "lxml")
+        return self._soup
+
+    def ld_json(self) -> Optional[Dict[str, Any]]:
+        """页面里的 ld+json 对象（解析失败为 None）"""
+        if self._ld is _UNSET:
+            self._ld = parse_ld_json(self.html, soup=lambda: self.soup)
+        return self._ld
+
+    def basic(self) -> Optional[Dict[str, Any]]:
+        """ld+json 中的基础信息：douban_id / name / image_url / release_date / genres / runtime_minutes"""
+        return movie_basic_from_ld(self.ld_json())
+
+    def details(self) -> Dict[str, Any]:
+        """#info 区块中的制片国家/地区、语言"""
+        if self._details is _UNSET:
+            self._details = parse_details_from_soup(self.soup)
+        return self._details
+
+    def summary(self) -> Optional[str]:
+        """完整的剧情简介"""
+        if self._summary is _UNSET:
+            self._summary = parse_summary_from_soup(self.soup)
+        return self._summary
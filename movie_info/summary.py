@@ -13,8 +13,10 @@ SUMMARY_SELECTOR = "#link-report-intra > span:nth-child(1)"
 
 def parse_summary(html: str) -> Optional[str]:
     """从 HTML 中解析完整的剧情简介"""
-    soup = BeautifulSoup(html, "lxml")
+    return parse_summary_from_soup(BeautifulSoup(html, "lxml"))
 
+def parse_summary_from_soup(soup: BeautifulSoup) -> Optional[str]:
+    """从已经解析好的文档树中提取完整的剧情简介"""
     summary_span = soup.select_one(SUMMARY_SELECTOR)
     if summary_span is None:
         return None
@@ -0,0 +1,271 @@
+"""
+page_archive.py
+
+原始响应存档：每次抓到的页面（HTML / JSON）都原样压缩存下来，以后改了解析器直接重跑解析，不用重新抓。
+
+目录结构（data/archive/）：
+
+    blobs/ab/abcdef....gz   响应 body 按 sha256 内容寻址、gzip 压缩；内容相同的页面只存一份
+    index.sqlite3           URL -> blob 索引：状态码、响应头、抓取时间、body 大小
+
+索引按 URL 的 path + query 查找，不看协议和域名：
+base url 换过（http/https、本地 mock、镜像）时存档照样能用。
+电影站和移动端 API 的路径各不相同，不会撞键。
+
+只存“确定的”响应：2xx 和 404（404 重放时照样是 404）；
+429 / 5xx 之类的临时错误不存，免得把之前存好的正常页面覆盖掉；
+跳转过来的响应（比如 302 到登录页 / 验证页之后的 200）也不存。
+同一个 URL 再抓一次，索引指向最新的 blob。
+
+utils.fetch_html 每次成功请求后自动存档（CRAWLER_ARCHIVE=0 可关闭）；
+各爬虫的 --from-archive 模式打开重放：fetch_html 直接从存档里取，不发任何请求，
+存档里没有的 URL 抛 ArchiveMiss。
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from crawler_config import ARCHIVE_DIR, ARCHIVE_COMPRESS_LEVEL, ARCHIVE_ENABLED
+
+# 不存的响应头（会话 cookie 之类）
+_SKIPPED_HEADERS = {"set-cookie"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key        TEXT PRIMARY KEY,
+    url        TEXT NOT NULL,
+    sha256     TEXT NOT NULL,
+    status     INTEGER NOT NULL,
+    headers    TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    size       INTEGER NOT NULL
+);
+"""
+
+
+class ArchiveMiss(requests.RequestException):
+    """重放模式下存档里找不到这个 URL"""
+
+
+def url_key(url: str) -> str:
+    """索引键：path + query"""
+    parts = urlsplit(url)
+    return (parts.path or "/") + ("?" + parts.query if parts.query else "")
+
+
+def should_archive(status: int) -> bool:
+    """哪些响应值得存：2xx 和 404"""
+    return 200 <= status < 300 or status == 404
+
+
+def is_redirected(url: str, resp: requests.Response) -> bool:
+    """
+    响应是不是跳转过来的：requests 默认跟随跳转，302 到登录页 / 验证页之后也是 200，
+    这种页面不能当成 url 本身的内容存。resp.history 非空，或者最终 path 和请求的不一样，都算跳转。
+    """
+    if resp.history:
+        return True
+    return bool(resp.url) and (urlsplit(resp.url).path or "/") != (urlsplit(url).path or "/")
+
+
+class PageArchive:
+    """
+    内容寻址的响应存档。每个进程一个实例，线程安全（asyncio 引擎在线程池里调 fetch_html），
+    多个 worker 进程可以同时写（blob 原子落盘 + SQLite WAL）。
+
+    :param root: 存档根目录
+    :param compress_level: gzip 压缩级别
+    """
+
+    def __init__(self, root: str = ARCHIVE_DIR, compress_level: int = ARCHIVE_COMPRESS_LEVEL):
+        self.root = root
+        self.blob_dir = os.path.join(root, "blobs")
+        self.compress_level = compress_level
+        os.makedirs(self.blob_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(root, "index.sqlite3"),
+            timeout=30,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _blob_path(self, sha: str) -> str:
+        return os.path.join(self.blob_dir, sha[:2], sha + ".gz")
+
+    # ====== 写 ======
+
+    def put_blob(self, body: bytes) -> str:
+        """存一个 body，返回 sha256；已经存过的不再重复写"""
+        sha = hashlib.sha256(body).hexdigest()
+        path = self._blob_path(sha)
+        if os.path.exists(path):
+            return sha
+
+        dirname = os.path.dirname(path)
+        os.makedirs(dirname, exist_ok=True)
+        # 先写临时文件再改名，别的进程不会读到写了一半的 blob
+        fd, tmp = tempfile.mkstemp(dir=dirname, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(gzip.compress(body, compresslevel=self.compress_level, mtime=0))
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return sha
+
+    def store(
+            self,
+            url: str,
+            status: int,
+            headers: Dict[str, str],
+            body: bytes,
+            fetched_at: Optional[float] = None,
+    ) -> str:
+        """存一条响应，返回 blob 的 sha256"""
+        sha = self.put_blob(body)
+        headers = {k: v for k, v in headers.items() if k.lower() not in _SKIPPED_HEADERS}
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, url, sha256, status, headers, fetched_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url_key(url), url, sha, status, json.dumps(headers, ensure_ascii=False),
+                    fetched_at if fetched_at is not None else time.time(), len(body),
+                ),
+            )
+        return sha
+
+    def store_response(self, url: str, resp: requests.Response) -> Optional[str]:
+        """
+        存一个 requests 的响应（不该存的状态码、跳转过来的响应返回 None）。
+        以请求时的 url 为键（不是跳转后的 resp.url），重放时才能按同一个 URL 找到。
+        """
+        if not should_archive(resp.status_code):
+            return None
+        if is_redirected(url, resp):
+            # 别让登录页 / 反爬页覆盖掉之前存好的正常页面
+            print(f"[archive] 响应是跳转过来的（{resp.url}），不存档: {url}")
+            return None
+        return self.store(url, resp.status_code, dict(resp.headers), resp.content)
+
+    # ====== 读 ======
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        """URL 的索引记录：url（存档时的完整 URL）/ sha256 / status / headers / fetched_at / size；没存过返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, sha256, status, headers, fetched_at, size FROM responses WHERE key = ?",
+                (url_key(url),),
+            ).fetchone()
+        if row is None:
+            return None
+        archived_url, sha, status, headers, fetched_at, size = row
+        return {
+            "url": archived_url,
+            "sha256": sha,
+            "status": status,
+            "headers": json.loads(headers),
+            "fetched_at": fetched_at,
+            "size": size,
+        }
+
+    def read_blob(self, sha: str) -> bytes:
+        with open(self._blob_path(sha), "rb") as f:
+            return gzip.decompress(f.read())
+
+    def load(self, url: str) -> Optional[Tuple[int, Dict[str, str], bytes]]:
+        """取出 URL 存档的 (status, headers, body)；没存过返回 None"""
+        meta = self.lookup(url)
+        if meta is None:
+            return None
+        return meta["status"], meta["headers"], self.read_blob(meta["sha256"])
+
+    def load_response(self, url: str) -> requests.Response:
+        """把存档还原成 requests.Response（调用方照常 raise_for_status / 取 text）"""
+        found = self.load(url)
+        if found is None:
+            raise ArchiveMiss(f"存档中没有该 URL: {url}")
+        status, headers, body = found
+
+        resp = requests.Response()
+        resp.url = url
+        resp.status_code = status
+        resp.headers.update(headers)
+        resp._content = body
+        return resp
+
+    def stats(self) -> Tuple[int, int, int]:
+        """(URL 数, 不同 blob 数, body 总字节数)"""
+        with self._lock:
+            n_urls, n_blobs, total = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT sha256), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return n_urls, n_blobs, total
+
+
+# ====== 进程内共享的存档 & 存档 / 重放开关 ======
+
+_archive: Optional[PageArchive] = None
+_archive_lock = threading.Lock()
+_enabled = ARCHIVE_ENABLED
+_replay = False
+
+
+def get_archive() -> PageArchive:
+    """进程内共享的存档（懒加载）"""
+    global _archive
+    if _archive is None:
+        with _archive_lock:
+            if _archive is None:
+                _archive = PageArchive()
+    return _archive
+
+
+def set_archive(archive: Optional[PageArchive]) -> None:
+    """替换进程内的存档（基准测试里指向临时目录用）"""
+    global _archive
+    with _archive_lock:
+        _archive = archive
+
+
+def enable_archive(enabled: bool = True) -> None:
+    """打开 / 关闭存档（基准测试里压本地服务器时关掉，别往真实存档里写）"""
+    global _enabled
+    _enabled = enabled
+
+
+def archive_enabled() -> bool:
+    return _enabled
+
+
+def enable_replay(enabled: bool = True) -> None:
+    """打开 / 关闭重放模式：之后的 fetch_html 都从存档里取"""
+    global _replay
+    _replay = enabled
+
+
+def replay_enabled() -> bool:
+    return _replay
@@ -3,11 +3,17 @@ person/celebrities.py
 
     从 /subject/{movie_id}/celebrities 页面中抓取电影-人物关联表所需信息。
     其中的人物 Douban ID 可以用于筛选种子人物列表。
+
+    解析后端见 crawler_config.PARSER_BACKEND：bs4（默认）或 lxml（预编译 XPath，结果一致）。
 """
 
 import re
 from typing import Any, Dict, List, Optional
 from bs4 import BeautifulSoup
+from lxml import etree
+
+import lxml_helpers
+from lxml_helpers import first, has_class
 from utils import fetch_html
 
 _PERSON_ID_RE = re.compile(r"/personage/(\d+)/")
@@ -21,15 +27,27 @@ def _extract_person_id_from_href(href: str) -> Optional[str]:
     m = _PERSON_ID_RE.search(href)
     return m.group(1) if m else None
 
-def parse_celebrities(html: str, movie_douban_id: str = "") -> Dict[str, List[Dict[str, Any]]]:
+def _is_cast_department(department: str) -> bool:
+    """部门是演员的归到 cast，其他一律属于 crew"""
+    return department.startswith("演员") or _CAST_WORD_RE.search(department) is not None
+
+def parse_celebrities(
+        html: str,
+        movie_douban_id: str = "",
+        backend: Optional[str] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
     """
     从影片的 /celebrities 页面抓取该电影所有的演职人员信息。
 
 
     :param html: 演职表页面的 HTML 文档
     :param movie_douban_id: 所属电影 Douban ID，方便填电影人物关联表，不一定用得上
+    :param backend: 解析后端 bs4 / lxml，默认取 PARSER_BACKEND
     :return: 返回 1 个 2 级 JSON 字典，外层分为 cast 和 crew，内层为抓取到的 celebrity 对象基本信息。包括 Douban ID，名称（中文+英文），部门，职位，顺序。
     """
+    if lxml_helpers.pick_backend(backend) == "lxml":
+        return _parse_celebrities_lxml(html, movie_douban_id)
+
     soup = BeautifulSoup(html, "lxml")
 
     root = soup.select_one("#celebrities")
@@ -79,14 +97,60 @@ def parse_celebrities(html: str, movie_douban_id: str = "") -> Dict[str, List[Di
                 "order": idx,
             }
 
-            # 部门是演员的归到 cast
-            # 其他一律属于 crew
-            is_cast = (
-                department.startswith("演员") or
-                _CAST_WORD_RE.search(department) is not None
-            )
+            if _is_cast_department(department):
+                cast.append(record)
+            else:
+                crew.append(record)
+
+    return {"cast": cast, "crew": crew}
+
+
+"""lxml 后端：和上面逐行对应，find / select 换成预编译 XPath"""
+
+_X_ROOT = etree.XPath("//*[@id='celebrities']")
+_X_WRAPPERS = etree.XPath(f".//div[{has_class('list-wrapper')}]")
+_X_H2 = etree.XPath(".//h2")
+_X_LIST = etree.XPath(f".//ul[{has_class('celebrities-list')}]")
+_X_ITEMS = etree.XPath(f".//li[{has_class('celebrity')}]")
+_X_LINK = etree.XPath(".//a[@href]")
+_X_NAME = etree.XPath(f".//span[{has_class('name')}]//a")
+_X_ROLE = etree.XPath(f".//span[{has_class('role')}]")
+
+def _parse_celebrities_lxml(html: str, movie_douban_id: str) -> Dict[str, List[Dict[str, Any]]]:
+    doc = lxml_helpers.document(html)
+    root = first(_X_ROOT, doc) if doc is not None else None
+    if root is None:
+        return {"cast": [], "crew": []}
+
+    cast: List[Dict[str, Any]] = []
+    crew: List[Dict[str, Any]] = []
+
+    for wrapper in _X_WRAPPERS(root):
+        h2 = first(_X_H2, wrapper)
+        department = lxml_helpers.text(h2) if h2 is not None else ""
+
+        ul = first(_X_LIST, wrapper)
+        if ul is None:
+            continue
+
+        for idx, li in enumerate(_X_ITEMS(ul), start=1):
+            a = first(_X_LINK, li)
+            if a is None:
+                continue
+
+            name_a = first(_X_NAME, li)
+            role_span = first(_X_ROLE, li)
+
+            record = {
+                "movie_douban_id": movie_douban_id,
+                "person_douban_id": _extract_person_id_from_href(a.get("href")),
+                "name": lxml_helpers.text(name_a if name_a is not None else a),
+                "department": department,
+                "role": lxml_helpers.text(role_span) if role_span is not None else department,
+                "order": idx,
+            }
 
-            if is_cast:
+            if _is_cast_department(department):
                 cast.append(record)
             else:
                 crew.append(record)
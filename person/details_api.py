@@ -22,9 +22,10 @@ from __future__ import annotations
 import json
 from typing import Any, Dict, List, Optional
 
+from crawler_config import DOUBAN_MOBILE_BASE_URL
 from utils import fetch_html
 
-BASE_API_URL = "https://m.douban.com/rexxar/api/v2/elessar/subject/{person_id}"
+BASE_API_URL = DOUBAN_MOBILE_BASE_URL + "/rexxar/api/v2/elessar/subject/{person_id}"
 
 
 """小工具"""
@@ -135,14 +136,16 @@ def parse_person_from_api_json(data: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def fetch_person_details(person_id: str) -> Optional[Dict[str, Any]]:
+def fetch_person_details(person_id: str, throttle: bool = True) -> Optional[Dict[str, Any]]:
     """
     对外的获取人物信息函数：
     - 调用 mobile API 拿到 json
     - 解析为我们自己的结构化 dict（精简字段）
+
+    throttle=False：调用方已经自己等过令牌（见 3_crawl_persons.py 的 pool 引擎）
     """
     url = BASE_API_URL.format(person_id=person_id)
-    text = fetch_html(url)   # 这里返回的是 json 字符串
+    text = fetch_html(url, throttle=throttle)   # 这里返回的是 json 字符串
     if not text:
         print(f"[person_api] 获取 API 文本失败: {url}")
         return None
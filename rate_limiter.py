@@ -0,0 +1,287 @@
+"""
+rate_limiter.py
+
+全机共享的令牌桶限速器，取代之前复制在各个爬虫里的 polite_sleep。
+
+- 每个 host 一个令牌桶：平均速率 RATE_LIMIT_RPS 次/秒，最多攒 RATE_LIMIT_BURST 个令牌；
+- 每发出 LONG_BREAK_EVERY 次请求，整个桶进入一次 LONG_BREAK_MIN~MAX 秒的长休息窗口；
+- 桶的状态存放在 data/state/rate_limiter.json，读写时加 fcntl 文件锁，
+  同一台机器上的所有 worker 进程共用同一份预算：
+  3 个 worker 合计的速率就是配置的速率，而不是配置的 3 倍。
+
+实现上用的是 GCRA（虚拟时间版的令牌桶）：每次 reserve() 直接算出
+“这个请求最早可以在什么时候发出”，调用方只需要睡到那个时间点，
+不会像随机 sleep 那样多等。
+
+自适应（RATE_LIMIT_ADAPTIVE，默认开启）：每次请求结束后 utils.fetch_html 调 feedback()，
+按 AIMD 调整这个 host 的速率：
+  - 2xx 且延迟正常：每个响应加 AIMD_INCREASE_STEP / 当前速率，
+    即每秒大约加 AIMD_INCREASE_STEP（加性增）；
+  - 403/418/429、5xx、网络异常、延迟明显高于基线：速率 × AIMD_DECREASE_FACTOR（乘性减），
+    AIMD_DECREASE_COOLDOWN 秒内最多减一次；
+  - 速率限制在 [RATE_LIMIT_MIN_RPS, RATE_LIMIT_MAX_RPS]，存在状态文件里，跨进程、跨运行共享。
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+from urllib.parse import urlsplit
+
+try:
+    import fcntl
+except ImportError:  # Windows 没有 fcntl，只能退化成进程内限速
+    fcntl = None
+
+from crawler_config import (
+    RATE_LIMIT_STATE_PATH,
+    RATE_LIMIT_RPS,
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_ADAPTIVE,
+    RATE_LIMIT_MIN_RPS,
+    RATE_LIMIT_MAX_RPS,
+    AIMD_INCREASE_STEP,
+    AIMD_DECREASE_FACTOR,
+    AIMD_DECREASE_COOLDOWN,
+    AIMD_THROTTLE_STATUSES,
+    AIMD_LATENCY_TOLERANCE,
+    AIMD_LATENCY_MIN_DELTA,
+    LONG_BREAK_EVERY,
+    LONG_BREAK_MIN,
+    LONG_BREAK_MAX,
+)
+
+
+class TokenBucketLimiter:
+    """
+    跨进程共享的按 host 令牌桶。
+
+    状态文件格式：
+        {
+          "movie.douban.com": {
+            "tat": 1700000000.5,        # 理论到达时间（GCRA 虚拟时钟）
+            "count": 123,               # 累计发放的令牌数，用来安排长休息
+            "break_until": 1700000020.0,# 长休息窗口结束时间
+            "rate": 1.2,                # 自适应学到的速率（次/秒）
+            "lat_ewma": 0.35,           # 响应延迟的指数滑动平均
+            "lat_base": 0.30,           # 延迟基线（缓慢上浮的最小值）
+            "last_decrease_at": 0.0     # 上一次乘性减的时间
+          },
+          ...
+        }
+    """
+
+    def __init__(
+            self,
+            state_path: str = RATE_LIMIT_STATE_PATH,
+            rate: float = RATE_LIMIT_RPS,
+            burst: int = RATE_LIMIT_BURST,
+            long_break_every: int = LONG_BREAK_EVERY,
+            long_break_min: float = LONG_BREAK_MIN,
+            long_break_max: float = LONG_BREAK_MAX,
+            adaptive: bool = RATE_LIMIT_ADAPTIVE,
+            min_rate: float = RATE_LIMIT_MIN_RPS,
+            max_rate: float = RATE_LIMIT_MAX_RPS,
+            increase_step: float = AIMD_INCREASE_STEP,
+            decrease_factor: float = AIMD_DECREASE_FACTOR,
+            decrease_cooldown: float = AIMD_DECREASE_COOLDOWN,
+    ):
+        self.state_path = state_path
+        self.rate = rate
+        self.burst = max(1, int(burst))
+        self.long_break_every = long_break_every
+        self.long_break_min = long_break_min
+        self.long_break_max = long_break_max
+        self.adaptive = adaptive and rate > 0
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, min_rate)
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        self._thread_lock = threading.Lock()
+
+        dirname = os.path.dirname(state_path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+
+    @contextlib.contextmanager
+    def _locked_state(self) -> Iterator[Dict[str, Any]]:
+        """加锁读出状态，with 块结束时写回并解锁"""
+        with self._thread_lock:
+            with open(self.state_path, "a+", encoding="utf-8") as f:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    raw = f.read()
+                    try:
+                        state = json.loads(raw) if raw.strip() else {}
+                    except json.JSONDecodeError:
+                        print(f"[throttle] 状态文件损坏，重置: {self.state_path}")
+                        state = {}
+                    if not isinstance(state, dict):
+                        state = {}
+
+                    yield state
+
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps(state))
+                    f.flush()
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    @staticmethod
+    def _bucket(state: Dict[str, Any], key: str) -> Dict[str, Any]:
+        bucket = state.get(key)
+        if not isinstance(bucket, dict):
+            bucket = {"tat": 0.0, "count": 0, "break_until": 0.0}
+            state[key] = bucket
+        return bucket
+
+    def _rate_of(self, bucket: Dict[str, Any]) -> float:
+        """这个桶当前生效的速率：非自适应时就是配置值"""
+        if not self.adaptive:
+            return self.rate
+        try:
+            rate = float(bucket.get("rate") or self.rate)
+        except (TypeError, ValueError):
+            rate = self.rate
+        return min(self.max_rate, max(self.min_rate, rate))
+
+    def current_rate(self, key: str) -> float:
+        """读出 key 当前生效的速率（次/秒）"""
+        with self._locked_state() as state:
+            return self._rate_of(self._bucket(state, key))
+
+    def reserve(self, key: str) -> float:
+        """
+        为 key（一般是 host）预约一个令牌。
+
+        :param key: 限速维度，一般是 host
+        :return: 调用方需要等待的秒数（0 表示可以立刻发请求）
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        with self._locked_state() as state:
+            bucket = self._bucket(state, key)
+            interval = 1.0 / self._rate_of(bucket)
+            # 允许的突发量：最多可以比理论时间提前 (burst - 1) 个间隔
+            tolerance = (self.burst - 1) * interval
+
+            now = time.time()
+            tat = max(float(bucket.get("tat") or 0.0), now)
+            start_at = max(now, tat - tolerance, float(bucket.get("break_until") or 0.0))
+
+            bucket["tat"] = max(tat, start_at) + interval
+            bucket["count"] = int(bucket.get("count") or 0) + 1
+
+            # 长休息：这一次请求发完之后，整个 host 歇一会
+            if self.long_break_every > 0 and bucket["count"] % self.long_break_every == 0:
+                long_sleep = random.uniform(self.long_break_min, self.long_break_max)
+                bucket["break_until"] = start_at + long_sleep
+                print(
+                    f"[throttle] {key} 已发送 {bucket['count']} 次请求，"
+                    f"之后长休眠 {long_sleep:.2f} 秒"
+                )
+
+        return max(0.0, start_at - now)
+
+    def feedback(self, key: str, status: Optional[int], latency: float) -> None:
+        """
+        请求结束后回报结果，按 AIMD 调整 key 的速率。
+
+        :param key: 限速维度，一般是 host
+        :param status: HTTP 状态码；网络异常（超时、连接失败）传 None
+        :param latency: 本次请求耗时（秒）
+        """
+        if not self.adaptive:
+            return
+
+        with self._locked_state() as state:
+            bucket = self._bucket(state, key)
+            rate = self._rate_of(bucket)
+            now = time.time()
+
+            # 延迟：EWMA 平滑；基线取历史最小值，但每次缓慢上浮 1%，
+            # 这样网络整体变慢时基线也能跟上，不会一直误判
+            ewma = bucket.get("lat_ewma")
+            ewma = latency if ewma is None else 0.8 * float(ewma) + 0.2 * latency
+            base = bucket.get("lat_base")
+            base = ewma if base is None else min(float(base) * 1.01, ewma)
+            bucket["lat_ewma"] = ewma
+            bucket["lat_base"] = base
+
+            reason = None
+            if status is None:
+                reason = "请求异常"
+            elif status in AIMD_THROTTLE_STATUSES or status >= 500:
+                reason = f"HTTP {status}"
+            elif ewma > base * AIMD_LATENCY_TOLERANCE and ewma - base > AIMD_LATENCY_MIN_DELTA:
+                reason = f"延迟升高 {base:.2f}s -> {ewma:.2f}s"
+
+            if reason is not None:
+                last = float(bucket.get("last_decrease_at") or 0.0)
+                if now - last >= self.decrease_cooldown:
+                    new_rate = max(self.min_rate, rate * self.decrease_factor)
+                    bucket["rate"] = new_rate
+                    bucket["last_decrease_at"] = now
+                    print(f"[throttle] {key} {reason}，速率 {rate:.2f} -> {new_rate:.2f} 次/秒")
+                else:
+                    bucket["rate"] = rate
+            elif 200 <= status < 300:
+                # 每秒大约 rate 个响应，每个加 step / rate，合起来每秒加 step
+                bucket["rate"] = min(self.max_rate, rate + self.increase_step / rate)
+            else:
+                # 404 之类与限流无关，保持不变
+                bucket["rate"] = rate
+
+    def acquire(self, key: str) -> float:
+        """预约令牌并阻塞等待，返回实际等待的秒数"""
+        wait = self.reserve(key)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+_limiter: Optional[TokenBucketLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> TokenBucketLimiter:
+    """返回进程内共享的限速器（懒加载）"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = TokenBucketLimiter()
+    return _limiter
+
+
+def set_limiter(limiter: TokenBucketLimiter) -> None:
+    """替换进程内共享的限速器（模拟 / 基准测试用）"""
+    global _limiter
+    with _limiter_lock:
+        _limiter = limiter
+
+
+def host_of(url: str) -> str:
+    """限速维度：URL 的 host（带端口）"""
+    return urlsplit(url).netloc or "default"
+
+
+def throttle(url: str) -> float:
+    """在对 url 发请求之前调用：等到全机共享的令牌桶放行为止"""
+    return get_limiter().acquire(host_of(url))
+
+
+def report(url: str, status: Optional[int], latency: float) -> None:
+    """对 url 的请求结束后调用：把状态码和耗时回报给自适应限速"""
+    get_limiter().feedback(host_of(url), status, latency)
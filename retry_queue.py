@@ -0,0 +1,272 @@
+"""
+retry_queue.py
+
+抓取失败时的延迟重试队列 + dead-letter 文件，1/3/4 三个爬虫共用。
+
+以前每个爬虫的 fetch_*_with_retry 失败后原地 sleep 10~30 秒，
+一个不稳定的 URL 能把整个 worker 卡住一分钟。现在改成：
+
+- 失败的页面包装成一个任务（dict，至少带 kind 字段，一般还有 url），
+  按“到期时间”放进小顶堆，第 n 次失败后等 RETRY_BACKOFF_BASE * 2^(n-1) 秒（封顶 CAP）；
+- worker 照常处理新任务，每处理完一个就顺手跑一下已经到期的重试；
+- 新任务处理完后 drain()：睡到下一个到期时间，直到队列清空；
+- 同一个任务失败 MAX_RETRY 次后写进 dead-letter 文件（jsonl），
+  之后用各爬虫的 --retry-dead-letters 参数重放。
+
+任务怎么执行由各爬虫自己的 handler 决定（按 kind 分派），这里只管排队和记账。
+
+给了 frontier 时，任务状态同步记进 frontier（见 frontier.py）：
+try_fetch 开始 -> in_progress；404 -> done；放回重试队列 -> pending（租约保留到重试之后）；
+重试用尽 -> failed；handler 写完记录后调 complete() -> done。
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import json
+import os
+import random
+import shutil
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from frontier import Frontier
+from metrics import endpoint_of, get_metrics
+from utils import fetch_html
+from crawler_config import (
+    MAX_RETRY,
+    RETRY_BACKOFF_BASE,
+    RETRY_BACKOFF_CAP,
+    DEAD_LETTER_DIR,
+)
+
+Task = Dict[str, Any]
+
+# dead-letter 里额外记录的字段，重放时去掉
+_DEAD_LETTER_META = ("attempt", "error", "failed_at")
+
+
+def retry_delay(attempt: int) -> float:
+    """第 attempt 次失败后要等多少秒：指数退避，封顶，带 ±20% 抖动"""
+    delay = min(RETRY_BACKOFF_CAP, RETRY_BACKOFF_BASE * (2 ** max(0, attempt - 1)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def describe(task: Task) -> str:
+    """日志里用的任务简述"""
+    return task.get("url") or json.dumps(task, ensure_ascii=False, sort_keys=True)
+
+
+# ====== dead-letter 文件 ======
+
+def dead_letter_path(name: str, worker_id: int) -> str:
+    """某个爬虫某个 worker 的 dead-letter 文件路径"""
+    return os.path.join(DEAD_LETTER_DIR, f"{name}_{worker_id}.jsonl")
+
+
+def append_dead_letter(path: str, task: Task, error: str) -> None:
+    """把重试用尽的任务追加到 dead-letter 文件"""
+    dirname = os.path.dirname(path)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+
+    rec = dict(task)
+    rec["error"] = error
+    rec["failed_at"] = datetime.now().isoformat(timespec="seconds")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    print(f"[retry] 重试用尽，写入 dead-letter: {describe(task)}")
+
+
+def _replaying_path(path: str) -> str:
+    """正在重放的 dead-letter 文件：重放期间原文件改名成这个，重放完才删"""
+    return path + ".replaying"
+
+
+def take_dead_letters(path: str) -> List[Task]:
+    """
+    读出 dead-letter 文件里的全部任务，attempt 归零后可以当作新任务重新跑（再失败会重新写回原文件）。
+
+    读之前先把文件改名为 {path}.replaying，重放完由 finish_dead_letters() 删掉：
+    重放中途崩了 / 被杀，下次 --retry-dead-letters 时 .replaying 里的任务连同新写回的一起再读出来
+    （内容相同的只算一个），不会丢。
+    """
+    replaying = _replaying_path(path)
+    if os.path.exists(path):
+        if os.path.exists(replaying):
+            # 上次重放没跑完：新写回来的接到 .replaying 后面
+            with open(path, "r", encoding="utf-8") as src, open(replaying, "a", encoding="utf-8") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(path)
+        else:
+            os.replace(path, replaying)
+    if not os.path.exists(replaying):
+        return []
+
+    tasks: List[Task] = []
+    seen = set()
+    with open(replaying, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"[retry] dead-letter JSON decode 失败，跳过一行: {e}")
+                continue
+            if not isinstance(obj, dict) or not obj.get("kind"):
+                continue
+            for k in _DEAD_LETTER_META:
+                obj.pop(k, None)
+            key = json.dumps(obj, ensure_ascii=False, sort_keys=True)
+            if key in seen:
+                continue
+            seen.add(key)
+            tasks.append(obj)
+
+    print(f"[retry] 从 {path} 读出 {len(tasks)} 个 dead-letter 任务")
+    return tasks
+
+
+def finish_dead_letters(path: str) -> None:
+    """重放完（任务都已完成或者重新写回 dead-letter）之后调用：删掉 take_dead_letters 留下的 .replaying"""
+    replaying = _replaying_path(path)
+    if os.path.exists(replaying):
+        os.remove(replaying)
+
+
+# ====== 延迟重试队列 ======
+
+class RetryQueue:
+    """
+    按到期时间排序的重试队列（单线程使用）。
+
+    handler 签名：handler(task) -> None，
+    内部一般通过 try_fetch() 抓取，失败时 try_fetch 会自动把任务重新放回队列；
+    成功并写完记录后调 complete(task)。
+    """
+
+    def __init__(
+            self,
+            dead_letter_path: str,
+            max_retry: int = MAX_RETRY,
+            frontier: Optional[Frontier] = None,
+    ):
+        self.dead_letter_path = dead_letter_path
+        self.max_retry = max(1, max_retry)
+        self.frontier = frontier
+        self._heap: List[Tuple[float, int, Task]] = []
+        # 到期时间相同时按入队顺序出队，且避免比较 dict
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, task: Task, error: str) -> None:
+        """记录一次失败：还有机会就按退避时间入队，否则写 dead-letter"""
+        task = dict(task)
+        task["attempt"] = int(task.get("attempt") or 0) + 1
+
+        if task["attempt"] >= self.max_retry:
+            append_dead_letter(self.dead_letter_path, task, error)
+            if self.frontier is not None:
+                self.frontier.mark_failed(task, error)
+            return
+
+        delay = retry_delay(task["attempt"])
+        get_metrics().record_retry(endpoint_of(task.get("url") or ""))
+        if self.frontier is not None:
+            self.frontier.mark_pending(task, error, retry_at=time.time() + delay)
+        heapq.heappush(self._heap, (time.monotonic() + delay, next(self._seq), task))
+        print(
+            f"[retry] 第 {task['attempt']}/{self.max_retry} 次失败，"
+            f"{delay:.1f}s 后重试（队列 {len(self._heap)}）: {describe(task)}"
+        )
+
+    def should_fetch(self, task: Task) -> bool:
+        """新发现的任务登记进 frontier；已经完成的返回 False（不再重复抓取）"""
+        if self.frontier is None:
+            return True
+        self.frontier.add(task, hold=True)
+        return not self.frontier.is_done(task)
+
+    def complete(self, task: Task) -> None:
+        """handler 把记录写出（并 flush）之后调用"""
+        if self.frontier is not None:
+            self.frontier.mark_done(task)
+
+    def next_due_in(self) -> Optional[float]:
+        """离最早一个重试到期还有多少秒（已到期为 0）；队列为空返回 None"""
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - time.monotonic())
+
+    def pop_due(self) -> List[Task]:
+        """取出所有已经到期的任务"""
+        now = time.monotonic()
+        due: List[Task] = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[2])
+        return due
+
+    def run_due(self, handler: Callable[[Task], None]) -> int:
+        """执行所有已到期的任务，返回执行了多少个"""
+        due = self.pop_due()
+        for task in due:
+            handler(task)
+        return len(due)
+
+    def drain(self, handler: Callable[[Task], None]) -> None:
+        """新任务都处理完后调用：一直等到重试队列清空"""
+        while self._heap:
+            wait = self._heap[0][0] - time.monotonic()
+            if wait > 0:
+                print(f"[retry] 队列剩 {len(self._heap)} 个任务，{wait:.1f}s 后到期")
+                time.sleep(wait)
+            self.run_due(handler)
+
+    def try_fetch(
+            self,
+            task: Task,
+            fetch: Optional[Callable[[], Any]] = None,
+    ) -> Optional[Any]:
+        """
+        执行一次抓取（默认 fetch_html(task["url"])）：
+
+        - 成功：返回抓取结果；
+        - 404：打印日志，返回 None，不重试；
+        - 其他 HTTP 错误 / 网络异常：任务放回重试队列，返回 None。
+        """
+        if fetch is None:
+            url = task["url"]
+            fetch = lambda: fetch_html(url)
+
+        if self.frontier is not None:
+            self.frontier.mark_in_progress(task)
+
+        try:
+            return fetch()
+
+        except requests.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            if status == 404:
+                print(f"[fetch] 404 Not Found，直接跳过：{describe(task)}")
+                # 页面不存在也算处理完了，以后不再抓
+                self.complete(task)
+                return None
+            error = f"HTTP {status}"
+            print(f"[fetch] HTTP error status={status}: {describe(task)}")
+
+        # 其他网络错误（超时、连接错误等）
+        except Exception as e:
+            error = repr(e)
+            print(f"[fetch] 请求失败: {describe(task)}")
+            print(f"        错误: {e!r}")
+
+        self.push(task, error)
+        return None
@@ -1,18 +1,128 @@
+"""
+utils.py
+
+各个爬虫 / 解析模块共用的抓取工具。
+
+所有请求都走同一个全局 requests.Session：
+  - 底层 urllib3 按 host 维护 keep-alive 连接池，
+    同一部电影的 subject / celebrities / awards 请求复用同一条 TCP+TLS 连接；
+  - 连接池大小、超时统一在 crawler_config.py 中配置。
+
+每次请求前都会先经过 rate_limiter 的令牌桶（全机所有 worker 共享），
+各爬虫不需要再自己 sleep；请求结束后把状态码和耗时回报给限速器，
+由它自适应地调快 / 调慢。
+
+成功的响应（2xx / 404）顺手存进 page_archive 的原始响应存档；
+重放模式（各爬虫的 --from-archive）下不发请求，直接从存档里取。
+
+每次请求的耗时、响应大小、状态码和等令牌的时间按接口类别记进 metrics.py。
+"""
+
+import threading
+import time
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limiter import throttle as wait_for_token, report as report_result
+from page_archive import archive_enabled, get_archive, replay_enabled
+from metrics import endpoint_of, get_metrics
+from crawler_config import (
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+)
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/120.0 Safari/537.36"
+    )
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def build_session(
+        pool_connections: int = HTTP_POOL_CONNECTIONS,
+        pool_maxsize: int = HTTP_POOL_MAXSIZE,
+) -> requests.Session:
+    """
+    新建一个带连接池的 Session。
+
+    :param pool_connections: 最多缓存多少个 host 的连接池
+    :param pool_maxsize: 每个 host 最多保留多少条 keep-alive 连接
+    :return: 配置好的 Session
+    """
+    session = requests.Session()
+    # 重试由各个爬虫自己控制，这里不让 urllib3 偷偷重试
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=0,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+def get_session() -> requests.Session:
+    """返回进程内共享的 Session（懒加载，线程安全）"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+def fetch_html(url: str, throttle: bool = True, feedback: bool = True) -> str:
+    """
+    发起 HTTP 请求， 返回 HTML 文本
+
+    :param url: 目标 URL
+    :param throttle: 是否先向令牌桶申请配额；
+                     调用方已经自己 reserve 过（比如 asyncio 引擎）时传 False
+    :param feedback: 是否把状态码 / 耗时回报给自适应限速
+    """
+    if replay_enabled():
+        # 重放：不限速、不发请求，存档里没有则抛 ArchiveMiss
+        resp = get_archive().load_response(url)
+        resp.raise_for_status()
+        resp.encoding = "utf-8"
+        return resp.text
+
+    metrics = get_metrics()
+    endpoint = endpoint_of(url)
+    if throttle:
+        metrics.record_throttle(endpoint, wait_for_token(url))
 
-def fetch_html(url: str) -> str:
-    """发起 HTTP 请求， 返回 HTML 文本"""
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/120.0 Safari/537.36"
+    t0 = time.perf_counter()
+    try:
+        resp = get_session().get(
+            url,
+            timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT),
         )
-    }
+    except requests.RequestException:
+        elapsed = time.perf_counter() - t0
+        metrics.record_request(endpoint, None, elapsed, 0)
+        if feedback:
+            report_result(url, None, elapsed)
+        raise
 
-    resp = requests.get(url, headers=headers, timeout=10)
+    # 非 stream 请求 get() 返回时 body 已经读完
+    metrics.record_request(endpoint, resp.status_code, time.perf_counter() - t0, len(resp.content))
+    if feedback:
+        # elapsed 是发出请求到收到响应头的时间，最能反映服务端排队情况
+        report_result(url, resp.status_code, resp.elapsed.total_seconds())
+    if archive_enabled():
+        get_archive().store_response(url, resp)
     resp.raise_for_status() # raise exception when receive error code
 
     # let's make it clear!
     resp.encoding = "utf-8"
-    return resp.text
\ No newline at end of file
+    return resp.text